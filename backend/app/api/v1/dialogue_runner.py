@@ -19,9 +19,10 @@ from app.schemas.dialogue_runner import (
     RunDialogueRequest,
     TextEvent,
 )
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
 from app.services.adk.memory.memory_factory import create_memory_service
 from app.services.adk.runner import AgentEngineClient, AgentRunnerService
-from app.services.adk.sessions import FirestoreSessionService
+from app.services.adk.sessions import FirestoreSessionService, create_firestore_session_service
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +33,8 @@ DEFAULT_APP_NAME = "homework-coach"
 
 
 def get_session_service() -> FirestoreSessionService:
-    """FirestoreSessionServiceを取得する"""
-    return FirestoreSessionService()
+    """FirestoreSessionServiceを取得する（プロセス共有キャッシュ付き）"""
+    return create_firestore_session_service()
 
 
 def get_memory_service() -> BaseMemoryService:
@@ -72,18 +73,13 @@ async def ensure_session_exists(
         user_id: ユーザーID
         session_id: セッションID
     """
-    existing = await session_service.get_session(
+    _, created = await session_service.get_or_create_session(
         app_name=DEFAULT_APP_NAME,
         user_id=user_id,
         session_id=session_id,
     )
-    if existing is None:
-        logger.info(f"Creating new session: {session_id} for user: {user_id}")
-        await session_service.create_session(
-            app_name=DEFAULT_APP_NAME,
-            user_id=user_id,
-            session_id=session_id,
-        )
+    if created:
+        logger.info(f"Created new session: {session_id} for user: {user_id}")
 
 
 async def event_generator(
@@ -92,6 +88,7 @@ async def event_generator(
     user_id: str,
     session_id: str,
     message: str,
+    memory_service: BaseMemoryService | None = None,
 ) -> AsyncIterator[str]:
     """SSEイベントを生成する（ローカル Runner）
 
@@ -101,10 +98,17 @@ async def event_generator(
         user_id: ユーザーID
         session_id: セッションID
         message: ユーザーメッセージ
+        memory_service: 記憶管理サービス（指定時は実行中の記憶検索をインメモリで行う）
 
     Yields:
         SSE形式のイベント文字列
     """
+    firestore_memory = (
+        memory_service if isinstance(memory_service, FirestoreMemoryService) else None
+    )
+    if firestore_memory is not None:
+        # セッションの確認と並行して記憶をバックグラウンドで読み込む
+        firestore_memory.warm_user(app_name=DEFAULT_APP_NAME, user_id=user_id)
     try:
         # セッションが存在しない場合は作成
         await ensure_session_exists(session_service, user_id, session_id)
@@ -123,6 +127,10 @@ async def event_generator(
         error_event = ErrorEvent(error=str(e), code="INTERNAL_ERROR")
         yield f"event: error\ndata: {error_event.model_dump_json()}\n\n"
 
+    finally:
+        if firestore_memory is not None:
+            firestore_memory.release_user(app_name=DEFAULT_APP_NAME, user_id=user_id)
+
 
 async def agent_engine_event_generator(
     engine_client: AgentEngineClient,
@@ -217,6 +225,7 @@ async def run_dialogue(
             user_id=request.user_id,
             session_id=request.session_id,
             message=request.message,
+            memory_service=runner.memory_service,
         ),
         media_type="text/event-stream",
     )
@@ -8,7 +8,7 @@ import asyncio
 import json
 import logging
 import uuid
-from typing import Any
+from typing import Any, cast
 
 from fastapi import Depends, WebSocket, WebSocketDisconnect
 from google.adk.memory import BaseMemoryService
@@ -19,8 +19,15 @@ from app.schemas.voice_stream import (
     ImageRecognitionErrorMessage,
     ImageRecognitionErrorPayload,
 )
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
 from app.services.adk.memory.memory_factory import create_memory_service
-from app.services.adk.sessions import FirestoreSessionService
+from app.services.adk.sessions import FirestoreSessionService, create_firestore_session_service
+from app.services.voice.audio_frames import (
+    AUDIO_FRAME_VERSION,
+    AudioChunk,
+    AudioFrameEncoder,
+)
+from app.services.voice.audio_ingest import AudioEncoding, AudioInputFormat
 from app.services.voice.streaming_service import VoiceStreamingService
 
 logger = logging.getLogger(__name__)
@@ -28,10 +35,13 @@ logger = logging.getLogger(__name__)
 # デフォルトのアプリ名
 DEFAULT_APP_NAME = "homework-coach"
 
+# 送信音声をバイナリフレームで受け取るクライアントが指定するクエリパラメータの値（?audio=binary）
+BINARY_AUDIO_MODE = "binary"
+
 
 def get_session_service() -> FirestoreSessionService:
-    """FirestoreSessionServiceを取得する"""
-    return FirestoreSessionService()
+    """FirestoreSessionServiceを取得する（プロセス共有キャッシュ・書き込み遅延付き）"""
+    return create_firestore_session_service(write_behind=True)
 
 
 def get_memory_service() -> BaseMemoryService:
@@ -45,18 +55,38 @@ async def _ensure_session_exists(
     session_id: str,
 ) -> None:
     """セッションが存在することを確認し、なければ作成する"""
-    existing = await session_service.get_session(
+    _, created = await session_service.get_or_create_session(
         app_name=DEFAULT_APP_NAME,
         user_id=user_id,
         session_id=session_id,
     )
-    if existing is None:
-        logger.info(f"Creating new session: {session_id} for user: {user_id}")
-        await session_service.create_session(
-            app_name=DEFAULT_APP_NAME,
-            user_id=user_id,
-            session_id=session_id,
-        )
+    if created:
+        logger.info(f"Created new session: {session_id} for user: {user_id}")
+
+
+async def _flush_session_events(
+    session_service: FirestoreSessionService,
+    session_id: str,
+) -> None:
+    """切断時に書き込み遅延中のイベントを書き込む"""
+    if not isinstance(session_service, FirestoreSessionService):
+        return
+    try:
+        await session_service.flush_events(session_id)
+    except Exception:
+        logger.exception(f"Failed to flush session events: {session_id}")
+
+
+def _warm_memory(memory_service: BaseMemoryService, user_id: str) -> None:
+    """接続開始時に記憶のホットインデックスの読み込みを開始する（完了は待たない）"""
+    if isinstance(memory_service, FirestoreMemoryService):
+        memory_service.warm_user(app_name=DEFAULT_APP_NAME, user_id=user_id)
+
+
+def _release_memory(memory_service: BaseMemoryService, user_id: str) -> None:
+    """切断時に記憶のホットインデックスの固定を解除する"""
+    if isinstance(memory_service, FirestoreMemoryService):
+        memory_service.release_user(app_name=DEFAULT_APP_NAME, user_id=user_id)
 
 
 async def _agent_to_client(
@@ -65,12 +95,19 @@ async def _agent_to_client(
     user_id: str,
     session_id: str,
 ) -> None:
-    """エージェントからクライアントへのイベント転送"""
+    """エージェントからクライアントへのイベント転送
+
+    音声チャンク（AudioChunk）はバイナリフレーム、それ以外はJSONで送信する。
+    """
+    encoder = AudioFrameEncoder()
     try:
         async for event in service.receive_events(
             user_id=user_id,
             session_id=session_id,
         ):
+            if isinstance(event, AudioChunk):
+                await websocket.send_bytes(encoder.encode(event))
+                continue
             json_str = event.model_dump_json(exclude_none=True, by_alias=True)
             await websocket.send_text(json_str)
     except Exception:
@@ -199,10 +236,20 @@ async def voice_stream_endpoint(
     session_id: str,
     session_service: FirestoreSessionService = Depends(get_session_service),
     memory_service: BaseMemoryService = Depends(get_memory_service),
+    audio: str | None = None,
+    input_encoding: str = "s16le",
+    input_rate: int = 16000,
+    input_channels: int = 1,
 ) -> None:
     """音声ストリームWebSocketエンドポイント
 
     双方向音声ストリーミングを提供する。
+    クエリパラメータ audio=binary を指定したクライアントには、接続直後に
+    {"type": "protocol", "audio": "binary", "version": 1} を返し、以降の送信音声を
+    バイナリフレーム（app/services/voice/audio_frames.py）で送る。
+    指定しない場合は従来どおりbase64のJSONで送る。
+    クライアントが送る音声の形式は input_encoding（s16le / f32le）・input_rate・
+    input_channels で指定でき、サーバー側で 16kHz Int16 モノラルに変換する。
 
     Args:
         websocket: WebSocket接続
@@ -210,9 +257,26 @@ async def voice_stream_endpoint(
         session_id: セッションID
         session_service: セッション管理サービス
         memory_service: 記憶管理サービス
+        audio: 送信音声の形式（"binary" でバイナリフレーム）
+        input_encoding: 受信音声のエンコーディング（"s16le" または "f32le"）
+        input_rate: 受信音声のサンプリングレート（Hz）
+        input_channels: 受信音声のチャンネル数（1 または 2）
     """
     await websocket.accept()
 
+    try:
+        input_format = AudioInputFormat(
+            encoding=cast(AudioEncoding, input_encoding),
+            sample_rate=input_rate,
+            channels=input_channels,
+        )
+    except ValueError as e:
+        logger.warning(f"Unsupported input audio format: {e}")
+        error_msg = json.dumps({"error": f"サポートしていない音声形式です: {e}"})
+        await websocket.send_text(error_msg)
+        await websocket.close(code=1003)
+        return
+
     try:
         # セッションの確認/作成
         await _ensure_session_exists(session_service, user_id, session_id)
@@ -223,20 +287,34 @@ async def voice_stream_endpoint(
         await websocket.close(code=1011)
         return
 
+    # 会話中の記憶検索をインメモリで行うため、バックグラウンドで読み込む
+    _warm_memory(memory_service, user_id)
+
+    binary_audio = audio == BINARY_AUDIO_MODE
     try:
         # VoiceStreamingServiceの作成
         service = VoiceStreamingService(
             session_service=session_service,
             memory_service=memory_service,
+            binary_audio=binary_audio,
+            input_format=input_format,
         )
     except Exception:
         logger.exception("Failed to create VoiceStreamingService")
+        _release_memory(memory_service, user_id)
         error_msg = json.dumps({"error": "音声サービスの初期化に失敗しました"})
         await websocket.send_text(error_msg)
         await websocket.close(code=1011)
         return
 
     try:
+        if binary_audio:
+            await websocket.send_text(
+                json.dumps(
+                    {"type": "protocol", "audio": BINARY_AUDIO_MODE, "version": AUDIO_FRAME_VERSION}
+                )
+            )
+
         # エージェントからのイベント転送を開始
         agent_task = asyncio.create_task(_agent_to_client(websocket, service, user_id, session_id))
 
@@ -252,3 +330,5 @@ async def voice_stream_endpoint(
         logger.exception("Error in voice stream WebSocket")
     finally:
         service.close()
+        await _flush_session_events(session_service, session_id)
+        _release_memory(memory_service, user_id)
@@ -0,0 +1,126 @@
+"""共有Firestoreクライアント
+
+firestore.AsyncClient は生成ごとにgRPCチャネルと認証ハンドシェイクを持つため、
+リクエストごとにサービスを生成するとその分の接続確立コストがかかる。
+アプリのlifespanでレジストリを開き、(project, database) ごとに1つのクライアントを
+全サービスで共有し、シャットダウン時に閉じる。
+
+レジストリが開かれていない場合（テストやスクリプト）、get_shared_firestore_client は
+Noneを返し、各サービスは従来どおり自身のクライアントを生成する。
+"""
+
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from google.cloud.firestore import AsyncClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE = "(default)"
+
+ClientFactory = Callable[[str | None, str], Any]
+
+
+def _default_factory(project_id: str | None, database: str) -> Any:
+    return AsyncClient(project=project_id, database=database)
+
+
+async def close_client(client: Any) -> None:
+    """クライアントを閉じる
+
+    AsyncClient.close() はHTTPセッションのみを閉じるため、生成済みのgRPCトランスポート
+    （チャネル）も閉じる。未使用のクライアントはトランスポートを生成せずに閉じる。
+    """
+    api = getattr(client, "_firestore_api_internal", None)
+    if api is not None:
+        await api.transport.close()
+    client.close()
+
+
+class FirestoreClientRegistry:
+    """(project, database) ごとにAsyncClientを1つ生成して共有する"""
+
+    def __init__(self, factory: ClientFactory | None = None) -> None:
+        """初期化
+
+        Args:
+            factory: クライアント生成関数（テスト用、デフォルトは firestore.AsyncClient）
+        """
+        self._factory = factory or _default_factory
+        self._clients: dict[tuple[str | None, str], Any] = {}
+
+    def get(self, project_id: str | None = None, database: str = DEFAULT_DATABASE) -> Any:
+        """共有クライアントを取得する（初回のみ生成）
+
+        Args:
+            project_id: GCPプロジェクトID（Noneでデフォルト）
+            database: Firestoreデータベース名
+
+        Returns:
+            firestore.AsyncClient
+        """
+        key = (project_id, database)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._factory(project_id, database)
+            self._clients[key] = client
+        return client
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def close(self) -> None:
+        """全クライアントを閉じる"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await close_client(client)
+            except Exception:
+                logger.exception("Failed to close Firestore client")
+
+
+# アプリのlifespan中のみ有効なレジストリ
+_registry: FirestoreClientRegistry | None = None
+
+
+def open_firestore_clients(factory: ClientFactory | None = None) -> FirestoreClientRegistry:
+    """共有クライアントのレジストリを開く（アプリ起動時）
+
+    Args:
+        factory: クライアント生成関数（テスト用）
+
+    Returns:
+        FirestoreClientRegistry
+    """
+    global _registry
+
+    if _registry is None:
+        _registry = FirestoreClientRegistry(factory)
+    return _registry
+
+
+def get_shared_firestore_client(
+    project_id: str | None = None, database: str = DEFAULT_DATABASE
+) -> Any | None:
+    """共有クライアントを取得する
+
+    Args:
+        project_id: GCPプロジェクトID（Noneでデフォルト）
+        database: Firestoreデータベース名
+
+    Returns:
+        firestore.AsyncClient（レジストリが開かれていない場合はNone）
+    """
+    if _registry is None:
+        return None
+    return _registry.get(project_id, database)
+
+
+async def close_firestore_clients() -> None:
+    """共有クライアントを閉じてレジストリを破棄する（アプリ終了時）"""
+    global _registry
+
+    registry, _registry = _registry, None
+    if registry is not None:
+        await registry.close()
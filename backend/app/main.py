@@ -2,19 +2,40 @@
 
 import logging
 import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.router import router as api_v1_router
 from app.api.v1.voice_stream import voice_stream_endpoint
+from app.db.firestore_client import close_firestore_clients, open_firestore_clients
+from app.services.adk.sessions.session_factory import stop_shared_background_tasks
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """アプリのライフサイクル管理
+
+    起動時に共有Firestoreクライアントのレジストリを開き、
+    終了時にバックグラウンドタスクを停止してからクライアントを閉じる。
+    """
+    open_firestore_clients()
+    try:
+        yield
+    finally:
+        await stop_shared_background_tasks()
+        await close_firestore_clients()
+
+
 app = FastAPI(
     title="宿題コーチロボット API",
     description="小学校低学年向けソクラテス式対話学習支援API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # API v1 ルーターを登録
@@ -10,11 +10,15 @@ from app.services.adk.memory.converters import (
     extract_text_from_event,
     extract_words_lower,
 )
-from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.services.adk.memory.firestore_memory_service import (
+    FirestoreMemoryService,
+    MemoryWriteResult,
+)
 from app.services.adk.memory.memory_factory import create_memory_service
 
 __all__ = [
     "FirestoreMemoryService",
+    "MemoryWriteResult",
     "create_memory_service",
     "extract_text_from_event",
     "event_to_memory_dict",
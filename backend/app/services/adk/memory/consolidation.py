@@ -0,0 +1,197 @@
+"""記憶エントリの統合（consolidation）
+
+子どもごとの記憶エントリは会話のたびに増え続け、検索のコストと
+LLMに渡すコンテキストも増える。統合では古い生のエントリを話題ごとに
+要約エントリへまとめ、ユーザーあたりのエントリ数を上限以下に保つ。
+
+- 話題は custom_metadata の topic（未設定の場合はセッションID）
+- 新しいエントリ retain_recent 件はそのまま残す
+- それより古いエントリ（既存の要約を含む）を話題ごとに1件の要約にまとめる
+- 話題の数が多く上限を超える場合は、最も古い話題どうしを1件にまとめる
+- 要約は Summarizer プロトコルで差し替え可能。ExtractiveSummarizer は
+  LLMを使わない決定的な実装（テスト・オフライン実行用）
+"""
+
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from app.services.adk.memory.inverted_index import entry_text
+
+# ユーザーあたりの記憶エントリ数の上限
+DEFAULT_MAX_ENTRIES_PER_USER = 500
+
+# 要約エントリの custom_metadata に設定するキー
+CONSOLIDATED_KEY = "consolidated"
+
+# 複数の話題をまとめた要約の話題名
+MIXED_TOPIC = "mixed"
+
+SUMMARY_AUTHOR = "memory"
+
+_SEPARATOR = " / "
+
+
+class Summarizer(Protocol):
+    """同じ話題の記憶テキストを1つの要約にまとめる"""
+
+    async def summarize(self, topic: str, texts: list[str]) -> str:
+        """テキストのリスト（古い順）を要約する"""
+        ...
+
+
+class ExtractiveSummarizer:
+    """各テキストの先頭部分を古い順につなげる決定的な要約
+
+    max_chars を超える場合は新しいテキストを優先して残す。
+    """
+
+    def __init__(self, max_chars: int = 1000, chars_per_text: int = 80) -> None:
+        """初期化
+
+        Args:
+            max_chars: 要約の最大文字数
+            chars_per_text: 1テキストあたりの最大文字数
+        """
+        self._max_chars = max_chars
+        self._chars_per_text = chars_per_text
+
+    async def summarize(
+        self,
+        topic: str,  # noqa: ARG002 - プロトコル準拠（抽出のみのため話題は使わない）
+        texts: list[str],
+    ) -> str:
+        """テキストの先頭部分を " / " でつなげる"""
+        snippets: list[str] = []
+        length = 0
+        for text in reversed(texts):
+            snippet = " ".join(text.split())[: self._chars_per_text]
+            if not snippet:
+                continue
+            added = len(snippet) + (len(_SEPARATOR) if snippets else 0)
+            if snippets and length + added > self._max_chars:
+                break
+            snippets.append(snippet)
+            length += added
+        return _SEPARATOR.join(reversed(snippets))[: self._max_chars]
+
+
+@dataclass
+class ConsolidationGroup:
+    """1件の要約にまとめるエントリのグループ
+
+    Attributes:
+        topic: 話題
+        entry_ids: まとめるエントリID（古い順）
+    """
+
+    topic: str
+    entry_ids: list[str]
+
+    @property
+    def summary_id(self) -> str:
+        """要約エントリのID（同じグループからは同じIDになる）"""
+        key = "\n".join([self.topic, *self.entry_ids]).encode("utf-8")
+        return f"summary-{hashlib.sha1(key).hexdigest()[:16]}"
+
+
+def entry_topic(data: dict[str, Any]) -> str:
+    """記憶エントリの話題"""
+    metadata = data.get("custom_metadata") or {}
+    return str(metadata.get("topic") or data.get("session_id") or "")
+
+
+def plan_consolidation(
+    entries: dict[str, dict[str, Any]],
+    *,
+    max_entries: int,
+    retain_recent: int | None = None,
+) -> list[ConsolidationGroup]:
+    """エントリ数を上限以下にするための統合グループを決める
+
+    Args:
+        entries: エントリID → 記憶エントリのdict
+        max_entries: ユーザーあたりのエントリ数の上限（1以上）
+        retain_recent: そのまま残す新しいエントリ数（Noneで上限の半分）
+
+    Returns:
+        統合グループのリスト（上限以下の場合は空）
+    """
+    if len(entries) <= max_entries:
+        return []
+    if retain_recent is None:
+        retain_recent = max_entries // 2
+    retain_recent = max(0, min(retain_recent, max_entries - 1))
+
+    ordered = sorted(
+        entries, key=lambda entry_id: (entries[entry_id].get("timestamp") or 0.0, entry_id)
+    )
+    old = ordered[: len(ordered) - retain_recent]
+    by_topic: dict[str, list[str]] = defaultdict(list)
+    for entry_id in old:
+        by_topic[entry_topic(entries[entry_id])].append(entry_id)
+
+    # 最新のエントリが新しい話題から順に並べる
+    groups = sorted(
+        (ConsolidationGroup(topic, entry_ids) for topic, entry_ids in by_topic.items()),
+        key=lambda group: (entries[group.entry_ids[-1]].get("timestamp") or 0.0, group.topic),
+        reverse=True,
+    )
+    allowed = max_entries - retain_recent
+    if len(groups) > allowed:
+        rest = [entry_id for group in groups[allowed - 1 :] for entry_id in group.entry_ids]
+        rest.sort(key=lambda entry_id: (entries[entry_id].get("timestamp") or 0.0, entry_id))
+        groups = [*groups[: allowed - 1], ConsolidationGroup(MIXED_TOPIC, rest)]
+
+    # 1件だけのグループ（要約済みのものを含む）はまとめる必要がない
+    return [group for group in groups if len(group.entry_ids) > 1]
+
+
+async def build_summary_entry(
+    group: ConsolidationGroup,
+    entries: dict[str, dict[str, Any]],
+    summarizer: Summarizer,
+) -> dict[str, Any]:
+    """グループの要約エントリを作成する
+
+    Args:
+        group: 統合グループ
+        entries: エントリID → 記憶エントリのdict
+        summarizer: 要約器
+
+    Returns:
+        要約エントリのdict（タイムスタンプはグループの最新エントリ）
+    """
+    sources = [entries[entry_id] for entry_id in group.entry_ids]
+    text = await summarizer.summarize(group.topic, [entry_text(data) for data in sources])
+    source_count = sum(
+        (data.get("custom_metadata") or {}).get("source_count") or 1 for data in sources
+    )
+    return {
+        "event_id": group.summary_id,
+        "session_id": sources[-1].get("session_id", ""),
+        "author": SUMMARY_AUTHOR,
+        "timestamp": max(data.get("timestamp") or 0.0 for data in sources),
+        "content": {"role": "user", "parts": [{"text": text}]},
+        "custom_metadata": {
+            CONSOLIDATED_KEY: True,
+            "topic": group.topic,
+            "source_count": source_count,
+        },
+    }
+
+
+@dataclass(frozen=True)
+class ConsolidationResult:
+    """1ユーザーの統合結果
+
+    Attributes:
+        entries_before: 統合前のエントリ数
+        entries_after: 統合後のエントリ数
+        summaries: 作成した要約エントリ数
+    """
+
+    entries_before: int
+    entries_after: int
+    summaries: int
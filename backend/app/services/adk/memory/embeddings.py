@@ -0,0 +1,222 @@
+"""記憶検索用の埋め込みベクトルとNumPyによる類似度検索
+
+振り返りエージェントがキーワードの一致だけでなく、意味の近い過去のつまずきを
+思い出せるよう、記憶エントリを埋め込みベクトルで検索する。
+
+- 埋め込みは add_session_to_memory の時点で1回だけ計算し、
+  記憶エントリの embedding フィールドに float16 のバイト列として保存する
+- 検索時はユーザーの全エントリの埋め込みを1つの行列にまとめ、
+  クエリとのコサイン類似度の上位k件を argpartition で求める
+- ユーザーごとの行列はプロセス内にLRUでキャッシュする。エントリを書き込むたびに
+  ユーザードキュメントの memory_version を増やし、キャッシュ済みの行列と
+  バージョンが異なる場合は読み込み直す（他のインスタンスが書き込んだ記憶も検索できる）
+- 埋め込みモデルは Embedder プロトコルで差し替え可能。HashingEmbedder は
+  外部APIを使わないオフライン実装（テスト・ローカル開発用）
+"""
+
+import hashlib
+import math
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Protocol
+
+import numpy as np
+import numpy.typing as npt
+
+from app.services.adk.memory.tokenizer import tokenize
+
+# 記憶エントリに埋め込みを保存するフィールド名
+EMBEDDING_FIELD = "embedding"
+
+# 保存時の要素型（float32の半分のサイズ）
+EMBEDDING_DTYPE = np.float16
+
+DEFAULT_EMBEDDING_DIM = 256
+
+# エントリの書き込みごとに増やすユーザードキュメントのフィールド名
+MEMORY_VERSION_FIELD = "memory_version"
+
+# 行列をキャッシュする最大ユーザー数
+DEFAULT_EMBEDDING_CACHE_USERS = 256
+
+FloatArray = npt.NDArray[np.floating]
+
+
+class Embedder(Protocol):
+    """テキストを埋め込みベクトルに変換する"""
+
+    @property
+    def dim(self) -> int:
+        """ベクトルの次元数"""
+        ...
+
+    def embed(self, texts: list[str]) -> FloatArray:
+        """テキストのリストを (len(texts), dim) の行列に変換する
+
+        各行はL2正規化済み（内積がコサイン類似度になる）とする。
+        意味のあるトークンを含まないテキストはゼロベクトルでよい。
+        """
+        ...
+
+
+class HashingEmbedder:
+    """トークンのハッシュによるオフラインの埋め込み（feature hashing）
+
+    tokenizer.py のトークンをハッシュで dim 次元に割り当て、
+    出現回数の対数（1 + log(tf)）を符号付きで加算してL2正規化する。
+    """
+
+    def __init__(self, dim: int = DEFAULT_EMBEDDING_DIM) -> None:
+        """初期化
+
+        Args:
+            dim: ベクトルの次元数
+        """
+        if dim <= 0:
+            raise ValueError(f"dim must be positive: {dim}")
+        self._dim = dim
+
+    @property
+    def dim(self) -> int:
+        """ベクトルの次元数"""
+        return self._dim
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self._dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts: list[str]) -> FloatArray:
+        """テキストのリストをL2正規化済みの行列に変換する"""
+        matrix = np.zeros((len(texts), self._dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(tokenize(text)).items():
+                index, sign = self._bucket(token)
+                matrix[row, index] += sign * (1.0 + math.log(count))
+        return normalize_rows(matrix)
+
+
+def normalize_rows(matrix: FloatArray) -> FloatArray:
+    """各行をL2正規化する（ゼロベクトルはそのまま）"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized: FloatArray = matrix / np.where(norms == 0, 1.0, norms)
+    return normalized
+
+
+def encode_embedding(vector: FloatArray) -> bytes:
+    """埋め込みベクトルをFirestore保存用のfloat16バイト列に変換する"""
+    return np.asarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def decode_embedding(data: bytes, dim: int) -> FloatArray | None:
+    """float16バイト列を埋め込みベクトルに戻す（次元が合わない場合はNone）"""
+    if len(data) != dim * np.dtype(EMBEDDING_DTYPE).itemsize:
+        return None
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+def cosine_top_k(matrix: FloatArray, query: FloatArray, top_k: int) -> list[tuple[int, float]]:
+    """正規化済みの行列とクエリのコサイン類似度の上位k件を求める
+
+    Args:
+        matrix: (N, dim) のL2正規化済み行列
+        query: (dim,) のL2正規化済みクエリ
+        top_k: 返す最大件数
+
+    Returns:
+        (行番号, 類似度) の類似度降順リスト（同点は行番号の昇順、類似度が0以下は除く）
+    """
+    if top_k <= 0 or len(matrix) == 0:
+        return []
+    scores = matrix.astype(np.float32, copy=False) @ query.astype(np.float32, copy=False)
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > top_k:
+        candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+    # 候補はk件以下のため、(-類似度, 行番号) での並べ替えは安価
+    order = np.lexsort((candidates, -scores[candidates]))
+    return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+
+@dataclass
+class UserEmbeddings:
+    """1ユーザーの埋め込み行列
+
+    Attributes:
+        entry_ids: 行番号 → エントリID
+        matrix: (len(entry_ids), dim) の float16 行列
+        version: 読み込んだ時点のユーザーの memory_version
+    """
+
+    entry_ids: list[str]
+    matrix: FloatArray
+    version: int = 0
+
+    def extend(self, entry_ids: list[str], rows: FloatArray) -> None:
+        """行を追加する（既存のエントリIDは置き換える）"""
+        positions = {entry_id: row for row, entry_id in enumerate(self.entry_ids)}
+        rows = np.asarray(rows, dtype=EMBEDDING_DTYPE)
+        new_ids: list[str] = []
+        new_rows: list[int] = []
+        for row, entry_id in enumerate(entry_ids):
+            if entry_id in positions:
+                self.matrix[positions[entry_id]] = rows[row]
+            else:
+                new_ids.append(entry_id)
+                new_rows.append(row)
+        if new_ids:
+            self.entry_ids.extend(new_ids)
+            self.matrix = np.concatenate([self.matrix, rows[new_rows]])
+
+
+class EmbeddingCache:
+    """ユーザーごとの埋め込み行列のLRUキャッシュ（memory_version が一致する場合のみ使う）"""
+
+    def __init__(self, max_users: int = DEFAULT_EMBEDDING_CACHE_USERS) -> None:
+        """初期化
+
+        Args:
+            max_users: キャッシュする最大ユーザー数（0でキャッシュしない）
+        """
+        self._max_users = max_users
+        self._users: OrderedDict[tuple[str, str], UserEmbeddings] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._users
+
+    def get(self, app_name: str, user_id: str, version: int) -> UserEmbeddings | None:
+        """キャッシュ済みの行列を取得する（最近使用したものとして扱う）
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+            version: ユーザーの現在の memory_version
+
+        Returns:
+            行列（未キャッシュ、またはバージョンが異なり破棄した場合はNone）
+        """
+        key = (app_name, user_id)
+        embeddings = self._users.get(key)
+        if embeddings is None:
+            return None
+        if embeddings.version != version:
+            del self._users[key]
+            return None
+        self._users.move_to_end(key)
+        return embeddings
+
+    def put(self, app_name: str, user_id: str, embeddings: UserEmbeddings) -> None:
+        """行列をキャッシュする（上限を超えた場合は最も古いユーザーを追い出す）"""
+        if self._max_users <= 0:
+            return
+        key = (app_name, user_id)
+        self._users[key] = embeddings
+        self._users.move_to_end(key)
+        while len(self._users) > self._max_users:
+            self._users.popitem(last=False)
+
+    def invalidate(self, app_name: str, user_id: str) -> None:
+        """ユーザーの行列を破棄する"""
+        self._users.pop((app_name, user_id), None)
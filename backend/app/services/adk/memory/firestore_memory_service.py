@@ -1,18 +1,82 @@
 """Firestore-backed ADK MemoryService"""
 
+import asyncio
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
 from google.adk.memory.base_memory_service import (
     BaseMemoryService,
     SearchMemoryResponse,
 )
 from google.adk.sessions.session import Session
-from google.cloud import firestore  # type: ignore[attr-defined]
+from google.cloud import firestore
 from typing_extensions import override
 
+from app.services.adk.memory.consolidation import (
+    ConsolidationResult,
+    Summarizer,
+    build_summary_entry,
+    plan_consolidation,
+)
 from app.services.adk.memory.converters import (
     dict_to_memory_entry,
     event_to_memory_dict,
-    extract_words_lower,
 )
+from app.services.adk.memory.embeddings import (
+    EMBEDDING_DTYPE,
+    EMBEDDING_FIELD,
+    MEMORY_VERSION_FIELD,
+    Embedder,
+    EmbeddingCache,
+    FloatArray,
+    UserEmbeddings,
+    cosine_top_k,
+    decode_embedding,
+    encode_embedding,
+)
+from app.services.adk.memory.hot_index import HotMemoryIndex, HotUserMemory
+from app.services.adk.memory.inverted_index import (
+    INDEX_VERSION,
+    LENGTHS_COLLECTION,
+    POSTINGS_PER_SHARD,
+    TERM_SHARDS_COLLECTION,
+    TERMS_COLLECTION,
+    TermPostings,
+    bm25_top_k,
+    build_postings,
+    entry_text,
+    query_terms,
+    shard_count,
+    shard_doc_id,
+    split_by_shard,
+    term_doc_id,
+)
+
+# Firestoreの1バッチあたりの最大書き込み数
+MAX_BATCH_WRITES = 500
+
+# search_memory が返す最大件数
+DEFAULT_TOP_K = 10
+
+# セッションごとの書き込み済み位置（ウォーターマーク）のコレクション
+SESSIONS_COLLECTION = "sessions"
+
+# (ドキュメント参照, データ（Noneで削除）, merge)
+_Write = tuple[Any, dict[str, Any] | None, bool]
+
+
+@dataclass(frozen=True)
+class MemoryWriteResult:
+    """add_session_to_memory の書き込み結果
+
+    Attributes:
+        written: 書き込んだ記憶エントリ数
+        skipped: 書き込み済みのためスキップした記憶エントリ数
+    """
+
+    written: int
+    skipped: int
 
 
 class FirestoreMemoryService(BaseMemoryService):
@@ -22,20 +86,71 @@ class FirestoreMemoryService(BaseMemoryService):
 
     Firestoreコレクション構造:
         /memories/{app_name}/users/{user_id}/entries/{entry_id} - 記憶エントリ
+        /memories/{app_name}/users/{user_id}/terms/{term_id}/shards/{shard} - 転置インデックス
+        /memories/{app_name}/users/{user_id}/entry_lengths/{shard} - エントリの長さ
+        /memories/{app_name}/users/{user_id}/sessions/{session_id} - 書き込み済み位置
+
+    add_session_to_memory はセッションごとに書き込み済みのイベント数を記録し、
+    同じセッションを繰り返し追加しても新しいイベントのみをバッチで書き込む。
+
+    検索はクエリとエントリを tokenizer.py のトークン（かな・漢字はn-gram）に分割し、
+    BM25スコアの上位 top_k 件を返す。
+
+    inverted_index=True の場合、add_session_to_memory で転置インデックスを更新し、
+    search_memory はクエリの語のポスティングリストと上位k件のエントリのみを読み取る
+    （inverted_index.py 参照）。インデックス未構築（または形式が古い）ユーザーは、
+    最初の検索時に全エントリを走査して構築する。
+
+    embedder を指定した場合は埋め込みベクトルによる検索モードになる。
+    add_session_to_memory で各エントリの埋め込みを計算して float16 で保存し、
+    search_memory はクエリとのコサイン類似度の上位 top_k 件を返す（embeddings.py 参照）。
+    ユーザーごとの埋め込み行列はプロセス内にキャッシュし、ユーザードキュメントの
+    memory_version が変わったら読み込み直す。
+
+    hot_index を指定した場合、warm_user で読み込んだユーザーの検索は
+    インメモリのインデックスのみで行う（hot_index.py 参照）。
     """
 
     def __init__(
         self,
         project_id: str | None = None,
         database: str = "(default)",
+        *,
+        client: Any | None = None,
+        inverted_index: bool = False,
+        top_k: int = DEFAULT_TOP_K,
+        embedder: Embedder | None = None,
+        embedding_cache: EmbeddingCache | None = None,
+        hot_index: HotMemoryIndex | None = None,
     ) -> None:
         """初期化
 
         Args:
             project_id: GCPプロジェクトID（Noneでデフォルト）
             database: Firestoreデータベース名
+            client: 使用するFirestore AsyncClient（Noneで新規作成）
+            inverted_index: 転置インデックスで検索するか
+            top_k: search_memory が返す最大件数
+            embedder: 埋め込みモデル（指定時は埋め込みベクトルで検索する）
+            embedding_cache: 埋め込み行列のキャッシュ（プロセス共有、Noneでインスタンスごとに作成）
+            hot_index: ユーザーごとのインメモリ記憶インデックス（プロセス共有）
         """
-        self._db = firestore.AsyncClient(project=project_id, database=database)
+        self._db = (
+            client
+            if client is not None
+            else firestore.AsyncClient(project=project_id, database=database)
+        )
+        self._inverted_index = inverted_index
+        self._top_k = top_k
+        self._embedder = embedder
+        self._embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
+        self._hot_index = hot_index
+
+    def _get_user_ref(self, app_name: str, user_id: str) -> Any:
+        """ユーザードキュメント（インデックスのメタデータ）の参照を取得"""
+        return (
+            self._db.collection("memories").document(app_name).collection("users").document(user_id)
+        )
 
     def _get_entries_collection(
         self,
@@ -63,29 +178,104 @@ class FirestoreMemoryService(BaseMemoryService):
     async def add_session_to_memory(
         self,
         session: Session,
-    ) -> None:
+    ) -> MemoryWriteResult:
         """セッションを記憶に追加
 
         セッションのイベントからテキストコンテンツを持つものを抽出し、
-        Firestoreに保存する。
+        前回の追加以降の新しいイベントのみをFirestoreにバッチで保存する。
+        書き込み済み位置はエントリと同じcommitの最後に更新するため、
+        途中で失敗した場合は次回の追加で再度書き込む。書き込み済み位置を確認できない
+        場合も含め、保存済みのエントリは書き込まずにスキップする（インデックスの
+        エントリ数・語数や memory_version を二重に増やさない）。
 
         Args:
             session: ADK Session
+
+        Returns:
+            MemoryWriteResult: 書き込んだ件数とスキップした件数
         """
         entries_collection = self._get_entries_collection(
             session.app_name,
             session.user_id,
         )
+        user_ref = self._get_user_ref(session.app_name, session.user_id)
+        watermark_ref = user_ref.collection(SESSIONS_COLLECTION).document(session.id)
+        start = await self._read_watermark(watermark_ref, session)
 
-        for event in session.events:
-            # コンテンツがないイベントはスキップ
+        # コンテンツがないイベントはスキップ
+        entries: dict[str, dict[str, Any]] = {}
+        skipped = 0
+        for position, event in enumerate(session.events):
             memory_dict = event_to_memory_dict(event, session_id=session.id)
             if memory_dict is None:
                 continue
+            if position < start:
+                skipped += 1
+                continue
+            entries[event.id] = memory_dict
+
+        if start < len(session.events):
+            if entries:
+                existing = await self._existing_entry_ids(entries_collection, list(entries))
+                for entry_id in existing:
+                    del entries[entry_id]
+                skipped += len(existing)
+
+            rows = None
+            cached = None
+            if self._embedder is not None and entries:
+                rows = self._add_embeddings(self._embedder, entries)
+                cached = await self._get_cached_embeddings(
+                    user_ref, session.app_name, session.user_id
+                )
 
-            # Firestoreに保存
-            entry_ref = entries_collection.document(event.id)
-            await entry_ref.set(memory_dict)
+            writes: list[_Write] = [
+                (entries_collection.document(entry_id), data, False)
+                for entry_id, data in entries.items()
+            ]
+            if self._inverted_index and entries:
+                writes.extend(await self._index_update_writes(user_ref, added=entries))
+            if entries:
+                writes.append(self._memory_version_write(user_ref))
+            watermark = {
+                "event_count": len(session.events),
+                "last_event_id": session.events[-1].id,
+            }
+            writes.append((watermark_ref, watermark, False))
+            await self._commit_in_batches(writes)
+            if cached is not None and rows is not None:
+                # 読み取り後に他のインスタンスが書き込んだ場合はバージョンが一致せず、
+                # 次回の検索で読み込み直す
+                cached.extend(list(entries), rows)
+                cached.version += 1
+            if self._hot_index is not None and entries:
+                self._hot_index.add_entries(session.app_name, session.user_id, entries, rows)
+
+        return MemoryWriteResult(written=len(entries), skipped=skipped)
+
+    async def _existing_entry_ids(self, entries_collection: Any, entry_ids: list[str]) -> set[str]:
+        """保存済みのエントリIDを1回のget_allで取得する"""
+        refs = [entries_collection.document(entry_id) for entry_id in entry_ids]
+        return {
+            doc.id async for doc in self._db.get_all(refs, field_paths=["event_id"]) if doc.exists
+        }
+
+    async def _read_watermark(self, watermark_ref: Any, session: Session) -> int:
+        """書き込み済みのイベント数を読み取る
+
+        記録された位置のイベントIDがセッションと一致しない場合
+        （イベントの巻き戻しなど）は、最初から書き込み直す。
+        """
+        doc = await watermark_ref.get()
+        if not doc.exists:
+            return 0
+        data = doc.to_dict() or {}
+        event_count = data.get("event_count") or 0
+        if not 0 < event_count <= len(session.events):
+            return 0
+        if session.events[event_count - 1].id != data.get("last_event_id"):
+            return 0
+        return int(event_count)
 
     @override
     async def search_memory(
@@ -97,8 +287,8 @@ class FirestoreMemoryService(BaseMemoryService):
     ) -> SearchMemoryResponse:
         """記憶を検索
 
-        キーワードベースの検索を行い、クエリに含まれる単語が
-        記憶エントリのテキストに含まれる場合にマッチとする。
+        クエリのトークンを1つ以上含む記憶エントリを、BM25スコアの高い順に
+        最大 top_k 件返す。
 
         Args:
             app_name: アプリ名
@@ -106,36 +296,537 @@ class FirestoreMemoryService(BaseMemoryService):
             query: 検索クエリ
 
         Returns:
-            SearchMemoryResponse: マッチした記憶のリスト
+            SearchMemoryResponse: マッチした記憶のリスト（スコア降順）
         """
+        # クエリからトークンを抽出
+        terms = query_terms(query)
+        if not terms:
+            return SearchMemoryResponse(memories=[])
+
+        if self._hot_index is not None:
+            hot = self._hot_index.get(app_name, user_id)
+            if hot is not None:
+                self._hot_index.stats.hits += 1
+                return self._search_hot(hot, query, terms)
+            self._hot_index.stats.misses += 1
+
+        if self._embedder is not None:
+            return await self._search_vector(self._embedder, app_name, user_id, query)
+
+        if self._inverted_index:
+            return await self._search_indexed(app_name, user_id, terms)
+
+        # 全エントリを取得してスコアリング（大量データの場合は inverted_index を使用する）
+        entries: dict[str, dict[str, Any]] = {}
+        async for doc in self._get_entries_collection(app_name, user_id).stream():
+            data = doc.to_dict()
+            if data:
+                entries[doc.id] = data
+        return self._rank_entries(entries, terms)
+
+    def _rank_entries(
+        self, entries: dict[str, dict[str, Any]], terms: list[str]
+    ) -> SearchMemoryResponse:
+        """読み込み済みの全エントリをBM25でスコアリングする"""
+        index, lengths = build_postings(entries)
+        ranked = bm25_top_k(
+            {term: index[term] for term in terms if term in index},
+            lengths,
+            entry_count=len(entries),
+            average_length=sum(lengths.values()) / len(entries) if entries else 0.0,
+            top_k=self._top_k,
+        )
+        return SearchMemoryResponse(
+            memories=[dict_to_memory_entry(entries[entry_id]) for entry_id, _ in ranked]
+        )
+
+    def _add_embeddings(self, embedder: Embedder, entries: dict[str, dict[str, Any]]) -> FloatArray:
+        """エントリの埋め込みを計算して保存用のdictに追加する
+
+        Returns:
+            entries と同じ順の埋め込み行列
+        """
+        entry_ids = list(entries)
+        rows = embedder.embed([entry_text(entries[entry_id]) for entry_id in entry_ids])
+        for entry_id, row in zip(entry_ids, rows, strict=True):
+            entries[entry_id][EMBEDDING_FIELD] = encode_embedding(row)
+        return rows
+
+    def _memory_version_write(self, user_ref: Any) -> _Write:
+        """エントリの追加・削除と同じcommitで memory_version を増やす書き込み"""
+        return (user_ref, {MEMORY_VERSION_FIELD: firestore.Increment(1)}, True)
+
+    async def _get_cached_embeddings(
+        self, user_ref: Any, app_name: str, user_id: str
+    ) -> UserEmbeddings | None:
+        """ユーザードキュメントの memory_version と一致するキャッシュ済みの行列を取得する
+
+        未キャッシュの場合はユーザードキュメントを読み取らない。
+        """
+        if (app_name, user_id) not in self._embedding_cache:
+            return None
+        doc = await user_ref.get()
+        data = (doc.to_dict() or {}) if doc.exists else {}
+        return self._embedding_cache.get(app_name, user_id, data.get(MEMORY_VERSION_FIELD) or 0)
+
+    async def _index_update_writes(
+        self,
+        user_ref: Any,
+        *,
+        added: dict[str, dict[str, Any]],
+        removed: dict[str, dict[str, Any]] | None = None,
+    ) -> list[_Write]:
+        """エントリの追加・削除に伴うインデックスの差分更新の書き込み
+
+        エントリ数がシャードの上限を超える場合は、差分更新の代わりに
+        インデックスを未構築に戻す（次回の検索でシャード数を増やして再構築する）。
+        """
+        doc = await user_ref.get()
+        user_data = (doc.to_dict() or {}) if doc.exists else {}
+        shards = user_data.get("index_shards") or 1
+        entry_count = (user_data.get("entry_count") or 0) + len(added) - len(removed or {})
+        if entry_count > shards * POSTINGS_PER_SHARD:
+            return [(user_ref, {"index_version": 0}, True)]
+        return self._index_writes(user_ref, shards, added, removed or {})
+
+    def _index_writes(
+        self,
+        user_ref: Any,
+        shards: int,
+        added: dict[str, dict[str, Any]],
+        removed: dict[str, dict[str, Any]],
+    ) -> list[_Write]:
+        """ポスティング・長さ・ユーザーの統計の書き込み（ドキュメントごとに1件）"""
+        added_index, added_lengths = build_postings(added)
+        removed_index, removed_lengths = build_postings(removed)
+
+        # 既存のエントリIDを残すようマージし、削除するエントリIDは DELETE_FIELD にする
+        postings: dict[tuple[str, int], dict[str, Any]] = {}
+        lengths: dict[int, dict[str, Any]] = {}
+        for index, entry_lengths, delete in (
+            (removed_index, removed_lengths, True),
+            (added_index, added_lengths, False),
+        ):
+            for term, term_postings in index.items():
+                for shard, values in split_by_shard(term_postings.postings, shards).items():
+                    target = postings.setdefault((term, shard), {})
+                    target.update(
+                        dict.fromkeys(values, firestore.DELETE_FIELD) if delete else values
+                    )
+            for shard, values in split_by_shard(entry_lengths, shards).items():
+                target = lengths.setdefault(shard, {})
+                target.update(dict.fromkeys(values, firestore.DELETE_FIELD) if delete else values)
+
+        terms_collection = user_ref.collection(TERMS_COLLECTION)
+        lengths_collection = user_ref.collection(LENGTHS_COLLECTION)
+        writes: list[_Write] = [
+            (
+                terms_collection.document(term_doc_id(term))
+                .collection(TERM_SHARDS_COLLECTION)
+                .document(shard_doc_id(shard)),
+                {"term": term, "postings": values},
+                True,
+            )
+            for (term, shard), values in postings.items()
+        ]
+        writes.extend(
+            (lengths_collection.document(shard_doc_id(shard)), {"lengths": values}, True)
+            for shard, values in lengths.items()
+        )
+        stats = {
+            "entry_count": firestore.Increment(len(added) - len(removed)),
+            "total_terms": firestore.Increment(
+                sum(added_lengths.values()) - sum(removed_lengths.values())
+            ),
+        }
+        writes.append((user_ref, stats, True))
+        return writes
+
+    def _shard_refs(self, user_ref: Any, terms: list[str], shard: int) -> list[Any]:
+        """クエリの語のポスティングと長さの1シャード分のドキュメント参照"""
+        terms_collection = user_ref.collection(TERMS_COLLECTION)
+        refs = [
+            terms_collection.document(term_doc_id(term))
+            .collection(TERM_SHARDS_COLLECTION)
+            .document(shard_doc_id(shard))
+            for term in terms
+        ]
+        refs.append(user_ref.collection(LENGTHS_COLLECTION).document(shard_doc_id(shard)))
+        return refs
+
+    async def _read_index_docs(
+        self,
+        refs: list[Any],
+        user_ref: Any,
+        index: dict[str, TermPostings],
+        lengths: dict[str, int],
+    ) -> dict[str, Any]:
+        """ユーザー・ポスティング・長さのドキュメントを読み取り、index / lengths にまとめる
+
+        Returns:
+            ユーザードキュメントのデータ（refs に含まれない・存在しない場合は空）
+        """
+        user_data: dict[str, Any] = {}
+        async for doc in self._db.get_all(refs):
+            if not doc.exists:
+                continue
+            data = doc.to_dict() or {}
+            if doc.reference.path == user_ref.path:
+                user_data = data
+            elif doc.reference.parent.id == LENGTHS_COLLECTION:
+                lengths.update(data.get("lengths") or {})
+            else:
+                term_postings = index.setdefault(data.get("term", ""), TermPostings())
+                term_postings.postings.update(data.get("postings") or {})
+        return user_data
+
+    async def _search_indexed(
+        self, app_name: str, user_id: str, terms: list[str]
+    ) -> SearchMemoryResponse:
+        """ポスティングリストでスコアリングし、上位k件のエントリのみを読み取る"""
+        user_ref = self._get_user_ref(app_name, user_id)
+
+        # インデックスの構築状態・統計と先頭シャードを1回のRPCで読み取り、
+        # シャードが複数ある場合のみ残りを追加で読み取る
+        index: dict[str, TermPostings] = {}
+        lengths: dict[str, int] = {}
+        user_data = await self._read_index_docs(
+            [user_ref, *self._shard_refs(user_ref, terms, 0)], user_ref, index, lengths
+        )
+        if (user_data.get("index_version") or 0) < INDEX_VERSION:
+            entries = await self.rebuild_index(app_name=app_name, user_id=user_id)
+            return self._rank_entries(entries, terms)
+        rest = [
+            ref
+            for shard in range(1, user_data.get("index_shards") or 1)
+            for ref in self._shard_refs(user_ref, terms, shard)
+        ]
+        if rest:
+            await self._read_index_docs(rest, user_ref, index, lengths)
+
+        entry_count = user_data.get("entry_count") or 0
+        ranked = bm25_top_k(
+            index,
+            lengths,
+            entry_count=entry_count,
+            average_length=(user_data.get("total_terms") or 0) / entry_count
+            if entry_count
+            else 0.0,
+            top_k=self._top_k,
+        )
         entries_collection = self._get_entries_collection(app_name, user_id)
+        entry_refs = [entries_collection.document(entry_id) for entry_id, _ in ranked]
+        docs = {doc.id: doc async for doc in self._db.get_all(entry_refs) if doc.exists}
+        return SearchMemoryResponse(
+            memories=[
+                dict_to_memory_entry(docs[entry_id].to_dict())
+                for entry_id, _ in ranked
+                if entry_id in docs
+            ]
+        )
 
-        # クエリから単語を抽出
-        query_words = extract_words_lower(query)
-        if not query_words:
+    async def _search_vector(
+        self, embedder: Embedder, app_name: str, user_id: str, query: str
+    ) -> SearchMemoryResponse:
+        """埋め込みのコサイン類似度で上位k件のエントリのみを読み取る"""
+        query_vector = embedder.embed([query])[0]
+        embeddings = await self._load_embeddings(embedder, app_name, user_id)
+        ranked = cosine_top_k(embeddings.matrix, query_vector, self._top_k)
+        if not ranked:
             return SearchMemoryResponse(memories=[])
 
-        response = SearchMemoryResponse(memories=[])
+        entries_collection = self._get_entries_collection(app_name, user_id)
+        entry_ids = [embeddings.entry_ids[row] for row, _ in ranked]
+        entry_refs = [entries_collection.document(entry_id) for entry_id in entry_ids]
+        docs = {doc.id: doc async for doc in self._db.get_all(entry_refs) if doc.exists}
+        return SearchMemoryResponse(
+            memories=[
+                dict_to_memory_entry(docs[entry_id].to_dict())
+                for entry_id in entry_ids
+                if entry_id in docs
+            ]
+        )
+
+    async def _load_embeddings(
+        self, embedder: Embedder, app_name: str, user_id: str
+    ) -> UserEmbeddings:
+        """ユーザーの埋め込み行列を取得する
+
+        ユーザードキュメントの memory_version を読み取り、キャッシュ済みの行列と
+        一致しない（未キャッシュを含む）場合は全エントリを読み込む。
+        埋め込みのないエントリ（embedder 導入前のもの、次元の異なるもの）は
+        読み込み時に計算する。
+        """
+        user_doc = await self._get_user_ref(app_name, user_id).get()
+        user_data = (user_doc.to_dict() or {}) if user_doc.exists else {}
+        version = user_data.get(MEMORY_VERSION_FIELD) or 0
+        cached = self._embedding_cache.get(app_name, user_id, version)
+        if cached is not None:
+            return cached
+
+        entries_query = self._get_entries_collection(app_name, user_id).select(
+            [EMBEDDING_FIELD, "content"]
+        )
+        entries = {doc.id: doc.to_dict() or {} async for doc in entries_query.stream()}
+        embeddings = self._build_embeddings(embedder, entries)
+        embeddings.version = version
+        self._embedding_cache.put(app_name, user_id, embeddings)
+        return embeddings
+
+    def _build_embeddings(
+        self, embedder: Embedder, entries: dict[str, dict[str, Any]]
+    ) -> UserEmbeddings:
+        """エントリの保存済みの埋め込みから行列を作成する
+
+        埋め込みのないエントリ（embedder 導入前のもの、次元の異なるもの）は
+        ここで計算する。
+        """
+        dim = embedder.dim
+        rows: list[Any] = []
+        missing: dict[int, str] = {}
+        for data in entries.values():
+            stored = data.get(EMBEDDING_FIELD)
+            vector = decode_embedding(stored, dim) if isinstance(stored, bytes) else None
+            if vector is None:
+                missing[len(rows)] = entry_text(data)
+            rows.append(vector)
+        if missing:
+            computed = embedder.embed(list(missing.values()))
+            for position, vector in zip(missing, computed, strict=True):
+                rows[position] = vector
+
+        matrix = (
+            np.stack(rows).astype(EMBEDDING_DTYPE, copy=False)
+            if rows
+            else np.zeros((0, dim), dtype=EMBEDDING_DTYPE)
+        )
+        return UserEmbeddings(entry_ids=list(entries), matrix=matrix)
+
+    def warm_user(self, *, app_name: str, user_id: str) -> asyncio.Task[HotUserMemory] | None:
+        """ユーザーを接続中として固定し、記憶のホットインデックスへの読み込みを開始する
+
+        WebSocket接続や /dialogue/run の開始時に呼び出し（読み込みの完了は待たない）、
+        終了時に release_user を呼び出す。hot_index 未指定の場合は何もしない。
+        読み込み済みのユーザーはユーザーの memory_version を確認し、
+        他のインスタンスが記憶を書き換えていれば読み込み直す。
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+
+        Returns:
+            読み込み・確認タスク（hot_index 未指定の場合はNone）
+        """
+        if self._hot_index is None:
+            return None
+        self._hot_index.acquire(app_name, user_id)
+        user_ref = self._get_user_ref(app_name, user_id)
+        return self._hot_index.start_load(
+            app_name,
+            user_id,
+            lambda: self._load_hot_memory(app_name, user_id),
+            current_version=lambda: self._read_memory_version(user_ref),
+        )
+
+    def release_user(self, *, app_name: str, user_id: str) -> None:
+        """接続の終了を記録する（以降はLRUで追い出される）
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+        """
+        if self._hot_index is not None:
+            self._hot_index.release(app_name, user_id)
+
+    async def _load_hot_memory(self, app_name: str, user_id: str) -> HotUserMemory:
+        """ユーザーの全記憶エントリからインメモリのインデックスを構築する
+
+        memory_version はエントリより先に読み取る（読み取り中の書き込みは
+        次回の確認でバージョンが一致せず、読み込み直す）。
+        """
+        version = await self._read_memory_version(self._get_user_ref(app_name, user_id))
+        entries: dict[str, dict[str, Any]] = {}
+        async for doc in self._get_entries_collection(app_name, user_id).stream():
+            data = doc.to_dict()
+            if data:
+                entries[doc.id] = data
+        memory = HotUserMemory(version=version)
+        if self._embedder is not None:
+            memory.embeddings = self._build_embeddings(self._embedder, entries)
+        memory.add(entries)
+        return memory
+
+    async def _read_memory_version(self, user_ref: Any) -> int:
+        """ユーザードキュメントの memory_version を読み取る"""
+        doc = await user_ref.get(field_paths=[MEMORY_VERSION_FIELD])
+        data = (doc.to_dict() or {}) if doc.exists else {}
+        return int(data.get(MEMORY_VERSION_FIELD) or 0)
+
+    def _search_hot(
+        self, memory: HotUserMemory, query: str, terms: list[str]
+    ) -> SearchMemoryResponse:
+        """ホットインデックスのみで検索する（Firestoreを読まない）"""
+        if self._embedder is not None:
+            entries = memory.search_vector(self._embedder.embed([query])[0], self._top_k)
+        else:
+            entries = memory.search_terms(terms, self._top_k)
+        return SearchMemoryResponse(memories=[dict_to_memory_entry(data) for data in entries])
+
+    async def rebuild_index(self, *, app_name: str, user_id: str) -> dict[str, dict[str, Any]]:
+        """ユーザーの全記憶エントリから転置インデックスを構築する
 
-        # 全エントリを取得してフィルタリング
-        # 注意: 大量データの場合はページネーションやインデックスの最適化が必要
+        既存のポスティングリストは語・シャードごとに置き換え、シャード数の変更で
+        使われなくなったシャードと旧形式（語ごとの1ドキュメント）は削除する（冪等）。
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+
+        Returns:
+            エントリID → 記憶エントリのdict（走査結果）
+        """
+        user_ref = self._get_user_ref(app_name, user_id)
+        user_doc = await user_ref.get()
+        user_data = (user_doc.to_dict() or {}) if user_doc.exists else {}
+        previous_shards = user_data.get("index_shards") or 1
+        legacy = 0 < (user_data.get("index_version") or 0) < INDEX_VERSION
+
+        entries_collection = self._get_entries_collection(app_name, user_id)
+        entries: dict[str, dict[str, Any]] = {}
         async for doc in entries_collection.stream():
             data = doc.to_dict()
-            if not data:
-                continue
+            if data:
+                entries[doc.id] = data
 
-            # エントリのテキストを抽出
-            content = data.get("content", {})
-            parts = content.get("parts", [])
-            entry_text = " ".join(part.get("text", "") for part in parts if part.get("text"))
+        index, lengths = build_postings(entries)
+        shards = shard_count(len(entries))
+        terms_collection = user_ref.collection(TERMS_COLLECTION)
+        writes: list[_Write] = []
+        for term, term_postings in index.items():
+            term_ref = terms_collection.document(term_doc_id(term))
+            split = split_by_shard(term_postings.postings, shards)
+            for shard in range(max(shards, previous_shards)):
+                ref = term_ref.collection(TERM_SHARDS_COLLECTION).document(shard_doc_id(shard))
+                if shard in split:
+                    writes.append((ref, TermPostings(split[shard]).to_dict(term), False))
+                elif shard < previous_shards:
+                    writes.append((ref, None, False))
+            if legacy:
+                writes.append((term_ref, None, False))
+        lengths_collection = user_ref.collection(LENGTHS_COLLECTION)
+        split_lengths = split_by_shard(lengths, shards)
+        for shard in range(max(shards, previous_shards)):
+            ref = lengths_collection.document(shard_doc_id(shard))
+            if shard in split_lengths:
+                writes.append((ref, {"lengths": split_lengths[shard]}, False))
+            elif shard < previous_shards:
+                writes.append((ref, None, False))
+        await self._commit_in_batches(writes)
+        # ポスティングの書き込み後に構築済みにする（途中失敗時は次回の検索で再構築）
+        await user_ref.set(
+            {
+                "index_version": INDEX_VERSION,
+                "index_shards": shards,
+                "entry_count": len(entries),
+                "total_terms": sum(lengths.values()),
+            },
+            merge=True,
+        )
+        return entries
 
-            if not entry_text:
-                continue
+    async def list_user_ids(self, app_name: str) -> list[str]:
+        """記憶を持つユーザーIDのリストを取得する（統合などのバッチ処理用）
+
+        Args:
+            app_name: アプリ名
+
+        Returns:
+            ユーザーIDのリスト
+        """
+        users_collection = self._db.collection("memories").document(app_name).collection("users")
+        return [ref.id async for ref in users_collection.list_documents()]
+
+    async def consolidate_user(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        summarizer: Summarizer,
+        max_entries: int,
+        retain_recent: int | None = None,
+        dry_run: bool = False,
+    ) -> ConsolidationResult:
+        """ユーザーの古い記憶エントリを話題ごとの要約にまとめる
+
+        要約エントリを書き込んでから元のエントリを削除するため、途中で失敗しても
+        記憶は失われない（再実行すると残りのエントリと要約を再度まとめる）。
+        転置インデックスは話題ごとに、要約の追加と元のエントリの削除を
+        同じバッチで更新する。1バッチに収まらない場合はインデックスを未構築に戻し、
+        次回の検索で再構築する（consolidation.py 参照）。
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+            summarizer: 要約器
+            max_entries: ユーザーあたりのエントリ数の上限
+            retain_recent: そのまま残す新しいエントリ数（Noneで上限の半分）
+            dry_run: True の場合、書き込まずに結果のみを返す
+
+        Returns:
+            ConsolidationResult: 統合前後のエントリ数と作成した要約数
+        """
+        user_ref = self._get_user_ref(app_name, user_id)
+        entries_collection = self._get_entries_collection(app_name, user_id)
+        entries: dict[str, dict[str, Any]] = {}
+        async for doc in entries_collection.stream():
+            data = doc.to_dict()
+            if data:
+                entries[doc.id] = data
+
+        groups = plan_consolidation(entries, max_entries=max_entries, retain_recent=retain_recent)
+        merged = sum(len(group.entry_ids) for group in groups)
+        result = ConsolidationResult(
+            entries_before=len(entries),
+            entries_after=len(entries) - merged + len(groups),
+            summaries=len(groups),
+        )
+        if not groups or dry_run:
+            return result
+
+        for group in groups:
+            summary = await build_summary_entry(group, entries, summarizer)
+            if self._embedder is not None:
+                vector = self._embedder.embed([entry_text(summary)])[0]
+                summary[EMBEDDING_FIELD] = encode_embedding(vector)
+            writes: list[_Write] = [(entries_collection.document(group.summary_id), summary, False)]
+            writes.extend(
+                (entries_collection.document(entry_id), None, False) for entry_id in group.entry_ids
+            )
+            writes.append(self._memory_version_write(user_ref))
+            if self._inverted_index:
+                index_writes = await self._index_update_writes(
+                    user_ref,
+                    added={group.summary_id: summary},
+                    removed={entry_id: entries[entry_id] for entry_id in group.entry_ids},
+                )
+                if len(writes) + len(index_writes) > MAX_BATCH_WRITES:
+                    index_writes = [(user_ref, {"index_version": 0}, True)]
+                # 未構築に戻す場合も、エントリの削除より先（同じか前のバッチ）に書き込む
+                writes = [*index_writes, *writes]
+            await self._commit_in_batches(writes)
 
-            # キーワードマッチング
-            entry_words = extract_words_lower(entry_text)
-            if any(query_word in entry_words for query_word in query_words):
-                memory_entry = dict_to_memory_entry(data)
-                response.memories.append(memory_entry)
+        self._embedding_cache.invalidate(app_name, user_id)
+        if self._hot_index is not None:
+            self._hot_index.invalidate(app_name, user_id)
+        return result
 
-        return response
+    async def _commit_in_batches(self, writes: list[_Write]) -> None:
+        """書き込みをWriteBatchの上限ごとに分けてcommitする"""
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self._db.batch()
+            for reference, data, merge in writes[start : start + MAX_BATCH_WRITES]:
+                if data is None:
+                    batch.delete(reference)
+                else:
+                    batch.set(reference, data, merge=merge)
+            await batch.commit()
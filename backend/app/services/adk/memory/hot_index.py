@@ -0,0 +1,276 @@
+"""ユーザーごとのインプロセス記憶インデックス（ホットインデックス）
+
+search_memory は会話中のレイテンシが重要な経路で呼ばれる。WebSocket接続や
+/dialogue/run の開始時にユーザーの全記憶エントリを非同期で読み込んで
+インメモリのインデックスを構築し、会話中の検索をFirestoreへのRPCなしで行う。
+
+- add_session_to_memory で書き込んだエントリはインデックスにも追加する
+- 読み込み中に追加されたエントリは読み込み完了時に反映する
+- 読み込み済みのユーザーも接続時にユーザーの memory_version を確認し、
+  他のインスタンスが書き換えていれば読み込み直す
+- 接続中のユーザーは固定（pin）し、切断後はLRUで追い出す
+- ホットインデックスにないユーザーの検索は従来どおりFirestoreを読む
+"""
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.services.adk.memory.embeddings import (
+    EMBEDDING_FIELD,
+    FloatArray,
+    UserEmbeddings,
+    cosine_top_k,
+)
+from app.services.adk.memory.inverted_index import (
+    TermPostings,
+    bm25_top_k,
+    build_postings,
+)
+
+logger = logging.getLogger(__name__)
+
+# インデックスを保持する最大ユーザー数（接続中のユーザーは上限を超えても保持する）
+DEFAULT_HOT_INDEX_USERS = 256
+
+_UserKey = tuple[str, str]
+
+
+@dataclass
+class HotIndexStats:
+    """ホットインデックスの統計情報
+
+    Attributes:
+        hits: インメモリで検索した回数
+        misses: インデックスがなくFirestoreで検索した回数
+        loads: ユーザーの記憶を読み込んだ回数
+        evictions: LRUで追い出したユーザー数
+    """
+
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class HotUserMemory:
+    """1ユーザーのインメモリ記憶インデックス
+
+    Attributes:
+        entries: エントリID → 記憶エントリのdict（埋め込みを除く）
+        index: 語 → TermPostings
+        lengths: エントリID → トークン数
+        embeddings: 埋め込み行列（埋め込み検索を使わない場合はNone）
+        version: 反映済みの書き込みに対応するユーザーの memory_version
+    """
+
+    entries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    index: dict[str, TermPostings] = field(default_factory=dict)
+    lengths: dict[str, int] = field(default_factory=dict)
+    embeddings: UserEmbeddings | None = None
+    version: int = 0
+
+    def add(self, entries: dict[str, dict[str, Any]], rows: FloatArray | None = None) -> None:
+        """エントリを追加する（既存のエントリIDは置き換える）
+
+        Args:
+            entries: エントリID → 記憶エントリのdict
+            rows: entries と同じ順の埋め込み行列（埋め込み検索時のみ）
+        """
+        for entry_id in entries:
+            if entry_id in self.entries:
+                self._remove_postings(entry_id)
+        for entry_id, data in entries.items():
+            self.entries[entry_id] = {k: v for k, v in data.items() if k != EMBEDDING_FIELD}
+        index, lengths = build_postings(entries)
+        for term, term_postings in index.items():
+            self.index.setdefault(term, TermPostings()).postings.update(term_postings.postings)
+        self.lengths.update(lengths)
+        if self.embeddings is not None and rows is not None:
+            self.embeddings.extend(list(entries), rows)
+
+    def _remove_postings(self, entry_id: str) -> None:
+        index, _ = build_postings({entry_id: self.entries[entry_id]})
+        for term in index:
+            term_postings = self.index.get(term)
+            if term_postings is None:
+                continue
+            term_postings.postings.pop(entry_id, None)
+            if not term_postings.postings:
+                del self.index[term]
+        self.lengths.pop(entry_id, None)
+
+    def search_terms(self, terms: list[str], top_k: int) -> list[dict[str, Any]]:
+        """クエリの語でBM25スコアの上位k件を返す"""
+        entry_count = len(self.entries)
+        ranked = bm25_top_k(
+            {term: self.index[term] for term in terms if term in self.index},
+            self.lengths,
+            entry_count=entry_count,
+            average_length=sum(self.lengths.values()) / entry_count if entry_count else 0.0,
+            top_k=top_k,
+        )
+        return [self.entries[entry_id] for entry_id, _ in ranked]
+
+    def search_vector(self, query: FloatArray, top_k: int) -> list[dict[str, Any]]:
+        """埋め込みのコサイン類似度の上位k件を返す"""
+        if self.embeddings is None:
+            return []
+        ranked = cosine_top_k(self.embeddings.matrix, query, top_k)
+        entry_ids = [self.embeddings.entry_ids[row] for row, _ in ranked]
+        return [self.entries[entry_id] for entry_id in entry_ids if entry_id in self.entries]
+
+
+class HotMemoryIndex:
+    """ユーザーごとの HotUserMemory をプロセス内で共有するLRUキャッシュ"""
+
+    def __init__(self, max_users: int = DEFAULT_HOT_INDEX_USERS) -> None:
+        """初期化
+
+        Args:
+            max_users: 保持する最大ユーザー数（接続中のユーザーは追い出さない）
+        """
+        self._max_users = max_users
+        self._users: OrderedDict[_UserKey, HotUserMemory] = OrderedDict()
+        self._pins: Counter[_UserKey] = Counter()
+        self._loading: dict[_UserKey, asyncio.Task[HotUserMemory]] = {}
+        self._pending: dict[_UserKey, list[tuple[dict[str, dict[str, Any]], Any]]] = {}
+        self.stats = HotIndexStats()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, app_name: str, user_id: str) -> HotUserMemory | None:
+        """ユーザーのインデックスを取得する（最近使用したものとして扱う）"""
+        key = (app_name, user_id)
+        memory = self._users.get(key)
+        if memory is not None:
+            self._users.move_to_end(key)
+        return memory
+
+    def acquire(self, app_name: str, user_id: str) -> None:
+        """ユーザーを接続中として固定する（release まで追い出さない）"""
+        self._pins[(app_name, user_id)] += 1
+
+    def release(self, app_name: str, user_id: str) -> None:
+        """接続の終了を記録し、上限を超えていれば追い出す"""
+        key = (app_name, user_id)
+        if self._pins[key] <= 1:
+            del self._pins[key]
+        else:
+            self._pins[key] -= 1
+        self._evict()
+
+    def start_load(
+        self,
+        app_name: str,
+        user_id: str,
+        loader: Callable[[], Coroutine[Any, Any, HotUserMemory]],
+        *,
+        current_version: Callable[[], Coroutine[Any, Any, int]] | None = None,
+    ) -> asyncio.Task[HotUserMemory] | None:
+        """バックグラウンドでユーザーのインデックスの読み込みを開始する
+
+        読み込み済みのユーザーは、current_version が返す memory_version が
+        インデックスの version と異なる場合のみ読み込み直す。
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+            loader: 全記憶エントリからインデックスを構築する関数
+            current_version: ユーザーの現在の memory_version を読み取る関数
+                （Noneの場合、読み込み済みのユーザーは確認しない）
+
+        Returns:
+            読み込みタスク（読み込み済みで確認しない場合はNone、
+            読み込み中の場合は既存のタスク）
+        """
+        key = (app_name, user_id)
+        task = self._loading.get(key)
+        if task is not None:
+            return task
+        loaded = self._users.get(key)
+        if loaded is None:
+            coro = loader()
+        elif current_version is None:
+            return None
+        else:
+            coro = self._reload_if_stale(loaded, loader, current_version)
+        self._pending[key] = []
+        task = asyncio.get_running_loop().create_task(coro)
+        self._loading[key] = task
+        task.add_done_callback(lambda done: self._finish_load(key, done, loaded))
+        return task
+
+    async def _reload_if_stale(
+        self,
+        loaded: HotUserMemory,
+        loader: Callable[[], Coroutine[Any, Any, HotUserMemory]],
+        current_version: Callable[[], Coroutine[Any, Any, int]],
+    ) -> HotUserMemory:
+        """memory_version が一致すれば読み込み済みのインデックスをそのまま返す"""
+        if await current_version() == loaded.version:
+            return loaded
+        return await loader()
+
+    def _finish_load(
+        self,
+        key: _UserKey,
+        task: asyncio.Task[HotUserMemory],
+        loaded: HotUserMemory | None,
+    ) -> None:
+        self._loading.pop(key, None)
+        pending = self._pending.pop(key, [])
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.warning("Failed to load memory index for user %s", key[1], exc_info=error)
+            return
+        memory = task.result()
+        if memory is loaded:
+            # 最新だった（確認中の追加は add_entries で反映済み）
+            return
+        for entries, rows in pending:
+            memory.add(entries, rows)
+            memory.version += 1
+        self.stats.loads += 1
+        self._users[key] = memory
+        self._users.move_to_end(key)
+        self._evict()
+
+    def add_entries(
+        self,
+        app_name: str,
+        user_id: str,
+        entries: dict[str, dict[str, Any]],
+        rows: FloatArray | None = None,
+    ) -> None:
+        """書き込んだエントリを反映する（読み込み中の場合は完了時に反映する）
+
+        書き込み1回ごとにユーザーの memory_version が1増えるため、version も1増やす。
+        """
+        key = (app_name, user_id)
+        memory = self._users.get(key)
+        if memory is not None:
+            memory.add(entries, rows)
+            memory.version += 1
+        if key in self._pending:
+            self._pending[key].append((entries, rows))
+
+    def invalidate(self, app_name: str, user_id: str) -> None:
+        """ユーザーのインデックスを破棄する"""
+        self._users.pop((app_name, user_id), None)
+
+    def _evict(self) -> None:
+        """上限を超えた分を、接続中でないユーザーの古い順に追い出す"""
+        excess = len(self._users) - self._max_users
+        if excess <= 0:
+            return
+        for key in [key for key in self._users if key not in self._pins][:excess]:
+            del self._users[key]
+            self.stats.evictions += 1
@@ -0,0 +1,167 @@
+"""記憶検索用の転置インデックスとBM25スコアリング
+
+search_memory がユーザーの全記憶エントリを読み込んでトークン化する代わりに、
+add_session_to_memory の時点で「語 → エントリID」の転置インデックスを更新し、
+検索時はクエリの語のポスティングリストのみを読み取る。
+語は tokenizer.py のトークン（かな・漢字はn-gram、英数字は単語）。
+
+Firestoreコレクション構造:
+    /memories/{app_name}/users/{user_id} - ユーザードキュメント
+        index_version: インデックスの形式バージョン（未設定・古い場合は未構築）
+        index_shards: シャード数
+        entry_count: インデックス済みのエントリ数（BM25のN）
+        total_terms: インデックス済みエントリの総トークン数（平均文書長の計算用）
+    /memories/{app_name}/users/{user_id}/terms/{term_id}/shards/{shard} - ポスティングリスト
+        term: 語
+        postings: エントリID → 出現回数
+    /memories/{app_name}/users/{user_id}/entry_lengths/{shard} - エントリの長さ
+        lengths: エントリID → エントリのトークン数（BM25の文書長）
+
+ドキュメントのフィールド数（20,000）・インデックスエントリ数（40,000）・
+サイズ（1MiB）の上限を超えないよう、ポスティングと長さはエントリIDのハッシュで
+index_shards 個のシャードに分ける。1シャードあたりのエントリ数は平均で
+POSTINGS_PER_SHARD の半分になるようにシャード数を決め、エントリ数が
+POSTINGS_PER_SHARD * index_shards を超えたら次回の検索で再構築する。
+postings / lengths のマップは単一フィールドインデックスの対象外にする
+（infrastructure/terraform/modules/firestore/indexes.tf）。
+"""
+
+import math
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import quote
+
+from app.services.adk.memory.tokenizer import tokenize
+
+TERMS_COLLECTION = "terms"
+TERM_SHARDS_COLLECTION = "shards"
+LENGTHS_COLLECTION = "entry_lengths"
+
+# インデックスの形式バージョン（トークナイザ・レイアウトを変えた場合は上げて再構築する）
+INDEX_VERSION = 3
+
+# 1シャードドキュメントあたりのエントリ数の上限
+POSTINGS_PER_SHARD = 2000
+
+# BM25パラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def term_doc_id(term: str) -> str:
+    """語をポスティングリストのドキュメントIDに変換する（"/" などをエスケープ）"""
+    return quote(term, safe="")
+
+
+def shard_count(entry_count: int) -> int:
+    """エントリ数に対するシャード数（1シャードあたり平均 POSTINGS_PER_SHARD の半分）"""
+    return max(1, math.ceil(2 * entry_count / POSTINGS_PER_SHARD))
+
+
+def entry_shard(entry_id: str, shards: int) -> int:
+    """エントリIDのシャード番号（プロセスによらず同じ値になるハッシュ）"""
+    return zlib.crc32(entry_id.encode()) % shards
+
+
+def shard_doc_id(shard: int) -> str:
+    """シャード番号をドキュメントIDに変換する"""
+    return str(shard)
+
+
+def split_by_shard(values: dict[str, int], shards: int) -> dict[int, dict[str, int]]:
+    """エントリID → 値 のdictをシャードごとに分ける"""
+    split: dict[int, dict[str, int]] = {}
+    for entry_id, value in values.items():
+        split.setdefault(entry_shard(entry_id, shards), {})[entry_id] = value
+    return split
+
+
+def entry_text(data: dict[str, Any]) -> str:
+    """記憶エントリのdictからテキストを取り出す"""
+    parts = data.get("content", {}).get("parts", [])
+    return " ".join(part.get("text", "") for part in parts if part.get("text"))
+
+
+def query_terms(query: str) -> list[str]:
+    """検索クエリの語（重複なし、出現順）"""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+@dataclass
+class TermPostings:
+    """1語のポスティングリスト（またはその1シャード）
+
+    Attributes:
+        postings: エントリID → 出現回数
+    """
+
+    postings: dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self, term: str) -> dict[str, Any]:
+        """Firestore保存用のdict"""
+        return {"term": term, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TermPostings":
+        """Firestoreのdictから復元する"""
+        return cls(postings=data.get("postings") or {})
+
+
+def build_postings(
+    entries: dict[str, dict[str, Any]],
+) -> tuple[dict[str, TermPostings], dict[str, int]]:
+    """記憶エントリから語ごとのポスティングリストとエントリの長さを作成する
+
+    Args:
+        entries: エントリID → 記憶エントリのdict
+
+    Returns:
+        (語 → TermPostings, エントリID → トークン数（テキストのあるエントリのみ）)
+    """
+    index: dict[str, TermPostings] = {}
+    lengths: dict[str, int] = {}
+    for entry_id, data in entries.items():
+        tokens = tokenize(entry_text(data))
+        if not tokens:
+            continue
+        lengths[entry_id] = len(tokens)
+        for term, count in Counter(tokens).items():
+            index.setdefault(term, TermPostings()).postings[entry_id] = count
+    return index, lengths
+
+
+def bm25_top_k(
+    index: dict[str, TermPostings],
+    lengths: dict[str, int],
+    *,
+    entry_count: int,
+    average_length: float,
+    top_k: int,
+) -> list[tuple[str, float]]:
+    """クエリの語のポスティングリストからBM25スコアの上位k件を求める
+
+    Args:
+        index: クエリの語 → TermPostings（存在しない語は含めなくてよい）
+        lengths: エントリID → トークン数（ないエントリは平均の長さとみなす）
+        entry_count: 全エントリ数（N）
+        average_length: エントリの平均トークン数
+        top_k: 返す最大件数
+
+    Returns:
+        (エントリID, スコア) のスコア降順リスト（同点はエントリIDの昇順）
+    """
+    scores: dict[str, float] = {}
+    average_length = average_length or 1.0
+    for term_postings in index.values():
+        df = len(term_postings.postings)
+        if df == 0:
+            continue
+        idf = math.log(1 + (max(entry_count, df) - df + 0.5) / (df + 0.5))
+        for entry_id, tf in term_postings.postings.items():
+            length = lengths.get(entry_id, average_length)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            scores[entry_id] = scores.get(entry_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:top_k]
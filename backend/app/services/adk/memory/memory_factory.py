@@ -10,16 +10,124 @@ import os
 
 from google.adk.memory import BaseMemoryService
 
-from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.db.firestore_client import get_shared_firestore_client
+from app.services.adk.memory.embeddings import (
+    DEFAULT_EMBEDDING_CACHE_USERS,
+    DEFAULT_EMBEDDING_DIM,
+    Embedder,
+    EmbeddingCache,
+    HashingEmbedder,
+)
+from app.services.adk.memory.firestore_memory_service import (
+    DEFAULT_TOP_K,
+    FirestoreMemoryService,
+)
+from app.services.adk.memory.hot_index import DEFAULT_HOT_INDEX_USERS, HotMemoryIndex
 
 logger = logging.getLogger(__name__)
 
+# プロセス共有のホットインデックス（接続をまたいで保持する）
+_shared_hot_index: HotMemoryIndex | None = None
+
+# プロセス共有の埋め込み行列キャッシュ（リクエストごとのサービスをまたいで保持する）
+_shared_embedding_cache: EmbeddingCache | None = None
+
+
+def _env_flag(name: str) -> bool:
+    """環境変数が "true" か"""
+    return os.environ.get(name, "false").strip().lower() == "true"
+
+
+def _int_env(name: str, default: int) -> int:
+    """整数の環境変数を読み取る（不正値はデフォルト）"""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Invalid %s: %s", name, value)
+        return default
+
+
+def _create_embedder() -> Embedder | None:
+    """MEMORY_RETRIEVAL に応じて埋め込みモデルを作成する（"vector" 以外はNone）"""
+    retrieval = os.environ.get("MEMORY_RETRIEVAL", "keyword").strip().lower()
+    if retrieval != "vector":
+        return None
+    return HashingEmbedder(dim=_int_env("MEMORY_EMBEDDING_DIM", DEFAULT_EMBEDDING_DIM))
+
+
+def get_shared_hot_index() -> HotMemoryIndex | None:
+    """プロセス全体で共有する記憶のホットインデックスを取得する
+
+    環境変数:
+        MEMORY_HOT_INDEX: "true" で有効化（デフォルト無効）
+        MEMORY_HOT_INDEX_MAX_USERS: 保持する最大ユーザー数（デフォルト256）
+
+    Returns:
+        HotMemoryIndex（無効の場合はNone）
+    """
+    global _shared_hot_index
+
+    if not _env_flag("MEMORY_HOT_INDEX"):
+        return None
+
+    if _shared_hot_index is None:
+        _shared_hot_index = HotMemoryIndex(
+            max_users=_int_env("MEMORY_HOT_INDEX_MAX_USERS", DEFAULT_HOT_INDEX_USERS)
+        )
+    return _shared_hot_index
+
+
+def get_shared_embedding_cache() -> EmbeddingCache:
+    """プロセス全体で共有する埋め込み行列のキャッシュを取得する
+
+    環境変数:
+        MEMORY_EMBEDDING_CACHE_USERS: キャッシュする最大ユーザー数（デフォルト256）
+
+    Returns:
+        EmbeddingCache
+    """
+    global _shared_embedding_cache
+
+    if _shared_embedding_cache is None:
+        _shared_embedding_cache = EmbeddingCache(
+            _int_env("MEMORY_EMBEDDING_CACHE_USERS", DEFAULT_EMBEDDING_CACHE_USERS)
+        )
+    return _shared_embedding_cache
+
+
+def create_firestore_memory_service() -> FirestoreMemoryService:
+    """環境変数の検索設定（create_memory_service 参照）でFirestoreMemoryServiceを作成する
+
+    アプリと同じ転置インデックス・埋め込みの設定を使うため、記憶を書き換える
+    バッチ処理（統合など）もこの関数でサービスを作成する。
+
+    Returns:
+        FirestoreMemoryService: メモリサービスインスタンス
+    """
+    return FirestoreMemoryService(
+        client=get_shared_firestore_client(),
+        inverted_index=_env_flag("MEMORY_INVERTED_INDEX"),
+        top_k=_int_env("MEMORY_SEARCH_TOP_K", DEFAULT_TOP_K),
+        embedder=_create_embedder(),
+        embedding_cache=get_shared_embedding_cache(),
+        hot_index=get_shared_hot_index(),
+    )
+
 
 def create_memory_service() -> BaseMemoryService:
     """環境変数に基づいてメモリサービスを作成する
 
     環境変数:
         AGENT_ENGINE_ID: Agent Engine ID（設定時は VertexAiMemoryBankService）
+        MEMORY_INVERTED_INDEX: "true" で転置インデックス検索を有効化（デフォルト無効）
+        MEMORY_SEARCH_TOP_K: search_memory が返す最大件数（デフォルト10）
+        MEMORY_RETRIEVAL: "vector" で埋め込みベクトル検索（デフォルト "keyword"）
+        MEMORY_EMBEDDING_DIM: 埋め込みの次元数（デフォルト256）
+        MEMORY_EMBEDDING_CACHE_USERS: 埋め込み行列をキャッシュする最大ユーザー数
+        MEMORY_HOT_INDEX: "true" で接続中ユーザーのインメモリ検索を有効化（デフォルト無効）
         GCP_PROJECT_ID: GCP プロジェクト ID（オプション）
         GCP_LOCATION: GCP ロケーション（オプション）
 
@@ -30,7 +138,7 @@ def create_memory_service() -> BaseMemoryService:
 
     if not agent_engine_id:
         logger.info("AGENT_ENGINE_ID not set, using FirestoreMemoryService")
-        return FirestoreMemoryService()
+        return create_firestore_memory_service()
 
     from google.adk.memory import VertexAiMemoryBankService
 
@@ -0,0 +1,53 @@
+"""記憶検索用の日本語対応トークナイザ
+
+会話のほとんどが日本語のため、単語の区切りがないかな・漢字は文字n-gram
+（バイグラムとトライグラム）に分割する。英数字は従来どおり単語単位とする。
+インデックス作成と検索クエリの両方で同じトークナイザを使う。
+
+- NFKC正規化（全角英数字・半角カナを統一）と小文字化を行う
+- かな・漢字の連続部分は2文字と3文字のn-gram（1文字のみの場合はその文字）
+- 英数字の連続部分は1トークン
+- それ以外の文字（記号・空白・句読点）は区切りとして扱う
+"""
+
+import re
+import unicodedata
+
+# かな・漢字（長音符・繰り返し記号を含む）の連続部分、または英数字の連続部分
+_TOKEN_RUN = re.compile(r"([ぁ-ヿ㐀-䶿一-鿿豈-﫿々〆]+)|([a-z0-9]+)")
+
+NGRAM_SIZES = (2, 3)
+
+
+def normalize(text: str) -> str:
+    """NFKC正規化と小文字化"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _ngrams(run: str) -> list[str]:
+    if len(run) < min(NGRAM_SIZES):
+        return [run]
+    return [run[i : i + n] for n in NGRAM_SIZES for i in range(len(run) - n + 1)]
+
+
+def tokenize(text: str) -> list[str]:
+    """テキストを検索用トークンに分割する（重複を含む）
+
+    Args:
+        text: 入力テキスト
+
+    Returns:
+        トークンのリスト（かな・漢字はn-gram、英数字は単語）
+
+    Example:
+        >>> tokenize("かけ算 ３×４")
+        ['かけ', 'け算', 'かけ算', '3', '4']
+    """
+    tokens: list[str] = []
+    for match in _TOKEN_RUN.finditer(normalize(text)):
+        cjk, word = match.groups()
+        if cjk:
+            tokens.extend(_ngrams(cjk))
+        else:
+            tokens.append(word)
+    return tokens
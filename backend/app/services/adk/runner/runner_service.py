@@ -56,6 +56,11 @@ class AgentRunnerService:
             memory_service=memory_service,
         )
 
+    @property
+    def memory_service(self) -> BaseMemoryService:
+        """記憶管理サービス"""
+        return self._memory_service
+
     async def run(
         self,
         user_id: str,
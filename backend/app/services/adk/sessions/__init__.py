@@ -2,8 +2,16 @@
 
 Firestore-backed session service for ADK integration.
 Session factory for environment-based service selection.
+In-process LRU/TTL session cache for read-through get_session.
+Process-wide app/user state cache for _merge_state.
+Event-history snapshots and background compaction.
+Paged event storage layout (many events per document).
+Sharded app-scope state with in-process write coalescing.
+Write-behind event persistence queue for the live voice path.
 """
 
+from app.services.adk.sessions.app_state_shards import AppStateCoalescer, CoalescerStats
+from app.services.adk.sessions.compaction import CompactorStats, SessionCompactor
 from app.services.adk.sessions.converters import (
     dict_to_event,
     dict_to_session,
@@ -11,17 +19,46 @@ from app.services.adk.sessions.converters import (
     extract_state_delta,
     session_to_dict,
 )
+from app.services.adk.sessions.event_pages import EventLayout
 from app.services.adk.sessions.firestore_session_service import (
     FirestoreSessionService,
+    SessionPage,
 )
+from app.services.adk.sessions.session_cache import SessionCache, SessionCacheStats
 from app.services.adk.sessions.session_factory import (
+    create_firestore_session_service,
     create_session_service,
+    get_shared_app_state_coalescer,
+    get_shared_compactor,
+    get_shared_session_cache,
+    get_shared_state_cache,
+    get_shared_write_behind_queue,
     should_use_managed_session,
 )
+from app.services.adk.sessions.state_cache import StateCache, StateCacheStats
+from app.services.adk.sessions.write_behind import WriteBehindQueue, WriteBehindStats
 
 __all__ = [
+    "AppStateCoalescer",
+    "CoalescerStats",
+    "CompactorStats",
+    "EventLayout",
     "FirestoreSessionService",
+    "SessionCache",
+    "SessionCacheStats",
+    "SessionCompactor",
+    "SessionPage",
+    "StateCache",
+    "StateCacheStats",
+    "WriteBehindQueue",
+    "WriteBehindStats",
+    "create_firestore_session_service",
     "create_session_service",
+    "get_shared_app_state_coalescer",
+    "get_shared_compactor",
+    "get_shared_session_cache",
+    "get_shared_state_cache",
+    "get_shared_write_behind_queue",
     "should_use_managed_session",
     "session_to_dict",
     "dict_to_session",
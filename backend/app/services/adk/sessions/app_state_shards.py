@@ -0,0 +1,220 @@
+"""app_state のシャーディングと書き込み集約
+
+app_state/{app_name} は全ユーザーのセッションから書き込まれるため、同時接続が
+増えると1ドキュメントへの持続的な書き込み上限に達する。書き込み先をN個の
+シャードドキュメントに分散し、読み取り時にマージする。
+
+Firestoreコレクション構造:
+    /app_state/{app_name} - 従来の単一ドキュメント（読み取り時に最も低い優先度でマージ）
+    /app_state/{app_name}/shards/{index} - シャード
+        values: キー → 値
+        updated: キー → 書き込み時のタイムスタンプ
+
+同じキーが複数のシャードに書かれた場合は updated が新しい値を採用する（後勝ち）。
+
+AppStateCoalescer を使うと、プロセス内の複数セッションからのapp状態差分を
+まとめ、flush_interval_seconds ごとにプロセスに割り当てた1シャードへ書き込む。
+書き込み待ち・書き込み中の差分は、書き込みが完了するまで読み取り時に重ねる。
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import zlib
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.services.adk.sessions.state_cache import StateCache, app_state_key
+
+logger = logging.getLogger(__name__)
+
+SHARDS_COLLECTION = "shards"
+DEFAULT_SHARD_COUNT = 8
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+
+
+def shard_index_for(key: str, num_shards: int) -> int:
+    """キー（セッションIDなど）から書き込み先のシャード番号を決める"""
+    return zlib.crc32(key.encode("utf-8")) % num_shards
+
+
+def shard_update(delta: dict[str, Any], timestamp: float) -> dict[str, Any]:
+    """シャードに set(merge=True) で書き込むデータを作成"""
+    return {
+        "values": dict(delta),
+        "updated": dict.fromkeys(delta, timestamp),
+    }
+
+
+def merge_shards(base: dict[str, Any], shards: list[dict[str, Any]]) -> dict[str, Any]:
+    """従来ドキュメントとシャードをマージしてapp状態を復元
+
+    Args:
+        base: 従来の app_state/{app_name} ドキュメント
+        shards: シャードドキュメントのデータ
+
+    Returns:
+        キーごとに最新の値を採用したapp状態
+    """
+    merged = dict(base)
+    latest: dict[str, float] = {}
+    for shard in shards:
+        values = shard.get("values") or {}
+        updated = shard.get("updated") or {}
+        for key, value in values.items():
+            timestamp = updated.get(key, 0.0)
+            if key not in latest or timestamp >= latest[key]:
+                merged[key] = value
+                latest[key] = timestamp
+    return merged
+
+
+@dataclass
+class CoalescerStats:
+    """書き込み集約の統計情報
+
+    Attributes:
+        deltas: 受け付けたapp状態差分の数
+        flushes: フラッシュの実行回数
+        writes: Firestoreへの書き込み数
+        failures: 失敗した書き込み数
+    """
+
+    deltas: int = 0
+    flushes: int = 0
+    writes: int = 0
+    failures: int = 0
+
+
+@dataclass
+class _PendingAppState:
+    """フラッシュ待ちのapp状態差分"""
+
+    db: Any
+    values: dict[str, Any] = field(default_factory=dict)
+    updated: dict[str, float] = field(default_factory=dict)
+
+    def add(self, values: dict[str, Any], updated: dict[str, float]) -> None:
+        for key, value in values.items():
+            timestamp = updated[key]
+            if key not in self.updated or timestamp >= self.updated[key]:
+                self.values[key] = value
+                self.updated[key] = timestamp
+
+
+class AppStateCoalescer:
+    """app状態差分をプロセス内で集約し、定期的に1シャードへ書き込む
+
+    最初の差分を受け付けた時点で、実行中のイベントループ上で
+    バックグラウンドのフラッシュタスクを開始する。
+    """
+
+    def __init__(
+        self,
+        *,
+        num_shards: int = DEFAULT_SHARD_COUNT,
+        flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        state_cache: StateCache | None = None,
+        shard_index: int | None = None,
+    ) -> None:
+        """初期化
+
+        Args:
+            num_shards: シャード数
+            flush_interval_seconds: フラッシュ間隔（秒）
+            state_cache: フラッシュ後に無効化するapp/user状態キャッシュ
+            shard_index: このプロセスの書き込み先シャード（Noneでランダム）
+        """
+        self._flush_interval_seconds = flush_interval_seconds
+        self._state_cache = state_cache
+        self.shard_index = shard_index if shard_index is not None else random.randrange(num_shards)
+        self._pending: dict[str, _PendingAppState] = {}
+        # フラッシュごとの書き込み中の差分（commit完了まで読み取り時に重ねる）
+        self._in_flight: list[dict[str, _PendingAppState]] = []
+        self._task: asyncio.Task[None] | None = None
+        self.stats = CoalescerStats()
+
+    def add(self, db: Any, app_name: str, delta: dict[str, Any], timestamp: float) -> None:
+        """app状態差分を集約する
+
+        Args:
+            db: 書き込みに使用するFirestoreクライアント
+            app_name: アプリ名
+            delta: app状態差分（プレフィックスなし）
+            timestamp: 差分のタイムスタンプ（後勝ちの判定に使用）
+        """
+        pending = self._pending.setdefault(app_name, _PendingAppState(db))
+        pending.add(delta, dict.fromkeys(delta, timestamp))
+        self.stats.deltas += 1
+        self._ensure_started()
+
+    def pending(self, app_name: str) -> dict[str, Any]:
+        """書き込みが完了していないapp状態差分（読み取り時に重ねる）"""
+        merged = _PendingAppState(None)
+        for states in [*self._in_flight, self._pending]:
+            state = states.get(app_name)
+            if state is not None:
+                merged.add(state.values, state.updated)
+        return merged.values
+
+    async def flush(self) -> int:
+        """集約した差分をシャードに書き込む
+
+        失敗したアプリの差分は次回のフラッシュで再試行する。
+
+        Returns:
+            書き込んだドキュメント数
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        self._in_flight.append(pending)
+        try:
+            return await self._write(pending)
+        finally:
+            self._in_flight.remove(pending)
+
+    async def _write(self, pending: dict[str, _PendingAppState]) -> int:
+        """差分をアプリごとにシャードへ書き込む（失敗した差分は書き込み待ちに戻す）"""
+        self.stats.flushes += 1
+        written = 0
+        for app_name, state in pending.items():
+            shard_ref = (
+                state.db.collection("app_state")
+                .document(app_name)
+                .collection(SHARDS_COLLECTION)
+                .document(str(self.shard_index))
+            )
+            try:
+                await shard_ref.set({"values": state.values, "updated": state.updated}, merge=True)
+            except Exception:
+                logger.exception("Failed to flush app state for %s", app_name)
+                self.stats.failures += 1
+                retry = self._pending.setdefault(app_name, _PendingAppState(state.db))
+                retry.add(state.values, state.updated)
+                continue
+            written += 1
+            if self._state_cache is not None:
+                self._state_cache.invalidate(app_state_key(app_name))
+        self.stats.writes += written
+        return written
+
+    async def stop(self) -> None:
+        """バックグラウンドタスクを停止し、残りの差分を書き込む"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_seconds)
+            await self.flush()
@@ -0,0 +1,185 @@
+"""イベント履歴のスナップショット化（コンパクション）
+
+長期間使われるセッションはイベントが増え続け、get_session のたびに全イベントを
+読み込んで dict_to_event で復元することになる。古いイベントを1つのスナップショット
+ドキュメント（畳み込んだ状態 + 圧縮したイベントログ）にまとめ、末尾のイベントのみを
+個別ドキュメントとして残すことで、get_session は「スナップショット1件 + 短い末尾」の
+読み取りで済むようになる。
+
+Firestoreコレクション構造:
+    /sessions/{session_id}/snapshots/latest - スナップショット
+    /sessions/{session_id}/events/{event_id} - スナップショット化されていない末尾のイベント
+
+コンパクションは単一ライターを前提とする（SessionCompactor を1プロセスで実行する）。
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+# スナップショット設定
+SNAPSHOT_COLLECTION = "snapshots"
+SNAPSHOT_DOCUMENT_ID = "latest"
+SNAPSHOT_FORMAT_VERSION = 1
+# Firestoreのドキュメント上限（1 MiB）に余裕を持たせる
+SNAPSHOT_MAX_BYTES = 900 * 1024
+
+# コンパクター設定
+DEFAULT_KEEP_TAIL = 20
+DEFAULT_COMPACT_EVERY = 100
+DEFAULT_INTERVAL_SECONDS = 30.0
+MAX_TRACKED_SESSIONS = 10_000
+
+
+def encode_event_log(events: list[dict[str, Any]]) -> bytes:
+    """イベントdictのリストを圧縮したバイト列に変換
+
+    Args:
+        events: Firestoreに保存されていたイベントdict（時系列順）
+
+    Returns:
+        zlib圧縮したJSON
+
+    Raises:
+        TypeError: JSONに変換できない値を含む場合
+    """
+    payload = json.dumps(events, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"))
+
+
+def decode_event_log(blob: bytes) -> list[dict[str, Any]]:
+    """encode_event_log で圧縮したイベントログを復元
+
+    Args:
+        blob: 圧縮されたイベントログ
+
+    Returns:
+        イベントdictのリスト（時系列順）
+    """
+    events: list[dict[str, Any]] = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return events
+
+
+class _Compactable(Protocol):
+    """compact_session を持つセッションサービス"""
+
+    async def compact_session(self, session_id: str, *, keep_tail: int = ...) -> int: ...
+
+
+@dataclass
+class CompactorStats:
+    """コンパクターの統計情報
+
+    Attributes:
+        runs: コンパクション処理の実行回数
+        compacted_sessions: スナップショットを更新したセッション数
+        compacted_events: スナップショットに移したイベント数
+        failures: 失敗したコンパクション数
+    """
+
+    runs: int = 0
+    compacted_sessions: int = 0
+    compacted_events: int = 0
+    failures: int = 0
+
+
+class SessionCompactor:
+    """バックグラウンドでセッションのイベント履歴をスナップショット化する
+
+    append_event の回数をセッションごとに数え、compact_every 回に達した
+    セッションを対象として登録する。登録されたセッションは interval_seconds
+    ごとにまとめてコンパクションされる。最初の登録時に実行中のイベントループ上で
+    バックグラウンドタスクを開始する。
+    """
+
+    def __init__(
+        self,
+        *,
+        compact_every: int = DEFAULT_COMPACT_EVERY,
+        keep_tail: int = DEFAULT_KEEP_TAIL,
+        interval_seconds: float = DEFAULT_INTERVAL_SECONDS,
+    ) -> None:
+        """初期化
+
+        Args:
+            compact_every: コンパクション対象とするまでのappend回数
+            keep_tail: 個別ドキュメントとして残す末尾のイベント数
+            interval_seconds: バックグラウンド実行の間隔（秒）
+        """
+        self._compact_every = compact_every
+        self._keep_tail = keep_tail
+        self._interval_seconds = interval_seconds
+        self._append_counts: OrderedDict[str, int] = OrderedDict()
+        self._pending: dict[str, _Compactable] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.stats = CompactorStats()
+
+    @property
+    def pending(self) -> int:
+        """コンパクション待ちのセッション数"""
+        return len(self._pending)
+
+    def record_append(self, service: _Compactable, session_id: str) -> None:
+        """append_event を記録し、閾値に達したセッションを対象に登録する
+
+        Args:
+            service: コンパクションを実行するセッションサービス
+            session_id: セッションID
+        """
+        count = self._append_counts.pop(session_id, 0) + 1
+        if count < self._compact_every:
+            self._append_counts[session_id] = count
+            while len(self._append_counts) > MAX_TRACKED_SESSIONS:
+                self._append_counts.popitem(last=False)
+            return
+
+        self._pending[session_id] = service
+        self._ensure_started()
+
+    async def run_once(self) -> int:
+        """登録済みのセッションをコンパクションする
+
+        Returns:
+            スナップショットに移したイベント数
+        """
+        pending, self._pending = self._pending, {}
+        self.stats.runs += 1
+        total = 0
+        for session_id, service in pending.items():
+            try:
+                compacted = await service.compact_session(session_id, keep_tail=self._keep_tail)
+            except Exception:
+                logger.exception("Failed to compact session %s", session_id)
+                self.stats.failures += 1
+                continue
+            if compacted:
+                self.stats.compacted_sessions += 1
+                self.stats.compacted_events += compacted
+                total += compacted
+        return total
+
+    async def stop(self) -> None:
+        """バックグラウンドタスクを停止する"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval_seconds)
+            if self._pending:
+                await self.run_once()
@@ -0,0 +1,141 @@
+"""イベントのページ単位保存レイアウト
+
+デフォルトのレイアウトはイベント1件につき1ドキュメントを保存するため、
+get_session の読み取り数（課金単位）がイベント数に比例する。
+ページレイアウトでは固定件数（デフォルト50件）のイベントを1つの「ページ」
+ドキュメントの配列に追記し、読み取り数を約1/50に削減する。
+大きなイベント（関数の応答など）でページが1MiBの上限を超えないよう、
+ページ内のイベントの合計サイズが PAGE_MAX_BYTES を超える場合は件数に満たなくても
+次のページに移る。
+
+Firestoreコレクション構造:
+    /sessions/{session_id} - ページレイアウトの追記位置（PageCursor）
+        event_layout: "paged"
+        event_count: 総イベント数
+        event_page / page_events / page_bytes: 追記中のページ番号・イベント数・サイズ
+    /sessions/{session_id}/event_pages/{page:06d} - ページ
+        page: ページ番号（0始まり、並び順のインデックス）
+        events: イベントdictの配列（追記順）
+        last_timestamp: ページ内の最新イベントのタイムスタンプ
+
+event_layout を持たない既存セッションは従来の events サブコレクションから読み取る。
+FirestoreSessionService.migrate_session_to_pages で既存セッションを移行できる。
+"""
+
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Literal
+
+EventLayout = Literal["documents", "paged"]
+
+EVENT_LAYOUT_DOCUMENTS: EventLayout = "documents"
+EVENT_LAYOUT_PAGED: EventLayout = "paged"
+EVENT_LAYOUTS: tuple[EventLayout, ...] = (EVENT_LAYOUT_DOCUMENTS, EVENT_LAYOUT_PAGED)
+
+EVENT_PAGES_COLLECTION = "event_pages"
+DEFAULT_EVENTS_PER_PAGE = 50
+# Firestoreのドキュメント上限（1 MiB）に余裕を持たせる
+PAGE_MAX_BYTES = 900 * 1024
+
+
+def page_id(page: int) -> str:
+    """ページ番号からドキュメントIDを作成（辞書順 = ページ順）"""
+    return f"{page:06d}"
+
+
+def is_paged(session_data: dict[str, Any]) -> bool:
+    """セッションドキュメントがページレイアウトで保存されているか"""
+    return session_data.get("event_layout") == EVENT_LAYOUT_PAGED
+
+
+def event_bytes(data: dict[str, Any]) -> int:
+    """イベントdictの保存サイズの見積もり（JSONのバイト数）"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+    return len(payload.encode("utf-8"))
+
+
+@dataclass(frozen=True)
+class PageCursor:
+    """ページレイアウトのセッションの追記位置
+
+    Attributes:
+        event_count: 総イベント数
+        page: 追記中のページ番号
+        page_events: 追記中のページのイベント数
+        page_bytes: 追記中のページのイベントの合計サイズ（見積もり）
+    """
+
+    event_count: int = 0
+    page: int = 0
+    page_events: int = 0
+    page_bytes: int = 0
+
+    @classmethod
+    def from_session(cls, session_data: dict[str, Any], events_per_page: int) -> "PageCursor":
+        """セッションドキュメントから追記位置を復元する
+
+        追記位置を持たないセッション（件数のみでページを分けていたもの）は
+        総イベント数から求める。
+        """
+        event_count = session_data.get("event_count", 0)
+        if "event_page" not in session_data:
+            return cls(
+                event_count, event_count // events_per_page, event_count % events_per_page, 0
+            )
+        return cls(
+            event_count,
+            session_data["event_page"],
+            session_data.get("page_events", 0),
+            session_data.get("page_bytes", 0),
+        )
+
+    def advance(self, size: int, events_per_page: int) -> "PageCursor":
+        """サイズ size のイベントを1件追記した後の位置（ページが一杯なら次のページ）"""
+        full = self.page_events >= events_per_page or self.page_bytes + size > PAGE_MAX_BYTES
+        if self.page_events and full:
+            return PageCursor(self.event_count + 1, self.page + 1, 1, size)
+        return PageCursor(
+            self.event_count + 1, self.page, self.page_events + 1, self.page_bytes + size
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """セッションドキュメントに保存するフィールド"""
+        return {
+            "event_count": self.event_count,
+            "event_page": self.page,
+            "page_events": self.page_events,
+            "page_bytes": self.page_bytes,
+        }
+
+
+def pages_for_recent(num_recent_events: int, events_per_page: int) -> int:
+    """最新N件を含むのに必要な末尾ページ数（最終ページが途中の場合を考慮）
+
+    サイズの上限で件数に満たないページがある場合は不足しうるため、
+    呼び出し側で不足時に全ページを読む。
+    """
+    return math.ceil(num_recent_events / events_per_page) + 1
+
+
+def build_pages(
+    events: list[dict[str, Any]], events_per_page: int
+) -> tuple[list[dict[str, Any]], PageCursor]:
+    """時系列順のイベントdictをページドキュメントに分割（append_event と同じ件数・サイズの上限）
+
+    Args:
+        events: イベントdict（時系列順）
+        events_per_page: 1ページあたりのイベント数
+
+    Returns:
+        (ページドキュメントのリスト（ページ番号順）, 最後のイベントの後の追記位置)
+    """
+    pages: list[dict[str, Any]] = []
+    cursor = PageCursor()
+    for data in events:
+        cursor = cursor.advance(event_bytes(data), events_per_page)
+        if cursor.page == len(pages):
+            pages.append({"page": cursor.page, "events": [], "last_timestamp": 0.0})
+        pages[-1]["events"].append(data)
+        pages[-1]["last_timestamp"] = data.get("timestamp", 0.0)
+    return pages, cursor
@@ -1,8 +1,13 @@
 """Firestore-backed ADK SessionService"""
 
+import asyncio
+import base64
+import json
+import logging
 import time
 import uuid
-from typing import Any
+from dataclasses import dataclass, replace
+from typing import Any, Literal
 
 from google.adk.errors.already_exists_error import AlreadyExistsError
 from google.adk.events.event import Event
@@ -12,9 +17,28 @@ from google.adk.sessions.base_session_service import (
     ListSessionsResponse,
 )
 from google.adk.sessions.session import Session
-from google.cloud import firestore  # type: ignore[attr-defined]
+from google.api_core import exceptions as gexc
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 from typing_extensions import override
 
+from app.services.adk.sessions.app_state_shards import (
+    SHARDS_COLLECTION,
+    AppStateCoalescer,
+    merge_shards,
+    shard_index_for,
+    shard_update,
+)
+from app.services.adk.sessions.compaction import (
+    DEFAULT_KEEP_TAIL,
+    SNAPSHOT_COLLECTION,
+    SNAPSHOT_DOCUMENT_ID,
+    SNAPSHOT_FORMAT_VERSION,
+    SNAPSHOT_MAX_BYTES,
+    SessionCompactor,
+    decode_event_log,
+    encode_event_log,
+)
 from app.services.adk.sessions.converters import (
     dict_to_event,
     dict_to_session,
@@ -22,12 +46,132 @@ from app.services.adk.sessions.converters import (
     extract_state_delta,
     session_to_dict,
 )
+from app.services.adk.sessions.event_pages import (
+    DEFAULT_EVENTS_PER_PAGE,
+    EVENT_LAYOUT_DOCUMENTS,
+    EVENT_LAYOUT_PAGED,
+    EVENT_LAYOUTS,
+    EVENT_PAGES_COLLECTION,
+    EventLayout,
+    PageCursor,
+    build_pages,
+    event_bytes,
+    is_paged,
+    page_id,
+    pages_for_recent,
+)
+from app.services.adk.sessions.session_cache import SessionCache
+from app.services.adk.sessions.state_cache import (
+    StateCache,
+    StateKey,
+    app_state_key,
+    user_state_key,
+)
+from app.services.adk.sessions.write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
 
 # ADK State プレフィックス定数
 APP_PREFIX = "app:"
 USER_PREFIX = "user:"
 TEMP_PREFIX = "temp:"
 
+# list_sessions で取得するセッションフィールド（射影）
+SESSION_LIST_FIELDS = ["id", "app_name", "user_id", "state", "last_update_time"]
+
+# ページング設定
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# 楽観的並行性制御の競合時の再試行回数
+DEFAULT_MAX_APPEND_RETRIES = 3
+
+# 追記先のレイアウトの確認に読み取るセッションフィールド
+LAYOUT_FIELDS = ["event_layout", "event_count", "event_page", "page_events", "page_bytes"]
+
+# 一括削除設定（WriteBatchは1回のcommitで最大500書き込み）
+DELETE_BATCH_SIZE = 500
+DELETE_MAX_CONCURRENCY = 4
+
+
+@dataclass
+class SessionPage:
+    """list_sessions_page の結果
+
+    Attributes:
+        sessions: ページ内のセッション（イベントは含まない）
+        next_page_token: 次ページ取得用トークン（最終ページではNone）
+    """
+
+    sessions: list[Session]
+    next_page_token: str | None = None
+
+
+def _encode_page_token(last_update_time: float, session_id: str) -> str:
+    """ページカーソルを不透明なトークンにエンコード"""
+    payload = json.dumps([last_update_time, session_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _decode_page_token(page_token: str) -> tuple[float, str]:
+    """ページトークンをカーソルにデコード
+
+    Raises:
+        ValueError: トークンが不正な場合
+    """
+    try:
+        last_update_time, session_id = json.loads(base64.urlsafe_b64decode(page_token))
+        return float(last_update_time), str(session_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid page_token") from e
+
+
+def _filter_events(events: list[Event], config: GetSessionConfig | None) -> list[Event]:
+    """GetSessionConfigのイベントフィルタリングをメモリ上で適用"""
+    if config and config.num_recent_events:
+        return events[-config.num_recent_events :]
+    if config and config.after_timestamp:
+        return [e for e in events if e.timestamp > config.after_timestamp]
+    return events
+
+
+def _state_field_path(key: str) -> str:
+    """セッション状態のキーをフィールドパスに変換（必要に応じてバッククォートで囲む）"""
+    return str(FieldPath("state", key).to_api_repr())
+
+
+def _snapshot_ref(session_ref: Any) -> Any:
+    """セッションのスナップショットドキュメント参照を取得"""
+    return session_ref.collection(SNAPSHOT_COLLECTION).document(SNAPSHOT_DOCUMENT_ID)
+
+
+def _apply_scope_states(
+    session: Session,
+    app_state: dict[str, Any],
+    user_state: dict[str, Any],
+) -> None:
+    """app/user状態をプレフィックス付きでセッション状態に反映"""
+    for key, value in app_state.items():
+        session.state[f"{APP_PREFIX}{key}"] = value
+    for key, value in user_state.items():
+        session.state[f"{USER_PREFIX}{key}"] = value
+
+
+class _LayoutConflictError(gexc.FailedPrecondition):
+    """従来レイアウトへの追記の前提条件が満たされなかった（移行・同時更新）"""
+
+
+@dataclass(frozen=True)
+class _PendingWrite:
+    """append_eventで発行する1件の書き込み"""
+
+    reference: Any
+    data: dict[str, Any]
+    op: Literal["set", "update"] = "set"
+    merge: bool = False
+    # update時の前提条件（write_option(last_update_time=...)）
+    option: Any = None
+
 
 class FirestoreSessionService(BaseSessionService):
     """Firestore-backed ADK SessionService
@@ -38,21 +182,117 @@ class FirestoreSessionService(BaseSessionService):
         /sessions/{session_id} - セッションメタデータと状態
         /sessions/{session_id}/events/{event_id} - イベント
         /app_state/{app_name} - アプリスコープの状態
+        /app_state/{app_name}/shards/{index} - アプリスコープの状態（シャード）
         /user_state/{app_name}/users/{user_id} - ユーザースコープの状態
+
+    batch_writes=True の場合、append_eventの書き込み（イベント、app/user状態、
+    セッション更新）を1つのWriteBatchにまとめ、1回のcommitでアトミックに反映する。
+
+    session_cache を指定した場合、get_session はキャッシュを優先し、
+    last_update_time のみを読む鮮度確認1回で済ませる（リードスルー）。
+    キャッシュが古い場合は、キャッシュ済みの最終イベント以降のイベントのみを
+    取得して追記する（差分同期）。キャッシュは create_session / append_event で更新される。
+
+    state_cache を指定した場合、app_state / user_state の読み取りをプロセス内で
+    キャッシュする（自身の書き込みで無効化、他プロセスの更新はTTLで反映）。
+
+    snapshots=True の場合、get_session はスナップショット（compact_session で
+    古いイベントをまとめたもの）と末尾のイベントからイベント履歴を復元する。
+    compactor を指定すると、append_event の回数に応じてバックグラウンドで
+    compact_session が実行される。
+
+    event_layout="paged" の場合、新規セッションのイベントを events_per_page 件ずつ
+    ページドキュメントに追記して保存する（event_pages.py 参照）。
+
+    app_state_shards > 0 の場合、app状態をセッションIDで選んだシャードに書き込み、
+    読み取り時に全シャードをマージする（app_state_shards.py 参照）。
+    app_state_coalescer を指定すると、app状態差分はプロセス内で集約され定期的に書き込まれる。
+
+    write_behind を指定すると、append_eventの書き込みはキューに積まれて非同期に
+    バッチcommitされる（write_behind.py 参照）。turn_completeのイベント、
+    get_session、flush_events の呼び出し時には未書き込みのイベントを書き込む。
+
+    optimistic_concurrency=True の場合、セッションドキュメントに version を持たせ、
+    append_event の書き込みを「最後に読み書きした時点から更新されていないこと」
+    （update_time の前提条件）付きの1バッチでcommitする。別インスタンスが先に
+    書き込んでいた場合はセッション状態を読み直し、自身の状態差分を重ねて再試行する。
     """
 
     def __init__(
         self,
         project_id: str | None = None,
         database: str = "(default)",
+        *,
+        client: Any | None = None,
+        batch_writes: bool = False,
+        session_cache: SessionCache | None = None,
+        state_cache: StateCache | None = None,
+        snapshots: bool = False,
+        compactor: SessionCompactor | None = None,
+        event_layout: EventLayout = EVENT_LAYOUT_DOCUMENTS,
+        events_per_page: int = DEFAULT_EVENTS_PER_PAGE,
+        app_state_shards: int = 0,
+        app_state_coalescer: AppStateCoalescer | None = None,
+        write_behind: WriteBehindQueue | None = None,
+        optimistic_concurrency: bool = False,
+        max_append_retries: int = DEFAULT_MAX_APPEND_RETRIES,
     ) -> None:
         """初期化
 
         Args:
             project_id: GCPプロジェクトID（Noneでデフォルト）
             database: Firestoreデータベース名
+            client: 使用するFirestore AsyncClient（Noneで新規作成）
+            batch_writes: append_eventの書き込みを1回のバッチcommitにまとめるか
+            session_cache: get_session用のセッションキャッシュ（Noneで無効）
+            state_cache: app/user状態のキャッシュ（Noneで無効）
+            snapshots: スナップショットからイベント履歴を復元するか
+            compactor: バックグラウンドコンパクター（snapshots=Trueが必要）
+            event_layout: 新規セッションのイベント保存レイアウト（"documents" / "paged"）
+            events_per_page: ページレイアウトでの1ページあたりのイベント数
+            app_state_shards: app状態のシャード数（0で従来の単一ドキュメント）
+            app_state_coalescer: app状態差分の書き込み集約（app_state_shards > 0 が必要）
+            write_behind: append_eventの書き込み遅延キュー（Noneで同期書き込み）
+            optimistic_concurrency: append_eventを前提条件付きで書き込み、競合時に再試行するか
+            max_append_retries: 競合時の最大再試行回数
+
+        Raises:
+            ValueError: snapshots=False で compactor を指定した場合、
+                不正なevent_layout / snapshotsとページレイアウトを併用した場合、
+                app_state_shards=0 で app_state_coalescer を指定した場合、
+                または write_behind と optimistic_concurrency を併用した場合
         """
-        self._db = firestore.AsyncClient(project=project_id, database=database)
+        if compactor is not None and not snapshots:
+            raise ValueError("compactor requires snapshots=True")
+        if event_layout not in EVENT_LAYOUTS:
+            raise ValueError(f"Unknown event_layout: {event_layout}")
+        if event_layout == EVENT_LAYOUT_PAGED and snapshots:
+            raise ValueError("snapshots are not supported with the paged event layout")
+        if app_state_coalescer is not None and app_state_shards <= 0:
+            raise ValueError("app_state_coalescer requires app_state_shards > 0")
+        if write_behind is not None and optimistic_concurrency:
+            raise ValueError("optimistic_concurrency is not supported with write_behind")
+        self._db = (
+            client
+            if client is not None
+            else firestore.AsyncClient(project=project_id, database=database)
+        )
+        self._batch_writes = batch_writes
+        self._session_cache = session_cache
+        self._state_cache = state_cache
+        self._snapshots = snapshots
+        self._compactor = compactor
+        self._event_layout = event_layout
+        self._events_per_page = events_per_page
+        self._app_state_shards = app_state_shards
+        self._app_state_coalescer = app_state_coalescer
+        self._write_behind = write_behind
+        self._optimistic_concurrency = optimistic_concurrency
+        self._max_append_retries = max_append_retries
+        # 楽観的並行性制御: セッションごとに最後に読み書きしたドキュメントのupdate_time
+        self._update_times: dict[str, Any] = {}
+        # ページレイアウトのセッションの追記位置（従来レイアウトは移行で切り替わるため保持しない）
+        self._page_cursors: dict[str, PageCursor] = {}
 
     @override
     async def create_session(
@@ -80,13 +320,85 @@ class FirestoreSessionService(BaseSessionService):
         # セッションID生成
         session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
 
-        # 既存セッションチェック
-        session_ref = self._db.collection("sessions").document(session_id)
-        existing_doc = await session_ref.get()
-        if existing_doc.exists:
+        try:
+            return await self._create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
+            )
+        except gexc.AlreadyExists as e:
             raise AlreadyExistsError(  # type: ignore[no-untyped-call]
                 f"Session with id {session_id} already exists."
+            ) from e
+
+    async def get_or_create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        state: dict[str, Any] | None = None,
+    ) -> tuple[Session, bool]:
+        """セッションを取得し、なければ作成する
+
+        存在確認の読み取りは行わず、条件付き作成（create）を1回試みる。
+        既存セッションと競合した場合のみ、イベントを含まないメタデータを読み取る。
+        競合後に削除されていた場合は1回だけ作成し直す。
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+            session_id: セッションID
+            state: 作成時の初期状態（既存のセッションの場合は使用しない）
+
+        Returns:
+            (Session, created): 既存の場合のSessionはlist_sessionsと同様に
+            イベントを含まない（必要な場合はget_sessionを使用する）。
+            app/user状態はマージ済み
+
+        Raises:
+            AlreadyExistsError: session_idが別のアプリ・ユーザーのセッションで
+                使われている場合、または作成し直しも競合した場合
+        """
+        try:
+            session = await self._create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
             )
+            return session, True
+        except gexc.AlreadyExists:
+            pass
+
+        session_doc = (
+            await self._db.collection("sessions")
+            .document(session_id)
+            .get(field_paths=SESSION_LIST_FIELDS)
+        )
+        if not session_doc.exists:
+            # 競合後に削除された場合は作成し直す（再度競合した場合はAlreadyExistsError）
+            session = await self.create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
+            )
+            return session, True
+
+        session = dict_to_session(session_doc.to_dict())
+        if session.app_name != app_name or session.user_id != user_id:
+            raise AlreadyExistsError(  # type: ignore[no-untyped-call]
+                f"Session with id {session_id} already exists."
+            )
+        return await self._merge_state(app_name, user_id, session), False
+
+    async def _create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None,
+        session_id: str,
+    ) -> Session:
+        """セッションドキュメントを条件付きで作成し、app/user状態を保存する
+
+        Raises:
+            google.api_core.exceptions.AlreadyExists: セッションが既に存在する場合
+        """
+        session_ref = self._db.collection("sessions").document(session_id)
 
         # 状態をスコープ別に分類
         state_deltas = extract_state_delta(state)
@@ -94,22 +406,7 @@ class FirestoreSessionService(BaseSessionService):
         user_state_delta = state_deltas["user"]
         session_state = state_deltas["session"]
 
-        # アプリ状態を保存
-        if app_state_delta:
-            app_state_ref = self._db.collection("app_state").document(app_name)
-            await app_state_ref.set(app_state_delta, merge=True)
-
-        # ユーザー状態を保存
-        if user_state_delta:
-            user_state_ref = (
-                self._db.collection("user_state")
-                .document(app_name)
-                .collection("users")
-                .document(user_id)
-            )
-            await user_state_ref.set(user_state_delta, merge=True)
-
-        # セッションを作成
+        # セッションを作成（既存の場合はAlreadyExists、app/user状態は書き込まない）
         session = Session(
             id=session_id,
             app_name=app_name,
@@ -117,9 +414,34 @@ class FirestoreSessionService(BaseSessionService):
             state=session_state or {},
             last_update_time=time.time(),
         )
+        session_data = session_to_dict(session)
+        if self._event_layout == EVENT_LAYOUT_PAGED:
+            session_data["event_layout"] = EVENT_LAYOUT_PAGED
+            session_data["event_count"] = 0
+        if self._optimistic_concurrency:
+            session_data["version"] = 0
+        result = await session_ref.create(session_data)
+        self._remember_update_time(session_id, result)
+        if self._event_layout == EVENT_LAYOUT_PAGED:
+            self._page_cursors[session_id] = PageCursor()
+
+        # アプリ状態を保存
+        app_write = self._app_state_write(app_name, session_id, app_state_delta, time.time())
+        if app_write is not None:
+            await self._commit_writes([app_write])
+        elif self._app_state_coalescer is not None and app_state_delta:
+            self._app_state_coalescer.add(self._db, app_name, app_state_delta, time.time())
+
+        # ユーザー状態を保存
+        if user_state_delta:
+            await self._user_state_ref(app_name, user_id).set(user_state_delta, merge=True)
+
+        self._invalidate_state_cache(
+            app_name, user_id, app=app_write is not None, user=bool(user_state_delta)
+        )
 
-        # Firestoreに保存
-        await session_ref.set(session_to_dict(session))
+        if self._session_cache is not None:
+            self._session_cache.put(session)
 
         # 返却用にapp/user状態をマージ
         merged_session = await self._merge_state(app_name, user_id, session)
@@ -145,39 +467,49 @@ class FirestoreSessionService(BaseSessionService):
         Returns:
             Session（存在しない場合はNone）
         """
-        # セッションドキュメント取得
         session_ref = self._db.collection("sessions").document(session_id)
-        session_doc = await session_ref.get()
-
-        if not session_doc.exists:
-            return None
 
-        # イベント取得
-        events: list[Event] = []
-        events_collection = session_ref.collection("events")
-
-        if config and config.num_recent_events:
-            # 最新N件のみ取得
-            events_query = events_collection.order_by("timestamp").limit_to_last(
-                config.num_recent_events
-            )
-            async for event_doc in events_query.stream():
-                events.append(dict_to_event(event_doc.to_dict()))
-        elif config and config.after_timestamp:
-            # 指定タイムスタンプ以降のみ取得
-            events_query = events_collection.order_by("timestamp").where(
-                "timestamp", ">", config.after_timestamp
+        # 書き込み遅延中のイベントを先に書き込む（自身の書き込みを読めるようにする）
+        if self._write_behind is not None:
+            await self._write_behind.flush(session_id)
+
+        # キャッシュから取得（鮮度確認付き）
+        if self._session_cache is not None:
+            cached = await self._get_cached_session(app_name, user_id, session_ref, config)
+            if cached is not None:
+                return await self._merge_state(app_name, user_id, cached)
+
+        # セッションドキュメントとイベント取得
+        if self._snapshots:
+            session_doc, snapshot_doc = await self._get_with_snapshot(session_ref)
+            if not session_doc.exists:
+                return None
+            self._remember_update_time(session_id, session_doc)
+            events = _filter_events(
+                await self._load_events_with_snapshot(session_ref, snapshot_doc), config
             )
-            async for event_doc in events_query.stream():
-                events.append(dict_to_event(event_doc.to_dict()))
         else:
-            # 全件取得
-            async for event_doc in events_collection.order_by("timestamp").stream():
-                events.append(dict_to_event(event_doc.to_dict()))
+            session_doc = await session_ref.get()
+            if not session_doc.exists:
+                return None
+            self._remember_update_time(session_id, session_doc)
+            session_data = session_doc.to_dict()
+            if is_paged(session_data):
+                self._page_cursors[session_id] = PageCursor.from_session(
+                    session_data, self._events_per_page
+                )
+                events = await self._load_paged_events(session_ref, config)
+            else:
+                self._page_cursors.pop(session_id, None)
+                events = await self._load_events(session_ref, config)
 
         # Sessionオブジェクト構築
         session = dict_to_session(session_doc.to_dict(), events=events)
 
+        # 全履歴を読み込んだ場合のみキャッシュする
+        if self._session_cache is not None and config is None:
+            self._session_cache.put(session)
+
         # app/user状態をマージ
         merged_session = await self._merge_state(app_name, user_id, session)
         return merged_session
@@ -191,6 +523,9 @@ class FirestoreSessionService(BaseSessionService):
     ) -> ListSessionsResponse:
         """セッション一覧取得
 
+        セッションドキュメントは必要なフィールドのみを射影して取得し、
+        app/user状態は一覧内の重複しないユーザーごとに1回だけまとめて取得する。
+
         Args:
             app_name: アプリ名
             user_id: ユーザーID（未指定で全ユーザー）
@@ -198,29 +533,77 @@ class FirestoreSessionService(BaseSessionService):
         Returns:
             ListSessionsResponse
         """
-        sessions: list[Session] = []
+        query = self._sessions_query(app_name, user_id).select(SESSION_LIST_FIELDS)
 
-        sessions_collection = self._db.collection("sessions")
+        # list_sessionsではイベントを含めない（仕様通り）
+        sessions = [
+            dict_to_session(session_doc.to_dict(), events=[])
+            async for session_doc in query.stream()
+        ]
+        await self._merge_states_bulk(app_name, sessions)
 
-        if user_id is not None:
-            # 特定ユーザーのセッション
-            query = sessions_collection.where("app_name", "==", app_name).where(
-                "user_id", "==", user_id
-            )
-        else:
-            # 全ユーザーのセッション
-            query = sessions_collection.where("app_name", "==", app_name)
+        return ListSessionsResponse(sessions=sessions)
 
-        async for session_doc in query.stream():
-            session_data = session_doc.to_dict()
-            session = dict_to_session(session_data, events=[])
+    async def list_sessions_page(
+        self,
+        *,
+        app_name: str,
+        user_id: str | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: str | None = None,
+    ) -> SessionPage:
+        """セッション一覧をページ単位で取得する（新しい順）
 
-            # list_sessionsではイベントを含めない（仕様通り）
-            session_user_id = session_data["user_id"]
-            merged_session = await self._merge_state(app_name, session_user_id, session)
-            sessions.append(merged_session)
+        last_update_time 降順 + セッションID降順で並べ、前ページ末尾の
+        カーソル以降を取得する。
 
-        return ListSessionsResponse(sessions=sessions)
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID（未指定で全ユーザー）
+            page_size: 1ページあたりの最大件数
+            page_token: 前ページのnext_page_token（未指定で先頭ページ）
+
+        Returns:
+            SessionPage
+
+        Raises:
+            ValueError: page_sizeまたはpage_tokenが不正な場合
+        """
+        if page_size < 1 or page_size > MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+
+        query = (
+            self._sessions_query(app_name, user_id)
+            .select(SESSION_LIST_FIELDS)
+            .order_by("last_update_time", direction="DESCENDING")
+            .order_by("__name__", direction="DESCENDING")
+        )
+        if page_token:
+            last_update_time, last_session_id = _decode_page_token(page_token)
+            query = query.start_after(
+                {"last_update_time": last_update_time, "__name__": last_session_id}
+            )
+
+        # 次ページの有無を判定するため1件多く取得する
+        sessions = [
+            dict_to_session(session_doc.to_dict(), events=[])
+            async for session_doc in query.limit(page_size + 1).stream()
+        ]
+        next_page_token = None
+        if len(sessions) > page_size:
+            sessions = sessions[:page_size]
+            last = sessions[-1]
+            next_page_token = _encode_page_token(last.last_update_time, last.id)
+
+        await self._merge_states_bulk(app_name, sessions)
+        return SessionPage(sessions=sessions, next_page_token=next_page_token)
+
+    def _sessions_query(self, app_name: str, user_id: str | None) -> Any:
+        """app_name（とuser_id）で絞り込んだセッションクエリを作成"""
+        query = self._db.collection("sessions").where("app_name", "==", app_name)
+        if user_id is not None:
+            query = query.where("user_id", "==", user_id)
+        return query
 
     @override
     async def delete_session(
@@ -237,20 +620,96 @@ class FirestoreSessionService(BaseSessionService):
             user_id: ユーザーID
             session_id: セッションID
         """
+        if self._session_cache is not None:
+            self._session_cache.invalidate(session_id)
+        self._page_cursors.pop(session_id, None)
+        self._update_times.pop(session_id, None)
+        if self._write_behind is not None:
+            self._write_behind.discard(session_id)
+
         session_ref = self._db.collection("sessions").document(session_id)
         session_doc = await session_ref.get()
 
         if not session_doc.exists:
             return
 
-        # イベントサブコレクションを削除
-        events_collection = session_ref.collection("events")
-        async for event_doc in events_collection.stream():
-            await event_doc.reference.delete()
-
-        # セッション自体を削除
+        # 子ドキュメントを先に削除し、途中失敗時もセッションを残して再実行可能にする
+        await self._delete_in_batches(await self._list_child_refs(session_ref))
         await session_ref.delete()
 
+    async def delete_sessions(self, *, app_name: str, user_id: str) -> int:
+        """ユーザーの全セッションをイベントごと一括削除
+
+        データ保持期間の適用やアカウント削除で使用する。
+        イベント・スナップショット → セッションの順に、チャンク単位のWriteBatchで削除する。
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+
+        Returns:
+            削除したセッション数
+        """
+        query = self._sessions_query(app_name, user_id).select([])
+        session_refs = [doc.reference async for doc in query.stream()]
+        if not session_refs:
+            return 0
+
+        if self._session_cache is not None:
+            for session_ref in session_refs:
+                self._session_cache.invalidate(session_ref.id)
+        for session_ref in session_refs:
+            self._page_cursors.pop(session_ref.id, None)
+
+        semaphore = asyncio.Semaphore(DELETE_MAX_CONCURRENCY)
+
+        async def list_children(session_ref: Any) -> list[Any]:
+            async with semaphore:
+                return await self._list_child_refs(session_ref)
+
+        child_refs = await asyncio.gather(*(list_children(ref) for ref in session_refs))
+        await self._delete_in_batches([ref for refs in child_refs for ref in refs])
+        await self._delete_in_batches(session_refs)
+        return len(session_refs)
+
+    async def _list_child_refs(self, session_ref: Any) -> list[Any]:
+        """イベント・ページ・スナップショットのドキュメント参照を取得（本文は読まない）
+
+        セッションごとにレイアウトが異なりうる（移行中・別設定のインスタンスが作成）ため、
+        このインスタンスの event_layout によらず両方のコレクションを列挙する。
+        """
+        refs = [
+            ref
+            for collection_id in ("events", EVENT_PAGES_COLLECTION)
+            async for ref in session_ref.collection(collection_id).list_documents(
+                page_size=DELETE_BATCH_SIZE
+            )
+        ]
+        refs.append(_snapshot_ref(session_ref))
+        return refs
+
+    async def _delete_in_batches(self, references: list[Any]) -> None:
+        """ドキュメントをWriteBatch単位で削除（同時commit数を制限）
+
+        Args:
+            references: 削除するドキュメント参照
+        """
+        semaphore = asyncio.Semaphore(DELETE_MAX_CONCURRENCY)
+
+        async def commit_chunk(chunk: list[Any]) -> None:
+            async with semaphore:
+                batch = self._db.batch()
+                for reference in chunk:
+                    batch.delete(reference)
+                await batch.commit()
+
+        await asyncio.gather(
+            *(
+                commit_chunk(references[i : i + DELETE_BATCH_SIZE])
+                for i in range(0, len(references), DELETE_BATCH_SIZE)
+            )
+        )
+
     @override
     async def append_event(
         self,
@@ -273,6 +732,9 @@ class FirestoreSessionService(BaseSessionService):
         # temp:キーを除去（親クラスのメソッドを使用）
         event = self._trim_temp_delta_state(event)
 
+        # キャッシュ整合性確認用に追加前のlast_update_timeを保持
+        previous_update_time = session.last_update_time
+
         # セッション状態を更新（親クラスのメソッドを使用）
         self._update_session_state(session, event)
 
@@ -282,81 +744,895 @@ class FirestoreSessionService(BaseSessionService):
 
         # Firestoreに永続化
         session_ref = self._db.collection("sessions").document(session.id)
+        event_data = event_to_dict(event)
 
-        # イベントを保存
-        event_ref = session_ref.collection("events").document(event.id)
-        await event_ref.set(event_to_dict(event))
+        # 状態差分をスコープ別に分類して永続化
+        state_deltas = extract_state_delta(event.actions.state_delta if event.actions else None)
 
-        # セッションのlast_update_timeと状態を更新
-        update_data: dict[str, Any] = {"last_update_time": event.timestamp}
+        # アプリ状態を更新（書き込み集約時はcommit後に集約バッファへ追加）
+        app_write = self._app_state_write(
+            session.app_name, session.id, state_deltas["app"], event.timestamp
+        )
 
-        # 状態差分をスコープ別に分類して永続化
-        if event.actions and event.actions.state_delta:
-            state_deltas = extract_state_delta(event.actions.state_delta)
+        attempt = 0
+        while True:
+            # 追記先のレイアウトはセッションドキュメントで確認する（移行でいつでも切り替わる）
+            cursor, legacy_update_time = await self._resolve_layout(session_ref)
+
+            # セッションのlast_update_timeと状態を更新
+            update_data: dict[str, Any] = {"last_update_time": event.timestamp}
+
+            # イベントを保存（ページレイアウトのセッションは現在のページに追記）
+            if cursor is None:
+                event_ref = session_ref.collection("events").document(event.id)
+                writes = [_PendingWrite(event_ref, event_data)]
+            else:
+                page_write, cursor = self._page_write(
+                    session_ref, cursor, event_data, event.timestamp
+                )
+                writes = [page_write]
+                update_data.update(cursor.to_dict())
+                # 総イベント数は同時追記でも失われないよう加算する
+                update_data["event_count"] = firestore.Increment(1)
 
-            # セッション状態を更新
-            if state_deltas["session"]:
-                # Firestoreのstate fieldをマージ更新
-                update_data["state"] = session.state
+            # セッション状態は変更されたキーのみをフィールドパスで更新する
+            # （書き込みサイズが状態の大きさに依存せず、別キーへの同時書き込みも失われない）
+            for key, value in state_deltas["session"].items():
+                update_data[_state_field_path(key)] = value
 
-            # アプリ状態を更新
-            if state_deltas["app"]:
-                app_state_ref = self._db.collection("app_state").document(session.app_name)
-                await app_state_ref.set(state_deltas["app"], merge=True)
+            if app_write is not None:
+                writes.append(app_write)
 
             # ユーザー状態を更新
             if state_deltas["user"]:
-                user_state_ref = (
-                    self._db.collection("user_state")
-                    .document(session.app_name)
-                    .collection("users")
-                    .document(session.user_id)
-                )
-                await user_state_ref.set(state_deltas["user"], merge=True)
+                user_state_ref = self._user_state_ref(session.app_name, session.user_id)
+                writes.append(_PendingWrite(user_state_ref, state_deltas["user"], merge=True))
+
+            writes.append(_PendingWrite(session_ref, update_data, op="update"))
+            try:
+                if self._write_behind is not None:
+                    # 従来レイアウトの確認はフラッシュ時に行う（_commit_queued_writes）
+                    await self._enqueue_writes(self._write_behind, session, event, writes)
+                elif self._optimistic_concurrency:
+                    update_data["version"] = firestore.Increment(1)
+                    await self._commit_with_retry(
+                        session,
+                        writes,
+                        state_deltas["session"],
+                        legacy_update_time=legacy_update_time,
+                        app=app_write is not None,
+                        user=bool(state_deltas["user"]),
+                    )
+                else:
+                    await self._commit_now(
+                        session,
+                        writes,
+                        legacy_update_time=legacy_update_time,
+                        app=app_write is not None,
+                        user=bool(state_deltas["user"]),
+                    )
+                break
+            except _LayoutConflictError:
+                # 従来レイアウトを確認した後に移行・更新された場合は追記先を確認し直す
+                attempt += 1
+                if attempt > self._max_append_retries:
+                    raise
+                logger.debug("Session %s changed before a legacy append, retrying", session.id)
+
+        if self._app_state_coalescer is not None and state_deltas["app"]:
+            self._app_state_coalescer.add(
+                self._db, session.app_name, state_deltas["app"], event.timestamp
+            )
 
-        await session_ref.update(update_data)
+        self._update_cache_after_append(session, previous_update_time)
+        if cursor is not None:
+            self._page_cursors[session.id] = cursor
+
+        if self._compactor is not None:
+            self._compactor.record_append(self, session.id)
 
         return event
 
-    async def _merge_state(
+    async def _commit_now(
+        self,
+        session: Session,
+        writes: list[_PendingWrite],
+        *,
+        legacy_update_time: Any = None,
+        app: bool,
+        user: bool,
+    ) -> None:
+        """append_eventの書き込みを同期的に反映する
+
+        従来レイアウトへの追記（legacy_update_time あり）は、レイアウト確認時の
+        update_time をセッション更新の前提条件にする。
+
+        Raises:
+            _LayoutConflictError: レイアウト確認後にセッションが移行・更新された場合
+        """
+        if legacy_update_time is not None:
+            option = self._db.write_option(last_update_time=legacy_update_time)
+            writes[-1] = replace(writes[-1], option=option)
+        try:
+            await self._commit_writes(writes)
+        except Exception as exc:
+            if self._session_cache is not None:
+                self._session_cache.invalidate(session.id)
+            self._page_cursors.pop(session.id, None)
+            if legacy_update_time is not None and isinstance(exc, gexc.FailedPrecondition):
+                raise _LayoutConflictError(str(exc)) from exc  # type: ignore[no-untyped-call]
+            raise
+        finally:
+            self._invalidate_state_cache(session.app_name, session.user_id, app=app, user=user)
+
+    async def _commit_with_retry(
+        self,
+        session: Session,
+        writes: list[_PendingWrite],
+        session_delta: dict[str, Any],
+        *,
+        legacy_update_time: Any = None,
+        app: bool,
+        user: bool,
+    ) -> None:
+        """セッション更新に前提条件を付けて1バッチでcommitし、競合時は状態をマージして再試行する
+
+        セッション更新は writes の末尾にある。前提条件が満たされなかった場合
+        （他インスタンスが先に書き込んだ場合）はバッチ全体が反映されないため、
+        最新のセッション状態に自身の状態差分を重ねて同じ書き込みを再試行する。
+
+        Raises:
+            google.api_core.exceptions.FailedPrecondition: 再試行回数を超えて競合した場合
+            _LayoutConflictError: 従来レイアウトへの追記中にセッションが移行された場合
+        """
+        session_ref = writes[-1].reference
+        attempt = 0
+        try:
+            while True:
+                known = self._update_times.get(session.id, legacy_update_time)
+                if known is not None:
+                    option = self._db.write_option(last_update_time=known)
+                    writes[-1] = replace(writes[-1], option=option)
+                try:
+                    results = await self._commit_batch(writes)
+                    break
+                except gexc.FailedPrecondition:
+                    attempt += 1
+                    if attempt > self._max_append_retries:
+                        raise
+                    logger.debug("Concurrent update on session %s, retrying", session.id)
+                    await self._reload_session_state(
+                        session_ref, session, session_delta, legacy=legacy_update_time is not None
+                    )
+        except Exception:
+            self._forget_session(session.id)
+            raise
+        finally:
+            self._invalidate_state_cache(session.app_name, session.user_id, app=app, user=user)
+
+        self._remember_update_time(session.id, results[-1])
+        if attempt and self._session_cache is not None:
+            # 他インスタンスのイベントを含まないため、次回のget_sessionで差分同期させる
+            self._session_cache.invalidate(session.id)
+
+    async def _reload_session_state(
+        self,
+        session_ref: Any,
+        session: Session,
+        session_delta: dict[str, Any],
+        *,
+        legacy: bool = False,
+    ) -> None:
+        """競合時に最新のセッション状態を読み直し、自身の状態差分を重ねる
+
+        Raises:
+            _LayoutConflictError: 従来レイアウトへの追記中にセッションが移行された場合
+        """
+        session_doc = await session_ref.get(field_paths=["state", "event_layout"])
+        if not session_doc.exists:
+            raise gexc.NotFound(  # type: ignore[no-untyped-call]
+                f"Session {session.id} was deleted during append"
+            )
+        if legacy and is_paged(session_doc.to_dict() or {}):
+            raise _LayoutConflictError(  # type: ignore[no-untyped-call]
+                f"Session {session.id} was migrated to pages during append"
+            )
+        self._remember_update_time(session.id, session_doc)
+
+        scope_state = {
+            key: value
+            for key, value in session.state.items()
+            if key.startswith((APP_PREFIX, USER_PREFIX))
+        }
+        session.state.clear()
+        session.state.update((session_doc.to_dict() or {}).get("state") or {})
+        session.state.update(session_delta)
+        session.state.update(scope_state)
+
+    def _forget_session(self, session_id: str) -> None:
+        """反映されなかった書き込みを含むセッションのキャッシュと追記位置を破棄する"""
+        if self._session_cache is not None:
+            self._session_cache.invalidate(session_id)
+        self._page_cursors.pop(session_id, None)
+        self._update_times.pop(session_id, None)
+
+    def _remember_update_time(self, session_id: str, doc_or_result: Any) -> None:
+        """楽観的並行性制御用に、読み書きしたセッションドキュメントのupdate_timeを記録する"""
+        if self._optimistic_concurrency:
+            self._update_times[session_id] = doc_or_result.update_time
+
+    async def _enqueue_writes(
+        self,
+        write_behind: WriteBehindQueue,
+        session: Session,
+        event: Event,
+        writes: list[_PendingWrite],
+    ) -> None:
+        """append_eventの書き込みを遅延キューに積む（turn_completeでは即座に書き込む）"""
+
+        async def commit(pending: list[_PendingWrite]) -> None:
+            await self._commit_write_batch(session.app_name, session.user_id, session.id, pending)
+
+        await write_behind.enqueue(
+            session.id, writes, commit, on_drop=lambda: self._forget_session(session.id)
+        )
+        if event.turn_complete:
+            await write_behind.flush(session.id)
+
+    async def _commit_write_batch(
+        self, app_name: str, user_id: str, session_id: str, writes: list[_PendingWrite]
+    ) -> None:
+        """遅延キューの書き込みを1つのWriteBatchでcommitし、app/user状態キャッシュを無効化する
+
+        従来レイアウトのイベントを含む場合は、commit直前にセッションのレイアウトを確認する
+        （キューに積んだ後に移行されていればページへの追記に置き換える）。
+
+        Raises:
+            google.api_core.exceptions.FailedPrecondition: 再試行回数を超えて競合した場合
+        """
+        attempt = 0
+        try:
+            while True:
+                batch_writes, cursor = await self._align_queued_writes(session_id, writes)
+                try:
+                    await self._commit_batch(batch_writes)
+                    break
+                except gexc.FailedPrecondition:
+                    attempt += 1
+                    if batch_writes is writes or attempt > self._max_append_retries:
+                        raise
+                    logger.debug("Session %s changed before a queued append, retrying", session_id)
+        finally:
+            paths = [write.reference.path for write in writes]
+            self._invalidate_state_cache(
+                app_name,
+                user_id,
+                app=any(path.startswith("app_state/") for path in paths),
+                user=any(path.startswith("user_state/") for path in paths),
+            )
+        if cursor is not None:
+            self._page_cursors[session_id] = cursor
+
+    async def _align_queued_writes(
+        self, session_id: str, writes: list[_PendingWrite]
+    ) -> tuple[list[_PendingWrite], PageCursor | None]:
+        """遅延キューの従来レイアウトのイベント書き込みを現在のレイアウトに合わせる
+
+        Returns:
+            (commitする書き込み, ページに置き換えた場合の追記後の追記位置)。
+            従来レイアウトのイベントを含まない場合は writes をそのまま返す。
+        """
+        if not any(write.reference.parent.id == "events" for write in writes):
+            return writes, None
+
+        session_ref = self._db.collection("sessions").document(session_id)
+        cursor, legacy_update_time = await self._resolve_layout(session_ref)
+        if cursor is None and legacy_update_time is None:
+            return writes, None
+        aligned: list[_PendingWrite] = []
+        if cursor is None:
+            # 従来レイアウトのまま: 確認時の update_time を前提条件にする
+            option = self._db.write_option(last_update_time=legacy_update_time)
+            for write in writes:
+                if write.op == "update" and write.reference.path == session_ref.path:
+                    aligned.append(replace(write, option=option))
+                    option = None
+                else:
+                    aligned.append(write)
+            return aligned, None
+
+        # キューに積んだ後に移行された: イベントをページへの追記に置き換える
+        moved = 0
+        for write in writes:
+            if write.reference.parent.id == "events":
+                page_write, cursor = self._page_write(
+                    session_ref, cursor, write.data, write.data.get("timestamp", 0.0)
+                )
+                aligned.append(page_write)
+                moved += 1
+            else:
+                aligned.append(write)
+        aligned.append(
+            _PendingWrite(
+                session_ref,
+                {**cursor.to_dict(), "event_count": firestore.Increment(moved)},
+                op="update",
+            )
+        )
+        return aligned, cursor
+
+    async def flush_events(self, session_id: str) -> int:
+        """書き込み遅延中のイベントを書き込む（切断時など）
+
+        Args:
+            session_id: セッションID
+
+        Returns:
+            書き込んだイベント数（write_behindが無効の場合は0）
+        """
+        if self._write_behind is None:
+            return 0
+        return await self._write_behind.flush(session_id)
+
+    async def compact_session(self, session_id: str, *, keep_tail: int = DEFAULT_KEEP_TAIL) -> int:
+        """古いイベントをスナップショットにまとめ、個別ドキュメントを削除する
+
+        末尾keep_tail件を除くイベントを既存のスナップショットに追記し、
+        スナップショットとセッションのcompacted_throughを書き込んだ後に
+        移したイベントドキュメントを削除する。
+
+        Args:
+            session_id: セッションID
+            keep_tail: 個別ドキュメントとして残す末尾のイベント数
+
+        Returns:
+            スナップショットに移したイベント数
+        """
+        session_ref = self._db.collection("sessions").document(session_id)
+        session_doc, snapshot_doc = await self._get_with_snapshot(session_ref)
+        if not session_doc.exists:
+            return 0
+
+        event_docs = [
+            doc async for doc in session_ref.collection("events").order_by("timestamp").stream()
+        ]
+        candidates = event_docs[: max(len(event_docs) - keep_tail, 0)]
+        if not candidates:
+            return 0
+
+        if snapshot_doc.exists:
+            compacted = decode_event_log(snapshot_doc.get("events"))
+            folded_state: dict[str, Any] = snapshot_doc.get("state")
+        else:
+            compacted, folded_state = [], {}
+
+        known_ids = {data.get("id") for data in compacted}
+        for event_doc in candidates:
+            data = event_doc.to_dict()
+            if data.get("id") in known_ids:
+                continue
+            compacted.append(data)
+            state_delta = (data.get("actions") or {}).get("state_delta")
+            folded_state.update(extract_state_delta(state_delta)["session"])
+
+        try:
+            blob = encode_event_log(compacted)
+        except TypeError:
+            logger.warning("Session %s has events that cannot be snapshotted", session_id)
+            return 0
+        if len(blob) > SNAPSHOT_MAX_BYTES:
+            logger.warning("Snapshot for session %s exceeds %d bytes", session_id, len(blob))
+            return 0
+
+        compacted_through = candidates[-1].to_dict().get("timestamp", 0.0)
+        snapshot = {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "event_count": len(compacted),
+            "events": blob,
+            "state": folded_state,
+            "compacted_through": compacted_through,
+            "created_at": time.time(),
+        }
+        # スナップショットを書いてからイベントを削除する（途中失敗時も履歴は欠けない）
+        await self._commit_writes(
+            [
+                _PendingWrite(_snapshot_ref(session_ref), snapshot),
+                _PendingWrite(session_ref, {"compacted_through": compacted_through}, op="update"),
+            ]
+        )
+        await self._delete_in_batches([doc.reference for doc in candidates])
+        return len(candidates)
+
+    async def _get_cached_session(
         self,
         app_name: str,
         user_id: str,
-        session: Session,
-    ) -> Session:
-        """app状態とuser状態をセッション状態にマージ
+        session_ref: Any,
+        config: GetSessionConfig | None,
+    ) -> Session | None:
+        """キャッシュからセッションを取得し、last_update_timeで鮮度を確認する
 
         Args:
             app_name: アプリ名
             user_id: ユーザーID
-            session: マージ対象のSession
+            session_ref: セッションドキュメント参照
+            config: 取得設定（イベントフィルタリング）
 
         Returns:
-            状態がマージされたSession
+            最新であることを確認したSession（使用できない場合はNone）
         """
-        # アプリ状態を取得
-        app_state_ref = self._db.collection("app_state").document(app_name)
-        app_state_doc = await app_state_ref.get()
-        if app_state_doc.exists:
-            app_state = app_state_doc.to_dict() or {}
-            for key, value in app_state.items():
-                session.state[f"{APP_PREFIX}{key}"] = value
+        cache = self._session_cache
+        if cache is None:
+            return None
+        cached = cache.get(session_ref.id)
+        if cached is None:
+            return None
+        if cached.app_name != app_name or cached.user_id != user_id:
+            return None
+
+        # last_update_timeのみを読み取る軽量な鮮度確認
+        freshness_doc = await session_ref.get(field_paths=["last_update_time"])
+        if not freshness_doc.exists:
+            cache.invalidate(session_ref.id, stale=True)
+            return None
+        self._remember_update_time(session_ref.id, freshness_doc)
+        if freshness_doc.get("last_update_time") != cached.last_update_time:
+            cache.invalidate(session_ref.id, stale=True)
+            synced = await self._sync_new_events(session_ref, cached)
+            if synced is None:
+                return None
+            cache.stats.delta_syncs += 1
+            cache.put(synced)
+            cached = synced
+
+        # イベントフィルタリングはメモリ上で適用する
+        cached.events = _filter_events(cached.events, config)
+        return cached
+
+    async def _load_events(self, session_ref: Any, config: GetSessionConfig | None) -> list[Event]:
+        """イベントサブコレクションからイベントを取得（configのフィルタリングはクエリで適用）"""
+        events: list[Event] = []
+        events_collection = session_ref.collection("events")
 
-        # ユーザー状態を取得
-        user_state_ref = (
+        if config and config.num_recent_events:
+            # 最新N件のみ取得
+            events_query = events_collection.order_by("timestamp").limit_to_last(
+                config.num_recent_events
+            )
+        elif config and config.after_timestamp:
+            # 指定タイムスタンプ以降のみ取得
+            events_query = events_collection.order_by("timestamp").where(
+                "timestamp", ">", config.after_timestamp
+            )
+        else:
+            # 全件取得
+            events_query = events_collection.order_by("timestamp")
+
+        async for event_doc in events_query.stream():
+            events.append(dict_to_event(event_doc.to_dict()))
+        return events
+
+    async def _load_paged_events(
+        self, session_ref: Any, config: GetSessionConfig | None
+    ) -> list[Event]:
+        """ページドキュメントからイベントを取得
+
+        num_recent_events / after_timestamp 指定時は必要なページのみを読み取る。
+        """
+        pages_collection = session_ref.collection(EVENT_PAGES_COLLECTION)
+        if config and config.num_recent_events:
+            pages_query = pages_collection.order_by("page").limit_to_last(
+                pages_for_recent(config.num_recent_events, self._events_per_page)
+            )
+        elif config and config.after_timestamp:
+            pages_query = pages_collection.where(
+                "last_timestamp", ">", config.after_timestamp
+            ).order_by("last_timestamp")
+        else:
+            pages_query = pages_collection.order_by("page")
+
+        events: list[Event] = []
+        pages = 0
+        async for page_doc in pages_query.stream():
+            pages += 1
+            events.extend(dict_to_event(data) for data in page_doc.get("events") or [])
+        if (
+            config
+            and config.num_recent_events
+            and len(events) < config.num_recent_events
+            and pages == pages_for_recent(config.num_recent_events, self._events_per_page)
+        ):
+            # サイズの上限で件数に満たないページがあり、末尾のページだけでは足りない
+            return _filter_events(await self._load_paged_events(session_ref, None), config)
+        return _filter_events(events, config)
+
+    async def _resolve_layout(self, session_ref: Any) -> tuple[PageCursor | None, Any]:
+        """セッションの追記先のレイアウトを確認する
+
+        ページレイアウトは移行後に戻らないため、把握済みの追記位置は読み取りなしで使う。
+        従来レイアウトは移行でいつでも切り替わるため、event_layout の設定に関わらず
+        毎回セッションドキュメントを読み、その update_time を追記の前提条件に使う。
+
+        Returns:
+            (ページレイアウトの追記位置, 従来レイアウトの場合のセッションの update_time)
+        """
+        cursor = self._page_cursors.get(session_ref.id)
+        if cursor is not None:
+            return cursor, None
+
+        doc = await session_ref.get(field_paths=LAYOUT_FIELDS)
+        data = doc.to_dict() if doc.exists else None
+        if data and is_paged(data):
+            cursor = PageCursor.from_session(data, self._events_per_page)
+            self._page_cursors[session_ref.id] = cursor
+            return cursor, None
+        return None, doc.update_time if doc.exists else None
+
+    def _page_write(
+        self, session_ref: Any, cursor: PageCursor, event_data: dict[str, Any], timestamp: float
+    ) -> tuple[_PendingWrite, PageCursor]:
+        """イベントを現在のページに追記する書き込みと、追記後の追記位置を返す"""
+        cursor = cursor.advance(event_bytes(event_data), self._events_per_page)
+        page_ref = session_ref.collection(EVENT_PAGES_COLLECTION).document(page_id(cursor.page))
+        page_data = {
+            "page": cursor.page,
+            "events": firestore.ArrayUnion([event_data]),
+            "last_timestamp": timestamp,
+        }
+        return _PendingWrite(page_ref, page_data, merge=True), cursor
+
+    async def migrate_session_to_pages(
+        self, session_id: str, *, delete_source: bool = False
+    ) -> int:
+        """従来レイアウトのセッションをページレイアウトに移行する
+
+        イベントドキュメントを読み取って append_event と同じ件数・サイズの上限でページに
+        分け、セッションドキュメントに event_layout と追記位置を設定する
+        （1つのWriteBatchでアトミックに反映）。読み取り後にイベントが追記された場合は
+        セッションの update_time の前提条件で反映されないため、読み直して再試行する。
+        反映によりセッションの update_time も変わるため、移行前のレイアウトを前提にした
+        追記（同じく update_time を前提条件にする）は失敗し、ページに追記し直される。
+        移行済みのセッションは何もしない。
+
+        Args:
+            session_id: セッションID
+            delete_source: 移行後に元のイベントドキュメントを削除するか
+
+        Returns:
+            移行したイベント数（移行済み・存在しない場合は-1）
+
+        Raises:
+            google.api_core.exceptions.FailedPrecondition: 再試行回数を超えて競合した場合
+        """
+        session_ref = self._db.collection("sessions").document(session_id)
+        attempt = 0
+        while True:
+            session_doc = await session_ref.get()
+            if not session_doc.exists or is_paged(session_doc.to_dict()):
+                return -1
+
+            event_docs = [
+                doc async for doc in session_ref.collection("events").order_by("timestamp").stream()
+            ]
+            events = [doc.to_dict() for doc in event_docs]
+            pages, cursor = build_pages(events, self._events_per_page)
+            pages_collection = session_ref.collection(EVENT_PAGES_COLLECTION)
+
+            batch = self._db.batch()
+            for page in pages:
+                batch.set(pages_collection.document(page_id(page["page"])), page)
+            batch.update(
+                session_ref,
+                {"event_layout": EVENT_LAYOUT_PAGED, **cursor.to_dict()},
+                option=self._db.write_option(last_update_time=session_doc.update_time),
+            )
+            try:
+                await batch.commit()
+                break
+            except gexc.FailedPrecondition:
+                attempt += 1
+                if attempt > self._max_append_retries:
+                    raise
+                logger.debug("Session %s was updated during migration, retrying", session_id)
+
+        self._page_cursors.pop(session_id, None)
+        if self._session_cache is not None:
+            self._session_cache.invalidate(session_id)
+        if delete_source:
+            await self._delete_in_batches([doc.reference for doc in event_docs])
+        return len(events)
+
+    async def _get_with_snapshot(self, session_ref: Any) -> tuple[Any, Any]:
+        """セッションドキュメントとスナップショットを1回のget_allで取得"""
+        snapshot_ref = _snapshot_ref(session_ref)
+        docs = {
+            doc.reference.path: doc async for doc in self._db.get_all([session_ref, snapshot_ref])
+        }
+        return docs[session_ref.path], docs[snapshot_ref.path]
+
+    async def _load_events_with_snapshot(self, session_ref: Any, snapshot_doc: Any) -> list[Event]:
+        """スナップショットと末尾のイベントドキュメントからイベント履歴を復元
+
+        コンパクション途中（スナップショット書き込み後、イベント削除前）でも
+        重複しないよう、スナップショット済みのイベントIDは末尾から除外する。
+
+        Args:
+            session_ref: セッションドキュメント参照
+            snapshot_doc: スナップショットのドキュメントスナップショット
+
+        Returns:
+            時系列順の全イベント
+        """
+        compacted = decode_event_log(snapshot_doc.get("events")) if snapshot_doc.exists else []
+        known_ids = {data.get("id") for data in compacted}
+        events = [dict_to_event(data) for data in compacted]
+
+        async for event_doc in session_ref.collection("events").order_by("timestamp").stream():
+            data = event_doc.to_dict()
+            if data.get("id") not in known_ids:
+                events.append(dict_to_event(data))
+        return events
+
+    async def _sync_new_events(self, session_ref: Any, cached: Session) -> Session | None:
+        """キャッシュ済みセッションに、それ以降に追加されたイベントのみを取り込む
+
+        キャッシュ中の最終イベントのタイムスタンプT以上のイベントを取得し、
+        既知のイベントIDを除いて追記する（同一タイムスタンプの取りこぼし防止）。
+        セッション状態はセッションドキュメントから読み直す。
+
+        Args:
+            session_ref: セッションドキュメント参照
+            cached: キャッシュ済みのSession
+
+        Returns:
+            新しいイベントを取り込んだSession（セッションが存在しない場合、または
+            キャッシュ以降のイベントがスナップショット化済みで差分取得できない場合はNone）
+        """
+        session_doc = await session_ref.get()
+        if not session_doc.exists:
+            return None
+        self._remember_update_time(session_ref.id, session_doc)
+
+        session_data = session_doc.to_dict()
+        last_timestamp = cached.events[-1].timestamp if cached.events else 0.0
+        compacted_through = session_data.get("compacted_through")
+        if compacted_through is not None and compacted_through >= last_timestamp:
+            return None
+        known_ids = {event.id for event in cached.events if event.timestamp >= last_timestamp}
+
+        if is_paged(session_data):
+            self._page_cursors[session_ref.id] = PageCursor.from_session(
+                session_data, self._events_per_page
+            )
+            pages_query = (
+                session_ref.collection(EVENT_PAGES_COLLECTION)
+                .where("last_timestamp", ">=", last_timestamp)
+                .order_by("last_timestamp")
+            )
+            candidates = [
+                data async for page_doc in pages_query.stream() for data in page_doc.get("events")
+            ]
+        else:
+            events_query = (
+                session_ref.collection("events")
+                .order_by("timestamp")
+                .where("timestamp", ">=", last_timestamp)
+            )
+            candidates = [event_doc.to_dict() async for event_doc in events_query.stream()]
+
+        new_events = [
+            event
+            for event in map(dict_to_event, candidates)
+            if event.timestamp >= last_timestamp and event.id not in known_ids
+        ]
+        return dict_to_session(session_data, events=[*cached.events, *new_events])
+
+    def _update_cache_after_append(self, session: Session, previous_update_time: float) -> None:
+        """append_event後にキャッシュを更新する
+
+        キャッシュ中のセッションが追加前の状態と一致する場合のみ書き込む。
+        一致しない場合（呼び出し元のセッションが古い可能性がある）は無効化する。
+
+        Args:
+            session: イベント追加後のセッション
+            previous_update_time: イベント追加前のlast_update_time
+        """
+        if self._session_cache is None:
+            return
+        if self._session_cache.peek_last_update_time(session.id) == previous_update_time:
+            self._session_cache.put(session)
+        else:
+            self._session_cache.invalidate(session.id)
+
+    async def _commit_writes(self, writes: list[_PendingWrite]) -> None:
+        """書き込みを反映する
+
+        batch_writes有効時は1つのWriteBatchで1回commitし、
+        無効時は順番に1件ずつ書き込む。
+
+        Args:
+            writes: 反映する書き込みのリスト（順序を保持）
+        """
+        if self._batch_writes:
+            await self._commit_batch(writes)
+            return
+
+        for write in writes:
+            if write.op == "update":
+                await write.reference.update(write.data, option=write.option)
+            elif write.merge:
+                await write.reference.set(write.data, merge=True)
+            else:
+                await write.reference.set(write.data)
+
+    async def _commit_batch(self, writes: list[_PendingWrite]) -> list[Any]:
+        """書き込みを1つのWriteBatchで1回commitする
+
+        Returns:
+            書き込みごとのWriteResult
+        """
+        batch = self._db.batch()
+        for write in writes:
+            if write.op == "update":
+                batch.update(write.reference, write.data, option=write.option)
+            else:
+                batch.set(write.reference, write.data, merge=write.merge)
+        return list(await batch.commit())
+
+    def _app_state_ref(self, app_name: str) -> Any:
+        """app_stateドキュメント参照を取得"""
+        return self._db.collection("app_state").document(app_name)
+
+    def _app_state_shard_ref(self, app_name: str, index: int) -> Any:
+        """app_stateシャードのドキュメント参照を取得"""
+        return self._app_state_ref(app_name).collection(SHARDS_COLLECTION).document(str(index))
+
+    def _app_state_write(
+        self, app_name: str, session_id: str, delta: dict[str, Any], timestamp: float
+    ) -> _PendingWrite | None:
+        """app状態差分の書き込みを作成（差分なし・書き込み集約時はNone）
+
+        Args:
+            app_name: アプリ名
+            session_id: セッションID（シャードの選択に使用）
+            delta: app状態差分（プレフィックスなし）
+            timestamp: 差分のタイムスタンプ
+
+        Returns:
+            書き込み（直ちに書き込まない場合はNone）
+        """
+        if not delta or self._app_state_coalescer is not None:
+            return None
+        if self._app_state_shards > 0:
+            shard_ref = self._app_state_shard_ref(
+                app_name, shard_index_for(session_id, self._app_state_shards)
+            )
+            return _PendingWrite(shard_ref, shard_update(delta, timestamp), merge=True)
+        return _PendingWrite(self._app_state_ref(app_name), delta, merge=True)
+
+    def _user_state_ref(self, app_name: str, user_id: str) -> Any:
+        """user_stateドキュメント参照を取得"""
+        return (
             self._db.collection("user_state")
             .document(app_name)
             .collection("users")
             .document(user_id)
         )
-        user_state_doc = await user_state_ref.get()
-        if user_state_doc.exists:
-            user_state = user_state_doc.to_dict() or {}
-            for key, value in user_state.items():
-                session.state[f"{USER_PREFIX}{key}"] = value
 
+    def _invalidate_state_cache(
+        self, app_name: str, user_id: str, *, app: bool, user: bool
+    ) -> None:
+        """自身の書き込みに合わせてapp/user状態キャッシュを無効化する"""
+        if self._state_cache is None:
+            return
+        if app:
+            self._state_cache.invalidate(app_state_key(app_name))
+        if user:
+            self._state_cache.invalidate(user_state_key(app_name, user_id))
+
+    async def _merge_state(
+        self,
+        app_name: str,
+        user_id: str,
+        session: Session,
+    ) -> Session:
+        """app状態とuser状態をセッション状態にマージ
+
+        Args:
+            app_name: アプリ名
+            user_id: ユーザーID
+            session: マージ対象のSession
+
+        Returns:
+            状態がマージされたSession
+        """
+        app_state, user_states = await self._resolve_scope_states(app_name, [user_id])
+        _apply_scope_states(session, app_state, user_states[user_id])
         return session
 
+    async def _merge_states_bulk(self, app_name: str, sessions: list[Session]) -> None:
+        """複数セッションにapp/user状態をマージ（ユーザーごとに1回のみ取得）
+
+        Args:
+            app_name: アプリ名
+            sessions: マージ対象のSessionリスト
+        """
+        if not sessions:
+            return
+        user_ids = list(dict.fromkeys(session.user_id for session in sessions))
+        app_state, user_states = await self._resolve_scope_states(app_name, user_ids)
+        for session in sessions:
+            _apply_scope_states(session, app_state, user_states[session.user_id])
+
+    async def _resolve_scope_states(
+        self,
+        app_name: str,
+        user_ids: list[str],
+    ) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+        """app状態と各ユーザーの状態を取得する
+
+        state_cache に無いドキュメントのみを、1回のget_allでまとめて取得する。
+
+        Args:
+            app_name: アプリ名
+            user_ids: ユーザーIDのリスト（重複なし）
+
+        Returns:
+            (app状態, user_id → user状態)
+        """
+        app_key = app_state_key(app_name)
+        app_state = self._state_cache.get(app_key) if self._state_cache is not None else None
+        user_states: dict[str, dict[str, Any]] = {}
+
+        # キャッシュにないドキュメントの参照を収集（path → (キャッシュキー, user_id)）
+        missing: dict[str, tuple[StateKey, str | None]] = {}
+        missing_refs: list[Any] = []
+        if app_state is None:
+            app_refs = [self._app_state_ref(app_name)]
+            app_refs += [
+                self._app_state_shard_ref(app_name, index)
+                for index in range(self._app_state_shards)
+            ]
+            for app_ref in app_refs:
+                missing[app_ref.path] = (app_key, None)
+            missing_refs.extend(app_refs)
+        for user_id in user_ids:
+            user_key = user_state_key(app_name, user_id)
+            cached = self._state_cache.get(user_key) if self._state_cache is not None else None
+            if cached is not None:
+                user_states[user_id] = cached
+                continue
+            user_ref = self._user_state_ref(app_name, user_id)
+            missing[user_ref.path] = (user_key, user_id)
+            missing_refs.append(user_ref)
+
+        if missing_refs:
+            app_parts: dict[str, dict[str, Any]] = {}
+            async for state_doc in self._db.get_all(missing_refs):
+                data = (state_doc.to_dict() or {}) if state_doc.exists else {}
+                cache_key, owner = missing[state_doc.reference.path]
+                if owner is None:
+                    app_parts[state_doc.reference.path] = data
+                    continue
+                user_states[owner] = data
+                if self._state_cache is not None:
+                    self._state_cache.put(cache_key, data)
+
+            if app_state is None:
+                base = app_parts.pop(self._app_state_ref(app_name).path, {})
+                app_state = merge_shards(base, list(app_parts.values()))
+                if self._state_cache is not None:
+                    self._state_cache.put(app_key, app_state)
+
+        for user_id in user_ids:
+            user_states.setdefault(user_id, {})
+
+        # 書き込み集約中の差分を重ねる（キャッシュには含めない）
+        app_state = app_state or {}
+        if self._app_state_coalescer is not None:
+            app_state = {**app_state, **self._app_state_coalescer.pending(app_name)}
+        return app_state, user_states
+
     async def list_all_session_ids(self) -> list[str]:
         """全セッションIDのリストを取得する
 
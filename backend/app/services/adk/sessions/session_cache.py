@@ -0,0 +1,179 @@
+"""インプロセス セッションキャッシュ（LRU + TTL）
+
+FirestoreSessionService.get_session の読み取りを削減するためのキャッシュ。
+ADK Runner は呼び出しごとに get_session を行うため、イベント履歴全体を
+毎回Firestoreから読み直すのを避け、last_update_time の比較による
+軽量な鮮度確認だけで済ませる。
+"""
+
+import copy
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from google.adk.sessions.session import Session
+
+# デフォルト設定
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_EVENTS = 50_000
+DEFAULT_TTL_SECONDS = 300.0
+
+
+@dataclass
+class SessionCacheStats:
+    """キャッシュの統計情報
+
+    Attributes:
+        hits: キャッシュに存在したルックアップ数（鮮度確認で失効したものを含む）
+        misses: キャッシュに存在しなかったルックアップ数
+        stale: 鮮度確認でFirestoreより古いと判定された数
+        delta_syncs: 古いエントリを差分イベント取得で最新化した数
+        evictions: 容量超過またはTTL切れで追い出された数
+    """
+
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    delta_syncs: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _CacheEntry:
+    """キャッシュエントリ"""
+
+    session: Session
+    expires_at: float
+
+
+def _copy_session(session: Session) -> Session:
+    """キャッシュ内外で共有しないようにセッションをコピーする
+
+    イベントは不変として扱いリストのみコピーし、状態はディープコピーする。
+    """
+    return session.model_copy(
+        update={
+            "events": list(session.events),
+            "state": copy.deepcopy(session.state),
+        }
+    )
+
+
+class SessionCache:
+    """session_id をキーとする LRU + TTL セッションキャッシュ
+
+    メモリ上限はエントリ数とキャッシュ全体のイベント数の両方で指定する。
+    いずれかを超えた場合、最も長く使われていないエントリから追い出す。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_events: int = DEFAULT_MAX_EVENTS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化
+
+        Args:
+            max_entries: 保持する最大セッション数
+            max_events: 全セッション合計で保持する最大イベント数
+            ttl_seconds: エントリの有効期間（秒）
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self._max_entries = max_entries
+        self._max_events = max_events
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._total_events = 0
+        self.stats = SessionCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_events(self) -> int:
+        """キャッシュ中の合計イベント数"""
+        return self._total_events
+
+    def get(self, session_id: str) -> Session | None:
+        """キャッシュからセッションを取得する
+
+        Args:
+            session_id: セッションID
+
+        Returns:
+            セッションのコピー（存在しないかTTL切れの場合はNone）
+        """
+        entry = self._entries.get(session_id)
+        if entry is not None and entry.expires_at <= self._clock():
+            self._remove(session_id)
+            self.stats.evictions += 1
+            entry = None
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(session_id)
+        self.stats.hits += 1
+        return _copy_session(entry.session)
+
+    def peek_last_update_time(self, session_id: str) -> float | None:
+        """統計やLRU順序に影響を与えずにlast_update_timeを参照する
+
+        Args:
+            session_id: セッションID
+
+        Returns:
+            キャッシュ中のlast_update_time（存在しない場合はNone）
+        """
+        entry = self._entries.get(session_id)
+        return entry.session.last_update_time if entry is not None else None
+
+    def put(self, session: Session) -> None:
+        """セッションをキャッシュに格納する（TTLは格納時点から計測）
+
+        Args:
+            session: 格納するセッション（コピーして保持する）
+        """
+        self._remove(session.id)
+        self._entries[session.id] = _CacheEntry(
+            session=_copy_session(session),
+            expires_at=self._clock() + self._ttl_seconds,
+        )
+        self._total_events += len(session.events)
+        self._evict()
+
+    def invalidate(self, session_id: str, *, stale: bool = False) -> None:
+        """エントリを無効化する
+
+        Args:
+            session_id: セッションID
+            stale: 鮮度確認で古いと判定された場合True（統計に記録）
+        """
+        if self._remove(session_id) and stale:
+            self.stats.stale += 1
+
+    def clear(self) -> None:
+        """全エントリを削除する"""
+        self._entries.clear()
+        self._total_events = 0
+
+    def _remove(self, session_id: str) -> bool:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        self._total_events -= len(entry.session.events)
+        return True
+
+    def _evict(self) -> None:
+        """容量上限を超えている間、LRU順に追い出す"""
+        while self._entries and (
+            len(self._entries) > self._max_entries or self._total_events > self._max_events
+        ):
+            session_id = next(iter(self._entries))
+            self._remove(session_id)
+            self.stats.evictions += 1
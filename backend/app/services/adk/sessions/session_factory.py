@@ -10,10 +10,322 @@ import os
 
 from google.adk.sessions import BaseSessionService
 
-from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.db.firestore_client import get_shared_firestore_client
+from app.services.adk.sessions import app_state_shards, compaction, state_cache, write_behind
+from app.services.adk.sessions.app_state_shards import AppStateCoalescer
+from app.services.adk.sessions.compaction import SessionCompactor
+from app.services.adk.sessions.event_pages import (
+    DEFAULT_EVENTS_PER_PAGE,
+    EVENT_LAYOUT_DOCUMENTS,
+    EVENT_LAYOUT_PAGED,
+    EventLayout,
+)
+from app.services.adk.sessions.firestore_session_service import (
+    DEFAULT_MAX_APPEND_RETRIES,
+    FirestoreSessionService,
+)
+from app.services.adk.sessions.session_cache import (
+    DEFAULT_MAX_ENTRIES,
+    DEFAULT_MAX_EVENTS,
+    DEFAULT_TTL_SECONDS,
+    SessionCache,
+)
+from app.services.adk.sessions.state_cache import StateCache
+from app.services.adk.sessions.write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
+# プロセス全体で共有するキャッシュ
+_shared_session_cache: SessionCache | None = None
+_shared_state_cache: StateCache | None = None
+_shared_compactor: SessionCompactor | None = None
+_shared_app_state_coalescer: AppStateCoalescer | None = None
+_shared_write_behind: WriteBehindQueue | None = None
+
+
+def _int_env(name: str, default: int) -> int:
+    """整数の環境変数を読み取る（不正値はデフォルト）"""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Invalid %s: %s", name, value)
+        return default
+
+
+def _float_env(name: str, default: float) -> float:
+    """浮動小数点の環境変数を読み取る（不正値はデフォルト）"""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Invalid %s: %s", name, value)
+        return default
+
+
+def get_shared_session_cache() -> SessionCache | None:
+    """プロセス全体で共有するセッションキャッシュを取得する
+
+    環境変数:
+        SESSION_CACHE_ENABLED: "false" でキャッシュを無効化（デフォルト有効）
+        SESSION_CACHE_MAX_ENTRIES: 最大セッション数
+        SESSION_CACHE_MAX_EVENTS: 全セッション合計の最大イベント数
+        SESSION_CACHE_TTL_SECONDS: エントリの有効期間（秒）
+
+    Returns:
+        SessionCache（無効化されている場合はNone）
+    """
+    global _shared_session_cache
+
+    if os.environ.get("SESSION_CACHE_ENABLED", "true").strip().lower() == "false":
+        return None
+
+    if _shared_session_cache is None:
+        _shared_session_cache = SessionCache(
+            max_entries=_int_env("SESSION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+            max_events=_int_env("SESSION_CACHE_MAX_EVENTS", DEFAULT_MAX_EVENTS),
+            ttl_seconds=_float_env("SESSION_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+        )
+    return _shared_session_cache
+
+
+def get_shared_state_cache() -> StateCache | None:
+    """プロセス全体で共有するapp/user状態キャッシュを取得する
+
+    環境変数:
+        STATE_CACHE_ENABLED: "false" でキャッシュを無効化（デフォルト有効）
+        STATE_CACHE_MAX_ENTRIES: 最大エントリ数
+        STATE_CACHE_TTL_SECONDS: エントリの有効期間（秒）
+
+    Returns:
+        StateCache（無効化されている場合はNone）
+    """
+    global _shared_state_cache
+
+    if os.environ.get("STATE_CACHE_ENABLED", "true").strip().lower() == "false":
+        return None
+
+    if _shared_state_cache is None:
+        _shared_state_cache = StateCache(
+            max_entries=_int_env("STATE_CACHE_MAX_ENTRIES", state_cache.DEFAULT_MAX_ENTRIES),
+            ttl_seconds=_float_env("STATE_CACHE_TTL_SECONDS", state_cache.DEFAULT_TTL_SECONDS),
+        )
+    return _shared_state_cache
+
+
+def get_event_layout() -> EventLayout:
+    """新規セッションのイベント保存レイアウトを取得する
+
+    環境変数:
+        SESSION_EVENT_LAYOUT: "documents"（1イベント1ドキュメント、デフォルト）
+            または "paged"（SESSION_EVENTS_PER_PAGE 件ずつページに保存）
+
+    Returns:
+        EventLayout: イベント保存レイアウト
+    """
+    value = os.environ.get("SESSION_EVENT_LAYOUT", "").strip().lower()
+    if value == EVENT_LAYOUT_PAGED:
+        return EVENT_LAYOUT_PAGED
+    if value and value != EVENT_LAYOUT_DOCUMENTS:
+        logger.warning("Invalid SESSION_EVENT_LAYOUT: %s", value)
+    return EVENT_LAYOUT_DOCUMENTS
+
+
+def snapshots_enabled() -> bool:
+    """イベント履歴スナップショットが有効か
+
+    ページレイアウトとは併用できないため、SESSION_EVENT_LAYOUT=paged の場合は無効。
+
+    環境変数:
+        SESSION_SNAPSHOTS_ENABLED: "true" で有効化（デフォルト無効）
+
+    Returns:
+        bool: 有効な場合 True
+    """
+    if os.environ.get("SESSION_SNAPSHOTS_ENABLED", "false").strip().lower() != "true":
+        return False
+    if get_event_layout() == EVENT_LAYOUT_PAGED:
+        logger.warning("SESSION_SNAPSHOTS_ENABLED is ignored with SESSION_EVENT_LAYOUT=paged")
+        return False
+    return True
+
+
+def batch_writes_enabled() -> bool:
+    """append_eventの書き込みを1回のバッチcommitにまとめるか
+
+    環境変数:
+        SESSION_BATCH_WRITES: "true" で有効化（デフォルト無効）
+
+    Returns:
+        bool: 有効な場合 True
+    """
+    return os.environ.get("SESSION_BATCH_WRITES", "false").strip().lower() == "true"
+
+
+def optimistic_concurrency_enabled() -> bool:
+    """append_eventの楽観的並行性制御が有効か
+
+    環境変数:
+        SESSION_OPTIMISTIC_CONCURRENCY: "true" で有効化（デフォルト無効）
+        SESSION_APPEND_MAX_RETRIES: 競合時の最大再試行回数
+
+    Returns:
+        bool: 有効な場合 True
+    """
+    return os.environ.get("SESSION_OPTIMISTIC_CONCURRENCY", "false").strip().lower() == "true"
+
+
+def get_shared_compactor() -> SessionCompactor | None:
+    """プロセス全体で共有するセッションコンパクターを取得する
+
+    環境変数:
+        SESSION_SNAPSHOTS_ENABLED: "true" でスナップショットとコンパクターを有効化
+        SESSION_COMPACT_EVERY: コンパクション対象とするまでのappend回数
+        SESSION_COMPACT_KEEP_TAIL: 個別ドキュメントとして残す末尾のイベント数
+        SESSION_COMPACT_INTERVAL_SECONDS: バックグラウンド実行の間隔（秒）
+
+    Returns:
+        SessionCompactor（無効化されている場合はNone）
+    """
+    global _shared_compactor
+
+    if not snapshots_enabled():
+        return None
+
+    if _shared_compactor is None:
+        _shared_compactor = SessionCompactor(
+            compact_every=_int_env("SESSION_COMPACT_EVERY", compaction.DEFAULT_COMPACT_EVERY),
+            keep_tail=_int_env("SESSION_COMPACT_KEEP_TAIL", compaction.DEFAULT_KEEP_TAIL),
+            interval_seconds=_float_env(
+                "SESSION_COMPACT_INTERVAL_SECONDS", compaction.DEFAULT_INTERVAL_SECONDS
+            ),
+        )
+    return _shared_compactor
+
+
+def get_app_state_shards() -> int:
+    """app状態のシャード数を取得する
+
+    環境変数:
+        APP_STATE_SHARDS: シャード数（0で従来の単一ドキュメント、デフォルト0）
+
+    Returns:
+        int: シャード数
+    """
+    return max(_int_env("APP_STATE_SHARDS", 0), 0)
+
+
+def get_shared_app_state_coalescer() -> AppStateCoalescer | None:
+    """プロセス全体で共有するapp状態の書き込み集約を取得する
+
+    環境変数:
+        APP_STATE_SHARDS: シャード数（0の場合は集約も無効）
+        APP_STATE_COALESCE: "true" で有効化（デフォルト無効）
+        APP_STATE_FLUSH_INTERVAL_SECONDS: フラッシュ間隔（秒）
+
+    Returns:
+        AppStateCoalescer（無効化されている場合はNone）
+    """
+    global _shared_app_state_coalescer
+
+    num_shards = get_app_state_shards()
+    if num_shards == 0:
+        return None
+    if os.environ.get("APP_STATE_COALESCE", "false").strip().lower() != "true":
+        return None
+
+    if _shared_app_state_coalescer is None:
+        _shared_app_state_coalescer = AppStateCoalescer(
+            num_shards=num_shards,
+            flush_interval_seconds=_float_env(
+                "APP_STATE_FLUSH_INTERVAL_SECONDS",
+                app_state_shards.DEFAULT_FLUSH_INTERVAL_SECONDS,
+            ),
+            state_cache=get_shared_state_cache(),
+        )
+    return _shared_app_state_coalescer
+
+
+def get_shared_write_behind_queue() -> WriteBehindQueue | None:
+    """プロセス全体で共有するイベントの書き込み遅延キューを取得する
+
+    環境変数:
+        SESSION_WRITE_BEHIND: "true" で有効化（デフォルト無効）
+        SESSION_WRITE_BEHIND_MAX_PENDING: セッションあたりの未書き込みイベント数の上限
+        SESSION_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: バックグラウンドフラッシュの間隔（秒）
+        SESSION_WRITE_BEHIND_MAX_RETRIES: 一時的なエラーで失敗した書き込みの再試行回数
+
+    Returns:
+        WriteBehindQueue（無効化されている場合はNone）
+    """
+    global _shared_write_behind
+
+    if os.environ.get("SESSION_WRITE_BEHIND", "false").strip().lower() != "true":
+        return None
+
+    if _shared_write_behind is None:
+        _shared_write_behind = WriteBehindQueue(
+            max_pending_events=_int_env(
+                "SESSION_WRITE_BEHIND_MAX_PENDING", write_behind.DEFAULT_MAX_PENDING_EVENTS
+            ),
+            flush_interval_seconds=_float_env(
+                "SESSION_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS",
+                write_behind.DEFAULT_FLUSH_INTERVAL_SECONDS,
+            ),
+            max_retries=_int_env(
+                "SESSION_WRITE_BEHIND_MAX_RETRIES", write_behind.DEFAULT_MAX_RETRIES
+            ),
+        )
+    return _shared_write_behind
+
+
+async def stop_shared_background_tasks() -> None:
+    """共有の書き込み遅延キュー・app状態の書き込み集約・コンパクターを停止する（アプリ終了時）
+
+    未書き込みのイベントと集約中のapp状態差分はFirestoreクライアントを閉じる前に書き込む。
+    """
+    if _shared_write_behind is not None:
+        await _shared_write_behind.stop()
+    if _shared_app_state_coalescer is not None:
+        await _shared_app_state_coalescer.stop()
+    if _shared_compactor is not None:
+        await _shared_compactor.stop()
+
+
+def create_firestore_session_service(*, write_behind: bool = False) -> FirestoreSessionService:
+    """プロセス共有キャッシュ付きのFirestoreSessionServiceを作成する
+
+    アプリのlifespan中は共有Firestoreクライアントを使用する。
+    書き込み遅延キューを使用する場合、楽観的並行性制御は適用しない。
+
+    Args:
+        write_behind: True の場合、SESSION_WRITE_BEHIND 有効時に
+            イベントの書き込み遅延キューを使用する（ライブ音声パス用）
+
+    Returns:
+        FirestoreSessionService: セッションサービスインスタンス
+    """
+    queue = get_shared_write_behind_queue() if write_behind else None
+    return FirestoreSessionService(
+        client=get_shared_firestore_client(),
+        batch_writes=batch_writes_enabled(),
+        session_cache=get_shared_session_cache(),
+        state_cache=get_shared_state_cache(),
+        snapshots=snapshots_enabled(),
+        compactor=get_shared_compactor(),
+        event_layout=get_event_layout(),
+        events_per_page=_int_env("SESSION_EVENTS_PER_PAGE", DEFAULT_EVENTS_PER_PAGE),
+        app_state_shards=get_app_state_shards(),
+        app_state_coalescer=get_shared_app_state_coalescer(),
+        write_behind=queue,
+        optimistic_concurrency=queue is None and optimistic_concurrency_enabled(),
+        max_append_retries=_int_env("SESSION_APPEND_MAX_RETRIES", DEFAULT_MAX_APPEND_RETRIES),
+    )
+
 
 def should_use_managed_session(user_id: str | None) -> bool:
     """ユーザーIDに基づいてマネージドセッションを使用するか判定する
@@ -81,13 +393,27 @@ def create_session_service(user_id: str | None = None) -> BaseSessionService:
         MIGRATION_PERCENTAGE: 移行率（0-100%）
         GCP_PROJECT_ID: GCP プロジェクト ID（オプション）
         GCP_LOCATION: GCP ロケーション（オプション）
+        SESSION_CACHE_*: セッションキャッシュ設定（get_shared_session_cache参照）
+        STATE_CACHE_*: app/user状態キャッシュ設定（get_shared_state_cache参照）
+        SESSION_SNAPSHOTS_ENABLED / SESSION_COMPACT_*: スナップショット設定
+            （get_shared_compactor参照）
+        SESSION_EVENT_LAYOUT / SESSION_EVENTS_PER_PAGE: イベント保存レイアウト
+            （get_event_layout参照）
+        APP_STATE_SHARDS / APP_STATE_COALESCE: app状態のシャーディングと書き込み集約
+            （get_shared_app_state_coalescer参照）
+        SESSION_WRITE_BEHIND: ライブ音声パスの書き込み遅延
+            （get_shared_write_behind_queue参照）
+        SESSION_BATCH_WRITES: append_eventの書き込みのバッチcommit
+            （batch_writes_enabled参照）
+        SESSION_OPTIMISTIC_CONCURRENCY / SESSION_APPEND_MAX_RETRIES: append_eventの
+            楽観的並行性制御（optimistic_concurrency_enabled参照）
 
     Returns:
         BaseSessionService: セッションサービスインスタンス
     """
     if should_use_managed_session(user_id):
         return _create_vertex_ai_session_service()
-    return FirestoreSessionService()
+    return create_firestore_session_service()
 
 
 def _create_vertex_ai_session_service() -> BaseSessionService:
@@ -0,0 +1,124 @@
+"""app_state / user_state のプロセス共有キャッシュ
+
+_merge_state は create/get/list のたびに app_state と user_state を読み取る。
+app_state は全ユーザーで共通のため、プロセス内でキャッシュして読み取りを削減する。
+存在しないドキュメントも空dictとしてキャッシュする（ネガティブキャッシュ）。
+
+自プロセスの書き込みでは該当エントリを無効化し、他プロセスの書き込みは
+TTL経過後に反映される。
+"""
+
+import copy
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+# デフォルト設定
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL_SECONDS = 60.0
+
+StateKey = tuple[str, ...]
+
+
+def app_state_key(app_name: str) -> StateKey:
+    """app_state のキャッシュキー"""
+    return ("app", app_name)
+
+
+def user_state_key(app_name: str, user_id: str) -> StateKey:
+    """user_state のキャッシュキー"""
+    return ("user", app_name, user_id)
+
+
+@dataclass
+class StateCacheStats:
+    """キャッシュの統計情報
+
+    Attributes:
+        hits: キャッシュから返したルックアップ数
+        misses: Firestoreから読み取る必要があったルックアップ数
+        invalidations: 書き込みによる無効化の数
+        evictions: 容量超過またはTTL切れで追い出された数
+    """
+
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+
+
+class StateCache:
+    """app/user スコープ状態の LRU + TTL キャッシュ"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化
+
+        Args:
+            max_entries: 保持する最大エントリ数
+            ttl_seconds: エントリの有効期間（秒）
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[StateKey, tuple[dict[str, Any], float]] = OrderedDict()
+        self.stats = StateCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: StateKey) -> dict[str, Any] | None:
+        """キャッシュから状態を取得する
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            状態dictのコピー（存在しないかTTL切れの場合はNone）
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= self._clock():
+            del self._entries[key]
+            self.stats.evictions += 1
+            entry = None
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return copy.deepcopy(entry[0])
+
+    def put(self, key: StateKey, state: dict[str, Any]) -> None:
+        """状態をキャッシュに格納する
+
+        Args:
+            key: キャッシュキー
+            state: 状態dict（存在しないドキュメントは空dict）
+        """
+        self._entries.pop(key, None)
+        self._entries[key] = (copy.deepcopy(state), self._clock() + self._ttl_seconds)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: StateKey) -> None:
+        """エントリを無効化する
+
+        Args:
+            key: キャッシュキー
+        """
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        """全エントリを削除する"""
+        self._entries.clear()
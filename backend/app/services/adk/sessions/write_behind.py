@@ -0,0 +1,306 @@
+"""イベント永続化の書き込み遅延（write-behind）キュー
+
+ライブ音声パスでは append_event のたびにFirestoreへの書き込みを待つと、
+ADKのイベントループがRPCのレイテンシ分ブロックされる。write-behindモードでは
+append_event の書き込み（イベント、セッション/app/user状態）をセッションごとの
+順序付きキューに積み、バックグラウンドタスクがまとめてバッチcommitする。
+
+- turn_complete のイベントと切断時（flush_events）は即座にフラッシュする
+- セッションあたりの未書き込みイベント数が上限に達すると、append_event は
+  フラッシュの完了を待つ（バックプレッシャー）
+- 一時的なエラーでフラッシュに失敗した書き込みはキューの先頭に戻し、
+  指数バックオフで再試行する（max_retries 回を超えたら破棄する）
+- 再試行しても成功しないエラー（セッション削除後の NotFound など）の書き込みは
+  破棄してログに残し、後続の append_event / get_session を止めない
+  （破棄時は on_drop でセッションサービスに通知し、キャッシュを破棄させる）
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from google.api_core import exceptions as gexc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING_EVENTS = 200
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.5
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.5
+MAX_RETRY_BACKOFF_SECONDS = 30.0
+
+# 再試行しても成功しないエラー（書き込みを破棄する）
+PERMANENT_ERRORS: tuple[type[Exception], ...] = (
+    gexc.NotFound,
+    gexc.FailedPrecondition,
+    gexc.InvalidArgument,
+)
+
+# Firestoreの1バッチあたりの最大書き込み数
+MAX_BATCH_WRITES = 500
+
+CommitFn = Callable[[list[Any]], Awaitable[None]]
+DropFn = Callable[[], None]
+
+
+@dataclass
+class WriteBehindStats:
+    """書き込み遅延キューの統計情報
+
+    Attributes:
+        enqueued: キューに積んだイベント数
+        flushed: 書き込んだイベント数
+        flushes: バッチcommitの回数
+        failures: 失敗したバッチcommitの回数
+        dropped: 再試行できないエラー・再試行回数の超過で破棄したイベント数
+        backpressure_waits: キューが上限に達してフラッシュを待った回数
+        queue_depth: 現在の未書き込みイベント数（commit中を除く、全セッション合計）
+        in_flight: 現在commit中のイベント数
+        max_queue_depth: 未書き込みイベント数の最大値
+        last_flush_seconds: 直近のバッチcommitの所要時間（秒）
+        max_flush_seconds: バッチcommitの最大所要時間（秒）
+        total_flush_seconds: バッチcommitの合計所要時間（秒）
+    """
+
+    enqueued: int = 0
+    flushed: int = 0
+    flushes: int = 0
+    failures: int = 0
+    dropped: int = 0
+    backpressure_waits: int = 0
+    queue_depth: int = 0
+    in_flight: int = 0
+    max_queue_depth: int = 0
+    last_flush_seconds: float = 0.0
+    max_flush_seconds: float = 0.0
+    total_flush_seconds: float = 0.0
+
+    @property
+    def mean_flush_seconds(self) -> float:
+        """バッチcommitの平均所要時間（秒）"""
+        return self.total_flush_seconds / self.flushes if self.flushes else 0.0
+
+
+@dataclass
+class _SessionQueue:
+    """セッションごとの未書き込みイベント（1要素 = 1回のappend_eventの書き込み）
+
+    Attributes:
+        failures: 連続して失敗したバッチcommitの回数
+        retry_at: バックグラウンドフラッシュを再開する時刻（time.monotonic）
+        discarded: discard済み（commit中のバッチは失敗してもキューに戻さない）
+    """
+
+    commit: CommitFn
+    on_drop: DropFn | None = None
+    pending: deque[list[Any]] = field(default_factory=deque)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    failures: int = 0
+    retry_at: float = 0.0
+    discarded: bool = False
+
+
+class WriteBehindQueue:
+    """append_eventの書き込みをセッションごとに順序を保って遅延書き込みする
+
+    最初の書き込みを受け付けた時点で、実行中のイベントループ上で
+    バックグラウンドのフラッシュタスクを開始する。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_pending_events: int = DEFAULT_MAX_PENDING_EVENTS,
+        flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff_seconds: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+    ) -> None:
+        """初期化
+
+        Args:
+            max_pending_events: セッションあたりの未書き込みイベント数の上限
+            flush_interval_seconds: バックグラウンドフラッシュの間隔（秒）
+            max_retries: 一時的なエラーで失敗したバッチを再試行する回数
+            retry_backoff_seconds: 再試行の待ち時間の初期値（失敗ごとに2倍、上限30秒）
+        """
+        self._max_pending_events = max_pending_events
+        self._flush_interval_seconds = flush_interval_seconds
+        self._max_retries = max_retries
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._queues: dict[str, _SessionQueue] = {}
+        self._task: asyncio.Task[None] | None = None
+        self.stats = WriteBehindStats()
+
+    def pending(self, session_id: str) -> int:
+        """セッションの未書き込みイベント数"""
+        queue = self._queues.get(session_id)
+        return len(queue.pending) if queue is not None else 0
+
+    async def enqueue(
+        self,
+        session_id: str,
+        writes: list[Any],
+        commit: CommitFn,
+        *,
+        on_drop: DropFn | None = None,
+    ) -> None:
+        """1イベント分の書き込みをキューに積む
+
+        キューが上限に達している場合は、フラッシュが完了するまで待つ。
+
+        Args:
+            session_id: セッションID
+            writes: 書き込みのリスト（順序を保持して1バッチに含める）
+            commit: 書き込みのリストをバッチcommitする関数
+            on_drop: バッチを破棄したときに呼び出す関数（キャッシュの破棄など）
+        """
+        if self.pending(session_id) >= self._max_pending_events:
+            self.stats.backpressure_waits += 1
+            await self.flush(session_id)
+
+        queue = self._queues.setdefault(session_id, _SessionQueue(commit, on_drop))
+        queue.pending.append(writes)
+        self.stats.enqueued += 1
+        self.stats.queue_depth += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.stats.queue_depth)
+        self._ensure_started()
+
+    async def flush(self, session_id: str) -> int:
+        """セッションの未書き込みイベントをすべて書き込む
+
+        再試行しても成功しないエラー、または再試行回数を超えたバッチは破棄して続ける。
+
+        Args:
+            session_id: セッションID
+
+        Returns:
+            書き込んだイベント数
+
+        Raises:
+            Exception: 一時的なエラーでcommitに失敗した場合（書き込みはキューに残る）
+        """
+        queue = self._queues.get(session_id)
+        if queue is None:
+            return 0
+
+        flushed = 0
+        async with queue.lock:
+            while queue.pending:
+                batch = self._take_batch(queue)
+                start = time.perf_counter()
+                try:
+                    await queue.commit([write for writes in batch for write in writes])
+                except Exception as e:
+                    self.stats.failures += 1
+                    self.stats.in_flight -= len(batch)
+                    if self._should_retry(queue, e):
+                        queue.pending.extendleft(reversed(batch))
+                        self.stats.queue_depth += len(batch)
+                        raise
+                    self._drop(session_id, queue, batch, e)
+                    continue
+                queue.failures = 0
+                self._record_flush(len(batch), time.perf_counter() - start)
+                flushed += len(batch)
+
+        if not queue.pending and self._queues.get(session_id) is queue:
+            del self._queues[session_id]
+        return flushed
+
+    async def flush_all(self, *, backoff: bool = True) -> int:
+        """全セッションの未書き込みイベントを書き込む
+
+        Args:
+            backoff: True の場合、一時的なエラーで失敗したセッションは
+                バックオフの待ち時間が過ぎるまで書き込まない
+
+        Returns:
+            書き込んだイベント数
+        """
+        flushed = 0
+        now = time.monotonic()
+        for session_id, queue in list(self._queues.items()):
+            if backoff and queue.retry_at > now:
+                continue
+            try:
+                flushed += await self.flush(session_id)
+            except Exception:
+                logger.exception("Failed to flush pending events for session %s", session_id)
+        return flushed
+
+    def discard(self, session_id: str) -> None:
+        """セッションの未書き込みイベントを破棄する（セッション削除時）"""
+        queue = self._queues.pop(session_id, None)
+        if queue is not None:
+            # commit中のバッチは in_flight で数え、完了・失敗時に減らす
+            queue.discarded = True
+            self.stats.queue_depth -= len(queue.pending)
+            queue.pending.clear()
+
+    async def stop(self) -> None:
+        """バックグラウンドタスクを停止し、残りのイベントを書き込む"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush_all(backoff=False)
+
+    def _take_batch(self, queue: _SessionQueue) -> list[list[Any]]:
+        """1バッチの書き込み数上限に収まるだけ先頭から取り出す（最低1イベント）"""
+        batch: list[list[Any]] = []
+        num_writes = 0
+        while queue.pending:
+            size = len(queue.pending[0])
+            if batch and num_writes + size > MAX_BATCH_WRITES:
+                break
+            batch.append(queue.pending.popleft())
+            num_writes += size
+        self.stats.queue_depth -= len(batch)
+        self.stats.in_flight += len(batch)
+        return batch
+
+    def _should_retry(self, queue: _SessionQueue, error: Exception) -> bool:
+        """失敗したバッチをキューに戻すか（戻す場合は次の再試行時刻を設定）"""
+        if queue.discarded or isinstance(error, PERMANENT_ERRORS):
+            return False
+        queue.failures += 1
+        if queue.failures > self._max_retries:
+            return False
+        backoff = self._retry_backoff_seconds * 2 ** (queue.failures - 1)
+        queue.retry_at = time.monotonic() + min(backoff, MAX_RETRY_BACKOFF_SECONDS)
+        return True
+
+    def _drop(
+        self, session_id: str, queue: _SessionQueue, batch: list[list[Any]], error: Exception
+    ) -> None:
+        """再試行しないバッチを破棄する"""
+        queue.failures = 0
+        if queue.discarded:
+            return
+        self.stats.dropped += len(batch)
+        logger.error("Dropped %d pending events for session %s: %s", len(batch), session_id, error)
+        if queue.on_drop is not None:
+            queue.on_drop()
+
+    def _record_flush(self, num_events: int, seconds: float) -> None:
+        self.stats.flushes += 1
+        self.stats.flushed += num_events
+        self.stats.in_flight -= num_events
+        self.stats.last_flush_seconds = seconds
+        self.stats.max_flush_seconds = max(self.stats.max_flush_seconds, seconds)
+        self.stats.total_flush_seconds += seconds
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_seconds)
+            await self.flush_all()
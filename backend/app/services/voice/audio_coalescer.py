@@ -0,0 +1,199 @@
+"""受信音声のコアレッシング（ジッタバッファ）
+
+ブラウザは数ミリ秒単位の小さなチャンクで音声を送ってくるため、そのまま
+LiveRequestQueue に送るとチャンクごとに types.Blob の作成とLive APIへの送信が発生する。
+AudioCoalescer は 16-bit PCM を固定長（20〜100ms）のフレームにまとめて送る。
+
+- フレーム長に達したら即座に送る（複数フレーム分たまっていれば順に送る）
+- 入力が途切れた場合は、最も古いバイトの到着から max_delay_ms 経過した時点で
+  フレーム長に満たない分も送る（発話末尾の遅延を抑える）
+- close 時は残りをすべて送る
+- サンプルの途中で分割しないよう、送るバイト数は常にサンプル境界に揃える
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# 入力音声の形式（PCM 16-bit 16kHz モノラル）
+INPUT_SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+MIN_FRAME_MS = 20
+MAX_FRAME_MS = 100
+DEFAULT_FRAME_MS = 40
+DEFAULT_MAX_DELAY_MS = 60
+
+
+@dataclass
+class AudioCoalescerStats:
+    """コアレッシングの統計情報
+
+    Attributes:
+        chunks_in: 受信したチャンク数
+        bytes_in: 受信したバイト数
+        frames_out: 送信したフレーム数
+        bytes_out: 送信したバイト数
+        deadline_flushes: max_delay_ms 経過でフレーム長に満たないまま送った回数
+        total_latency: 各フレームの最も古いバイトの到着から送信までの時間の合計（秒）
+        max_latency: 同上の最大値（秒）
+    """
+
+    chunks_in: int = 0
+    bytes_in: int = 0
+    frames_out: int = 0
+    bytes_out: int = 0
+    deadline_flushes: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def mean_frame_bytes(self) -> float:
+        """送信したフレームの平均バイト数"""
+        return self.bytes_out / self.frames_out if self.frames_out else 0.0
+
+    @property
+    def mean_latency_ms(self) -> float:
+        """フレームあたりの平均バッファリング遅延（ミリ秒）"""
+        return self.total_latency / self.frames_out * 1000 if self.frames_out else 0.0
+
+
+class AudioCoalescer:
+    """PCMチャンクを固定長フレームにまとめて sink に渡す"""
+
+    def __init__(
+        self,
+        sink: Callable[[bytes], None],
+        frame_ms: int = DEFAULT_FRAME_MS,
+        max_delay_ms: int = DEFAULT_MAX_DELAY_MS,
+        sample_rate: int = INPUT_SAMPLE_RATE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """初期化
+
+        Args:
+            sink: まとめたフレームを受け取る関数
+            frame_ms: フレーム長（20〜100ミリ秒）
+            max_delay_ms: フレーム長に満たない音声を保持する最大時間（ミリ秒）
+            sample_rate: 入力のサンプリングレート
+            clock: 現在時刻（秒）を返す関数（テスト用）
+
+        Raises:
+            ValueError: frame_ms が範囲外、または max_delay_ms が0以下の場合
+        """
+        if not MIN_FRAME_MS <= frame_ms <= MAX_FRAME_MS:
+            raise ValueError(
+                f"frame_ms must be between {MIN_FRAME_MS} and {MAX_FRAME_MS}: {frame_ms}"
+            )
+        if max_delay_ms <= 0:
+            raise ValueError(f"max_delay_ms must be positive: {max_delay_ms}")
+        self._sink = sink
+        self._frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self._max_delay = max_delay_ms / 1000
+        self._clock = clock
+        self._buffer = bytearray()
+        # (受信済みバイト数の累計, 到着時刻)。先頭が未送信の最も古いチャンク
+        self._arrivals: deque[tuple[int, float]] = deque()
+        self._received = 0
+        self._sent = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self.stats = AudioCoalescerStats()
+
+    @property
+    def frame_bytes(self) -> int:
+        """1フレームのバイト数"""
+        return self._frame_bytes
+
+    @property
+    def buffered_bytes(self) -> int:
+        """未送信のバイト数"""
+        return len(self._buffer)
+
+    def push(self, data: bytes) -> None:
+        """PCMチャンクを追加し、フレーム長に達した分を送る"""
+        if not data:
+            return
+        now = self._clock()
+        self._buffer.extend(data)
+        self._received += len(data)
+        self._arrivals.append((self._received, now))
+        self.stats.chunks_in += 1
+        self.stats.bytes_in += len(data)
+
+        while len(self._buffer) >= self._frame_bytes:
+            self._emit(self._frame_bytes, now)
+        self._schedule_deadline()
+
+    def flush_expired(self) -> bool:
+        """最も古いバイトが max_delay_ms を超えていれば残りを送る
+
+        Returns:
+            送った場合はTrue
+        """
+        if len(self._buffer) < SAMPLE_WIDTH:
+            return False
+        now = self._clock()
+        if now - self._arrivals[0][1] < self._max_delay:
+            return False
+        self._flush(now)
+        self.stats.deadline_flushes += 1
+        self._schedule_deadline()
+        return True
+
+    def close(self) -> None:
+        """残りの音声をすべて送り、タイマーを止める"""
+        self._cancel_timer()
+        self._flush(self._clock())
+
+    def _flush(self, now: float) -> bool:
+        size = len(self._buffer) - len(self._buffer) % SAMPLE_WIDTH
+        if size == 0:
+            return False
+        self._emit(size, now)
+        return True
+
+    def _emit(self, size: int, now: float) -> None:
+        frame = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        latency = now - self._arrivals[0][1]
+        self._sent += size
+        while self._arrivals and self._arrivals[0][0] <= self._sent:
+            self._arrivals.popleft()
+
+        self.stats.frames_out += 1
+        self.stats.bytes_out += size
+        self.stats.total_latency += latency
+        self.stats.max_latency = max(self.stats.max_latency, latency)
+        self._sink(frame)
+
+    def _schedule_deadline(self) -> None:
+        """未送信の音声があれば max_delay_ms 後の送信を予約する"""
+        self._cancel_timer()
+        if len(self._buffer) < SAMPLE_WIDTH:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # イベントループ外（同期的な呼び出し）では flush_expired / close に任せる
+            return
+        delay = max(0.0, self._arrivals[0][1] + self._max_delay - self._clock())
+        self._timer = loop.call_later(delay, self._on_deadline)
+
+    def _on_deadline(self) -> None:
+        self._timer = None
+        try:
+            # タイマーがわずかに早く発火した場合は予約し直す
+            if not self.flush_expired():
+                self._schedule_deadline()
+        except Exception:
+            logger.exception("Failed to flush coalesced audio")
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
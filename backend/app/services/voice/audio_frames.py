@@ -0,0 +1,107 @@
+"""送信音声のバイナリWebSocketフレーム
+
+JSONモードでは音声チャンクをbase64文字列にしてADKEventMessageに入れるため、
+帯域が約33%増え、エンコード・バリデーション・JSON化のCPUもかかる。
+バイナリモードでは音声チャンクを小さなヘッダー付きの生のPCMとして送り、
+制御イベントやトランスクリプトのみJSONで送る。
+
+フレーム形式（リトルエンディアン、ヘッダー8バイト）:
+
+    | version (u8) | kind (u8) | sample_rate (u16, Hz) | seq (u32) | payload ... |
+
+- version: フレーム形式のバージョン（AUDIO_FRAME_VERSION）
+- kind: ペイロードの種類（AUDIO_KIND_PCM16: 16-bit リニアPCM、モノラル）
+- sample_rate: サンプリングレート（Hz）
+- seq: 接続ごとの連番（2**32 で0に戻る）
+"""
+
+import struct
+from dataclasses import dataclass
+
+AUDIO_FRAME_VERSION = 1
+
+# ペイロードの種類
+AUDIO_KIND_PCM16 = 1
+
+AUDIO_FRAME_HEADER = struct.Struct("<BBHI")
+
+# mime_type にレートがない場合のサンプリングレート（Live APIの出力音声）
+DEFAULT_OUTPUT_SAMPLE_RATE = 24000
+
+_PCM_MIME_TYPE = "audio/pcm"
+_SEQ_MODULO = 2**32
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    """エージェントからの音声チャンク（バイナリフレームで送信する）
+
+    Attributes:
+        data: 16-bit リニアPCM
+        sample_rate: サンプリングレート（Hz）
+    """
+
+    data: bytes
+    sample_rate: int = DEFAULT_OUTPUT_SAMPLE_RATE
+
+
+@dataclass(frozen=True)
+class AudioFrameHeader:
+    """デコードしたフレームのヘッダー"""
+
+    version: int
+    kind: int
+    sample_rate: int
+    seq: int
+
+
+def pcm_sample_rate(mime_type: str | None) -> int | None:
+    """PCMの mime_type からサンプリングレートを取得する
+
+    Args:
+        mime_type: "audio/pcm" または "audio/pcm;rate=24000" 形式の mime_type
+
+    Returns:
+        サンプリングレート（PCMでない、またはレートが不正な場合はNone）
+    """
+    if not mime_type:
+        return DEFAULT_OUTPUT_SAMPLE_RATE
+    media_type, *params = (value.strip() for value in mime_type.split(";"))
+    if media_type.lower() != _PCM_MIME_TYPE:
+        return None
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "rate":
+            rate = int(value) if value.strip().isdigit() else 0
+            return rate if 0 < rate <= 0xFFFF else None
+    return DEFAULT_OUTPUT_SAMPLE_RATE
+
+
+class AudioFrameEncoder:
+    """音声チャンクを連番付きのバイナリフレームに変換する（接続ごとに1つ）"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        self._seq = 0
+
+    def encode(self, chunk: AudioChunk) -> bytes:
+        """音声チャンクをヘッダー付きのフレームに変換する"""
+        header = AUDIO_FRAME_HEADER.pack(
+            AUDIO_FRAME_VERSION, AUDIO_KIND_PCM16, chunk.sample_rate, self._seq
+        )
+        self._seq = (self._seq + 1) % _SEQ_MODULO
+        return header + chunk.data
+
+
+def decode_audio_frame(frame: bytes) -> tuple[AudioFrameHeader, bytes]:
+    """バイナリフレームをヘッダーとペイロードに分ける
+
+    Raises:
+        ValueError: ヘッダーより短い、またはバージョンが異なる場合
+    """
+    if len(frame) < AUDIO_FRAME_HEADER.size:
+        raise ValueError(f"audio frame too short: {len(frame)} bytes")
+    header = AudioFrameHeader(*AUDIO_FRAME_HEADER.unpack_from(frame))
+    if header.version != AUDIO_FRAME_VERSION:
+        raise ValueError(f"unsupported audio frame version: {header.version}")
+    return header, frame[AUDIO_FRAME_HEADER.size :]
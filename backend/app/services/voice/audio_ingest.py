@@ -0,0 +1,256 @@
+"""受信音声のフォーマット変換・リサンプリング（インジェスト）
+
+Live API への入力は PCM 16-bit 16kHz モノラルだが、ブラウザの AudioContext は
+44.1kHz / 48kHz の Float32 を出力するため、これまでクライアント（低スペックの
+タブレットを含む）側で変換していた。AudioIngest はサーバー側で
+Float32 / Int16、44.1kHz / 48kHz など、モノラル / ステレオ の音声を 16kHz Int16 モノラルに変換する。
+
+- リサンプリングは有理数比 up/down のポリフェーズFIR（カイザー窓付きsinc）。
+  出力1サンプルごとに、位相に対応する係数行と入力の窓の内積をNumPyでまとめて計算する
+- 入力の履歴・窓の抽出・係数・出力は事前に確保したバッファを再利用し、
+  フレームごとのメモリ確保を避ける（より大きなフレームが来た場合のみ拡張する）
+- フィルタの片側の長さ分（1ms未満）だけ出力が遅れる
+"""
+
+from dataclasses import dataclass
+from math import gcd
+from typing import Literal
+
+import numpy as np
+import numpy.typing as npt
+
+from app.services.voice.audio_coalescer import INPUT_SAMPLE_RATE
+
+AudioEncoding = Literal["s16le", "f32le"]
+
+SUPPORTED_ENCODINGS: tuple[AudioEncoding, ...] = ("s16le", "f32le")
+SUPPORTED_SAMPLE_RATES = (16000, 24000, 32000, 44100, 48000)
+SUPPORTED_CHANNELS = (1, 2)
+
+# sincの片側のゼロ交差数（大きいほど急峻だが重い）
+DEFAULT_ZERO_CROSSINGS = 8
+# カットオフ周波数（出力のナイキスト周波数に対する比）
+DEFAULT_ROLLOFF = 0.92
+DEFAULT_KAISER_BETA = 8.0
+
+# 初期に確保する入力フレームの長さ（ミリ秒）
+_INITIAL_FRAME_MS = 100
+
+_SAMPLE_WIDTHS: dict[AudioEncoding, int] = {"s16le": 2, "f32le": 4}
+_DTYPES: dict[AudioEncoding, str] = {"s16le": "<i2", "f32le": "<f4"}
+_INT16_SCALE = 32768.0
+
+
+@dataclass(frozen=True)
+class AudioInputFormat:
+    """クライアントが送る音声の形式
+
+    Attributes:
+        encoding: "s16le"（Int16）または "f32le"（Float32、-1.0〜1.0）
+        sample_rate: サンプリングレート（Hz）
+        channels: チャンネル数（1 または 2。ステレオはインターリーブ）
+
+    Raises:
+        ValueError: サポートしていない形式の場合
+    """
+
+    encoding: AudioEncoding = "s16le"
+    sample_rate: int = INPUT_SAMPLE_RATE
+    channels: int = 1
+
+    def __post_init__(self) -> None:
+        if self.encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"unsupported audio encoding: {self.encoding}")
+        if self.sample_rate not in SUPPORTED_SAMPLE_RATES:
+            raise ValueError(f"unsupported sample rate: {self.sample_rate}")
+        if self.channels not in SUPPORTED_CHANNELS:
+            raise ValueError(f"unsupported channel count: {self.channels}")
+
+    @property
+    def frame_size(self) -> int:
+        """1サンプル（全チャンネル）のバイト数"""
+        return _SAMPLE_WIDTHS[self.encoding] * self.channels
+
+    @property
+    def is_native(self) -> bool:
+        """変換不要（PCM 16-bit 16kHz モノラル）か"""
+        return self == AudioInputFormat()
+
+
+def design_polyphase_filter(
+    up: int,
+    down: int,
+    zero_crossings: int = DEFAULT_ZERO_CROSSINGS,
+    rolloff: float = DEFAULT_ROLLOFF,
+    beta: float = DEFAULT_KAISER_BETA,
+) -> tuple[int, npt.NDArray[np.float32]]:
+    """ポリフェーズFIRの係数表を作成する
+
+    出力 n は入力の時刻 t = n * down / up に対応する。位相 p = (n * down) % up の行の
+    j 番目の係数を、入力 floor(t) - half + 1 + j に掛ける。
+
+    Args:
+        up: アップサンプリング比
+        down: ダウンサンプリング比
+        zero_crossings: sincの片側のゼロ交差数
+        rolloff: カットオフ周波数（低い方のナイキスト周波数に対する比）
+        beta: カイザー窓のβ
+
+    Returns:
+        (half, (up, 2 * half) の係数表)。各行の和は1（直流ゲイン1）
+    """
+    if up == down:
+        table = np.zeros((1, 2), dtype=np.float32)
+        table[0, 0] = 1.0
+        return 1, table
+    cutoff = rolloff * min(1.0, up / down)
+    half = int(np.ceil(zero_crossings / cutoff))
+    # t - i（入力サンプル単位の時間差）
+    offsets = np.arange(up)[:, None] / up + (half - 1 - np.arange(2 * half))[None, :]
+    window = np.i0(beta * np.sqrt(np.clip(1.0 - (offsets / half) ** 2, 0.0, None))) / np.i0(beta)
+    kernel = cutoff * np.sinc(cutoff * offsets) * window
+    kernel /= kernel.sum(axis=1, keepdims=True)
+    return half, kernel.astype(np.float32)
+
+
+class AudioIngest:
+    """クライアントの音声を 16kHz Int16 モノラルに変換する（接続ごとに1つ）"""
+
+    def __init__(self, input_format: AudioInputFormat) -> None:
+        """初期化
+
+        Args:
+            input_format: クライアントが送る音声の形式
+        """
+        self._format = input_format
+        self._dtype = np.dtype(_DTYPES[input_format.encoding])
+        scale = 1.0 if input_format.encoding == "f32le" else 1.0 / _INT16_SCALE
+        self._scale = scale / input_format.channels
+        ratio = gcd(INPUT_SAMPLE_RATE, input_format.sample_rate)
+        self._up = INPUT_SAMPLE_RATE // ratio
+        self._down = input_format.sample_rate // ratio
+        self._half, self._table = design_polyphase_filter(self._up, self._down)
+        self._taps = self._table.shape[1]
+
+        # サンプル境界に満たない端数のバイト
+        self._pending = b""
+        # buf[0] の入力サンプルの通し番号（最初の出力のために half - 1 個のゼロを前に置く）
+        self._offset = -(self._half - 1)
+        self._filled = self._half - 1
+        self._next_out = 0
+        self._capacity = 0
+        self._buffer: npt.NDArray[np.float32] = np.zeros(0, dtype=np.float32)
+        self._spare = self._buffer
+        self._allocate(input_format.sample_rate * _INITIAL_FRAME_MS // 1000)
+
+    @property
+    def input_format(self) -> AudioInputFormat:
+        """入力の形式"""
+        return self._format
+
+    def _allocate(self, frames: int) -> None:
+        """frames サンプルの入力を変換できるようにバッファを確保する"""
+        capacity = self._filled + frames + self._taps
+        if capacity <= self._capacity:
+            return
+        capacity = max(capacity, 2 * self._capacity)
+        max_out = capacity * self._up // self._down + 2
+
+        # 入力の履歴（ピンポンで使い、詰め直し時のメモリの重なりを避ける）
+        buffers = [np.zeros(capacity, dtype=np.float32) for _ in range(2)]
+        # 初回は履歴がゼロのため、確保したゼロのバッファをそのまま使う
+        if len(self._buffer):
+            buffers[0][: self._filled] = self._buffer[: self._filled]
+        self._buffer, self._spare = buffers
+
+        positions = np.arange(self._up + max_out)
+        self._rel_base = (positions * self._down) // self._up
+        self._phase = (positions * self._down) % self._up
+        self._index = np.empty(max_out, dtype=np.intp)
+        self._rows = np.empty((max_out, self._taps), dtype=np.float32)
+        self._coef = np.empty((max_out, self._taps), dtype=np.float32)
+        self._out = np.empty(max_out, dtype=np.float32)
+        self._pcm = np.empty(max_out, dtype="<i2")
+        self._capacity = capacity
+
+    def convert(self, data: bytes) -> bytes:
+        """音声チャンクを 16kHz Int16 モノラルのPCMに変換する
+
+        Args:
+            data: input_format の音声チャンク（サンプルの途中で分割されていてもよい）
+
+        Returns:
+            変換後のPCM（フィルタの遅延分がたまるまでは空の場合がある）
+        """
+        if self._format.is_native:
+            return data
+        if self._pending:
+            data = self._pending + data
+        frame_size = self._format.frame_size
+        frames = len(data) // frame_size
+        self._pending = data[frames * frame_size :]
+        if frames == 0:
+            return b""
+
+        self._allocate(frames)
+        self._decode(data, frames)
+        return self._resample()
+
+    def _decode(self, data: bytes, frames: int) -> None:
+        """入力をfloat32モノラルにして履歴の末尾に書き込む"""
+        dest = self._buffer[self._filled : self._filled + frames]
+        samples = np.frombuffer(data, dtype=self._dtype, count=frames * self._format.channels)
+        if self._format.channels == 2:
+            stereo = samples.reshape(frames, 2)
+            np.add(stereo[:, 0], stereo[:, 1], out=dest, dtype=np.float32)
+        else:
+            np.copyto(dest, samples, casting="unsafe")
+        np.multiply(dest, self._scale, out=dest)
+        self._filled += frames
+
+    def _resample(self) -> bytes:
+        """履歴から計算できる出力をすべて計算する"""
+        # 出力 n には入力 base(n) + half までが必要
+        limit = self._offset + self._filled - 1 - self._half
+        last = ((limit + 1) * self._up - 1) // self._down
+        count = max(0, last - self._next_out + 1)
+        if count == 0:
+            return b""
+
+        block, start = divmod(self._next_out, self._up)
+        index = self._index[:count]
+        np.add(
+            self._rel_base[start : start + count],
+            block * self._down - self._half + 1 - self._offset,
+            out=index,
+        )
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer[: self._filled], self._taps)
+        rows = np.take(windows, index, axis=0, out=self._rows[:count], mode="clip")
+        coef = np.take(
+            self._table,
+            self._phase[start : start + count],
+            axis=0,
+            out=self._coef[:count],
+            mode="clip",
+        )
+        out = np.einsum("ij,ij->i", rows, coef, out=self._out[:count])
+
+        np.clip(out, -1.0, 1.0, out=out)
+        np.multiply(out, _INT16_SCALE - 1, out=out)
+        np.rint(out, out=out)
+        pcm = self._pcm[:count]
+        np.copyto(pcm, out, casting="unsafe")
+
+        self._next_out += count
+        self._discard()
+        return pcm.tobytes()
+
+    def _discard(self) -> None:
+        """次の出力に不要になった入力を捨てる"""
+        first_needed = (self._next_out * self._down) // self._up - self._half + 1
+        start = min(first_needed - self._offset, self._filled)
+        keep = self._filled - start
+        self._spare[:keep] = self._buffer[start : self._filled]
+        self._buffer, self._spare = self._spare, self._buffer
+        self._offset += start
+        self._filled = keep
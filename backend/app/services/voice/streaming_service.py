@@ -25,6 +25,14 @@ from app.schemas.voice_stream import (
 )
 from app.services.adk.agents.router import create_router_agent
 from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.voice.audio_coalescer import DEFAULT_MAX_DELAY_MS, AudioCoalescer
+from app.services.voice.audio_frames import AudioChunk, pcm_sample_rate
+from app.services.voice.audio_ingest import AudioIngest, AudioInputFormat
+from app.services.voice.vad import (
+    DEFAULT_ENERGY_THRESHOLD_DB,
+    DEFAULT_HANGOVER_MS,
+    VoiceActivityDetector,
+)
 
 if TYPE_CHECKING:
     from google.adk.events import Event
@@ -40,6 +48,23 @@ LIVE_MODEL = "gemini-live-2.5-flash-native-audio"
 DEFAULT_APP_NAME = "homework-coach"
 
 
+def _env_flag(name: str) -> bool:
+    """環境変数が "true" か"""
+    return os.environ.get(name, "false").strip().lower() == "true"
+
+
+def _int_env(name: str, default: int) -> int:
+    """整数の環境変数を読み取る（不正値はデフォルト）"""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Invalid %s: %s", name, value)
+        return default
+
+
 class VoiceStreamingService:
     """音声ストリーミングサービス
 
@@ -58,6 +83,11 @@ class VoiceStreamingService:
         project_id: str | None = None,
         location: str | None = None,
         agent_engine_id: str | None = None,
+        binary_audio: bool = False,
+        audio_frame_ms: int | None = None,
+        audio_max_delay_ms: int | None = None,
+        vad: VoiceActivityDetector | None = None,
+        input_format: AudioInputFormat | None = None,
     ) -> None:
         """初期化
 
@@ -69,6 +99,16 @@ class VoiceStreamingService:
             project_id: Google Cloud プロジェクトID（Agent Engine用）
             location: リージョン（Agent Engine用）
             agent_engine_id: Agent Engine ID
+            binary_audio: 音声チャンクをbase64のJSONではなくAudioChunkとして返すか
+                （WebSocketのバイナリフレームで送信する場合）
+            audio_frame_ms: 受信音声をまとめるフレーム長（20〜100ミリ秒、0でまとめない。
+                Noneの場合は環境変数 VOICE_AUDIO_FRAME_MS）
+            audio_max_delay_ms: フレーム長に満たない受信音声を保持する最大時間
+                （Noneの場合は環境変数 VOICE_AUDIO_MAX_DELAY_MS）
+            vad: 無音を間引く音声区間検出（Noneの場合、環境変数 VOICE_VAD が "true" なら
+                VOICE_VAD_THRESHOLD_DB / VOICE_VAD_HANGOVER_MS / VOICE_VAD_KEEPALIVE_MS で作成）
+            input_format: クライアントが送る音声の形式（Noneまたは16kHz Int16 モノラルの場合は
+                変換しない。それ以外は 16kHz Int16 モノラルに変換してから送信する）
         """
         # Phase 2 Router Agent統合
         self._agent = create_router_agent(model=LIVE_MODEL)
@@ -88,6 +128,8 @@ class VoiceStreamingService:
             # 既存のFirestoreベース（後方互換）
             self._session_service = FirestoreSessionService()
 
+        self._binary_audio = binary_audio
+
         # メモリサービス（後でMemory Bank統合）
         self._memory_service = memory_service
 
@@ -103,12 +145,76 @@ class VoiceStreamingService:
             response_modalities=["AUDIO"],
         )
 
+        # 受信音声の形式変換・リサンプリング
+        self._ingest = (
+            AudioIngest(input_format)
+            if input_format is not None and not input_format.is_native
+            else None
+        )
+
+        # 受信音声のコアレッシング（小さなチャンクを固定長フレームにまとめる）
+        if audio_frame_ms is None:
+            audio_frame_ms = _int_env("VOICE_AUDIO_FRAME_MS", 0)
+        if audio_max_delay_ms is None:
+            audio_max_delay_ms = _int_env("VOICE_AUDIO_MAX_DELAY_MS", DEFAULT_MAX_DELAY_MS)
+        self._coalescer = (
+            AudioCoalescer(
+                self._send_audio_frame,
+                frame_ms=audio_frame_ms,
+                max_delay_ms=audio_max_delay_ms,
+            )
+            if audio_frame_ms > 0
+            else None
+        )
+
+        # 音声区間検出（コアレッシング後のフレームを判定する）
+        if vad is None and _env_flag("VOICE_VAD"):
+            vad = VoiceActivityDetector(
+                energy_threshold_db=_int_env(
+                    "VOICE_VAD_THRESHOLD_DB", int(DEFAULT_ENERGY_THRESHOLD_DB)
+                ),
+                hangover_ms=_int_env("VOICE_VAD_HANGOVER_MS", DEFAULT_HANGOVER_MS),
+                keepalive_ms=_int_env("VOICE_VAD_KEEPALIVE_MS", 0),
+            )
+        self._vad = vad
+
+    @property
+    def audio_coalescer(self) -> AudioCoalescer | None:
+        """受信音声のコアレッシング（無効の場合はNone。統計は .stats）"""
+        return self._coalescer
+
+    @property
+    def vad(self) -> VoiceActivityDetector | None:
+        """音声区間検出（無効の場合はNone。統計は .stats）"""
+        return self._vad
+
     def send_audio(self, data: bytes) -> None:
         """音声データをGemini Live APIに送信する
 
+        input_format を指定した場合は 16kHz Int16 モノラルに変換する。
+        コアレッシングが有効な場合は固定長のフレームにまとめてから送信する。
+        音声区間検出が有効な場合、無音のフレームは送信しない。
+
         Args:
-            data: PCM 16-bit 16kHz 音声バイナリデータ
+            data: PCM 16-bit 16kHz 音声バイナリデータ（input_format 指定時はその形式）
         """
+        if self._ingest is not None:
+            data = self._ingest.convert(data)
+            if not data:
+                return
+        if self._coalescer is not None:
+            self._coalescer.push(data)
+        else:
+            self._send_audio_frame(data)
+
+    def _send_audio_frame(self, data: bytes) -> None:
+        if self._vad is None:
+            self._send_blob(data)
+            return
+        for chunk in self._vad.process(data):
+            self._send_blob(chunk)
+
+    def _send_blob(self, data: bytes) -> None:
         blob = types.Blob(mime_type="audio/pcm", data=data)
         self._queue.send_realtime(blob)
 
@@ -128,7 +234,7 @@ class VoiceStreamingService:
         self,
         user_id: str,
         session_id: str,
-    ) -> AsyncIterator[ADKEventMessage]:
+    ) -> AsyncIterator[ADKEventMessage | AudioChunk]:
         """Gemini Live APIからイベントを受信する
 
         Args:
@@ -137,22 +243,34 @@ class VoiceStreamingService:
 
         Yields:
             ADKEventMessage: フロントエンド互換のイベントメッセージ
+            AudioChunk: PCM音声チャンク（binary_audio の場合のみ、同じイベントの
+                ADKEventMessage より先にyieldする）
         """
+        audio_chunks: list[AudioChunk] | None = [] if self._binary_audio else None
         async for event in self._runner.run_live(
             user_id=user_id,
             session_id=session_id,
             live_request_queue=self._queue,
             run_config=self._run_config,
         ):
-            message = self._convert_event_to_message(event)
+            message = self._convert_event_to_message(event, audio_chunks)
+            if audio_chunks:
+                for chunk in audio_chunks:
+                    yield chunk
+                audio_chunks.clear()
             if message is not None:
                 yield message
 
-    def _convert_event_to_message(self, event: "Event") -> ADKEventMessage | None:
+    def _convert_event_to_message(
+        self,
+        event: "Event",
+        audio_chunks: list[AudioChunk] | None = None,
+    ) -> ADKEventMessage | None:
         """ADK EventをフロントエンドのADKEventMessage形式に変換する
 
         Args:
             event: ADK Event
+            audio_chunks: 指定した場合、PCM音声はbase64にせずこのリストに追加する
 
         Returns:
             ADKEventMessage（変換不要なイベントはNone）
@@ -191,6 +309,11 @@ class VoiceStreamingService:
             parts: list[ADKContentPart] = []
             for part in event.content.parts:
                 if part.inline_data and part.inline_data.data:
+                    if audio_chunks is not None:
+                        rate = pcm_sample_rate(part.inline_data.mime_type)
+                        if rate is not None:
+                            audio_chunks.append(AudioChunk(part.inline_data.data, rate))
+                            continue
                     b64_data = base64.b64encode(part.inline_data.data).decode("utf-8")
                     parts.append(
                         ADKContentPart(
@@ -246,5 +369,27 @@ class VoiceStreamingService:
         return ADKEventMessage(**kwargs)  # type: ignore[arg-type]
 
     def close(self) -> None:
-        """ストリーミングをクローズする"""
+        """ストリーミングをクローズする（まとめ中の受信音声は送信してから閉じる）"""
+        if self._coalescer is not None:
+            self._coalescer.close()
+            stats = self._coalescer.stats
+            logger.info(
+                "Audio coalescing: %d chunks -> %d frames (mean %.0f bytes, "
+                "latency mean %.1fms max %.1fms, %d deadline flushes)",
+                stats.chunks_in,
+                stats.frames_out,
+                stats.mean_frame_bytes,
+                stats.mean_latency_ms,
+                stats.max_latency * 1000,
+                stats.deadline_flushes,
+            )
+        if self._vad is not None:
+            vad_stats = self._vad.stats
+            logger.info(
+                "VAD: %d/%d chunks sent (%d bytes suppressed, %d speech onsets)",
+                vad_stats.chunks_out,
+                vad_stats.chunks_in,
+                vad_stats.bytes_in - vad_stats.bytes_out,
+                vad_stats.speech_onsets,
+            )
         self._queue.close()  # type: ignore[no-untyped-call]
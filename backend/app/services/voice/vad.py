@@ -0,0 +1,196 @@
+"""受信音声の音声区間検出（VAD）
+
+子どもは考えている間もマイクを開いたままにすることが多く、無音も含めて
+Gemini Live に送り続けると帯域・モデルのコスト・誤ったターン検出が増える。
+VoiceActivityDetector は 16-bit PCM を短い窓に分け、NumPyでまとめて
+エネルギー（dBFS）とゼロ交差率を計算し、無音のチャンクを間引く。
+
+- 窓のエネルギーが energy_threshold_db 以上なら発話
+- エネルギーが fricative_margin_db だけ低くても、ゼロ交差率が高ければ発話
+  （「さ」「し」などの無声摩擦音の取りこぼしを防ぐ）
+- 発話が始まったら直前 pre_roll_ms 分の無音チャンクも送る（語頭の欠落を防ぐ）
+- 発話が終わっても hangover_ms の間は送り続ける（語尾の欠落を防ぎ、
+  Live API側の発話終了検出に必要な短い無音も届ける）
+- それ以降の無音は送らない。keepalive_ms を指定した場合はその間隔で
+  1チャンクだけ送る（間引き）
+"""
+
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from app.services.voice.audio_coalescer import INPUT_SAMPLE_RATE, SAMPLE_WIDTH
+
+DEFAULT_WINDOW_MS = 10
+DEFAULT_ENERGY_THRESHOLD_DB = -45.0
+DEFAULT_FRICATIVE_MARGIN_DB = 10.0
+DEFAULT_FRICATIVE_ZCR = 0.25
+DEFAULT_PRE_ROLL_MS = 200
+DEFAULT_HANGOVER_MS = 500
+
+# int16 のフルスケール
+_FULL_SCALE = 32768.0
+# 完全な無音（log10(0)）を避けるための下限
+_MIN_POWER = 1e-10
+
+
+@dataclass
+class VadStats:
+    """VADの統計情報
+
+    Attributes:
+        chunks_in: 入力チャンク数
+        chunks_out: 送信したチャンク数（プレロール分を含む）
+        chunks_suppressed: 送らなかった無音チャンク数（後からプレロールとして送った分を除く）
+        bytes_in: 入力バイト数
+        bytes_out: 送信したバイト数
+        speech_onsets: 無音から発話に切り替わった回数
+    """
+
+    chunks_in: int = 0
+    chunks_out: int = 0
+    chunks_suppressed: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    speech_onsets: int = 0
+
+
+def frame_features(
+    samples: npt.NDArray[np.int16], window: int
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """窓ごとのエネルギー（dBFS）とゼロ交差率を計算する
+
+    Args:
+        samples: int16 のサンプル列
+        window: 窓のサンプル数（末尾の端数は短い窓として扱う）
+
+    Returns:
+        (窓ごとのdBFS, 窓ごとのゼロ交差率（1サンプルあたり）)
+    """
+    if len(samples) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty
+    starts = np.arange(0, len(samples), window)
+    counts = np.diff(np.append(starts, len(samples)))
+
+    scaled = samples.astype(np.float64) / _FULL_SCALE
+    power = np.add.reduceat(scaled * scaled, starts) / counts
+    energy_db = 10.0 * np.log10(np.maximum(power, _MIN_POWER))
+
+    negative = np.signbit(samples)
+    crossings = np.zeros(len(samples), dtype=np.int32)
+    crossings[1:] = negative[1:] != negative[:-1]
+    zcr = np.add.reduceat(crossings, starts) / counts
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """無音チャンクを間引くゲート（接続ごとに1つ）"""
+
+    def __init__(
+        self,
+        energy_threshold_db: float = DEFAULT_ENERGY_THRESHOLD_DB,
+        fricative_margin_db: float = DEFAULT_FRICATIVE_MARGIN_DB,
+        fricative_zcr: float = DEFAULT_FRICATIVE_ZCR,
+        window_ms: int = DEFAULT_WINDOW_MS,
+        pre_roll_ms: int = DEFAULT_PRE_ROLL_MS,
+        hangover_ms: int = DEFAULT_HANGOVER_MS,
+        keepalive_ms: int = 0,
+        sample_rate: int = INPUT_SAMPLE_RATE,
+    ) -> None:
+        """初期化
+
+        Args:
+            energy_threshold_db: 発話とみなすエネルギー（dBFS）
+            fricative_margin_db: 無声摩擦音とみなすエネルギーの閾値からの差（dB）
+            fricative_zcr: 無声摩擦音とみなすゼロ交差率
+            window_ms: 特徴量を計算する窓の長さ（ミリ秒）
+            pre_roll_ms: 発話開始時にさかのぼって送る長さ（ミリ秒）
+            hangover_ms: 発話終了後も送り続ける長さ（ミリ秒）
+            keepalive_ms: 無音中に1チャンクだけ送る間隔（ミリ秒、0で送らない）
+            sample_rate: 入力のサンプリングレート
+        """
+        self._energy_threshold_db = energy_threshold_db
+        self._fricative_threshold_db = energy_threshold_db - fricative_margin_db
+        self._fricative_zcr = fricative_zcr
+        self._window = max(1, sample_rate * window_ms // 1000)
+        self._bytes_per_ms = sample_rate * SAMPLE_WIDTH / 1000
+        self._pre_roll_bytes = int(pre_roll_ms * self._bytes_per_ms)
+        self._hangover_ms = float(hangover_ms)
+        self._keepalive_ms = float(keepalive_ms)
+
+        self._pre_roll: deque[bytes] = deque()
+        self._pre_roll_size = 0
+        # 最後の発話からの経過時間（ミリ秒）。初期状態は無音
+        self._since_speech_ms = float("inf")
+        self._since_sent_ms = 0.0
+        self.stats = VadStats()
+
+    @property
+    def in_speech(self) -> bool:
+        """発話中（ハングオーバー中を含む）か"""
+        return self._since_speech_ms <= self._hangover_ms
+
+    def is_speech(self, data: bytes) -> bool:
+        """チャンクに発話の窓が含まれるか"""
+        samples = np.frombuffer(data, dtype="<i2", count=len(data) // SAMPLE_WIDTH)
+        energy_db, zcr = frame_features(samples, self._window)
+        speech = (energy_db >= self._energy_threshold_db) | (
+            (energy_db >= self._fricative_threshold_db) & (zcr >= self._fricative_zcr)
+        )
+        return bool(speech.any())
+
+    def process(self, data: bytes) -> list[bytes]:
+        """チャンクを判定し、送るべきチャンクを返す
+
+        Args:
+            data: PCM 16-bit チャンク
+
+        Returns:
+            送信するチャンクのリスト（発話開始時はプレロール分が先頭に付く。
+            無音で送らない場合は空）
+        """
+        duration_ms = len(data) / self._bytes_per_ms
+        self.stats.chunks_in += 1
+        self.stats.bytes_in += len(data)
+
+        if self.is_speech(data):
+            if self.in_speech:
+                output = [data]
+            else:
+                output = [*self._pre_roll, data]
+                self.stats.speech_onsets += 1
+                self.stats.chunks_suppressed -= len(self._pre_roll)
+            self._pre_roll.clear()
+            self._pre_roll_size = 0
+            self._since_speech_ms = 0.0
+        else:
+            self._since_speech_ms += duration_ms
+            keepalive_due = bool(self._keepalive_ms) and (
+                self._since_sent_ms + duration_ms >= self._keepalive_ms
+            )
+            if self.in_speech or keepalive_due:
+                output = [data]
+            else:
+                output = []
+                self._remember(data)
+                self.stats.chunks_suppressed += 1
+
+        if output:
+            self._since_sent_ms = 0.0
+            self.stats.chunks_out += len(output)
+            self.stats.bytes_out += sum(len(chunk) for chunk in output)
+        else:
+            self._since_sent_ms += duration_ms
+        return output
+
+    def _remember(self, data: bytes) -> None:
+        """送らなかった無音チャンクをプレロール用に保持する"""
+        self._pre_roll.append(data)
+        self._pre_roll_size += len(data)
+        while (
+            self._pre_roll and self._pre_roll_size - len(self._pre_roll[0]) >= self._pre_roll_bytes
+        ):
+            self._pre_roll_size -= len(self._pre_roll.popleft())
@@ -1 +1 @@
-"""E2Eテスト用モックモジュール"""
+"""E2Eテスト・ベンチマーク用モックモジュール"""
@@ -0,0 +1,641 @@
+"""インメモリ Firestore スタンドイン
+
+ネットワークなしで FirestoreSessionService / FirestoreMemoryService の
+ベンチマークやテストを行うための最小限の AsyncClient 互換実装。
+各RPCに人工的なレイテンシ（操作ごとの固定値 + ジッター）とエラーを注入できる。
+
+対応している API:
+    - AsyncClient: collection / batch / get_all / write_option / close
+    - CollectionReference / Query: document / where / order_by / limit /
+      limit_to_last / start_after / select / stream / get
+    - DocumentReference: get / set / create / update / delete / collection
+    - WriteBatch: set / create / update / delete / commit
+    - 変換: DELETE_FIELD / ArrayUnion / Increment
+    - 前提条件: write_option(last_update_time=...)（不一致は FailedPrecondition）
+
+reads / writes に読み取り・書き込みドキュメント数（課金単位）を記録する。
+操作（OPERATIONS）ごとの呼び出し数・読み書き数・注入エラー数は op_stats に記録する。
+
+Example:
+    client = FakeAsyncClient(
+        latency=0.02,
+        jitter=0.005,
+        op_latency={"commit": 0.04},
+        op_error_rates={"commit": 0.01},
+        seed=0,
+    )
+"""
+
+import asyncio
+import copy
+import functools
+import random
+import uuid
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from google.api_core import exceptions as gexc
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+# Firestoreのバッチ書き込み上限
+MAX_BATCH_WRITES = 500
+
+_DocPath = tuple[str, ...]
+
+_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# レイテンシ・エラー注入と統計の対象となる操作
+OPERATIONS = (
+    "get",
+    "get_all",
+    "query",
+    "list_documents",
+    "set",
+    "create",
+    "update",
+    "delete",
+    "commit",
+)
+
+
+def _split_field_path(field_path: str) -> list[str]:
+    """フィールドパスを要素に分割する（バッククォートで囲まれた要素に対応）"""
+    if "`" in field_path:
+        return list(FieldPath.from_api_repr(field_path).parts)
+    return field_path.split(".")
+
+
+def _get_field(data: dict[str, Any], field_path: str) -> tuple[bool, Any]:
+    """ドット区切りのフィールドパスで値を取得する"""
+    current: Any = data
+    for key in _split_field_path(field_path):
+        if not isinstance(current, dict) or key not in current:
+            return False, None
+        current = current[key]
+    return True, current
+
+
+def _resolve_value(existing: Any, value: Any) -> Any:
+    """変換（ArrayUnion / Increment）を既存値に適用した値を返す"""
+    if isinstance(value, firestore.ArrayUnion):
+        result = list(existing) if isinstance(existing, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(copy.deepcopy(item))
+        return result
+    if isinstance(value, firestore.Increment):
+        base = existing if isinstance(existing, int | float) else 0
+        return base + value.value
+    return copy.deepcopy(value)
+
+
+def _set_field(data: dict[str, Any], field_path: str, value: Any) -> None:
+    """ドット区切りのフィールドパスで値を設定する（DELETE_FIELDは削除）"""
+    keys = _split_field_path(field_path)
+    current = data
+    for key in keys[:-1]:
+        child = current.get(key)
+        if not isinstance(child, dict):
+            if value is firestore.DELETE_FIELD:
+                return
+            child = {}
+            current[key] = child
+        current = child
+    if value is firestore.DELETE_FIELD:
+        current.pop(keys[-1], None)
+    else:
+        current[keys[-1]] = _resolve_value(current.get(keys[-1]), value)
+
+
+def _merge(target: dict[str, Any], source: dict[str, Any]) -> None:
+    """set(merge=True) 相当の再帰マージ"""
+    for key, value in source.items():
+        if value is firestore.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve_value(target.get(key), value)
+
+
+def _matches(data: dict[str, Any], field_path: str, op: str, value: Any) -> bool:
+    """単一フィルタ条件の評価"""
+    found, actual = _get_field(data, field_path)
+    if not found:
+        return False
+    if op == "==":
+        return bool(actual == value)
+    if op == "!=":
+        return bool(actual != value)
+    if op == "<":
+        return bool(actual < value)
+    if op == "<=":
+        return bool(actual <= value)
+    if op == ">":
+        return bool(actual > value)
+    if op == ">=":
+        return bool(actual >= value)
+    if op == "in":
+        return actual in value
+    if op == "not-in":
+        return actual not in value
+    if op == "array-contains":
+        return isinstance(actual, list) and value in actual
+    if op == "array-contains-any":
+        return isinstance(actual, list) and any(v in actual for v in value)
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+# ドキュメントIDを表す特殊フィールドパス
+DOCUMENT_ID = "__name__"
+
+
+def _order_value(field_path: str, item: tuple[str, dict[str, Any]]) -> Any:
+    """order_by 用のソートキー（__name__ はドキュメントID）"""
+    if field_path == DOCUMENT_ID:
+        return item[0]
+    return _get_field(item[1], field_path)[1]
+
+
+@dataclass
+class FakeOpStats:
+    """操作ごとの統計情報
+
+    Attributes:
+        calls: 呼び出し回数（RPC数）
+        reads: 読み取りドキュメント数
+        writes: 書き込みドキュメント数
+        errors: 注入したエラーの数
+        latency_seconds: 注入したレイテンシの合計（秒）
+    """
+
+    calls: int = 0
+    reads: int = 0
+    writes: int = 0
+    errors: int = 0
+    latency_seconds: float = 0.0
+
+
+class FakeDocumentSnapshot:
+    """DocumentSnapshot 互換オブジェクト"""
+
+    def __init__(
+        self,
+        reference: "FakeDocumentReference",
+        data: dict[str, Any] | None,
+        update_time: datetime | None = None,
+        field_paths: Iterable[str] | None = None,
+    ) -> None:
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        if data is not None and field_paths is not None:
+            projected: dict[str, Any] = {}
+            for path in field_paths:
+                found, value = _get_field(data, path)
+                if found:
+                    _set_field(projected, path, value)
+            data = projected
+        self._data = copy.deepcopy(data)
+
+    def to_dict(self) -> dict[str, Any] | None:
+        """ドキュメントデータのコピーを返す"""
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        """フィールド値を取得する"""
+        _, value = _get_field(self._data or {}, field_path)
+        return value
+
+
+class FakeWriteResult:
+    """WriteResult 互換オブジェクト"""
+
+    def __init__(self, update_time: datetime | None) -> None:
+        self.update_time = update_time
+
+
+class FakeLastUpdateOption:
+    """LastUpdateOption 互換オブジェクト（update_time の前提条件）"""
+
+    def __init__(self, last_update_time: datetime) -> None:
+        self.last_update_time = last_update_time
+
+
+class FakeQuery:
+    """Query 互換オブジェクト（フィルタ・並び替え・カーソル）"""
+
+    def __init__(
+        self,
+        collection: "FakeCollectionReference",
+        filters: tuple[tuple[str, str, Any], ...] = (),
+        orders: tuple[tuple[str, str], ...] = (),
+        limit: int | None = None,
+        limit_to_last: bool = False,
+        start_after: dict[str, Any] | None = None,
+        projection: tuple[str, ...] | None = None,
+    ) -> None:
+        self._collection = collection
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._limit_to_last = limit_to_last
+        self._start_after = start_after
+        self._projection = projection
+
+    def _copy(self, **changes: Any) -> "FakeQuery":
+        params: dict[str, Any] = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "limit": self._limit,
+            "limit_to_last": self._limit_to_last,
+            "start_after": self._start_after,
+            "projection": self._projection,
+        }
+        params.update(changes)
+        return FakeQuery(self._collection, **params)
+
+    def where(
+        self,
+        field_path: str | None = None,
+        op_string: str | None = None,
+        value: Any = None,
+        *,
+        filter: Any = None,
+    ) -> "FakeQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if field_path is None or op_string is None:
+            raise ValueError("field_path and op_string are required")
+        return self._copy(filters=(*self._filters, (field_path, op_string, value)))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(orders=(*self._orders, (field_path, direction)))
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count, limit_to_last=False)
+
+    def limit_to_last(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count, limit_to_last=True)
+
+    def start_after(self, document_fields_or_snapshot: Any) -> "FakeQuery":
+        if isinstance(document_fields_or_snapshot, FakeDocumentSnapshot):
+            cursor = document_fields_or_snapshot.to_dict() or {}
+            cursor[DOCUMENT_ID] = document_fields_or_snapshot.id
+        else:
+            cursor = dict(document_fields_or_snapshot)
+        return self._copy(start_after=cursor)
+
+    def select(self, field_paths: Iterable[str]) -> "FakeQuery":
+        return self._copy(projection=tuple(field_paths))
+
+    def _sort_key(self, item: tuple[str, dict[str, Any]]) -> tuple[Any, ...]:
+        return (*(_order_value(path, item) for path, _ in self._orders), item[0])
+
+    def _run(self) -> list[tuple[str, dict[str, Any]]]:
+        items = list(self._collection._documents())
+        for path, op, value in self._filters:
+            items = [item for item in items if _matches(item[1], path, op, value)]
+        for path, _ in self._orders:
+            if path != DOCUMENT_ID:
+                items = [item for item in items if _get_field(item[1], path)[0]]
+
+        items.sort(key=lambda item: item[0])
+        for path, direction in reversed(self._orders):
+            items.sort(
+                key=functools.partial(_order_value, path),
+                reverse=direction == "DESCENDING",
+            )
+
+        if self._start_after is not None:
+            cursor = self._start_after
+            cursor_key = (
+                *(cursor.get(path) for path, _ in self._orders),
+                cursor.get(DOCUMENT_ID, ""),
+            )
+            descending = bool(self._orders) and self._orders[0][1] == "DESCENDING"
+            if descending:
+                items = [item for item in items if self._sort_key(item) < cursor_key]
+            else:
+                items = [item for item in items if self._sort_key(item) > cursor_key]
+
+        if self._limit is not None:
+            items = items[-self._limit :] if self._limit_to_last else items[: self._limit]
+        return items
+
+    async def stream(self, **_: Any) -> AsyncIterator[FakeDocumentSnapshot]:
+        client = self._collection._client
+        await client._rpc("query")
+        items = self._run()
+        # 結果が0件のクエリも1読み取りとして課金される
+        client._count_reads("query", max(len(items), 1))
+        for doc_id, data in items:
+            ref = self._collection.document(doc_id)
+            yield FakeDocumentSnapshot(
+                ref,
+                data,
+                client._update_times.get(ref._path),
+                field_paths=self._projection,
+            )
+
+    async def get(self, **kwargs: Any) -> list[FakeDocumentSnapshot]:
+        return [snapshot async for snapshot in self.stream(**kwargs)]
+
+
+class FakeCollectionReference(FakeQuery):
+    """CollectionReference 互換オブジェクト"""
+
+    def __init__(self, client: "FakeAsyncClient", path: _DocPath) -> None:
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+        super().__init__(self)
+
+    def document(self, document_id: str | None = None) -> "FakeDocumentReference":
+        return FakeDocumentReference(
+            self._client, (*self._path, document_id or uuid.uuid4().hex[:20])
+        )
+
+    def _documents(self) -> Iterable[tuple[str, dict[str, Any]]]:
+        depth = len(self._path) + 1
+        for path, data in self._client._store.items():
+            if len(path) == depth and path[:-1] == self._path:
+                yield path[-1], data
+
+    async def list_documents(self, **_: Any) -> AsyncIterator["FakeDocumentReference"]:
+        # 実際のクライアントと同様に、サブコレクションのみを持つドキュメント
+        # （show_missing）も含める
+        await self._client._rpc("list_documents")
+        depth = len(self._path) + 1
+        doc_ids = {
+            path[depth - 1]
+            for path in self._client._store
+            if len(path) >= depth and path[: depth - 1] == self._path
+        }
+        for doc_id in sorted(doc_ids):
+            yield self.document(doc_id)
+
+
+class FakeDocumentReference:
+    """DocumentReference 互換オブジェクト"""
+
+    def __init__(self, client: "FakeAsyncClient", path: _DocPath) -> None:
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    @property
+    def path(self) -> str:
+        return "/".join(self._path)
+
+    @property
+    def parent(self) -> FakeCollectionReference:
+        return FakeCollectionReference(self._client, self._path[:-1])
+
+    def collection(self, collection_id: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self._client, (*self._path, collection_id))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FakeDocumentReference) and other._path == self._path
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    async def get(self, field_paths: Iterable[str] | None = None, **_: Any) -> FakeDocumentSnapshot:
+        await self._client._rpc("get")
+        return self._client._snapshot(self, field_paths, op="get")
+
+    async def set(
+        self, document_data: dict[str, Any], merge: bool = False, **_: Any
+    ) -> FakeWriteResult:
+        await self._client._rpc("set")
+        return self._client._apply_set(self, document_data, merge, op="set")
+
+    async def create(self, document_data: dict[str, Any], **_: Any) -> FakeWriteResult:
+        await self._client._rpc("create")
+        self._client._check_create(self)
+        return self._client._apply_set(self, document_data, merge=False, op="create")
+
+    async def update(
+        self,
+        field_updates: dict[str, Any],
+        option: FakeLastUpdateOption | None = None,
+        **_: Any,
+    ) -> FakeWriteResult:
+        await self._client._rpc("update")
+        self._client._check_update(self, option)
+        return self._client._apply_update(self, field_updates, op="update")
+
+    async def delete(self, **_: Any) -> None:
+        await self._client._rpc("delete")
+        self._client._apply_delete(self, op="delete")
+
+
+class FakeWriteBatch:
+    """WriteBatch 互換オブジェクト（commit時にアトミックに適用）"""
+
+    def __init__(self, client: "FakeAsyncClient") -> None:
+        self._client = client
+        self._writes: list[tuple[str, FakeDocumentReference, dict[str, Any] | None, bool, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(
+        self, reference: FakeDocumentReference, document_data: dict[str, Any], merge: bool = False
+    ) -> None:
+        self._writes.append(("set", reference, copy.deepcopy(document_data), merge, None))
+
+    def create(self, reference: FakeDocumentReference, document_data: dict[str, Any]) -> None:
+        self._writes.append(("create", reference, copy.deepcopy(document_data), False, None))
+
+    def update(
+        self,
+        reference: FakeDocumentReference,
+        field_updates: dict[str, Any],
+        option: FakeLastUpdateOption | None = None,
+    ) -> None:
+        self._writes.append(("update", reference, copy.deepcopy(field_updates), False, option))
+
+    def delete(self, reference: FakeDocumentReference) -> None:
+        self._writes.append(("delete", reference, None, False, None))
+
+    async def commit(self, **_: Any) -> list[FakeWriteResult]:
+        if len(self._writes) > MAX_BATCH_WRITES:
+            message = f"maximum {MAX_BATCH_WRITES} writes allowed per request"
+            raise gexc.InvalidArgument(message)  # type: ignore[no-untyped-call]
+        await self._client._rpc("commit")
+        # 前提条件をすべて検証してから適用する（アトミック性）
+        for op, ref, _data, _merge, option in self._writes:
+            if op == "create":
+                self._client._check_create(ref)
+            elif op == "update":
+                self._client._check_update(ref, option)
+        results: list[FakeWriteResult] = []
+        for op, ref, data, merge, _option in self._writes:
+            if op in ("set", "create"):
+                results.append(self._client._apply_set(ref, data or {}, merge, op="commit"))
+            elif op == "update":
+                results.append(self._client._apply_update(ref, data or {}, op="commit"))
+            else:
+                results.append(self._client._apply_delete(ref, op="commit"))
+        self._writes = []
+        return results
+
+
+class FakeAsyncClient:
+    """firestore.AsyncClient 互換のインメモリクライアント
+
+    Args:
+        latency: 1 RPCあたりに注入するレイテンシ（秒）
+        jitter: レイテンシに加える一様乱数の上限（秒）
+        error_rate: RPCが ServiceUnavailable で失敗する確率（0〜1）
+        op_latency: 操作ごとのレイテンシ（秒、未指定の操作は latency）
+        op_error_rates: 操作ごとのエラー率（未指定の操作は error_rate）
+        seed: ジッターとエラー注入の乱数シード（再現性のあるベンチマーク用）
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        *,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        op_latency: Mapping[str, float] | None = None,
+        op_error_rates: Mapping[str, float] | None = None,
+        seed: int | None = None,
+    ) -> None:
+        unknown = (set(op_latency or {}) | set(op_error_rates or {})) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown operations: {sorted(unknown)}")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.op_latency = dict(op_latency or {})
+        self.op_error_rates = dict(op_error_rates or {})
+        self._random = random.Random(seed)
+        self._store: dict[_DocPath, dict[str, Any]] = {}
+        self._update_times: dict[_DocPath, datetime] = {}
+        self._clock = 0
+        self.closed = False
+        self.reads = 0
+        self.writes = 0
+        self.op_stats: defaultdict[str, FakeOpStats] = defaultdict(FakeOpStats)
+
+    async def _rpc(self, op: str) -> None:
+        """1ラウンドトリップ分のレイテンシを注入し、確率的にエラーを発生させる"""
+        stats = self.op_stats[op]
+        stats.calls += 1
+        delay = self.op_latency.get(op, self.latency)
+        if self.jitter > 0:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            stats.latency_seconds += delay
+            await asyncio.sleep(delay)
+        error_rate = self.op_error_rates.get(op, self.error_rate)
+        if error_rate > 0 and self._random.random() < error_rate:
+            stats.errors += 1
+            raise gexc.ServiceUnavailable(f"Injected {op} failure")  # type: ignore[no-untyped-call]
+
+    def _count_reads(self, op: str, count: int) -> None:
+        self.reads += count
+        self.op_stats[op].reads += count
+
+    def _count_write(self, op: str) -> None:
+        self.writes += 1
+        self.op_stats[op].writes += 1
+
+    def reset_stats(self) -> None:
+        """読み書き数と操作ごとの統計をリセットする（データは保持）"""
+        self.reads = 0
+        self.writes = 0
+        self.op_stats.clear()
+
+    def _tick(self) -> datetime:
+        self._clock += 1
+        return _EPOCH + timedelta(microseconds=self._clock)
+
+    def _snapshot(
+        self, ref: FakeDocumentReference, field_paths: Iterable[str] | None = None, *, op: str
+    ) -> FakeDocumentSnapshot:
+        self._count_reads(op, 1)
+        return FakeDocumentSnapshot(
+            ref,
+            self._store.get(ref._path),
+            self._update_times.get(ref._path),
+            field_paths=field_paths,
+        )
+
+    def _check_create(self, ref: FakeDocumentReference) -> None:
+        if ref._path in self._store:
+            raise gexc.AlreadyExists(f"Document already exists: {ref.path}")  # type: ignore[no-untyped-call]
+
+    def _check_update(
+        self, ref: FakeDocumentReference, option: FakeLastUpdateOption | None = None
+    ) -> None:
+        if ref._path not in self._store:
+            raise gexc.NotFound(f"No document to update: {ref.path}")  # type: ignore[no-untyped-call]
+        if option is not None and self._update_times.get(ref._path) != option.last_update_time:
+            message = f"Document was modified since {option.last_update_time}: {ref.path}"
+            raise gexc.FailedPrecondition(message)  # type: ignore[no-untyped-call]
+
+    def _apply_set(
+        self, ref: FakeDocumentReference, data: dict[str, Any], merge: bool, *, op: str
+    ) -> FakeWriteResult:
+        if merge and ref._path in self._store:
+            _merge(self._store[ref._path], data)
+        else:
+            new_data: dict[str, Any] = {}
+            _merge(new_data, data)
+            self._store[ref._path] = new_data
+        self._update_times[ref._path] = self._tick()
+        self._count_write(op)
+        return FakeWriteResult(self._update_times[ref._path])
+
+    def _apply_update(
+        self, ref: FakeDocumentReference, field_updates: dict[str, Any], *, op: str
+    ) -> FakeWriteResult:
+        data = self._store[ref._path]
+        for field_path, value in field_updates.items():
+            _set_field(data, field_path, value)
+        self._update_times[ref._path] = self._tick()
+        self._count_write(op)
+        return FakeWriteResult(self._update_times[ref._path])
+
+    def _apply_delete(self, ref: FakeDocumentReference, *, op: str) -> FakeWriteResult:
+        self._store.pop(ref._path, None)
+        self._update_times.pop(ref._path, None)
+        self._count_write(op)
+        return FakeWriteResult(None)
+
+    def collection(self, collection_id: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, (collection_id,))
+
+    def document(self, document_path: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self, tuple(document_path.split("/")))
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    @staticmethod
+    def write_option(*, last_update_time: datetime) -> FakeLastUpdateOption:
+        return FakeLastUpdateOption(last_update_time)
+
+    async def get_all(
+        self,
+        references: Iterable[FakeDocumentReference],
+        field_paths: Iterable[str] | None = None,
+        **_: Any,
+    ) -> AsyncIterator[FakeDocumentSnapshot]:
+        refs = list(references)
+        await self._rpc("get_all")
+        for ref in refs:
+            yield self._snapshot(ref, field_paths, op="get_all")
+
+    def close(self) -> None:
+        self.closed = True
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""受信音声インジェスト（形式変換・リサンプリング）のベンチマークスクリプト
+
+1接続分の合成音声（--seconds 秒、--frame-ms ミリ秒ごとのチャンク）を、
+AudioIngest で 16kHz Int16 モノラルに変換するCPU時間を入力形式ごとに計測する。
+リアルタイム比（処理時間 / 音声の長さ）が小さいほど、1コアで多くの接続を処理できる。
+
+Usage:
+    python scripts/benchmark_audio_ingest.py [--seconds 30] [--frame-ms 20]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from app.services.voice.audio_ingest import AudioIngest, AudioInputFormat
+
+SEED = 0
+
+FORMATS = [
+    AudioInputFormat("f32le", 48000, 1),
+    AudioInputFormat("f32le", 48000, 2),
+    AudioInputFormat("f32le", 44100, 1),
+    AudioInputFormat("s16le", 44100, 2),
+    AudioInputFormat("s16le", 48000, 1),
+]
+
+
+def _make_frames(input_format: AudioInputFormat, seconds: float, frame_ms: int) -> list[bytes]:
+    """声に近い帯域の合成音声（複数の正弦波と雑音）をチャンクに分ける"""
+    rng = np.random.default_rng(SEED)
+    rate = input_format.sample_rate
+    t = np.arange(int(rate * seconds)) / rate
+    signal = 0.2 * np.sin(2 * np.pi * 220 * t) + 0.1 * np.sin(2 * np.pi * 1800 * t)
+    signal += 0.01 * rng.standard_normal(len(t))
+    if input_format.channels == 2:
+        signal = np.repeat(signal, 2)
+    if input_format.encoding == "f32le":
+        data = signal.astype("<f4").tobytes()
+    else:
+        data = np.round(signal * 32767).astype("<i2").tobytes()
+    chunk = rate * frame_ms // 1000 * input_format.frame_size
+    return [data[i : i + chunk] for i in range(0, len(data), chunk)]
+
+
+def bench_ingest(
+    input_format: AudioInputFormat, seconds: float, frame_ms: int
+) -> tuple[list[float], float]:
+    """1フレームあたりの変換時間（秒）とリアルタイム比を計測する
+
+    Returns:
+        (各フレームの変換時間リスト, CPU時間 / 音声の長さ)
+    """
+    frames = _make_frames(input_format, seconds, frame_ms)
+    ingest = AudioIngest(input_format)
+    timings: list[float] = []
+
+    cpu_start = time.process_time()
+    for frame in frames:
+        start = time.perf_counter()
+        ingest.convert(frame)
+        timings.append(time.perf_counter() - start)
+    cpu = time.process_time() - cpu_start
+    return timings, cpu / seconds
+
+
+def _report(label: str, timings: list[float], realtime_factor: float) -> None:
+    """計測結果を表示する"""
+    us = sorted(t * 1_000_000 for t in timings)
+    p95 = us[min(len(us) - 1, int(len(us) * 0.95))]
+    print(
+        f"{label:<22} mean={statistics.mean(us):7.1f}us  p50={statistics.median(us):7.1f}us  "
+        f"p95={p95:7.1f}us  rtf={realtime_factor:.4f}  "
+        f"(~{1 / realtime_factor:,.0f} streams/core)"
+    )
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Benchmark inbound audio ingest/resampling")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Audio length per format")
+    parser.add_argument("--frame-ms", type=int, default=20, help="Client chunk length in ms")
+    args = parser.parse_args()
+
+    print(f"audio={args.seconds}s per format, frame={args.frame_ms}ms -> 16kHz s16le mono")
+    for input_format in FORMATS:
+        timings, rtf = bench_ingest(input_format, args.seconds, args.frame_ms)
+        channels = "stereo" if input_format.channels == 2 else "mono"
+        _report(f"{input_format.encoding} {input_format.sample_rate} {channels}", timings, rtf)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""共有Firestoreクライアントのベンチマークスクリプト
+
+1リクエスト（セッション/メモリサービスの生成と get_session 1回の往復）の
+レイテンシを、リクエストごとに AsyncClient を生成する場合（従来）と、
+FirestoreClientRegistry の共有クライアントを使う場合で比較する。
+gRPCチャネルの接続確立を含む実際の往復を計測するため、Firestoreエミュレータが必要。
+
+Usage:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python scripts/benchmark_firestore_clients.py \
+        [--requests 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Any
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore import AsyncClient
+
+from app.db.firestore_client import FirestoreClientRegistry, close_client
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+
+APP_NAME = "homework-coach"
+USER_ID = "bench-user"
+PROJECT_ID = "bench-project"
+
+
+def _new_client(project_id: str | None, database: str) -> Any:
+    """認証情報なしで生成できる AsyncClient（エミュレータ用）"""
+    credentials = AnonymousCredentials()  # type: ignore[no-untyped-call]
+    return AsyncClient(project=project_id, database=database, credentials=credentials)
+
+
+async def _handle_request(client: Any) -> None:
+    """1リクエスト分のサービス生成とRPC 1回"""
+    session_service = FirestoreSessionService(client=client)
+    FirestoreMemoryService(client=client)
+    await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="bench-missing"
+    )
+
+
+async def bench_per_request(num_requests: int) -> list[float]:
+    """リクエストごとにクライアントを生成・破棄する場合の所要時間（秒）"""
+    timings: list[float] = []
+    for _ in range(num_requests):
+        start = time.perf_counter()
+        client = _new_client(PROJECT_ID, "(default)")
+        await _handle_request(client)
+        timings.append(time.perf_counter() - start)
+        await close_client(client)
+    return timings
+
+
+async def bench_shared(num_requests: int) -> list[float]:
+    """共有クライアントを使う場合の所要時間（秒）"""
+    registry = FirestoreClientRegistry(_new_client)
+    timings: list[float] = []
+    try:
+        for _ in range(num_requests):
+            start = time.perf_counter()
+            await _handle_request(registry.get(PROJECT_ID))
+            timings.append(time.perf_counter() - start)
+    finally:
+        await registry.close()
+    return timings
+
+
+def _report(label: str, timings: list[float]) -> None:
+    """計測結果を表示する"""
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{label:<28} mean={statistics.mean(ms):7.2f}ms  p50={statistics.median(ms):7.2f}ms  p95={p95:7.2f}ms"
+    )
+
+
+async def run(num_requests: int) -> None:
+    """全シナリオを実行する"""
+    print(f"requests={num_requests}, emulator={os.environ['FIRESTORE_EMULATOR_HOST']}")
+
+    per_request = await bench_per_request(num_requests)
+    _report("per-request client", per_request)
+
+    shared = await bench_shared(num_requests)
+    _report("shared client", shared)
+
+    speedup = statistics.mean(per_request) / statistics.mean(shared)
+    print(f"speedup: {speedup:.2f}x")
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Benchmark shared Firestore clients")
+    parser.add_argument("--requests", type=int, default=200, help="Number of requests")
+    args = parser.parse_args()
+
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        print("FIRESTORE_EMULATOR_HOST is required", file=sys.stderr)
+        return 1
+
+    asyncio.run(run(args.requests))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""FirestoreMemoryService の検索ベンチマークスクリプト
+
+インメモリの FakeAsyncClient に人工的なRPCレイテンシを注入し、
+1ユーザー（子ども1人）あたり --entries 件の記憶エントリに対する search_memory を、
+全件走査・転置インデックス・埋め込みベクトル検索で比較する。読み取りドキュメント数（課金単位）も表示する。
+
+Usage:
+    python scripts/benchmark_memory_search.py [--entries 10000] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from google.adk.events.event import Event
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from app.services.adk.memory.embeddings import HashingEmbedder
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.testing.fake_firestore import FakeAsyncClient
+
+APP_NAME = "homework-coach"
+USER_ID = "bench-child"
+SEED = 0
+EVENTS_PER_SESSION = 100
+
+# 英字のみの合成語彙（Zipf分布に近い頻度で出現させる）
+_SYLLABLES = [c + v for c in "kstnhmyrwgzdbp" for v in "aiueo"]
+VOCABULARY = ["".join(pair) for pair in itertools.product(_SYLLABLES, repeat=2)][:2000]
+QUERIES = [
+    f"{VOCABULARY[3]} {VOCABULARY[150]}",
+    VOCABULARY[42],
+    f"{VOCABULARY[1500]} {VOCABULARY[1999]} {VOCABULARY[7]}",
+    VOCABULARY[999],
+]
+
+
+def _make_sessions(num_entries: int, rng: random.Random) -> list[Session]:
+    """num_entries件のテキストイベントを持つセッションを作成する"""
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    sessions: list[Session] = []
+    for start in range(0, num_entries, EVENTS_PER_SESSION):
+        events = [
+            Event(
+                id=f"e{i:06d}",
+                author="user",
+                content=types.Content(
+                    role="user",
+                    parts=[types.Part(text=" ".join(rng.choices(VOCABULARY, weights, k=12)))],
+                ),
+            )
+            for i in range(start, min(start + EVENTS_PER_SESSION, num_entries))
+        ]
+        sessions.append(Session(id=f"s{start}", app_name=APP_NAME, user_id=USER_ID, events=events))
+    return sessions
+
+
+async def bench_search(
+    num_entries: int,
+    latency: float,
+    inverted_index: bool,
+    vector: bool = False,
+    iterations: int = 5,
+) -> tuple[list[float], float]:
+    """search_memory 1回あたりの所要時間（秒）と読み取りドキュメント数を計測する
+
+    Args:
+        num_entries: 記憶エントリ数
+        latency: 1 RPCあたりのレイテンシ（秒）
+        inverted_index: 転置インデックスを使用するか
+        vector: 埋め込みベクトルで検索するか（2回目以降はキャッシュ済みの行列を使う）
+        iterations: クエリごとの計測回数
+
+    Returns:
+        (各search_memoryの所要時間リスト, 1検索あたりの平均読み取り数)
+    """
+    client = FakeAsyncClient()
+    service = FirestoreMemoryService(
+        client=client,
+        inverted_index=inverted_index,
+        embedder=HashingEmbedder() if vector else None,
+    )
+    for session in _make_sessions(num_entries, random.Random(SEED)):
+        await service.add_session_to_memory(session)
+    if inverted_index:
+        await service.rebuild_index(app_name=APP_NAME, user_id=USER_ID)
+
+    client.latency = latency
+    client.reset_stats()
+    timings: list[float] = []
+    for _ in range(iterations):
+        for query in QUERIES:
+            start = time.perf_counter()
+            await service.search_memory(app_name=APP_NAME, user_id=USER_ID, query=query)
+            timings.append(time.perf_counter() - start)
+    return timings, client.reads / len(timings)
+
+
+def _report(label: str, timings: list[float], reads: float) -> None:
+    """計測結果を表示する"""
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{label:<24} mean={statistics.mean(ms):8.2f}ms  p50={statistics.median(ms):8.2f}ms  "
+        f"p95={p95:8.2f}ms  reads/search={reads:8.1f}"
+    )
+
+
+async def run(num_entries: int, latency_ms: float) -> None:
+    """全シナリオを実行する"""
+    latency = latency_ms / 1000
+    print(f"entries={num_entries}, latency={latency_ms}ms/RPC")
+
+    scan, scan_reads = await bench_search(num_entries, latency, inverted_index=False)
+    _report("search (full scan)", scan, scan_reads)
+
+    indexed, indexed_reads = await bench_search(num_entries, latency, inverted_index=True)
+    _report("search (inverted index)", indexed, indexed_reads)
+
+    print(f"speedup: {statistics.mean(scan) / statistics.mean(indexed):.2f}x")
+
+    vector, vector_reads = await bench_search(
+        num_entries, latency, inverted_index=False, vector=True
+    )
+    _report("search (vector, cached)", vector, vector_reads)
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Benchmark FirestoreMemoryService search")
+    parser.add_argument("--entries", type=int, default=10_000, help="Memory entries per child")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="RPC latency in ms")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.entries, args.latency_ms))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""FirestoreSessionService のベンチマークスクリプト
+
+インメモリの FakeAsyncClient に人工的なRPCレイテンシ（とジッター）を注入し、
+Firestoreのラウンドトリップがターンレイテンシに与える影響を計測する。
+ジッターは固定シードで生成するため、同じ引数の実行結果は再現できる。
+
+Usage:
+    python scripts/benchmark_session_service.py [--latency-ms 20] [--jitter-ms 5] [--events 50]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+
+from app.services.adk.sessions.event_pages import EventLayout
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.session_cache import SessionCache
+from app.services.adk.sessions.state_cache import StateCache
+from app.testing.fake_firestore import FakeAsyncClient
+
+APP_NAME = "homework-coach"
+USER_ID = "bench-user"
+SEED = 0
+
+
+def _make_event(index: int) -> Event:
+    """app/user/sessionの全スコープに差分を持つイベントを作成する"""
+    return Event(
+        author="agent",
+        invocation_id=f"inv-{index}",
+        actions=EventActions(
+            state_delta={
+                "hint_level": index % 3 + 1,
+                "user:total_points": index,
+                "app:active_sessions": index,
+            }
+        ),
+    )
+
+
+async def bench_append_event(
+    latency: float,
+    num_events: int,
+    batch_writes: bool,
+    jitter: float = 0.0,
+) -> tuple[list[float], FakeAsyncClient]:
+    """append_event 1回あたりの所要時間（秒）を計測する
+
+    Args:
+        latency: 1 RPCあたりのレイテンシ（秒）
+        num_events: 追加するイベント数
+        batch_writes: バッチcommitモードを使用するか
+        jitter: レイテンシに加えるジッターの上限（秒）
+
+    Returns:
+        (各append_eventの所要時間リスト, 計測区間のみの統計を持つクライアント)
+    """
+    client = FakeAsyncClient(latency=latency, jitter=jitter, seed=SEED)
+    service = FirestoreSessionService(client=client, batch_writes=batch_writes)
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    client.reset_stats()
+
+    timings: list[float] = []
+    for i in range(num_events):
+        event = _make_event(i)
+        start = time.perf_counter()
+        await service.append_event(session, event)
+        timings.append(time.perf_counter() - start)
+    return timings, client
+
+
+async def bench_get_session(
+    latency: float,
+    num_events: int,
+    use_cache: bool,
+    iterations: int = 20,
+    jitter: float = 0.0,
+) -> list[float]:
+    """num_events件のイベントを持つセッションのget_session所要時間（秒）を計測する
+
+    Args:
+        latency: 1 RPCあたりのレイテンシ（秒）
+        num_events: セッションのイベント数
+        use_cache: セッションキャッシュと状態キャッシュを使用するか
+        iterations: 計測回数
+        jitter: レイテンシに加えるジッターの上限（秒）
+
+    Returns:
+        各get_sessionの所要時間リスト
+    """
+    client = FakeAsyncClient(latency=0.0, seed=SEED)
+    service = FirestoreSessionService(
+        client=client,
+        batch_writes=True,
+        session_cache=SessionCache() if use_cache else None,
+        state_cache=StateCache() if use_cache else None,
+    )
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    for i in range(num_events):
+        await service.append_event(session, _make_event(i))
+
+    client.latency = latency
+    client.jitter = jitter
+    timings: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_reads_per_get_session(num_events: int, event_layout: EventLayout) -> int:
+    """キャッシュなしのget_session 1回あたりの読み取りドキュメント数（課金単位）を計測する
+
+    Args:
+        num_events: セッションのイベント数
+        event_layout: イベント保存レイアウト
+
+    Returns:
+        get_session 1回の読み取りドキュメント数
+    """
+    client = FakeAsyncClient()
+    service = FirestoreSessionService(client=client, batch_writes=True, event_layout=event_layout)
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    for i in range(num_events):
+        await service.append_event(session, _make_event(i))
+
+    before = client.reads
+    await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    return client.reads - before
+
+
+def _report(label: str, timings: list[float]) -> None:
+    """計測結果を表示する"""
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{label:<28} mean={statistics.mean(ms):7.2f}ms  p50={statistics.median(ms):7.2f}ms  p95={p95:7.2f}ms"
+    )
+
+
+def _report_ops(label: str, client: FakeAsyncClient, num_events: int) -> None:
+    """操作ごとのRPC数・書き込み数（1イベントあたり）を表示する"""
+    ops = ", ".join(
+        f"{op}={stats.calls / num_events:.1f}rpc/{stats.writes / num_events:.1f}w"
+        for op, stats in sorted(client.op_stats.items())
+    )
+    print(f"{label:<28} per event: {ops}")
+
+
+async def run(latency_ms: float, num_events: int, jitter_ms: float = 0.0) -> None:
+    """全シナリオを実行する"""
+    latency = latency_ms / 1000
+    jitter = jitter_ms / 1000
+    print(f"latency={latency_ms}ms/RPC (+0-{jitter_ms}ms jitter), events={num_events}")
+
+    sequential, sequential_client = await bench_append_event(
+        latency, num_events, batch_writes=False, jitter=jitter
+    )
+    _report("append_event (sequential)", sequential)
+    _report_ops("append_event (sequential)", sequential_client, num_events)
+
+    batched, batched_client = await bench_append_event(
+        latency, num_events, batch_writes=True, jitter=jitter
+    )
+    _report("append_event (batched)", batched)
+    _report_ops("append_event (batched)", batched_client, num_events)
+
+    speedup = statistics.mean(sequential) / statistics.mean(batched)
+    print(f"speedup: {speedup:.2f}x")
+
+    uncached = await bench_get_session(latency, num_events, use_cache=False, jitter=jitter)
+    _report("get_session (uncached)", uncached)
+
+    cached = await bench_get_session(latency, num_events, use_cache=True, jitter=jitter)
+    _report("get_session (cached)", cached)
+
+    layouts: tuple[EventLayout, ...] = ("documents", "paged")
+    for layout in layouts:
+        reads = await bench_reads_per_get_session(num_events, layout)
+        print(f"reads/get_session ({layout}): {reads}")
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Benchmark FirestoreSessionService")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="RPC latency in ms")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Max RPC jitter in ms")
+    parser.add_argument("--events", type=int, default=50, help="Number of events to append")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.latency_ms, args.events, args.jitter_ms))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""送信音声フレームのスループットベンチマークスクリプト
+
+Live APIの出力音声イベント（--chunk-ms ミリ秒の 24kHz PCM）を、
+VoiceStreamingService の変換から WebSocket に送るペイロードの作成までを
+1スレッドで繰り返し、JSONモード（base64）とバイナリフレームモードの
+1コアあたりのフレーム数/秒（CPU時間基準）と1フレームあたりのバイト数を比較する。
+
+Usage:
+    python scripts/benchmark_voice_frames.py [--frames 20000] [--chunk-ms 40]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from google.adk.events.event import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.services.voice.audio_frames import AudioChunk, AudioFrameEncoder
+from app.services.voice.streaming_service import VoiceStreamingService
+
+OUTPUT_SAMPLE_RATE = 24000
+SEED = 0
+
+
+def _make_event(chunk_ms: int, rng: random.Random) -> Event:
+    """chunk_ms ミリ秒分の16-bit PCMを持つ音声イベントを作成する"""
+    num_bytes = OUTPUT_SAMPLE_RATE * chunk_ms // 1000 * 2
+    return Event(
+        author="agent",
+        content=types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    inline_data=types.Blob(
+                        mime_type=f"audio/pcm;rate={OUTPUT_SAMPLE_RATE}",
+                        data=rng.randbytes(num_bytes),
+                    )
+                )
+            ],
+        ),
+    )
+
+
+def bench_frames(num_frames: int, chunk_ms: int, binary: bool) -> tuple[float, float]:
+    """1フレームを変換して送信用ペイロードにする処理を計測する
+
+    Args:
+        num_frames: 計測するフレーム数
+        chunk_ms: 1フレームの音声の長さ（ミリ秒）
+        binary: バイナリフレームモードか
+
+    Returns:
+        (1コアあたりのフレーム数/秒, 1フレームあたりのバイト数)
+    """
+    service = VoiceStreamingService(
+        session_service=InMemorySessionService(),  # type: ignore[no-untyped-call]
+        binary_audio=binary,
+    )
+    event = _make_event(chunk_ms, random.Random(SEED))
+    encoder = AudioFrameEncoder()
+    chunks: list[AudioChunk] | None = [] if binary else None
+    total_bytes = 0
+
+    start = time.process_time()
+    for _ in range(num_frames):
+        message = service._convert_event_to_message(event, chunks)
+        if chunks:
+            for chunk in chunks:
+                total_bytes += len(encoder.encode(chunk))
+            chunks.clear()
+        if message is not None:
+            total_bytes += len(message.model_dump_json(exclude_none=True, by_alias=True))
+    elapsed = time.process_time() - start
+    service.close()
+    return num_frames / elapsed, total_bytes / num_frames
+
+
+def _report(label: str, frames_per_sec: float, bytes_per_frame: float) -> None:
+    """計測結果を表示する"""
+    print(f"{label:<16} {frames_per_sec:12,.0f} frames/s/core  {bytes_per_frame:10,.0f} B/frame")
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード
+    """
+    parser = argparse.ArgumentParser(description="Benchmark outbound voice frame encoding")
+    parser.add_argument("--frames", type=int, default=20_000, help="Frames per scenario")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Audio per frame in ms")
+    args = parser.parse_args()
+
+    print(f"frames={args.frames}, chunk={args.chunk_ms}ms @ {OUTPUT_SAMPLE_RATE}Hz")
+    json_fps, json_bytes = bench_frames(args.frames, args.chunk_ms, binary=False)
+    _report("json (base64)", json_fps, json_bytes)
+    binary_fps, binary_bytes = bench_frames(args.frames, args.chunk_ms, binary=True)
+    _report("binary frame", binary_fps, binary_bytes)
+
+    print(f"speedup: {binary_fps / json_fps:.2f}x, bytes: {binary_bytes / json_bytes:.0%} of json")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""記憶エントリを統合してユーザーあたりのエントリ数を上限以下にするスクリプト
+
+古い記憶エントリを話題ごとの要約エントリにまとめる
+（app/services/adk/memory/consolidation.py）。上限以下のユーザーはスキップする。
+
+--checkpoint を指定すると、処理済みのユーザーIDをファイルに1行ずつ追記し、
+再実行時はそれらのユーザーをスキップする（中断したジョブの再開用）。
+
+Usage:
+    python scripts/consolidate_memories.py [--app-name homework-coach] [--max-entries 500]
+        [--retain-recent N] [--checkpoint PATH] [--dry-run] [--verbose]
+
+Environment Variables:
+    MEMORY_MAX_ENTRIES_PER_USER: ユーザーあたりのエントリ数の上限（オプション、デフォルト500）
+    MEMORY_INVERTED_INDEX / MEMORY_RETRIEVAL など: アプリと同じ記憶検索の設定
+        （転置インデックス・埋め込みを統合と同時に更新する。memory_factory.py 参照）
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+from app.services.adk.memory.consolidation import (
+    DEFAULT_MAX_ENTRIES_PER_USER,
+    ExtractiveSummarizer,
+    Summarizer,
+)
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.services.adk.memory.memory_factory import create_firestore_memory_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_APP_NAME = "homework-coach"
+
+# 並列処理設定
+MAX_CONCURRENT = 10
+
+
+def load_checkpoint(path: Path | None) -> set[str]:
+    """処理済みのユーザーIDを読み込む"""
+    if path is None or not path.exists():
+        return set()
+    return {line.strip() for line in path.read_text().splitlines() if line.strip()}
+
+
+def append_checkpoint(path: Path | None, user_id: str) -> None:
+    """処理済みのユーザーIDを追記する"""
+    if path is None:
+        return
+    with path.open("a") as f:
+        f.write(f"{user_id}\n")
+
+
+async def consolidate_single_user(
+    user_id: str,
+    service: FirestoreMemoryService,
+    summarizer: Summarizer,
+    *,
+    app_name: str,
+    max_entries: int,
+    retain_recent: int | None = None,
+    dry_run: bool = False,
+) -> tuple[str, str]:
+    """単一ユーザーの記憶を統合する
+
+    Args:
+        user_id: ユーザーID
+        service: Firestoreメモリサービス
+        summarizer: 要約器
+        app_name: アプリ名
+        max_entries: ユーザーあたりのエントリ数の上限
+        retain_recent: そのまま残す新しいエントリ数
+        dry_run: True の場合、実際には統合しない
+
+    Returns:
+        (user_id, status): statusは "success", "failed", "skipped" のいずれか
+    """
+    try:
+        result = await service.consolidate_user(
+            app_name=app_name,
+            user_id=user_id,
+            summarizer=summarizer,
+            max_entries=max_entries,
+            retain_recent=retain_recent,
+            dry_run=dry_run,
+        )
+        if result.summaries == 0:
+            logger.debug("User %s has %d entries, skipping", user_id, result.entries_before)
+            return (user_id, "skipped")
+
+        logger.info(
+            "%s user %s: %d -> %d entries (%d summaries)",
+            "Would consolidate" if dry_run else "Consolidated",
+            user_id,
+            result.entries_before,
+            result.entries_after,
+            result.summaries,
+        )
+        return (user_id, "success")
+
+    except Exception as e:
+        logger.error("Failed to consolidate user %s: %s", user_id, e)
+        return (user_id, "failed")
+
+
+async def consolidate_memories(
+    service: FirestoreMemoryService | None = None,
+    summarizer: Summarizer | None = None,
+    *,
+    app_name: str = DEFAULT_APP_NAME,
+    max_entries: int | None = None,
+    retain_recent: int | None = None,
+    checkpoint: Path | None = None,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """全ユーザーの記憶を統合する
+
+    Args:
+        service: Firestoreメモリサービス（Noneでアプリと同じ環境変数の設定で作成）
+        summarizer: 要約器（Noneで ExtractiveSummarizer）
+        app_name: アプリ名
+        max_entries: ユーザーあたりのエントリ数の上限（Noneで環境変数またはデフォルト）
+        retain_recent: そのまま残す新しいエントリ数（Noneで上限の半分）
+        checkpoint: 処理済みユーザーIDを記録するファイル（Noneで記録しない）
+        dry_run: True の場合、実際には統合せず対象の確認のみ
+
+    Returns:
+        統計情報 {"success": 10, "failed": 1, "skipped": 2}
+    """
+    if service is None:
+        service = create_firestore_memory_service()
+    if summarizer is None:
+        summarizer = ExtractiveSummarizer()
+    if max_entries is None:
+        max_entries = int(
+            os.environ.get("MEMORY_MAX_ENTRIES_PER_USER", DEFAULT_MAX_ENTRIES_PER_USER)
+        )
+
+    logger.info("Fetching all user IDs from Firestore...")
+    done = load_checkpoint(checkpoint)
+    user_ids = [user_id for user_id in await service.list_user_ids(app_name) if user_id not in done]
+    total = len(user_ids)
+    logger.info("Found %d users (%d already processed)", total, len(done))
+
+    stats = {"success": 0, "failed": 0, "skipped": 0}
+    if total == 0:
+        return stats
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+
+    async def consolidate_with_semaphore(user_id: str) -> tuple[str, str]:
+        async with semaphore:
+            result = await consolidate_single_user(
+                user_id,
+                service,
+                summarizer,
+                app_name=app_name,
+                max_entries=max_entries,
+                retain_recent=retain_recent,
+                dry_run=dry_run,
+            )
+        # 失敗したユーザーは次回の実行で再試行する
+        if result[1] != "failed" and not dry_run:
+            append_checkpoint(checkpoint, user_id)
+        return result
+
+    logger.info(
+        "Starting consolidation (dry_run=%s, max_entries=%d, max_concurrent=%d)",
+        dry_run,
+        max_entries,
+        MAX_CONCURRENT,
+    )
+    results = await asyncio.gather(*[consolidate_with_semaphore(uid) for uid in user_ids])
+
+    for _, status in results:
+        stats[status] += 1
+
+        processed = stats["success"] + stats["failed"] + stats["skipped"]
+        if processed % 1000 == 0:
+            logger.info("Progress: %d/%d users processed", processed, total)
+
+    return stats
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード（0: 成功, 1: 失敗）
+    """
+    parser = argparse.ArgumentParser(description="Consolidate old memory entries per user")
+    parser.add_argument("--app-name", default=DEFAULT_APP_NAME, help="ADK app name")
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=None,
+        help="Maximum memory entries per user (default: MEMORY_MAX_ENTRIES_PER_USER or 500)",
+    )
+    parser.add_argument(
+        "--retain-recent",
+        type=int,
+        default=None,
+        help="Number of newest entries kept as-is (default: half of --max-entries)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=None,
+        help="File recording processed user IDs; processed users are skipped on rerun",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Perform a dry run without actually consolidating",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Enable verbose logging",
+    )
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    try:
+        stats = asyncio.run(
+            consolidate_memories(
+                app_name=args.app_name,
+                max_entries=args.max_entries,
+                retain_recent=args.retain_recent,
+                checkpoint=args.checkpoint,
+                dry_run=args.dry_run,
+            )
+        )
+    except Exception as e:
+        logger.error("Consolidation failed: %s", e, exc_info=True)
+        return 1
+
+    logger.info("Consolidation complete:")
+    logger.info("  Success: %d", stats["success"])
+    logger.info("  Failed:  %d", stats["failed"])
+    logger.info("  Skipped: %d", stats["skipped"])
+
+    return 1 if stats["failed"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
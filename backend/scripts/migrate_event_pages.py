@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Firestoreセッションのイベントをページレイアウトに移行するスクリプト
+
+1イベント1ドキュメントで保存された既存セッションを、複数イベントを1ドキュメントに
+まとめるページレイアウト（app/services/adk/sessions/event_pages.py）に変換する。
+
+推奨手順:
+    1. SESSION_EVENT_LAYOUT=paged でデプロイ（新規セッションはページレイアウト、
+       既存セッションは従来どおり読み書きされる）
+    2. --dry-run で対象セッション数を確認
+    3. 本スクリプトで移行（--delete-source で元のイベントドキュメントを削除。
+       指定しない場合は残るが、移行済みセッションの読み取りには使われない）
+
+Usage:
+    python scripts/migrate_event_pages.py [--dry-run] [--delete-source] [--verbose]
+
+Environment Variables:
+    SESSION_EVENTS_PER_PAGE: 1ページあたりのイベント数（オプション、デフォルト50）
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from app.services.adk.sessions.event_pages import DEFAULT_EVENTS_PER_PAGE, is_paged
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+
+logger = logging.getLogger(__name__)
+
+# 並列処理設定
+MAX_CONCURRENT = 10
+
+
+async def migrate_single_session(
+    session_id: str,
+    service: FirestoreSessionService,
+    dry_run: bool = False,
+    delete_source: bool = False,
+) -> tuple[str, str]:
+    """単一セッションをページレイアウトに移行する
+
+    Args:
+        session_id: セッションID
+        service: ページレイアウトのFirestoreセッションサービス
+        dry_run: True の場合、実際には移行しない
+        delete_source: 移行後に元のイベントドキュメントを削除するか
+
+    Returns:
+        (session_id, status): statusは "success", "failed", "skipped" のいずれか
+    """
+    try:
+        if dry_run:
+            session_data = await service.get_session_data_by_id(session_id)
+            if session_data is None or is_paged(session_data):
+                return (session_id, "skipped")
+            logger.info("Would migrate session %s", session_id)
+            return (session_id, "success")
+
+        migrated = await service.migrate_session_to_pages(session_id, delete_source=delete_source)
+        if migrated < 0:
+            logger.debug("Session %s already migrated or not found, skipping", session_id)
+            return (session_id, "skipped")
+
+        logger.info("Migrated session %s (%d events)", session_id, migrated)
+        return (session_id, "success")
+
+    except Exception as e:
+        logger.error("Failed to migrate session %s: %s", session_id, e)
+        return (session_id, "failed")
+
+
+async def migrate_event_pages(
+    service: FirestoreSessionService | None = None,
+    dry_run: bool = False,
+    delete_source: bool = False,
+) -> dict[str, int]:
+    """全セッションをページレイアウトに移行する
+
+    Args:
+        service: ページレイアウトのFirestoreセッションサービス（テスト用）
+        dry_run: True の場合、実際には移行せず検証のみ
+        delete_source: 移行後に元のイベントドキュメントを削除するか
+
+    Returns:
+        統計情報 {"success": 10, "failed": 1, "skipped": 2}
+    """
+    if service is None:
+        events_per_page = int(os.environ.get("SESSION_EVENTS_PER_PAGE", DEFAULT_EVENTS_PER_PAGE))
+        service = FirestoreSessionService(event_layout="paged", events_per_page=events_per_page)
+
+    logger.info("Fetching all session IDs from Firestore...")
+    session_ids = await service.list_all_session_ids()
+    total = len(session_ids)
+    logger.info("Found %d sessions", total)
+
+    stats = {"success": 0, "failed": 0, "skipped": 0}
+    if total == 0:
+        return stats
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+
+    async def migrate_with_semaphore(session_id: str) -> tuple[str, str]:
+        async with semaphore:
+            return await migrate_single_session(session_id, service, dry_run, delete_source)
+
+    logger.info(
+        "Starting migration (dry_run=%s, delete_source=%s, max_concurrent=%d)",
+        dry_run,
+        delete_source,
+        MAX_CONCURRENT,
+    )
+    results = await asyncio.gather(*[migrate_with_semaphore(sid) for sid in session_ids])
+
+    for _, status in results:
+        stats[status] += 1
+
+        processed = stats["success"] + stats["failed"] + stats["skipped"]
+        if processed % 1000 == 0:
+            logger.info("Progress: %d/%d sessions processed", processed, total)
+
+    return stats
+
+
+def main() -> int:
+    """メイン関数
+
+    Returns:
+        終了コード（0: 成功, 1: 失敗）
+    """
+    parser = argparse.ArgumentParser(description="Migrate session events to the paged layout")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Perform a dry run without actually migrating",
+    )
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Delete the per-event documents after migrating each session",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Enable verbose logging",
+    )
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    try:
+        stats = asyncio.run(
+            migrate_event_pages(dry_run=args.dry_run, delete_source=args.delete_source)
+        )
+    except Exception as e:
+        logger.error("Migration failed: %s", e, exc_info=True)
+        return 1
+
+    logger.info("Migration complete:")
+    logger.info("  Success: %d", stats["success"])
+    logger.info("  Failed:  %d", stats["failed"])
+    logger.info("  Skipped: %d", stats["skipped"])
+
+    return 1 if stats["failed"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
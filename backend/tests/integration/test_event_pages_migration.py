@@ -0,0 +1,54 @@
+"""Integration tests for the event-pages migration script"""
+
+import pytest
+from google.adk.events.event import Event
+
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.testing.fake_firestore import FakeAsyncClient
+from scripts.migrate_event_pages import migrate_event_pages
+
+
+async def _create_legacy_sessions(client: FakeAsyncClient, count: int, num_events: int) -> None:
+    """従来レイアウトのセッションを作成する"""
+    legacy = FirestoreSessionService(client=client)
+    for i in range(count):
+        session = await legacy.create_session(
+            app_name="homework_coach", user_id="user1", session_id=f"session_{i}"
+        )
+        for j in range(num_events):
+            await legacy.append_event(session, Event(author="user", timestamp=float(j)))
+
+
+class TestMigrateEventPages:
+    """Tests for migrate_event_pages function"""
+
+    @pytest.mark.asyncio
+    async def test_migrates_all_sessions(self) -> None:
+        """全セッションをページレイアウトに移行し、2回目はスキップする"""
+        client = FakeAsyncClient()
+        await _create_legacy_sessions(client, count=3, num_events=12)
+        service = FirestoreSessionService(client=client, event_layout="paged", events_per_page=5)
+
+        stats = await migrate_event_pages(service=service, delete_source=True)
+        rerun = await migrate_event_pages(service=service)
+
+        assert stats == {"success": 3, "failed": 0, "skipped": 0}
+        assert rerun == {"success": 0, "failed": 0, "skipped": 3}
+        session = await service.get_session(
+            app_name="homework_coach", user_id="user1", session_id="session_0"
+        )
+        assert session is not None
+        assert [e.timestamp for e in session.events] == [float(j) for j in range(12)]
+
+    @pytest.mark.asyncio
+    async def test_dry_run_does_not_write(self) -> None:
+        """dry-runモードではページを書き込まない"""
+        client = FakeAsyncClient()
+        await _create_legacy_sessions(client, count=2, num_events=3)
+        service = FirestoreSessionService(client=client, event_layout="paged")
+        writes_before = client.writes
+
+        stats = await migrate_event_pages(service=service, dry_run=True)
+
+        assert stats == {"success": 2, "failed": 0, "skipped": 0}
+        assert client.writes == writes_before
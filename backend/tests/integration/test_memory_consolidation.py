@@ -0,0 +1,126 @@
+"""Integration tests for the memory consolidation script"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from app.db.firestore_client import close_firestore_clients, open_firestore_clients
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.testing.fake_firestore import FakeAsyncClient
+from scripts.consolidate_memories import consolidate_memories
+
+APP_NAME = "homework-coach"
+
+
+async def _add_memories(
+    service: FirestoreMemoryService, user_id: str, num_sessions: int, num_events: int
+) -> None:
+    """ユーザーの記憶エントリを作成する（セッション = 話題）"""
+    for i in range(num_sessions):
+        events = [
+            Event(
+                id=f"{user_id}-s{i}-e{j}",
+                author="user",
+                timestamp=float(i * num_events + j),
+                content=types.Content(role="user", parts=[types.Part(text=f"topic{i} note{j}")]),
+            )
+            for j in range(num_events)
+        ]
+        session = Session(id=f"s{i}", app_name=APP_NAME, user_id=user_id, events=events)
+        await service.add_session_to_memory(session)
+
+
+async def _count_entries(client: FakeAsyncClient, user_id: str) -> int:
+    entries = client.document(f"memories/{APP_NAME}/users/{user_id}").collection("entries")
+    return len([doc async for doc in entries.stream()])
+
+
+class TestConsolidateMemories:
+    """Tests for consolidate_memories function"""
+
+    @pytest.mark.asyncio
+    async def test_enforces_cap_per_user(self) -> None:
+        """上限を超えるユーザーのみ統合し、古い記憶も検索できる"""
+        client = FakeAsyncClient()
+        service = FirestoreMemoryService(client=client, inverted_index=True)
+        await _add_memories(service, "big", num_sessions=4, num_events=5)
+        await _add_memories(service, "small", num_sessions=1, num_events=3)
+
+        stats = await consolidate_memories(service=service, app_name=APP_NAME, max_entries=10)
+
+        assert stats == {"success": 1, "failed": 0, "skipped": 1}
+        assert await _count_entries(client, "big") <= 10
+        assert await _count_entries(client, "small") == 3
+        response = await service.search_memory(app_name=APP_NAME, user_id="big", query="topic0")
+        assert response.memories
+        assert response.memories[0].author == "memory"
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_skips_processed_users(self, tmp_path: Path) -> None:
+        """チェックポイントに記録したユーザーは再実行時にスキップする"""
+        client = FakeAsyncClient()
+        service = FirestoreMemoryService(client=client)
+        await _add_memories(service, "u1", num_sessions=3, num_events=4)
+        await _add_memories(service, "u2", num_sessions=3, num_events=4)
+        checkpoint = tmp_path / "consolidation.checkpoint"
+        checkpoint.write_text("u1\n")
+
+        stats = await consolidate_memories(
+            service=service, app_name=APP_NAME, max_entries=6, checkpoint=checkpoint
+        )
+        rerun = await consolidate_memories(
+            service=service, app_name=APP_NAME, max_entries=6, checkpoint=checkpoint
+        )
+
+        assert stats == {"success": 1, "failed": 0, "skipped": 0}
+        assert rerun == {"success": 0, "failed": 0, "skipped": 0}
+        assert await _count_entries(client, "u1") == 12
+        assert await _count_entries(client, "u2") <= 6
+        assert checkpoint.read_text().splitlines() == ["u1", "u2"]
+
+    @pytest.mark.asyncio
+    async def test_dry_run_does_not_write(self) -> None:
+        """dry-runモードでは書き込まない"""
+        client = FakeAsyncClient()
+        service = FirestoreMemoryService(client=client)
+        await _add_memories(service, "u1", num_sessions=3, num_events=4)
+        writes_before = client.writes
+
+        stats = await consolidate_memories(
+            service=service, app_name=APP_NAME, max_entries=6, dry_run=True
+        )
+
+        assert stats == {"success": 1, "failed": 0, "skipped": 0}
+        assert client.writes == writes_before
+
+    @pytest.mark.asyncio
+    async def test_keeps_inverted_index_current(self) -> None:
+        """アプリと同じ設定で統合し、統合後も転置インデックスのみで要約を検索できる"""
+        client = FakeAsyncClient()
+        service = FirestoreMemoryService(client=client, inverted_index=True)
+        await _add_memories(service, "big", num_sessions=4, num_events=5)
+        await service.rebuild_index(app_name=APP_NAME, user_id="big")
+        before = await service.search_memory(app_name=APP_NAME, user_id="big", query="topic0")
+
+        open_firestore_clients(lambda *_: client)
+        try:
+            with patch.dict("os.environ", {"MEMORY_INVERTED_INDEX": "true"}, clear=True):
+                stats = await consolidate_memories(app_name=APP_NAME, max_entries=10)
+        finally:
+            await close_firestore_clients()
+        client.reset_stats()
+        after = await service.search_memory(app_name=APP_NAME, user_id="big", query="topic0")
+
+        assert stats == {"success": 1, "failed": 0, "skipped": 0}
+        assert len(before.memories) == 5
+        assert [memory.author for memory in after.memories] == ["memory"]
+        # 再構築（全エントリの走査）をせずにポスティングリストで検索している
+        assert "query" not in client.op_stats
+        user_doc = await client.document(f"memories/{APP_NAME}/users/big").get()
+        assert user_doc.get("entry_count") == await _count_entries(client, "big")
+        shard = await client.document(f"memories/{APP_NAME}/users/big/terms/topic0/shards/0").get()
+        assert len(shard.get("postings")) == 1
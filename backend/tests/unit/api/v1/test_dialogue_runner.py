@@ -17,8 +17,7 @@ async def async_iter(items: list[Any]) -> AsyncIterator[Any]:
 def create_mock_session_service() -> MagicMock:
     """モックセッションサービスを作成するヘルパー"""
     mock_service = MagicMock()
-    mock_service.get_session = AsyncMock(return_value=None)
-    mock_service.create_session = AsyncMock(return_value=None)
+    mock_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), True))
     return mock_service
 
 
@@ -396,3 +395,33 @@ class TestEventGenerator:
         assert len(events) == 1
         assert "event: error" in events[0]
         assert "テストエラー" in events[0]
+
+    @pytest.mark.asyncio
+    async def test_warms_and_releases_memory(self) -> None:
+        """実行開始時に記憶の読み込みを開始し、終了時に固定を解除する"""
+        from app.api.v1.dialogue_runner import event_generator
+        from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+
+        mock_runner = MagicMock()
+        mock_runner.run = MagicMock(return_value=async_iter([]))
+        mock_memory_service = MagicMock(spec=FirestoreMemoryService)
+
+        events = [
+            event
+            async for event in event_generator(
+                runner=mock_runner,
+                session_service=create_mock_session_service(),
+                user_id="user-123",
+                session_id="session-456",
+                message="テスト",
+                memory_service=mock_memory_service,
+            )
+        ]
+
+        assert "event: done" in events[-1]
+        mock_memory_service.warm_user.assert_called_once_with(
+            app_name="homework-coach", user_id="user-123"
+        )
+        mock_memory_service.release_user.assert_called_once_with(
+            app_name="homework-coach", user_id="user-123"
+        )
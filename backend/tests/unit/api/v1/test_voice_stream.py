@@ -11,11 +11,16 @@ from app.schemas.voice_stream import (
     ADKInlineData,
     ADKTranscription,
 )
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.services.adk.sessions import FirestoreSessionService
+from app.services.voice.audio_frames import AudioChunk, decode_audio_frame
+from app.services.voice.audio_ingest import AudioInputFormat
 
 
 def create_app_with_mocks(
     _mock_streaming_service: MagicMock,
     mock_session_service: MagicMock | None = None,
+    mock_memory_service: MagicMock | None = None,
 ) -> Any:
     """テスト用にモックを注入したFastAPIアプリを作成する"""
     from app.api.v1.voice_stream import get_memory_service, get_session_service
@@ -23,11 +28,13 @@ def create_app_with_mocks(
 
     if mock_session_service is None:
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=None)
-        mock_session_service.create_session = AsyncMock(return_value=None)
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), True))
+
+    if mock_memory_service is None:
+        mock_memory_service = MagicMock()
 
     app.dependency_overrides[get_session_service] = lambda: mock_session_service
-    app.dependency_overrides[get_memory_service] = lambda: MagicMock()
+    app.dependency_overrides[get_memory_service] = lambda: mock_memory_service
 
     return app
 
@@ -52,7 +59,7 @@ class TestWebSocketConnection:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -79,7 +86,7 @@ class TestWebSocketConnection:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -110,7 +117,7 @@ class TestWebSocketConnection:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -148,7 +155,7 @@ class TestWebSocketConnection:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -182,7 +189,7 @@ class TestWebSocketSendText:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -217,7 +224,7 @@ class TestWebSocketSendAudio:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -231,6 +238,116 @@ class TestWebSocketSendAudio:
             app.dependency_overrides.clear()
 
 
+class TestBinaryAudioProtocol:
+    """送信音声のバイナリフレームモードのテスト"""
+
+    @patch("app.api.v1.voice_stream.VoiceStreamingService")
+    def test_sends_audio_as_binary_frames_when_negotiated(
+        self,
+        mock_service_cls: MagicMock,
+    ) -> None:
+        """audio=binary の場合、確認メッセージの後に音声をバイナリフレームで送る"""
+        mock_service = MagicMock()
+
+        async def event_generator(user_id: str, session_id: str) -> Any:  # noqa: ARG001
+            yield AudioChunk(b"\x01\x02\x03\x04", 24000)
+            yield ADKEventMessage(author="agent", turnComplete=True)
+
+        mock_service.receive_events = event_generator
+        mock_service_cls.return_value = mock_service
+
+        app = create_app_with_mocks(mock_service)
+
+        try:
+            client = TestClient(app)
+            with client.websocket_connect("/ws/user-1/session-1?audio=binary") as ws:
+                assert ws.receive_json() == {"type": "protocol", "audio": "binary", "version": 1}
+                header, payload = decode_audio_frame(ws.receive_bytes())
+                assert header.sample_rate == 24000
+                assert header.seq == 0
+                assert payload == b"\x01\x02\x03\x04"
+                assert ws.receive_json()["turnComplete"] is True
+
+            assert mock_service_cls.call_args.kwargs["binary_audio"] is True
+        finally:
+            app.dependency_overrides.clear()
+
+    @patch("app.api.v1.voice_stream.VoiceStreamingService")
+    def test_defaults_to_json_audio(
+        self,
+        mock_service_cls: MagicMock,
+    ) -> None:
+        """audio を指定しない場合は従来のJSONモード（確認メッセージなし）"""
+        mock_service = MagicMock()
+
+        async def event_generator(user_id: str, session_id: str) -> Any:  # noqa: ARG001
+            yield ADKEventMessage(author="agent", turnComplete=True)
+
+        mock_service.receive_events = event_generator
+        mock_service_cls.return_value = mock_service
+
+        app = create_app_with_mocks(mock_service)
+
+        try:
+            client = TestClient(app)
+            with client.websocket_connect("/ws/user-1/session-1") as ws:
+                assert ws.receive_json()["turnComplete"] is True
+
+            assert mock_service_cls.call_args.kwargs["binary_audio"] is False
+        finally:
+            app.dependency_overrides.clear()
+
+
+class TestInputAudioFormat:
+    """受信音声の形式指定のテスト"""
+
+    @patch("app.api.v1.voice_stream.VoiceStreamingService")
+    def test_passes_input_format_to_service(
+        self,
+        mock_service_cls: MagicMock,
+    ) -> None:
+        """クエリパラメータの形式をサービスに渡す"""
+        mock_service = MagicMock()
+
+        async def event_generator(user_id: str, session_id: str) -> Any:  # noqa: ARG001
+            yield ADKEventMessage(author="agent", turnComplete=True)
+
+        mock_service.receive_events = event_generator
+        mock_service_cls.return_value = mock_service
+
+        app = create_app_with_mocks(mock_service)
+
+        try:
+            client = TestClient(app)
+            url = "/ws/user-1/session-1?input_encoding=f32le&input_rate=48000&input_channels=2"
+            with client.websocket_connect(url) as ws:
+                assert ws.receive_json()["turnComplete"] is True
+
+            assert mock_service_cls.call_args.kwargs["input_format"] == AudioInputFormat(
+                "f32le", 48000, 2
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+    @patch("app.api.v1.voice_stream.VoiceStreamingService")
+    def test_unsupported_format_sends_error_and_closes(
+        self,
+        mock_service_cls: MagicMock,
+    ) -> None:
+        """サポートしていない形式はエラーを返して切断する"""
+        app = create_app_with_mocks(MagicMock())
+
+        try:
+            client = TestClient(app)
+            with client.websocket_connect("/ws/user-1/session-1?input_rate=8000") as ws:
+                data = ws.receive_json()
+                assert "error" in data
+
+            mock_service_cls.assert_not_called()
+        finally:
+            app.dependency_overrides.clear()
+
+
 class TestSessionCreation:
     """セッション管理のテスト"""
 
@@ -251,8 +368,7 @@ class TestSessionCreation:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=None)
-        mock_session_service.create_session = AsyncMock(return_value=None)
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), True))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -261,7 +377,9 @@ class TestSessionCreation:
             with client.websocket_connect("/ws/user-1/session-1"):
                 pass
 
-            mock_session_service.create_session.assert_called_once()
+            mock_session_service.get_or_create_session.assert_awaited_once_with(
+                app_name="homework-coach", user_id="user-1", session_id="session-1"
+            )
         finally:
             app.dependency_overrides.clear()
 
@@ -270,7 +388,7 @@ class TestSessionCreation:
         self,
         mock_service_cls: MagicMock,
     ) -> None:
-        """セッションが存在する場合は作成しない"""
+        """セッションが存在する場合もイベントを含む全件読み取りは行わない"""
         mock_service = MagicMock()
 
         async def empty_events(user_id: str, session_id: str) -> Any:  # noqa: ARG001
@@ -282,8 +400,7 @@ class TestSessionCreation:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
-        mock_session_service.create_session = AsyncMock()
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -292,7 +409,8 @@ class TestSessionCreation:
             with client.websocket_connect("/ws/user-1/session-1"):
                 pass
 
-            mock_session_service.create_session.assert_not_called()
+            mock_session_service.get_or_create_session.assert_awaited_once()
+            mock_session_service.get_session.assert_not_called()
         finally:
             app.dependency_overrides.clear()
 
@@ -317,7 +435,7 @@ class TestCleanup:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -330,6 +448,69 @@ class TestCleanup:
         finally:
             app.dependency_overrides.clear()
 
+    @patch("app.api.v1.voice_stream.VoiceStreamingService")
+    def test_flushes_pending_events_on_disconnect(
+        self,
+        mock_service_cls: MagicMock,
+    ) -> None:
+        """切断時に書き込み遅延中のイベントを書き込む"""
+        mock_service = MagicMock()
+
+        async def empty_events(user_id: str, session_id: str) -> Any:  # noqa: ARG001
+            return
+            yield  # noqa: B901
+
+        mock_service.receive_events = empty_events
+        mock_service_cls.return_value = mock_service
+
+        mock_session_service = MagicMock(spec=FirestoreSessionService)
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
+        mock_session_service.flush_events = AsyncMock(return_value=0)
+
+        app = create_app_with_mocks(mock_service, mock_session_service)
+
+        try:
+            client = TestClient(app)
+            with client.websocket_connect("/ws/user-1/session-1"):
+                pass
+
+            mock_session_service.flush_events.assert_awaited_once_with("session-1")
+        finally:
+            app.dependency_overrides.clear()
+
+    @patch("app.api.v1.voice_stream.VoiceStreamingService")
+    def test_warms_and_releases_memory(
+        self,
+        mock_service_cls: MagicMock,
+    ) -> None:
+        """接続時に記憶の読み込みを開始し、切断時に固定を解除する"""
+        mock_service = MagicMock()
+
+        async def empty_events(user_id: str, session_id: str) -> Any:  # noqa: ARG001
+            return
+            yield  # noqa: B901
+
+        mock_service.receive_events = empty_events
+        mock_service_cls.return_value = mock_service
+
+        mock_memory_service = MagicMock(spec=FirestoreMemoryService)
+
+        app = create_app_with_mocks(mock_service, mock_memory_service=mock_memory_service)
+
+        try:
+            client = TestClient(app)
+            with client.websocket_connect("/ws/user-1/session-1"):
+                pass
+
+            mock_memory_service.warm_user.assert_called_once_with(
+                app_name="homework-coach", user_id="user-1"
+            )
+            mock_memory_service.release_user.assert_called_once_with(
+                app_name="homework-coach", user_id="user-1"
+            )
+        finally:
+            app.dependency_overrides.clear()
+
 
 class TestErrorHandling:
     """エラーハンドリングのテスト"""
@@ -344,7 +525,7 @@ class TestErrorHandling:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(
+        mock_session_service.get_or_create_session = AsyncMock(
             side_effect=RuntimeError("Firestore connection failed")
         )
 
@@ -364,7 +545,7 @@ class TestErrorHandling:
     ) -> None:
         """VoiceStreamingService初期化失敗時にクライアントにエラーを送信する"""
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         with patch(
             "app.api.v1.voice_stream.VoiceStreamingService",
@@ -398,7 +579,7 @@ class TestErrorHandling:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
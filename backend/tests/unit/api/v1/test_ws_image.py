@@ -21,8 +21,7 @@ def create_app_with_mocks(
 
     if mock_session_service is None:
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=None)
-        mock_session_service.create_session = AsyncMock(return_value=None)
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), True))
 
     app.dependency_overrides[get_session_service] = lambda: mock_session_service
     app.dependency_overrides[get_memory_service] = lambda: MagicMock()
@@ -78,7 +77,7 @@ class TestStartWithImageSuccess:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -112,7 +111,7 @@ class TestStartWithImageSuccess:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -147,7 +146,7 @@ class TestStartWithImageSuccess:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -180,7 +179,7 @@ class TestStartWithImageSuccess:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -212,7 +211,7 @@ class TestStartWithImageSuccess:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -249,7 +248,7 @@ class TestStartWithImageError:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -278,7 +277,7 @@ class TestStartWithImageError:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -310,7 +309,7 @@ class TestStartWithImageError:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -342,7 +341,7 @@ class TestStartWithImageError:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
@@ -380,7 +379,7 @@ class TestStartWithImageCoexistence:
         mock_service_cls.return_value = mock_service
 
         mock_session_service = MagicMock()
-        mock_session_service.get_session = AsyncMock(return_value=MagicMock())
+        mock_session_service.get_or_create_session = AsyncMock(return_value=(MagicMock(), False))
 
         app = create_app_with_mocks(mock_service, mock_session_service)
 
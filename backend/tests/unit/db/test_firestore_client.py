@@ -0,0 +1,110 @@
+"""共有Firestoreクライアントのテスト"""
+
+from collections.abc import Iterator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import firestore_client
+from app.db.firestore_client import (
+    FirestoreClientRegistry,
+    close_firestore_clients,
+    get_shared_firestore_client,
+    open_firestore_clients,
+)
+
+
+def make_client(project_id: str | None, database: str) -> MagicMock:
+    """モッククライアント（gRPCトランスポート生成済み）"""
+    client = MagicMock(name=f"{project_id}/{database}")
+    client._firestore_api_internal.transport.close = AsyncMock()
+    return client
+
+
+@pytest.fixture(autouse=True)
+def reset_registry() -> Iterator[None]:
+    """テストごとにレジストリを破棄する"""
+    yield
+    firestore_client._registry = None
+
+
+class TestFirestoreClientRegistry:
+    """FirestoreClientRegistryのテスト"""
+
+    def test_shares_client_per_project_and_database(self) -> None:
+        """同じ (project, database) には同じクライアントを返す"""
+        factory = MagicMock(side_effect=make_client)
+        registry = FirestoreClientRegistry(factory)
+
+        first = registry.get("p", "(default)")
+        second = registry.get("p", "(default)")
+        other = registry.get("p", "other")
+
+        assert first is second
+        assert other is not first
+        assert factory.call_count == 2
+
+    async def test_close_closes_clients(self) -> None:
+        """close で全クライアントのHTTPセッションとgRPCトランスポートを閉じる"""
+        registry = FirestoreClientRegistry(make_client)
+        clients = [registry.get("p", "a"), registry.get("p", "b")]
+
+        await registry.close()
+
+        for client in clients:
+            client.close.assert_called_once()
+            client._firestore_api_internal.transport.close.assert_awaited_once()
+        assert len(registry) == 0
+
+    async def test_close_skips_unused_transport(self) -> None:
+        """gRPCトランスポート未生成のクライアントはトランスポートを生成せずに閉じる"""
+        registry = FirestoreClientRegistry(lambda _p, _d: MagicMock(_firestore_api_internal=None))
+        client = registry.get("p", "a")
+
+        await registry.close()
+
+        client.close.assert_called_once()
+
+
+class TestSharedClient:
+    """モジュールレベルのレジストリのテスト"""
+
+    def test_none_when_registry_not_open(self) -> None:
+        """レジストリが開かれていない場合はNone（各サービスが個別に生成）"""
+        assert get_shared_firestore_client() is None
+
+    async def test_shared_between_session_and_memory_services(self) -> None:
+        """lifespan中はセッション・メモリサービスが同じクライアントを使う"""
+        from app.services.adk.memory.memory_factory import create_memory_service
+        from app.services.adk.sessions.session_factory import create_firestore_session_service
+
+        open_firestore_clients(make_client)
+        with patch.dict("os.environ", {}, clear=True):
+            session_service = create_firestore_session_service()
+            memory_service = create_memory_service()
+
+        assert session_service._db is memory_service._db  # type: ignore[attr-defined]
+        assert session_service._db is get_shared_firestore_client()
+
+        await close_firestore_clients()
+        assert get_shared_firestore_client() is None
+
+
+class TestLifespan:
+    """app.main のlifespanのテスト"""
+
+    def test_opens_and_closes_registry(self) -> None:
+        """起動時にレジストリを開き、終了時に閉じる"""
+        from app.main import app
+
+        with (
+            patch.object(firestore_client, "_default_factory", side_effect=make_client),
+            TestClient(app),
+        ):
+            client = get_shared_firestore_client()
+            assert client is not None
+
+        assert get_shared_firestore_client() is None
+        client.close.assert_called_once()
+        client._firestore_api_internal.transport.close.assert_awaited_once()
@@ -0,0 +1,11 @@
+"""ADKサービスのテスト用フィクスチャ"""
+
+import pytest
+
+from app.testing.fake_firestore import FakeAsyncClient
+
+
+@pytest.fixture
+def fake_client() -> FakeAsyncClient:
+    """インメモリFirestoreクライアント"""
+    return FakeAsyncClient()
@@ -0,0 +1,26 @@
+"""記憶サービスのテスト用フィクスチャ"""
+
+from typing import Any
+
+import pytest
+
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.testing.fake_firestore import FakeAsyncClient
+
+
+@pytest.fixture
+def service_options() -> dict[str, Any]:
+    """FirestoreMemoryService の追加の引数
+
+    設定の異なるテストクラスはクラス内で再定義する
+    （複数の設定で検証する場合は params で parametrize する）。
+    """
+    return {}
+
+
+@pytest.fixture
+def service(
+    fake_client: FakeAsyncClient, service_options: dict[str, Any]
+) -> FirestoreMemoryService:
+    """インメモリクライアントを使うFirestoreMemoryService"""
+    return FirestoreMemoryService(client=fake_client, **service_options)
@@ -0,0 +1,90 @@
+"""consolidation のテスト"""
+
+from typing import Any
+
+from app.services.adk.memory.consolidation import (
+    MIXED_TOPIC,
+    ConsolidationGroup,
+    ExtractiveSummarizer,
+    build_summary_entry,
+    plan_consolidation,
+)
+
+
+def _entry(text: str, timestamp: float, session_id: str = "s1") -> dict[str, Any]:
+    return {
+        "event_id": f"e{timestamp:g}",
+        "session_id": session_id,
+        "timestamp": timestamp,
+        "content": {"role": "user", "parts": [{"text": text}]},
+        "custom_metadata": {},
+    }
+
+
+class TestPlanConsolidation:
+    """plan_consolidation のテスト"""
+
+    def test_no_groups_within_cap(self) -> None:
+        """上限以下の場合は統合しない"""
+        entries = {f"e{i}": _entry("x", i) for i in range(3)}
+
+        assert plan_consolidation(entries, max_entries=3) == []
+
+    def test_groups_old_entries_by_topic(self) -> None:
+        """新しいエントリを残し、古いエントリを話題（セッション）ごとにまとめる"""
+        entries = {
+            "a1": _entry("x", 1, "math"),
+            "b1": _entry("x", 2, "kanji"),
+            "a2": _entry("x", 3, "math"),
+            "b2": _entry("x", 4, "kanji"),
+            "new": _entry("x", 5, "math"),
+        }
+
+        groups = plan_consolidation(entries, max_entries=4, retain_recent=1)
+
+        assert groups == [
+            ConsolidationGroup("kanji", ["b1", "b2"]),
+            ConsolidationGroup("math", ["a1", "a2"]),
+        ]
+
+    def test_merges_oldest_topics_to_enforce_cap(self) -> None:
+        """話題が多すぎる場合は最も古い話題どうしをまとめて上限を守る"""
+        entries = {f"e{i}": _entry("x", i, f"topic{i}") for i in range(10)}
+
+        groups = plan_consolidation(entries, max_entries=3, retain_recent=1)
+        merged = sum(len(group.entry_ids) for group in groups)
+
+        assert len(entries) - merged + len(groups) <= 3
+        assert groups[-1].topic == MIXED_TOPIC
+        assert groups[-1].entry_ids == [f"e{i}" for i in range(8)]
+
+
+class TestBuildSummaryEntry:
+    """build_summary_entry / ExtractiveSummarizer のテスト"""
+
+    async def test_summary_keeps_latest_timestamp_and_source_count(self) -> None:
+        """要約はグループの最新のタイムスタンプと元のエントリ数を持つ"""
+        entries = {
+            "a": _entry("わり算  のあまり", 1),
+            "b": {**_entry("九九", 2), "custom_metadata": {"source_count": 3}},
+        }
+        group = ConsolidationGroup("s1", ["a", "b"])
+
+        summary = await build_summary_entry(group, entries, ExtractiveSummarizer())
+
+        assert summary["event_id"] == group.summary_id
+        assert summary["timestamp"] == 2
+        assert summary["content"]["parts"] == [{"text": "わり算 のあまり / 九九"}]
+        assert summary["custom_metadata"] == {
+            "consolidated": True,
+            "topic": "s1",
+            "source_count": 4,
+        }
+
+    async def test_extractive_summary_prefers_newest_texts(self) -> None:
+        """最大文字数を超える場合は新しいテキストを残す"""
+        summarizer = ExtractiveSummarizer(max_chars=13, chars_per_text=5)
+
+        summary = await summarizer.summarize("t", ["aaaaaaa", "bbbbbbb", "ccccccc"])
+
+        assert summary == "bbbbb / ccccc"
@@ -0,0 +1,128 @@
+"""embeddings のテスト"""
+
+import numpy as np
+import pytest
+
+from app.services.adk.memory.embeddings import (
+    EMBEDDING_DTYPE,
+    EmbeddingCache,
+    HashingEmbedder,
+    UserEmbeddings,
+    cosine_top_k,
+    decode_embedding,
+    encode_embedding,
+)
+
+
+class TestHashingEmbedder:
+    """HashingEmbedder のテスト"""
+
+    def test_rows_are_normalized(self) -> None:
+        """各行はL2正規化される（トークンのないテキストはゼロベクトル）"""
+        matrix = HashingEmbedder(dim=64).embed(["わり算の宿題", "!!!"])
+
+        assert matrix.shape == (2, 64)
+        assert np.linalg.norm(matrix[0]) == pytest.approx(1.0)
+        assert not matrix[1].any()
+
+    def test_is_deterministic(self) -> None:
+        """プロセスをまたいでも同じテキストは同じベクトルになる"""
+        first = HashingEmbedder(dim=64).embed(["fractions are hard"])
+        second = HashingEmbedder(dim=64).embed(["fractions are hard"])
+
+        np.testing.assert_array_equal(first, second)
+
+    def test_similar_texts_are_closer(self) -> None:
+        """共通のn-gramが多いテキストほど類似度が高い"""
+        query, near, far = HashingEmbedder().embed(["わり算", "わり算がむずかしい", "漢字の練習"])
+
+        assert float(query @ near) > float(query @ far)
+
+    def test_rejects_non_positive_dim(self) -> None:
+        """次元数は正の整数"""
+        with pytest.raises(ValueError):
+            HashingEmbedder(dim=0)
+
+
+class TestEncoding:
+    """encode_embedding / decode_embedding のテスト"""
+
+    def test_round_trip_as_float16(self) -> None:
+        """float16のバイト列として保存し、同じ次元で復元する"""
+        vector = HashingEmbedder(dim=32).embed(["apple pie"])[0]
+
+        data = encode_embedding(vector)
+        decoded = decode_embedding(data, 32)
+
+        assert len(data) == 32 * 2
+        assert decoded is not None
+        assert decoded.dtype == EMBEDDING_DTYPE
+        np.testing.assert_allclose(decoded, vector, atol=1e-3)
+
+    def test_dimension_mismatch_returns_none(self) -> None:
+        """次元数が異なる場合は None（再計算が必要）"""
+        data = encode_embedding(np.zeros(16, dtype=np.float32))
+
+        assert decode_embedding(data, 32) is None
+
+
+class TestCosineTopK:
+    """cosine_top_k のテスト"""
+
+    def test_returns_top_k_in_descending_order(self) -> None:
+        """類似度の高い順に top_k 件を返す（同点は行番号順、0以下は除く）"""
+        matrix = np.array(
+            [[1.0, 0.0], [0.6, 0.8], [0.0, 1.0], [-1.0, 0.0], [0.6, 0.8]],
+            dtype=EMBEDDING_DTYPE,
+        )
+        query = np.array([1.0, 0.0], dtype=np.float32)
+
+        assert [row for row, _ in cosine_top_k(matrix, query, 3)] == [0, 1, 4]
+        assert [row for row, _ in cosine_top_k(matrix, query, 10)] == [0, 1, 4]
+
+    def test_empty_matrix(self) -> None:
+        """エントリがない場合は空"""
+        matrix = np.zeros((0, 4), dtype=EMBEDDING_DTYPE)
+
+        assert cosine_top_k(matrix, np.ones(4, dtype=np.float32), 5) == []
+
+
+class TestEmbeddingCache:
+    """EmbeddingCache / UserEmbeddings のテスト"""
+
+    def _embeddings(self, *entry_ids: str) -> UserEmbeddings:
+        return UserEmbeddings(
+            entry_ids=list(entry_ids),
+            matrix=np.zeros((len(entry_ids), 2), dtype=EMBEDDING_DTYPE),
+        )
+
+    def test_evicts_least_recently_used_user(self) -> None:
+        """上限を超えると最も長く使われていないユーザーを追い出す"""
+        cache = EmbeddingCache(max_users=2)
+        cache.put("app", "a", self._embeddings("e1"))
+        cache.put("app", "b", self._embeddings("e2"))
+        cache.get("app", "a", 0)
+
+        cache.put("app", "c", self._embeddings("e3"))
+
+        assert cache.get("app", "b", 0) is None
+        assert cache.get("app", "a", 0) is not None
+        assert len(cache) == 2
+
+    def test_discards_matrix_of_other_version(self) -> None:
+        """memory_version が異なる行列は破棄する"""
+        cache = EmbeddingCache()
+        cache.put("app", "a", self._embeddings("e1"))
+
+        assert cache.get("app", "a", 1) is None
+        assert ("app", "a") not in cache
+
+    def test_extend_appends_and_replaces_rows(self) -> None:
+        """新しいエントリは追加し、既存のエントリIDは置き換える"""
+        embeddings = self._embeddings("e1", "e2")
+
+        embeddings.extend(["e2", "e3"], np.array([[1.0, 0.0], [0.0, 1.0]]))
+
+        assert embeddings.entry_ids == ["e1", "e2", "e3"]
+        assert embeddings.matrix.dtype == EMBEDDING_DTYPE
+        np.testing.assert_array_equal(embeddings.matrix, [[0, 0], [1, 0], [0, 1]])
@@ -2,13 +2,19 @@
 
 from collections.abc import AsyncIterator
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 from google.adk.events.event import Event
 from google.adk.sessions.session import Session
 from google.genai import types
 
+from app.services.adk.memory.consolidation import ExtractiveSummarizer
+from app.services.adk.memory.embeddings import HashingEmbedder
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.services.adk.memory.hot_index import HotMemoryIndex
+from app.testing.fake_firestore import FakeAsyncClient
+
 
 async def async_iter(items: list[Any]) -> AsyncIterator[Any]:
     """リストをasync iteratorに変換するヘルパー"""
@@ -19,216 +25,153 @@ async def async_iter(items: list[Any]) -> AsyncIterator[Any]:
 class TestAddSessionToMemory:
     """add_session_to_memory メソッドのテスト"""
 
-    @pytest.mark.asyncio
-    async def test_adds_session_events_to_memory(self) -> None:
-        """セッションのイベントを記憶に追加する"""
-        from app.services.adk.memory.firestore_memory_service import (
-            FirestoreMemoryService,
+    def _session(self, *events: Event) -> Session:
+        return Session(
+            id="session-1",
+            app_name="test-app",
+            user_id="user-1",
+            state={},
+            events=list(events),
         )
 
-        with patch("google.cloud.firestore.AsyncClient") as mock_client_class:
-            mock_client = MagicMock()
-            mock_client_class.return_value = mock_client
-
-            # コレクション/ドキュメント参照のモック
-            mock_entries_collection = MagicMock()
-            mock_doc_ref = MagicMock()
-            mock_doc_ref.set = AsyncMock()
-            mock_entries_collection.document.return_value = mock_doc_ref
-
-            mock_users_collection = MagicMock()
-            mock_users_collection.document.return_value.collection.return_value = (
-                mock_entries_collection
-            )
-
-            mock_app_doc = MagicMock()
-            mock_app_doc.collection.return_value = mock_users_collection
-
-            mock_memories_collection = MagicMock()
-            mock_memories_collection.document.return_value = mock_app_doc
-
-            mock_client.collection.return_value = mock_memories_collection
-
-            service = FirestoreMemoryService()
+    async def _entry_ids(self, fake_client: FakeAsyncClient) -> list[str]:
+        entries = fake_client.document("memories/test-app/users/user-1").collection("entries")
+        return [doc.id async for doc in entries.stream()]
 
-            # テスト用セッション
-            session = Session(
-                id="session-1",
-                app_name="test-app",
-                user_id="user-1",
-                state={},
-                events=[
-                    Event(
-                        id="event-1",
-                        invocation_id="inv-1",
-                        author="user",
-                        timestamp=1234567890.0,
-                        content=types.Content(
-                            role="user",
-                            parts=[types.Part(text="Hello")],
-                        ),
-                    ),
-                ],
-            )
-
-            await service.add_session_to_memory(session)
-
-            # Firestoreに書き込まれたか確認
-            mock_doc_ref.set.assert_called_once()
-            call_args = mock_doc_ref.set.call_args[0][0]
-            assert call_args["session_id"] == "session-1"
-            assert call_args["author"] == "user"
-
-    @pytest.mark.asyncio
-    async def test_adds_multiple_events(self) -> None:
-        """複数イベントのセッションを追加する"""
-        from app.services.adk.memory.firestore_memory_service import (
-            FirestoreMemoryService,
+    async def test_adds_session_events_to_memory(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """セッションのイベントを記憶に追加する"""
+        # Act
+        result = await service.add_session_to_memory(self._session(_text_event("event-1", "Hello")))
+
+        # Assert
+        doc = await fake_client.document("memories/test-app/users/user-1/entries/event-1").get()
+        assert doc.get("session_id") == "session-1"
+        assert doc.get("author") == "user"
+        assert (result.written, result.skipped) == (1, 0)
+
+    async def test_adds_multiple_events_in_one_batch(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """複数イベントを1回のバッチcommitで書き込む"""
+        # Act
+        await service.add_session_to_memory(
+            self._session(_text_event("event-1", "Question"), _text_event("event-2", "Answer"))
         )
 
-        with patch("google.cloud.firestore.AsyncClient") as mock_client_class:
-            mock_client = MagicMock()
-            mock_client_class.return_value = mock_client
-
-            mock_entries_collection = MagicMock()
-            mock_doc_ref = MagicMock()
-            mock_doc_ref.set = AsyncMock()
-            mock_entries_collection.document.return_value = mock_doc_ref
-
-            mock_users_collection = MagicMock()
-            mock_users_collection.document.return_value.collection.return_value = (
-                mock_entries_collection
-            )
-
-            mock_app_doc = MagicMock()
-            mock_app_doc.collection.return_value = mock_users_collection
-
-            mock_memories_collection = MagicMock()
-            mock_memories_collection.document.return_value = mock_app_doc
-
-            mock_client.collection.return_value = mock_memories_collection
+        # Assert
+        assert await self._entry_ids(fake_client) == ["event-1", "event-2"]
+        assert fake_client.op_stats["commit"].calls == 1
+        assert "set" not in fake_client.op_stats
 
-            service = FirestoreMemoryService()
-
-            session = Session(
-                id="session-1",
-                app_name="test-app",
-                user_id="user-1",
-                state={},
-                events=[
-                    Event(
-                        id="event-1",
-                        invocation_id="inv-1",
-                        author="user",
-                        timestamp=1234567890.0,
-                        content=types.Content(
-                            role="user",
-                            parts=[types.Part(text="Question")],
-                        ),
-                    ),
-                    Event(
-                        id="event-2",
-                        invocation_id="inv-1",
-                        author="model",
-                        timestamp=1234567891.0,
-                        content=types.Content(
-                            role="model",
-                            parts=[types.Part(text="Answer")],
-                        ),
-                    ),
-                ],
-            )
-
-            await service.add_session_to_memory(session)
-
-            # 2回書き込まれたか確認
-            assert mock_doc_ref.set.call_count == 2
-
-    @pytest.mark.asyncio
-    async def test_skips_events_without_content(self) -> None:
+    async def test_skips_events_without_content(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
         """コンテンツなしイベントはスキップする"""
-        from app.services.adk.memory.firestore_memory_service import (
-            FirestoreMemoryService,
-        )
-
-        with patch("google.cloud.firestore.AsyncClient") as mock_client_class:
-            mock_client = MagicMock()
-            mock_client_class.return_value = mock_client
-
-            mock_entries_collection = MagicMock()
-            mock_doc_ref = MagicMock()
-            mock_doc_ref.set = AsyncMock()
-            mock_entries_collection.document.return_value = mock_doc_ref
-
-            mock_users_collection = MagicMock()
-            mock_users_collection.document.return_value.collection.return_value = (
-                mock_entries_collection
+        # Act
+        result = await service.add_session_to_memory(
+            self._session(
+                Event(id="event-1", invocation_id="inv-1", author="user"),
+                _text_event("event-2", "Valid content"),
             )
-
-            mock_app_doc = MagicMock()
-            mock_app_doc.collection.return_value = mock_users_collection
-
-            mock_memories_collection = MagicMock()
-            mock_memories_collection.document.return_value = mock_app_doc
-
-            mock_client.collection.return_value = mock_memories_collection
-
-            service = FirestoreMemoryService()
-
-            session = Session(
-                id="session-1",
-                app_name="test-app",
-                user_id="user-1",
-                state={},
-                events=[
-                    Event(
-                        id="event-1",
-                        invocation_id="inv-1",
-                        author="user",
-                        timestamp=1234567890.0,
-                        # コンテンツなし
-                    ),
-                    Event(
-                        id="event-2",
-                        invocation_id="inv-1",
-                        author="user",
-                        timestamp=1234567891.0,
-                        content=types.Content(
-                            role="user",
-                            parts=[types.Part(text="Valid content")],
-                        ),
-                    ),
-                ],
-            )
-
-            await service.add_session_to_memory(session)
-
-            # 1回のみ書き込まれたか確認（コンテンツありのイベントのみ）
-            assert mock_doc_ref.set.call_count == 1
-
-    @pytest.mark.asyncio
-    async def test_handles_empty_session(self) -> None:
-        """イベントなしセッションを処理する"""
-        from app.services.adk.memory.firestore_memory_service import (
-            FirestoreMemoryService,
         )
 
-        with patch("google.cloud.firestore.AsyncClient") as mock_client_class:
-            mock_client = MagicMock()
-            mock_client_class.return_value = mock_client
+        # Assert
+        assert await self._entry_ids(fake_client) == ["event-2"]
+        assert (result.written, result.skipped) == (1, 0)
+
+    async def test_handles_empty_session(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """イベントなしセッションは何も書き込まない"""
+        # Act
+        result = await service.add_session_to_memory(self._session())
+
+        # Assert
+        assert (result.written, result.skipped) == (0, 0)
+        assert "commit" not in fake_client.op_stats
+
+    async def test_writes_only_new_events_on_repeated_calls(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """同じセッションを再度追加した場合は新しいイベントのみを書き込む"""
+        # Arrange
+        events = [_text_event(f"e{i}", f"message {i}") for i in range(3)]
+        await service.add_session_to_memory(self._session(*events))
+        fake_client.reset_stats()
+
+        # Act
+        unchanged = await service.add_session_to_memory(self._session(*events))
+        grown = await service.add_session_to_memory(
+            self._session(*events, _text_event("e3", "message 3"))
+        )
 
-            service = FirestoreMemoryService()
+        # Assert
+        assert (unchanged.written, unchanged.skipped) == (0, 3)
+        assert (grown.written, grown.skipped) == (1, 3)
+        # 変化のない追加は書き込まない（書き込み済み位置の読み取りのみ）
+        assert fake_client.op_stats["commit"].calls == 1
+        # 新しいエントリ + memory_version + 書き込み済み位置
+        assert fake_client.op_stats["commit"].writes == 3
+        assert await self._entry_ids(fake_client) == ["e0", "e1", "e2", "e3"]
+
+    async def test_rewrites_when_events_diverge(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """書き込み済み位置のイベントが一致しない場合は最初から確認し、保存済みはスキップする"""
+        # Arrange
+        await service.add_session_to_memory(
+            self._session(_text_event("a", "first"), _text_event("b", "second"))
+        )
 
-            session = Session(
-                id="session-1",
-                app_name="test-app",
-                user_id="user-1",
-                state={},
-                events=[],
-            )
+        # Act
+        result = await service.add_session_to_memory(
+            self._session(_text_event("a", "first"), _text_event("c", "rewound"))
+        )
 
-            # エラーなく完了する
-            await service.add_session_to_memory(session)
+        # Assert
+        assert (result.written, result.skipped) == (1, 1)
+        assert await self._entry_ids(fake_client) == ["a", "b", "c"]
+        watermark = await fake_client.document(
+            "memories/test-app/users/user-1/sessions/session-1"
+        ).get()
+        assert watermark.to_dict() == {"event_count": 2, "last_event_id": "c"}
+
+    async def test_indexed_counts_are_not_inflated_by_repeated_calls(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """転置インデックスの統計は同じセッションの再追加で増えない"""
+        # Arrange
+        service = FirestoreMemoryService(client=fake_client, inverted_index=True)
+        session = self._session(_text_event("e1", "fractions are hard"))
+
+        # Act
+        await service.add_session_to_memory(session)
+        await service.add_session_to_memory(session)
+
+        # Assert
+        user_doc = await fake_client.document("memories/test-app/users/user-1").get()
+        assert (user_doc.get("entry_count"), user_doc.get("total_terms")) == (1, 3)
+
+    async def test_indexed_counts_are_not_inflated_when_watermark_is_lost(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """書き込み済み位置を失っても、保存済みのエントリは統計・memory_version に数えない"""
+        # Arrange
+        service = FirestoreMemoryService(client=fake_client, inverted_index=True)
+        session = self._session(_text_event("e1", "fractions are hard"))
+        await service.add_session_to_memory(session)
+        await fake_client.document("memories/test-app/users/user-1/sessions/session-1").delete()
+
+        # Act
+        result = await service.add_session_to_memory(session)
+
+        # Assert
+        assert (result.written, result.skipped) == (0, 1)
+        user_doc = await fake_client.document("memories/test-app/users/user-1").get()
+        assert (user_doc.get("entry_count"), user_doc.get("total_terms")) == (1, 3)
+        assert user_doc.get("memory_version") == 1
 
 
 class TestSearchMemory:
@@ -470,3 +413,505 @@ class TestInitialization:
         with patch("google.cloud.firestore.AsyncClient") as mock_client_class:
             FirestoreMemoryService(database="custom-db")
             mock_client_class.assert_called_once_with(project=None, database="custom-db")
+
+
+def _text_event(event_id: str, text: str) -> Event:
+    """テキストを持つイベントを作成するヘルパー"""
+    return Event(
+        id=event_id,
+        author="user",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+    )
+
+
+class TestInvertedIndexSearch:
+    """転置インデックスによる検索のテスト"""
+
+    @pytest.fixture
+    def service_options(self) -> dict[str, Any]:
+        """転置インデックス有効のサービス"""
+        return {"inverted_index": True}
+
+    async def _add(self, service: FirestoreMemoryService, *events: Event) -> None:
+        session = Session(id="s1", app_name="homework_coach", user_id="user-1", events=list(events))
+        await service.add_session_to_memory(session)
+
+    async def test_reads_only_posting_lists_and_matches(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """検索はクエリの語のポスティングリストと上位のエントリのみを読む"""
+        # Arrange
+        await self._add(
+            service,
+            *(_text_event(f"e{i:03d}", f"filler text number {i}") for i in range(50)),
+            _text_event("apple", "I like Apple pie"),
+            _text_event("banana", "banana split"),
+        )
+        # 初回検索でインデックスを構築済みにする
+        await service.rebuild_index(app_name="homework_coach", user_id="user-1")
+        fake_client.reset_stats()
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="apple banana cherry"
+        )
+
+        # Assert
+        # 短いエントリほどBM25スコアが高い
+        assert [memory.id for memory in response.memories] == ["banana", "apple"]
+        # ユーザー + 3語 + 長さ + マッチした2エントリ（シャード1つ）
+        assert fake_client.reads == 1 + 3 + 1 + 2
+        assert "query" not in fake_client.op_stats
+
+    async def test_first_search_builds_index_from_existing_entries(
+        self, fake_client: FakeAsyncClient, service: FirestoreMemoryService
+    ) -> None:
+        """インデックス導入前のエントリも最初の検索で構築され、以降は走査しない"""
+        # Arrange
+        await self._add(
+            FirestoreMemoryService(client=fake_client), _text_event("old", "math homework")
+        )
+
+        # Act
+        first = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="homework"
+        )
+        fake_client.reset_stats()
+        second = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="homework"
+        )
+
+        # Assert
+        assert [memory.id for memory in first.memories] == ["old"]
+        assert [memory.id for memory in second.memories] == ["old"]
+        assert "query" not in fake_client.op_stats
+
+    async def test_adding_sessions_merges_posting_lists(
+        self, fake_client: FakeAsyncClient, service: FirestoreMemoryService
+    ) -> None:
+        """別のセッションで同じ語を追加してもポスティングは失われない"""
+        # Arrange
+        await service.rebuild_index(app_name="homework_coach", user_id="user-1")
+
+        # Act
+        await self._add(service, _text_event("a", "fractions are hard"))
+        await self._add(service, _text_event("b", "fractions again, fractions"))
+
+        # Assert
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="Fractions"
+        )
+        # 出現回数の多いエントリが上位
+        assert [memory.id for memory in response.memories] == ["b", "a"]
+        term_doc = await fake_client.document(
+            "memories/homework_coach/users/user-1/terms/fractions/shards/0"
+        ).get()
+        assert term_doc.get("postings") == {"a": 1, "b": 2}
+        lengths_doc = await fake_client.document(
+            "memories/homework_coach/users/user-1/entry_lengths/0"
+        ).get()
+        assert lengths_doc.get("lengths") == {"a": 3, "b": 3}
+        user_doc = await fake_client.document("memories/homework_coach/users/user-1").get()
+        assert (user_doc.get("entry_count"), user_doc.get("total_terms")) == (2, 6)
+
+    async def test_batches_respect_write_limit(
+        self, fake_client: FakeAsyncClient, service: FirestoreMemoryService
+    ) -> None:
+        """書き込みが500件を超える場合は複数のバッチに分ける"""
+        # Act
+        await self._add(
+            service,
+            *(_text_event(f"e{i:03d}", f"word{chr(97 + i % 26)}") for i in range(600)),
+        )
+
+        # Assert
+        assert fake_client.op_stats["commit"].calls == 2
+        # エントリ + 語 + 長さ + ユーザーの統計 + memory_version + 書き込み済み位置
+        assert fake_client.op_stats["commit"].writes == 600 + 26 + 1 + 1 + 1 + 1
+
+    async def test_shards_postings_and_reads_every_shard(
+        self, fake_client: FakeAsyncClient, service: FirestoreMemoryService
+    ) -> None:
+        """エントリ数に応じてポスティングを複数シャードに分け、検索は全シャードを読む"""
+        # Arrange
+        await self._add(
+            service,
+            *(_text_event(f"e{i:03d}", f"apple number {i}") for i in range(40)),
+        )
+        with patch("app.services.adk.memory.firestore_memory_service.shard_count", return_value=4):
+            await service.rebuild_index(app_name="homework_coach", user_id="user-1")
+        fake_client.reset_stats()
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="apple"
+        )
+
+        # Assert
+        # (ユーザー + 語 + 長さ) + 残り3シャード分の (語 + 長さ) + 上位10エントリ
+        assert fake_client.reads == 3 + 3 * 2 + 10
+        assert len(response.memories) == 10
+        shards = fake_client.document(
+            "memories/homework_coach/users/user-1/terms/apple"
+        ).collection("shards")
+        shard_postings = [doc.get("postings") async for doc in shards.stream()]
+        assert len(shard_postings) == 4
+        assert sum(len(postings) for postings in shard_postings) == 40
+
+    async def test_rebuild_removes_unused_shards_and_legacy_documents(
+        self, fake_client: FakeAsyncClient, service: FirestoreMemoryService
+    ) -> None:
+        """シャード数が減ったシャードと旧形式の語ドキュメントは再構築で削除する"""
+        # Arrange
+        await self._add(service, _text_event("a", "apple pie"))
+        user_ref = fake_client.document("memories/homework_coach/users/user-1")
+        await user_ref.set({"index_version": 2, "index_shards": 3}, merge=True)
+        legacy = user_ref.collection("terms").document("apple")
+        stale = legacy.collection("shards").document("2")
+        await legacy.set({"term": "apple", "postings": {"a": 1}, "lengths": {"a": 2}})
+        await stale.set({"term": "apple", "postings": {"gone": 1}})
+
+        # Act
+        await service.rebuild_index(app_name="homework_coach", user_id="user-1")
+
+        # Assert
+        assert not (await legacy.get()).exists
+        assert not (await stale.get()).exists
+        current = await legacy.collection("shards").document("0").get()
+        assert current.get("postings") == {"a": 1}
+
+    async def test_consolidation_updates_index_with_entries(
+        self, fake_client: FakeAsyncClient, service: FirestoreMemoryService
+    ) -> None:
+        """統合は要約の追加と元のエントリの削除をインデックスと同じバッチで反映する"""
+        # Arrange
+        await self._add(
+            service,
+            *(_text_event(f"e{i:03d}", f"apple note {i}") for i in range(20)),
+        )
+        await service.rebuild_index(app_name="homework_coach", user_id="user-1")
+        fake_client.reset_stats()
+
+        # Act
+        result = await service.consolidate_user(
+            app_name="homework_coach",
+            user_id="user-1",
+            summarizer=ExtractiveSummarizer(),
+            max_entries=10,
+        )
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="apple"
+        )
+
+        # Assert
+        # 全エントリの走査は統合対象の読み込みの1回のみ（再構築しない）
+        assert fake_client.op_stats["query"].calls == 1
+        assert fake_client.op_stats["commit"].calls == result.summaries == 1
+        assert len(response.memories) == result.entries_after
+        postings = await fake_client.document(
+            "memories/homework_coach/users/user-1/terms/apple/shards/0"
+        ).get()
+        assert len(postings.get("postings")) == result.entries_after
+        user_doc = await fake_client.document("memories/homework_coach/users/user-1").get()
+        assert user_doc.get("entry_count") == result.entries_after
+
+
+class TestJapaneseSearch:
+    """日本語の記憶検索とBM25ランキングのテスト"""
+
+    @pytest.fixture(params=[False, True], ids=["scan", "inverted_index"])
+    def service_options(self, request: pytest.FixtureRequest) -> dict[str, Any]:
+        """全件走査と転置インデックスの両方で検証する"""
+        return {"inverted_index": request.param, "top_k": 2}
+
+    async def _add(self, service: FirestoreMemoryService, *events: Event) -> None:
+        session = Session(id="s1", app_name="homework_coach", user_id="user-1", events=list(events))
+        await service.add_session_to_memory(session)
+
+    async def test_matches_japanese_query(self, service: FirestoreMemoryService) -> None:
+        """分かち書きのない日本語もn-gramでマッチする"""
+        # Arrange
+        await self._add(
+            service,
+            _text_event("kuku", "九九の七の段がむずかしい"),
+            _text_event("kanji", "漢字の書き取りをがんばった"),
+        )
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="七の段"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["kuku"]
+
+    async def test_normalizes_width_variants(self, service: FirestoreMemoryService) -> None:
+        """全角英数字・半角カナはNFKC正規化してマッチする"""
+        # Arrange
+        await self._add(service, _text_event("e1", "ﾃｽﾄで１００点"))
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="テスト 100"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["e1"]
+
+    async def test_returns_top_k_by_bm25(self, service: FirestoreMemoryService) -> None:
+        """BM25スコアの高い順に top_k 件を返す"""
+        # Arrange
+        await self._add(
+            service,
+            _text_event("weak", "今日は算数と国語と理科と社会の宿題をした"),
+            _text_event("strong", "わり算わり算わり算"),
+            _text_event("medium", "わり算をした"),
+            _text_event("none", "体育で走った"),
+        )
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="わり算"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["strong", "medium"]
+
+
+class TestVectorSearch:
+    """埋め込みベクトルによる検索のテスト"""
+
+    @pytest.fixture
+    def service_options(self) -> dict[str, Any]:
+        """埋め込み検索を有効にしたサービス"""
+        return {"embedder": HashingEmbedder(dim=128), "top_k": 2}
+
+    async def _add(self, service: FirestoreMemoryService, *events: Event) -> None:
+        session = Session(id="s1", app_name="homework_coach", user_id="user-1", events=list(events))
+        await service.add_session_to_memory(session)
+
+    async def test_stores_float16_embedding(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """埋め込みは追加時に計算し、float16のバイト列で保存する"""
+        # Act
+        await self._add(service, _text_event("e1", "わり算がむずかしい"))
+
+        # Assert
+        doc = await fake_client.document("memories/homework_coach/users/user-1/entries/e1").get()
+        assert len(doc.get("embedding")) == 128 * 2
+
+    async def test_returns_most_similar_entries(self, service: FirestoreMemoryService) -> None:
+        """クエリとの類似度の高い順に top_k 件を返す"""
+        # Arrange
+        await self._add(
+            service,
+            _text_event("division", "わり算のあまりがむずかしい"),
+            _text_event("kanji", "漢字の書き取りをがんばった"),
+            _text_event("division2", "わり算"),
+            _text_event("pe", "体育で走った"),
+        )
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="わり算のあまり"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["division", "division2"]
+
+    async def test_caches_user_matrix(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """2回目以降の検索は行列を読み込まず、追加したエントリも検索できる"""
+        # Arrange
+        await self._add(service, _text_event("e1", "九九の七の段"))
+        await service.search_memory(app_name="homework_coach", user_id="user-1", query="七の段")
+        await self._add(service, _text_event("e2", "分数のたし算"))
+        fake_client.reset_stats()
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="分数"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["e2"]
+        assert "query" not in fake_client.op_stats
+        # memory_version + 上位k件のエントリ
+        assert fake_client.reads == 2
+
+    async def test_reloads_matrix_after_write_from_other_instance(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """他のインスタンスが書き込んだエントリは、memory_version の変化で読み込み直す"""
+        # Arrange
+        await self._add(service, _text_event("e1", "九九の七の段"))
+        await service.search_memory(app_name="homework_coach", user_id="user-1", query="七の段")
+        other = FirestoreMemoryService(client=fake_client, embedder=HashingEmbedder(dim=128))
+        session = Session(
+            id="s2",
+            app_name="homework_coach",
+            user_id="user-1",
+            events=[_text_event("e2", "分数のたし算")],
+        )
+        await other.add_session_to_memory(session)
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="分数"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["e2"]
+
+    async def test_embeds_entries_added_without_embedder(
+        self, service: FirestoreMemoryService, fake_client: FakeAsyncClient
+    ) -> None:
+        """埋め込み導入前のエントリは読み込み時に計算する"""
+        # Arrange
+        await self._add(
+            FirestoreMemoryService(client=fake_client), _text_event("old", "時計の読み方")
+        )
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="時計"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["old"]
+
+
+class TestHotIndexSearch:
+    """ホットインデックスによるインメモリ検索のテスト"""
+
+    @pytest.fixture
+    def hot_index(self) -> HotMemoryIndex:
+        """プロセス共有を想定したホットインデックス"""
+        return HotMemoryIndex()
+
+    async def _add(self, service: FirestoreMemoryService, session_id: str, *events: Event) -> None:
+        session = Session(
+            id=session_id, app_name="homework_coach", user_id="user-1", events=list(events)
+        )
+        await service.add_session_to_memory(session)
+
+    @pytest.mark.parametrize("vector", [False, True], ids=["bm25", "vector"])
+    async def test_search_reads_nothing_after_warm(
+        self, fake_client: FakeAsyncClient, hot_index: HotMemoryIndex, vector: bool
+    ) -> None:
+        """読み込み後の検索と追加したエントリの検索はFirestoreを読まない"""
+        # Arrange
+        service = FirestoreMemoryService(
+            client=fake_client,
+            hot_index=hot_index,
+            embedder=HashingEmbedder(dim=128) if vector else None,
+        )
+        await self._add(service, "s1", _text_event("kuku", "九九の七の段がむずかしい"))
+        task = service.warm_user(app_name="homework_coach", user_id="user-1")
+        assert task is not None
+        await task
+        await self._add(service, "s2", _text_event("bunsu", "分数のたし算"))
+        fake_client.reset_stats()
+
+        # Act
+        kuku = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="七の段"
+        )
+        bunsu = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="分数"
+        )
+
+        # Assert
+        assert [memory.id for memory in kuku.memories] == ["kuku"]
+        assert [memory.id for memory in bunsu.memories] == ["bunsu"]
+        assert fake_client.reads == 0
+        assert hot_index.stats.hits == 2
+
+    async def test_falls_back_to_firestore_before_warm(
+        self, fake_client: FakeAsyncClient, hot_index: HotMemoryIndex
+    ) -> None:
+        """読み込み前のユーザーはFirestoreで検索する"""
+        # Arrange
+        service = FirestoreMemoryService(client=fake_client, hot_index=hot_index)
+        await self._add(service, "s1", _text_event("e1", "漢字の練習"))
+
+        # Act
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="漢字"
+        )
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["e1"]
+        assert hot_index.stats.misses == 1
+
+    async def test_shared_across_service_instances(
+        self, fake_client: FakeAsyncClient, hot_index: HotMemoryIndex
+    ) -> None:
+        """リクエストごとのサービスインスタンスでもインデックスを共有する"""
+        # Arrange
+        warm_service = FirestoreMemoryService(client=fake_client, hot_index=hot_index)
+        await self._add(warm_service, "s1", _text_event("e1", "時計の読み方"))
+        task = warm_service.warm_user(app_name="homework_coach", user_id="user-1")
+        assert task is not None
+        await task
+        fake_client.reset_stats()
+
+        # Act
+        response = await FirestoreMemoryService(
+            client=fake_client, hot_index=hot_index
+        ).search_memory(app_name="homework_coach", user_id="user-1", query="時計")
+
+        # Assert
+        assert [memory.id for memory in response.memories] == ["e1"]
+        assert fake_client.reads == 0
+
+    async def test_warm_reloads_when_another_instance_wrote(
+        self, fake_client: FakeAsyncClient, hot_index: HotMemoryIndex
+    ) -> None:
+        """他のプロセスが書き込んだ記憶は、次の接続時の確認で読み込み直す"""
+        # Arrange: このプロセスで読み込んだ後、別プロセス（別インデックス）が追加する
+        service = FirestoreMemoryService(client=fake_client, hot_index=hot_index)
+        await self._add(service, "s1", _text_event("e1", "時計の読み方"))
+        task = service.warm_user(app_name="homework_coach", user_id="user-1")
+        assert task is not None
+        await task
+        service.release_user(app_name="homework_coach", user_id="user-1")
+        other = FirestoreMemoryService(client=fake_client, hot_index=HotMemoryIndex())
+        await self._add(other, "s2", _text_event("e2", "時計の長い針"))
+
+        # Act
+        task = service.warm_user(app_name="homework_coach", user_id="user-1")
+        assert task is not None
+        await task
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="時計"
+        )
+
+        # Assert
+        assert sorted(memory.id for memory in response.memories) == ["e1", "e2"]
+        assert hot_index.stats.loads == 2
+        assert hot_index.stats.hits == 1
+
+    async def test_warm_keeps_current_user_without_reloading(
+        self, fake_client: FakeAsyncClient, hot_index: HotMemoryIndex
+    ) -> None:
+        """このプロセスの書き込みのみの場合は memory_version の確認だけで読み込み直さない"""
+        # Arrange
+        service = FirestoreMemoryService(client=fake_client, hot_index=hot_index)
+        await self._add(service, "s1", _text_event("e1", "時計の読み方"))
+        task = service.warm_user(app_name="homework_coach", user_id="user-1")
+        assert task is not None
+        await task
+        await self._add(service, "s2", _text_event("e2", "時計の長い針"))
+        fake_client.reset_stats()
+
+        # Act
+        task = service.warm_user(app_name="homework_coach", user_id="user-1")
+        assert task is not None
+        await task
+
+        # Assert
+        assert hot_index.stats.loads == 1
+        assert fake_client.reads == 1
@@ -0,0 +1,154 @@
+"""hot_index のテスト"""
+
+import asyncio
+from typing import Any
+
+from app.services.adk.memory.hot_index import HotMemoryIndex, HotUserMemory
+
+
+def _entry(text: str) -> dict[str, Any]:
+    return {"content": {"role": "user", "parts": [{"text": text}]}}
+
+
+class TestHotUserMemory:
+    """HotUserMemory のテスト"""
+
+    def test_search_after_incremental_add(self) -> None:
+        """追加したエントリをBM25で検索できる"""
+        memory = HotUserMemory()
+        memory.add({"a": _entry("fractions are hard"), "b": _entry("kanji practice")})
+        memory.add({"c": _entry("fractions fractions")})
+
+        results = memory.search_terms(["fractions"], top_k=10)
+
+        assert results == [_entry("fractions fractions"), _entry("fractions are hard")]
+
+    def test_replacing_entry_removes_old_postings(self) -> None:
+        """同じエントリIDの追加は古い語のポスティングを削除する"""
+        memory = HotUserMemory()
+        memory.add({"a": _entry("apple")})
+
+        memory.add({"a": _entry("banana")})
+
+        assert memory.search_terms(["apple"], top_k=10) == []
+        assert memory.search_terms(["banana"], top_k=10) == [_entry("banana")]
+        assert "apple" not in memory.index
+
+
+class TestHotMemoryIndex:
+    """HotMemoryIndex のテスト"""
+
+    async def _load(self, index: HotMemoryIndex, user_id: str) -> None:
+        async def loader() -> HotUserMemory:
+            return HotUserMemory()
+
+        task = index.start_load("app", user_id, loader)
+        assert task is not None
+        await task
+
+    async def test_evicts_only_released_users(self) -> None:
+        """接続中のユーザーは上限を超えても追い出さず、切断後にLRUで追い出す"""
+        index = HotMemoryIndex(max_users=1)
+        index.acquire("app", "a")
+        await self._load(index, "a")
+        index.acquire("app", "b")
+        await self._load(index, "b")
+        assert len(index) == 2
+
+        index.release("app", "a")
+
+        assert index.get("app", "a") is None
+        assert index.get("app", "b") is not None
+        assert index.stats.evictions == 1
+
+    async def test_applies_entries_added_while_loading(self) -> None:
+        """読み込み中に追加されたエントリは読み込み完了時に反映する"""
+        index = HotMemoryIndex()
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def loader() -> HotUserMemory:
+            started.set()
+            await release.wait()
+            return HotUserMemory()
+
+        task = index.start_load("app", "a", loader)
+        assert task is not None
+        await started.wait()
+        index.add_entries("app", "a", {"new": _entry("added during load")})
+        release.set()
+        await task
+
+        memory = index.get("app", "a")
+        assert memory is not None
+        assert list(memory.entries) == ["new"]
+
+    async def test_shares_in_flight_load(self) -> None:
+        """読み込み中のユーザーは同じタスクを共有し、読み込み済みなら読み込まない"""
+        index = HotMemoryIndex()
+        calls = 0
+
+        async def loader() -> HotUserMemory:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return HotUserMemory()
+
+        first = index.start_load("app", "a", loader)
+        second = index.start_load("app", "a", loader)
+        assert first is second
+        assert first is not None
+        await first
+
+        assert index.start_load("app", "a", loader) is None
+        assert calls == 1
+
+    async def test_reloads_loaded_user_only_when_version_changed(self) -> None:
+        """読み込み済みのユーザーは memory_version が変わった場合のみ読み込み直す"""
+        index = HotMemoryIndex()
+        calls = 0
+        version = 3
+
+        async def loader() -> HotUserMemory:
+            nonlocal calls
+            calls += 1
+            return HotUserMemory(entries={f"e{calls}": _entry("loaded")}, version=version)
+
+        async def current_version() -> int:
+            return version
+
+        await self._load_with(index, loader, current_version)
+        await self._load_with(index, loader, current_version)
+        assert calls == 1
+
+        version = 4
+        await self._load_with(index, loader, current_version)
+
+        memory = index.get("app", "a")
+        assert memory is not None
+        assert calls == 2
+        assert list(memory.entries) == ["e2"]
+
+    async def test_own_writes_keep_loaded_user_current(self) -> None:
+        """このインデックスに反映した書き込みは version を進め、読み込み直さない"""
+        index = HotMemoryIndex()
+        calls = 0
+
+        async def loader() -> HotUserMemory:
+            nonlocal calls
+            calls += 1
+            return HotUserMemory(version=1)
+
+        async def current_version() -> int:
+            return 2
+
+        await self._load_with(index, loader, current_version)
+        index.add_entries("app", "a", {"new": _entry("written here")})
+        await self._load_with(index, loader, current_version)
+
+        assert calls == 1
+
+    async def _load_with(self, index: HotMemoryIndex, loader: Any, current_version: Any) -> None:
+        task = index.start_load("app", "a", loader, current_version=current_version)
+        assert task is not None
+        await task
@@ -0,0 +1,97 @@
+"""inverted_index のテスト"""
+
+from app.services.adk.memory.inverted_index import (
+    TermPostings,
+    bm25_top_k,
+    build_postings,
+    entry_shard,
+    query_terms,
+    shard_count,
+    split_by_shard,
+    term_doc_id,
+)
+
+
+def _entry(text: str) -> dict[str, object]:
+    return {"content": {"role": "user", "parts": [{"text": text}]}}
+
+
+class TestQueryTerms:
+    """query_terms のテスト"""
+
+    def test_removes_duplicates_keeping_order(self) -> None:
+        """重複を除き出現順に返す"""
+        assert query_terms("Apple pie, APPLE") == ["apple", "pie"]
+
+
+class TestTermDocId:
+    """term_doc_id のテスト"""
+
+    def test_escapes_path_separators(self) -> None:
+        """ドキュメントIDに使えない文字をエスケープする"""
+        assert "/" not in term_doc_id("a/b")
+        assert term_doc_id("apple") == "apple"
+
+
+class TestBuildPostings:
+    """build_postings のテスト"""
+
+    def test_counts_term_frequency_per_entry(self) -> None:
+        """語ごとにエントリIDと出現回数を集計する"""
+        postings, lengths = build_postings({"e1": _entry("add add subtract"), "e2": _entry("add")})
+
+        assert postings == {
+            "add": TermPostings(postings={"e1": 2, "e2": 1}),
+            "subtract": TermPostings(postings={"e1": 1}),
+        }
+        assert lengths == {"e1": 3, "e2": 1}
+
+    def test_skips_entries_without_text(self) -> None:
+        """テキストのないエントリは含まない"""
+        assert build_postings({"e1": {"content": {"parts": []}}}) == ({}, {})
+
+
+class TestSharding:
+    """シャード分割のテスト"""
+
+    def test_shard_count_keeps_shards_half_full(self) -> None:
+        """1シャードあたり平均で上限の半分になるシャード数"""
+        assert shard_count(0) == 1
+        assert shard_count(1000) == 1
+        assert shard_count(1001) == 2
+        assert shard_count(10_000) == 10
+
+    def test_split_by_shard_is_stable(self) -> None:
+        """エントリIDごとに同じシャードに分け、全エントリを含む"""
+        values = {f"e{i}": i for i in range(100)}
+
+        split = split_by_shard(values, 4)
+
+        assert set(split) <= {0, 1, 2, 3}
+        assert sum(len(shard) for shard in split.values()) == 100
+        for shard, shard_values in split.items():
+            assert all(entry_shard(entry_id, 4) == shard for entry_id in shard_values)
+
+
+class TestBm25TopK:
+    """bm25_top_k のテスト"""
+
+    def test_rare_terms_weigh_more(self) -> None:
+        """出現エントリの少ない語に一致したエントリが上位になる"""
+        index = {
+            "common": TermPostings(postings={"a": 1, "b": 1, "c": 1}),
+            "rare": TermPostings(postings={"c": 1}),
+        }
+        lengths = {"a": 2, "b": 2, "c": 2}
+
+        ranked = bm25_top_k(index, lengths, entry_count=3, average_length=2.0, top_k=3)
+
+        assert [entry_id for entry_id, _ in ranked] == ["c", "a", "b"]
+
+    def test_limits_to_top_k(self) -> None:
+        """top_k 件に制限する"""
+        index = {"x": TermPostings(postings={"a": 3, "b": 2, "c": 1})}
+
+        ranked = bm25_top_k(index, {}, entry_count=10, average_length=1.0, top_k=2)
+
+        assert [entry_id for entry_id, _ in ranked] == ["a", "b"]
@@ -7,6 +7,7 @@ from unittest.mock import MagicMock, patch
 
 from google.adk.memory import BaseMemoryService, VertexAiMemoryBankService
 
+from app.services.adk.memory.embeddings import HashingEmbedder
 from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
 from app.services.adk.memory.memory_factory import create_memory_service
 
@@ -100,3 +101,101 @@ class TestCreateMemoryServiceReturnType:
         """AGENT_ENGINE_ID 設定時も BaseMemoryService のサブクラス"""
         service = create_memory_service()
         assert isinstance(service, BaseMemoryService)
+
+
+class TestCreateMemoryServiceInvertedIndex:
+    """MEMORY_INVERTED_INDEX の設定"""
+
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict("os.environ", {}, clear=True)
+    def test_disabled_by_default(self, _mock_client: MagicMock) -> None:
+        """デフォルトでは全件走査で検索する"""
+        service = create_memory_service()
+        assert isinstance(service, FirestoreMemoryService)
+        assert service._inverted_index is False
+
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict("os.environ", {"MEMORY_INVERTED_INDEX": "true"}, clear=True)
+    def test_enabled_by_env(self, _mock_client: MagicMock) -> None:
+        """環境変数で転置インデックスを有効化する"""
+        service = create_memory_service()
+        assert isinstance(service, FirestoreMemoryService)
+        assert service._inverted_index is True
+
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict("os.environ", {"MEMORY_SEARCH_TOP_K": "3"}, clear=True)
+    def test_top_k_from_env(self, _mock_client: MagicMock) -> None:
+        """検索結果の最大件数を環境変数で設定する"""
+        service = create_memory_service()
+        assert isinstance(service, FirestoreMemoryService)
+        assert service._top_k == 3
+
+
+class TestCreateMemoryServiceVectorRetrieval:
+    """MEMORY_RETRIEVAL の設定"""
+
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict("os.environ", {}, clear=True)
+    def test_keyword_by_default(self, _mock_client: MagicMock) -> None:
+        """デフォルトではキーワード検索（埋め込みなし）"""
+        service = create_memory_service()
+        assert isinstance(service, FirestoreMemoryService)
+        assert service._embedder is None
+
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict(
+        "os.environ",
+        {"MEMORY_RETRIEVAL": "vector", "MEMORY_EMBEDDING_DIM": "64"},
+        clear=True,
+    )
+    def test_vector_uses_hashing_embedder(self, _mock_client: MagicMock) -> None:
+        """ "vector" でハッシュ埋め込みによる検索を有効化する"""
+        service = create_memory_service()
+        assert isinstance(service, FirestoreMemoryService)
+        assert isinstance(service._embedder, HashingEmbedder)
+        assert service._embedder.dim == 64
+
+
+class TestCreateMemoryServiceHotIndex:
+    """MEMORY_HOT_INDEX の設定"""
+
+    @patch("app.services.adk.memory.memory_factory._shared_hot_index", None)
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict("os.environ", {}, clear=True)
+    def test_disabled_by_default(self, _mock_client: MagicMock) -> None:
+        """デフォルトではホットインデックスを使わない"""
+        service = create_memory_service()
+        assert isinstance(service, FirestoreMemoryService)
+        assert service._hot_index is None
+
+    @patch("app.services.adk.memory.memory_factory._shared_hot_index", None)
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict("os.environ", {"MEMORY_HOT_INDEX": "true"}, clear=True)
+    def test_shared_between_services(self, _mock_client: MagicMock) -> None:
+        """有効時はサービスインスタンス間で同じインデックスを共有する"""
+        first = create_memory_service()
+        second = create_memory_service()
+        assert isinstance(first, FirestoreMemoryService)
+        assert isinstance(second, FirestoreMemoryService)
+        assert first._hot_index is not None
+        assert first._hot_index is second._hot_index
+
+
+class TestCreateMemoryServiceEmbeddingCache:
+    """埋め込み行列キャッシュの共有"""
+
+    @patch("app.services.adk.memory.memory_factory._shared_embedding_cache", None)
+    @patch("google.cloud.firestore.AsyncClient", return_value=MagicMock())
+    @patch.dict(
+        "os.environ",
+        {"MEMORY_RETRIEVAL": "vector", "MEMORY_EMBEDDING_CACHE_USERS": "8"},
+        clear=True,
+    )
+    def test_shared_between_services(self, _mock_client: MagicMock) -> None:
+        """リクエストごとに作成するサービス間で同じキャッシュを共有する"""
+        first = create_memory_service()
+        second = create_memory_service()
+        assert isinstance(first, FirestoreMemoryService)
+        assert isinstance(second, FirestoreMemoryService)
+        assert first._embedding_cache is second._embedding_cache
+        assert first._embedding_cache._max_users == 8
@@ -0,0 +1,35 @@
+"""tokenizer のテスト"""
+
+from app.services.adk.memory.tokenizer import normalize, tokenize
+
+
+class TestNormalize:
+    """normalize のテスト"""
+
+    def test_nfkc_and_lowercase(self) -> None:
+        """全角英数字・半角カナを正規化して小文字化する"""
+        assert normalize("ＡＢＣ１２３ ｶﾅ") == "abc123 カナ"
+
+
+class TestTokenize:
+    """tokenize のテスト"""
+
+    def test_japanese_bigrams_and_trigrams(self) -> None:
+        """かな・漢字は2文字と3文字のn-gramに分割する"""
+        assert tokenize("たし算") == ["たし", "し算", "たし算"]
+
+    def test_single_character_run(self) -> None:
+        """1文字のみの連続部分はその文字をトークンとする"""
+        assert tokenize("数") == ["数"]
+
+    def test_ascii_words_and_numbers(self) -> None:
+        """英数字は単語単位（小文字化）、記号は区切り"""
+        assert tokenize("Apple 3+5=8") == ["apple", "3", "5", "8"]
+
+    def test_mixed_text_splits_runs(self) -> None:
+        """日本語と英数字が混在する場合は連続部分ごとに分割する"""
+        assert tokenize("九九は81こ") == ["九九", "九は", "九九は", "81", "こ"]
+
+    def test_empty_text(self) -> None:
+        """トークンがない場合は空リスト"""
+        assert tokenize("、。!?") == []
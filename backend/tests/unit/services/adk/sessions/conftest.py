@@ -0,0 +1,26 @@
+"""セッションサービスのテスト用フィクスチャ"""
+
+from typing import Any
+
+import pytest
+
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.testing.fake_firestore import FakeAsyncClient
+
+
+@pytest.fixture
+def service_options() -> dict[str, Any]:
+    """FirestoreSessionService の追加の引数
+
+    設定の異なるテストクラスはクラス内で再定義する
+    （複数の設定で検証する場合は params で parametrize する）。
+    """
+    return {}
+
+
+@pytest.fixture
+def service(
+    fake_client: FakeAsyncClient, service_options: dict[str, Any]
+) -> FirestoreSessionService:
+    """インメモリクライアントを使うFirestoreSessionService"""
+    return FirestoreSessionService(client=fake_client, **service_options)
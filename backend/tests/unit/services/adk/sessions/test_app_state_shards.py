@@ -0,0 +1,246 @@
+"""app状態のシャーディングと書き込み集約のテスト"""
+
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+
+from app.services.adk.sessions.app_state_shards import AppStateCoalescer, merge_shards
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.state_cache import StateCache
+from app.testing.fake_firestore import FakeAsyncClient, FakeCollectionReference
+
+APP_NAME = "homework_coach"
+USER_ID = "user-1"
+
+
+def shards_collection(client: FakeAsyncClient) -> FakeCollectionReference:
+    """シャードサブコレクション参照"""
+    return client.collection("app_state").document(APP_NAME).collection("shards")
+
+
+async def append_app_delta(
+    service: FirestoreSessionService, session_id: str, delta: dict[str, object], timestamp: float
+) -> None:
+    """app状態差分付きのイベントを追加するヘルパー"""
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    if session is None:
+        session = await service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+    await service.append_event(
+        session,
+        Event(
+            author="agent",
+            timestamp=timestamp,
+            actions=EventActions(state_delta={f"app:{k}": v for k, v in delta.items()}),
+        ),
+    )
+
+
+class TestMergeShards:
+    """シャードのマージのテスト"""
+
+    def test_latest_write_wins(self) -> None:
+        """同じキーは updated が新しいシャードの値を採用する"""
+        shards = [
+            {"values": {"a": 1, "b": 1}, "updated": {"a": 2.0, "b": 1.0}},
+            {"values": {"a": 2, "b": 2}, "updated": {"a": 1.0, "b": 3.0}},
+        ]
+
+        assert merge_shards({"a": 0, "legacy": True}, shards) == {"a": 1, "b": 2, "legacy": True}
+
+
+class TestShardedAppState:
+    """app_state_shards 指定時のFirestoreSessionServiceのテスト"""
+
+    @pytest.fixture
+    def service_options(self) -> dict[str, Any]:
+        """4シャードのFirestoreSessionService"""
+        return {"app_state_shards": 4}
+
+    async def test_writes_spread_across_shards(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """セッションごとに異なるシャードへ書き込み、読み取り時にマージする"""
+        # Arrange
+        for i in range(20):
+            await append_app_delta(service, f"s{i}", {f"key_{i}": i}, 1000.0 + i)
+
+        # Act
+        session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s0")
+
+        # Assert
+        assert session is not None
+        assert {session.state[f"app:key_{i}"] for i in range(20)} == set(range(20))
+        assert len([ref async for ref in shards_collection(fake_client).list_documents()]) > 1
+        base = await fake_client.collection("app_state").document(APP_NAME).get()
+        assert not base.exists
+
+    async def test_latest_value_wins_across_sessions(
+        self, service: FirestoreSessionService
+    ) -> None:
+        """別シャードに書かれた同じキーは最新の書き込みを採用する"""
+        for i in range(8):
+            await append_app_delta(service, f"s{i}", {"counter": i}, 1000.0 + i)
+
+        session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s0")
+
+        assert session is not None
+        assert session.state["app:counter"] == 7
+
+    async def test_reads_legacy_document(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """シャーディング前の単一ドキュメントもマージして読み取る"""
+        await fake_client.collection("app_state").document(APP_NAME).set({"legacy": 1, "x": 0})
+        await append_app_delta(service, "s1", {"x": 1}, 1000.0)
+
+        session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        assert session is not None
+        assert session.state["app:legacy"] == 1
+        assert session.state["app:x"] == 1
+
+    async def test_reads_base_and_shards_in_one_call(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """app状態（従来ドキュメント + シャード）とuser状態は1回のget_allで読み取る"""
+        await append_app_delta(service, "s1", {"x": 1}, 1000.0)
+
+        with patch.object(fake_client, "get_all", wraps=fake_client.get_all) as get_all_spy:
+            await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        assert [len(call.args[0]) for call in get_all_spy.call_args_list] == [1 + 4 + 1]
+
+
+class TestAppStateCoalescer:
+    """AppStateCoalescerのテスト"""
+
+    @pytest.fixture
+    def coalescer(self) -> AppStateCoalescer:
+        """自動フラッシュしない書き込み集約"""
+        return AppStateCoalescer(num_shards=4, flush_interval_seconds=3600, shard_index=2)
+
+    async def test_batches_deltas_into_one_write(
+        self, fake_client: FakeAsyncClient, coalescer: AppStateCoalescer
+    ) -> None:
+        """複数セッションの差分を1回の書き込みにまとめる"""
+        # Arrange
+        service = FirestoreSessionService(
+            client=fake_client, app_state_shards=4, app_state_coalescer=coalescer
+        )
+        for i in range(10):
+            await append_app_delta(service, f"s{i}", {"counter": i, f"k{i}": True}, 1000.0 + i)
+        writes_before = fake_client.writes
+
+        # Act
+        written = await coalescer.flush()
+        await coalescer.stop()
+
+        # Assert
+        assert written == 1
+        assert fake_client.writes - writes_before == 1
+        assert coalescer.stats.deltas == 10
+        shard = await shards_collection(fake_client).document("2").get()
+        assert shard.get("values")["counter"] == 9
+        assert len(shard.get("values")) == 11
+
+    async def test_pending_deltas_visible_before_flush(self, fake_client: FakeAsyncClient) -> None:
+        """フラッシュ前の差分も読み取り時に反映され、フラッシュ後はキャッシュを無効化する"""
+        # Arrange
+        state_cache = StateCache()
+        coalescer = AppStateCoalescer(
+            num_shards=4, flush_interval_seconds=3600, state_cache=state_cache
+        )
+        service = FirestoreSessionService(
+            client=fake_client,
+            state_cache=state_cache,
+            app_state_shards=4,
+            app_state_coalescer=coalescer,
+        )
+        await append_app_delta(service, "s1", {"x": 1}, 1000.0)
+
+        # Act
+        before_flush = await service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id="s1"
+        )
+        await coalescer.stop()
+        after_flush = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert before_flush is not None
+        assert after_flush is not None
+        assert before_flush.state["app:x"] == 1
+        assert after_flush.state["app:x"] == 1
+        assert coalescer.pending(APP_NAME) == {}
+
+    async def test_in_flight_deltas_visible_until_written(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """書き込み中の差分も、書き込みが完了するまで読み取り時に反映する"""
+        # Arrange
+        state_cache = StateCache()
+        coalescer = AppStateCoalescer(
+            num_shards=4, flush_interval_seconds=3600, state_cache=state_cache, shard_index=2
+        )
+        service = FirestoreSessionService(
+            client=fake_client,
+            state_cache=state_cache,
+            app_state_shards=4,
+            app_state_coalescer=coalescer,
+        )
+        await append_app_delta(service, "s1", {"x": 1}, 1000.0)
+        shard_ref = shards_collection(fake_client).document("2")
+        original_set = type(shard_ref).set
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_set(ref: Any, *args: Any, **kwargs: Any) -> Any:
+            started.set()
+            await release.wait()
+            return await original_set(ref, *args, **kwargs)
+
+        # Act
+        with patch.object(type(shard_ref), "set", slow_set):
+            flush = asyncio.create_task(coalescer.flush())
+            await started.wait()
+            during_flush = await service.get_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id="s1"
+            )
+            release.set()
+            await flush
+        await coalescer.stop()
+
+        # Assert
+        assert during_flush is not None
+        assert during_flush.state["app:x"] == 1
+        assert coalescer.pending(APP_NAME) == {}
+
+    async def test_failed_flush_is_retried(
+        self, fake_client: FakeAsyncClient, coalescer: AppStateCoalescer
+    ) -> None:
+        """書き込みに失敗した差分は次回のフラッシュで再試行する"""
+        # Arrange
+        coalescer.add(fake_client, APP_NAME, {"x": 1}, 1000.0)
+        shard_ref = shards_collection(fake_client).document("2")
+
+        # Act
+        with patch.object(type(shard_ref), "set", side_effect=RuntimeError("boom")):
+            failed = await coalescer.flush()
+        coalescer.add(fake_client, APP_NAME, {"y": 2}, 1001.0)
+        await coalescer.stop()
+
+        # Assert
+        assert failed == 0
+        assert coalescer.stats.failures == 1
+        shard = await shard_ref.get()
+        assert shard.get("values") == {"x": 1, "y": 2}
+
+    def test_requires_shards(self, coalescer: AppStateCoalescer) -> None:
+        """app_state_shards=0でcoalescerを指定するとValueError"""
+        with pytest.raises(ValueError):
+            FirestoreSessionService(client=FakeAsyncClient(), app_state_coalescer=coalescer)
@@ -0,0 +1,255 @@
+"""イベント履歴スナップショット（コンパクション）のテスト"""
+
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from app.services.adk.sessions.compaction import (
+    SessionCompactor,
+    decode_event_log,
+    encode_event_log,
+)
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.session_cache import SessionCache
+from app.testing.fake_firestore import FakeAsyncClient, FakeCollectionReference
+
+APP_NAME = "homework_coach"
+USER_ID = "user-1"
+
+
+async def append_events(
+    service: FirestoreSessionService, session_id: str, start: int, count: int
+) -> None:
+    """状態差分付きのイベントを追加するヘルパー"""
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    assert session is not None
+    for i in range(start, start + count):
+        await service.append_event(
+            session,
+            Event(
+                author="agent" if i % 2 else "user",
+                invocation_id=f"inv-{i}",
+                timestamp=1000.0 + i,
+                actions=EventActions(
+                    state_delta={"hint_level": i % 3, f"step_{i % 5}": i, "user:points": i}
+                ),
+            ),
+        )
+
+
+def events_collection(client: FakeAsyncClient, session_id: str = "s1") -> FakeCollectionReference:
+    """イベントサブコレクション参照"""
+    return client.collection("sessions").document(session_id).collection("events")
+
+
+class TestEventLogEncoding:
+    """イベントログの圧縮・復元のテスト"""
+
+    def test_round_trip(self) -> None:
+        """圧縮したイベントログを元に戻せる"""
+        events = [{"id": "e1", "author": "user", "actions": {"state_delta": {"答え": "さん"}}}]
+
+        assert decode_event_log(encode_event_log(events)) == events
+
+
+class TestCompactSession:
+    """compact_sessionとスナップショットからの復元のテスト"""
+
+    @pytest.fixture
+    def service_options(self) -> dict[str, Any]:
+        """スナップショット有効のFirestoreSessionService"""
+        return {"snapshots": True}
+
+    @pytest.fixture
+    async def populated(self, service: FirestoreSessionService) -> FirestoreSessionService:
+        """60イベントを持つセッションを作成"""
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 60)
+        return service
+
+    async def test_reconstructed_session_is_identical(
+        self, populated: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """スナップショット + 末尾から復元したセッションは元と同一"""
+        # Arrange
+        before = await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        compacted = await populated.compact_session("s1", keep_tail=10)
+        after = await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert compacted == 50
+        assert after == before
+        assert len([ref async for ref in events_collection(fake_client).list_documents()]) == 10
+
+    async def test_repeated_compaction_extends_snapshot(
+        self, populated: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """2回目のコンパクションは既存スナップショットに追記する"""
+        # Arrange
+        await populated.compact_session("s1", keep_tail=10)
+        await append_events(populated, "s1", 60, 30)
+        before = await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        compacted = await populated.compact_session("s1", keep_tail=5)
+        after = await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert compacted == 35
+        assert after == before
+        assert after is not None
+        assert len(after.events) == 90
+        snapshot = (
+            await fake_client.collection("sessions")
+            .document("s1")
+            .collection("snapshots")
+            .document("latest")
+            .get()
+        )
+        assert snapshot.get("event_count") == 85
+        assert snapshot.get("state")["hint_level"] == 84 % 3
+
+    async def test_get_session_reads_session_and_snapshot_in_one_call(
+        self, populated: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """セッションとスナップショットは1回のget_allで読み取る"""
+        await populated.compact_session("s1", keep_tail=10)
+
+        with patch.object(fake_client, "get_all", wraps=fake_client.get_all) as get_all_spy:
+            await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        assert [len(call.args[0]) for call in get_all_spy.call_args_list] == [2, 2]
+
+    async def test_applies_config_filter(self, populated: FirestoreSessionService) -> None:
+        """スナップショットからの復元でもGetSessionConfigを適用する"""
+        await populated.compact_session("s1", keep_tail=10)
+
+        session = await populated.get_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id="s1",
+            config=GetSessionConfig(num_recent_events=15),
+        )
+
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(45, 60)]
+
+    async def test_no_duplicates_when_event_delete_was_interrupted(
+        self, populated: FirestoreSessionService
+    ) -> None:
+        """スナップショット書き込み後にイベント削除が失敗しても重複しない"""
+        # Arrange
+        before = await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        with (
+            patch.object(populated, "_delete_in_batches", side_effect=RuntimeError("boom")),
+            pytest.raises(RuntimeError),
+        ):
+            await populated.compact_session("s1", keep_tail=10)
+        after = await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        recompacted = await populated.compact_session("s1", keep_tail=10)
+
+        # Assert
+        assert after == before
+        assert recompacted == 50
+        assert (
+            await populated.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+            == before
+        )
+
+    async def test_keeps_short_sessions_untouched(self, service: FirestoreSessionService) -> None:
+        """末尾件数以下のセッションはコンパクションしない"""
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 5)
+
+        assert await service.compact_session("s1", keep_tail=10) == 0
+
+    async def test_cached_session_reloads_after_remote_compaction(
+        self, populated: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """キャッシュ以降のイベントがスナップショット化された場合は全件を読み直す"""
+        # Arrange
+        cached_service = FirestoreSessionService(
+            client=fake_client, snapshots=True, session_cache=SessionCache()
+        )
+        await cached_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(populated, "s1", 60, 10)
+        await populated.compact_session("s1", keep_tail=0)
+
+        # Act
+        session = await cached_service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id="s1"
+        )
+
+        # Assert
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(70)]
+
+    async def test_delete_session_removes_snapshot(
+        self, populated: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """delete_sessionはスナップショットも削除する"""
+        await populated.compact_session("s1", keep_tail=10)
+
+        await populated.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        snapshots = fake_client.collection("sessions").document("s1").collection("snapshots")
+        assert [ref async for ref in snapshots.list_documents()] == []
+
+
+class TestSessionCompactor:
+    """SessionCompactorのテスト"""
+
+    async def test_compacts_after_threshold(self) -> None:
+        """append回数が閾値に達したセッションをコンパクションする"""
+        # Arrange
+        client = FakeAsyncClient()
+        compactor = SessionCompactor(compact_every=20, keep_tail=5, interval_seconds=3600)
+        service = FirestoreSessionService(client=client, snapshots=True, compactor=compactor)
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        await append_events(service, "s1", 0, 19)
+        pending_before = compactor.pending
+        await append_events(service, "s1", 19, 1)
+        compacted = await compactor.run_once()
+        await compactor.stop()
+
+        # Assert
+        assert pending_before == 0
+        assert compacted == 15
+        assert compactor.stats.compacted_sessions == 1
+        assert compactor.pending == 0
+
+    async def test_runs_in_background(self) -> None:
+        """バックグラウンドタスクが定期的にコンパクションする"""
+        # Arrange
+        client = FakeAsyncClient()
+        compactor = SessionCompactor(compact_every=10, keep_tail=0, interval_seconds=0.01)
+        service = FirestoreSessionService(client=client, snapshots=True, compactor=compactor)
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        await append_events(service, "s1", 0, 10)
+        for _ in range(100):
+            if compactor.stats.compacted_events:
+                break
+            await asyncio.sleep(0.01)
+        await compactor.stop()
+
+        # Assert
+        assert compactor.stats.compacted_events == 10
+        assert [ref async for ref in events_collection(client).list_documents()] == []
+
+    def test_requires_snapshots(self) -> None:
+        """snapshots=Falseでcompactorを指定するとValueError"""
+        with pytest.raises(ValueError):
+            FirestoreSessionService(client=FakeAsyncClient(), compactor=SessionCompactor())
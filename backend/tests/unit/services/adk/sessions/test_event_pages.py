@@ -0,0 +1,480 @@
+"""ページレイアウトのイベント保存のテスト"""
+
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from app.services.adk.sessions.event_pages import PageCursor, build_pages, event_bytes, page_id
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.session_cache import SessionCache
+from app.services.adk.sessions.write_behind import WriteBehindQueue
+from app.testing.fake_firestore import FakeAsyncClient
+
+APP_NAME = "homework_coach"
+USER_ID = "user-1"
+
+
+async def append_events(
+    service: FirestoreSessionService, session_id: str, start: int, count: int
+) -> None:
+    """状態差分付きのイベントを追加するヘルパー"""
+    session = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    assert session is not None
+    for i in range(start, start + count):
+        await service.append_event(
+            session,
+            Event(
+                author="agent" if i % 2 else "user",
+                invocation_id=f"inv-{i}",
+                timestamp=1000.0 + i,
+                actions=EventActions(state_delta={"hint_level": i % 3}),
+            ),
+        )
+
+
+async def count_documents(client: FakeAsyncClient, collection_id: str) -> int:
+    """セッションs1のサブコレクションのドキュメント数"""
+    collection = client.collection("sessions").document("s1").collection(collection_id)
+    return len([ref async for ref in collection.list_documents()])
+
+
+class TestBuildPages:
+    """ページ分割ヘルパーのテスト"""
+
+    def test_splits_into_fixed_size_pages(self) -> None:
+        """固定件数ごとにページ番号順で分割する"""
+        events = [{"id": f"e{i}", "timestamp": float(i)} for i in range(5)]
+
+        pages, cursor = build_pages(events, 2)
+
+        assert [page["page"] for page in pages] == [0, 1, 2]
+        assert [len(page["events"]) for page in pages] == [2, 2, 1]
+        assert pages[-1]["last_timestamp"] == 4.0
+        assert (cursor.event_count, cursor.page, cursor.page_events) == (5, 2, 1)
+
+    def test_starts_new_page_when_bytes_exceed_limit(self) -> None:
+        """ページの合計サイズが上限を超える場合は件数に満たなくても次のページに移る"""
+        events = [{"id": f"e{i}", "text": "x" * 100} for i in range(5)]
+        size = event_bytes(events[0])
+
+        with patch("app.services.adk.sessions.event_pages.PAGE_MAX_BYTES", size * 2):
+            pages, cursor = build_pages(events, 50)
+
+        assert [len(page["events"]) for page in pages] == [2, 2, 1]
+        assert cursor == PageCursor(event_count=5, page=2, page_events=1, page_bytes=size)
+
+    def test_oversized_event_gets_its_own_page(self) -> None:
+        """上限より大きいイベントも1件でページを作る（空のページは作らない）"""
+        events = [{"id": "big", "text": "x" * 100}, {"id": "small"}]
+
+        with patch("app.services.adk.sessions.event_pages.PAGE_MAX_BYTES", 10):
+            pages, _ = build_pages(events, 50)
+
+        assert [[data["id"] for data in page["events"]] for page in pages] == [["big"], ["small"]]
+
+    def test_cursor_from_session_without_page_fields(self) -> None:
+        """追記位置を持たないセッションは総イベント数から位置を求める"""
+        cursor = PageCursor.from_session({"event_layout": "paged", "event_count": 25}, 10)
+
+        assert (cursor.page, cursor.page_events) == (2, 5)
+
+    def test_page_ids_sort_in_page_order(self) -> None:
+        """ドキュメントIDの辞書順がページ順と一致する"""
+        assert sorted([page_id(10), page_id(9)]) == [page_id(9), page_id(10)]
+
+
+class TestPagedLayout:
+    """event_layout="paged" のFirestoreSessionServiceのテスト"""
+
+    @pytest.fixture
+    def service_options(self) -> dict[str, Any]:
+        """ページレイアウト（10件/ページ）のFirestoreSessionService"""
+        return {"event_layout": "paged", "events_per_page": 10}
+
+    async def test_appends_events_into_pages(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """イベントは固定件数のページに追記され、順序どおりに復元される"""
+        # Arrange
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        await append_events(service, "s1", 0, 25)
+        session = await FirestoreSessionService(
+            client=fake_client, event_layout="paged"
+        ).get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(25)]
+        assert session.state["hint_level"] == 24 % 3
+        assert await count_documents(fake_client, "event_pages") == 3
+        assert await count_documents(fake_client, "events") == 0
+
+    async def test_reads_pages_instead_of_event_documents(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """get_sessionの読み取り数はページ数に比例する"""
+        # Arrange
+        paged = FirestoreSessionService(
+            client=fake_client, event_layout="paged", events_per_page=50
+        )
+        documents = FirestoreSessionService(client=fake_client)
+        for service, session_id in ((paged, "paged"), (documents, "documents")):
+            session = await service.create_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+            )
+            for i in range(100):
+                await service.append_event(session, Event(author="user", timestamp=float(i)))
+
+        # Act
+        reads = {}
+        for service, session_id in ((paged, "paged"), (documents, "documents")):
+            before = fake_client.reads
+            await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+            reads[session_id] = fake_client.reads - before
+
+        # Assert: セッション1 + app/user状態2 + イベント
+        assert reads == {"paged": 3 + 2, "documents": 3 + 100}
+
+    async def test_append_from_fresh_service_continues_current_page(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """総イベント数を知らないサービスインスタンスも現在のページに追記する"""
+        # Arrange
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 15)
+        other = FirestoreSessionService(
+            client=fake_client, event_layout="paged", events_per_page=10
+        )
+
+        # Act
+        await other.append_event(session, Event(author="agent", timestamp=2000.0))
+
+        # Assert
+        pages = fake_client.collection("sessions").document("s1").collection("event_pages")
+        page = await pages.document(page_id(1)).get()
+        assert len(page.get("events")) == 6
+        assert await count_documents(fake_client, "event_pages") == 2
+
+    async def test_recent_events_read_only_tail_pages(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """num_recent_events指定時は末尾のページのみ読み取る"""
+        # Arrange
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 45)
+
+        # Act
+        before = fake_client.reads
+        session = await service.get_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id="s1",
+            config=GetSessionConfig(num_recent_events=5),
+        )
+
+        # Assert
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(40, 45)]
+        assert fake_client.reads - before == 1 + 2 + 2
+
+    async def test_after_timestamp_filters_events(self, service: FirestoreSessionService) -> None:
+        """after_timestamp指定時はそれ以降のイベントのみ返す"""
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 25)
+
+        session = await service.get_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id="s1",
+            config=GetSessionConfig(after_timestamp=1021.0),
+        )
+
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == ["inv-22", "inv-23", "inv-24"]
+
+    async def test_delta_sync_reads_new_events_from_pages(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """キャッシュの差分同期はページから新しいイベントのみ取り込む"""
+        # Arrange
+        cached = FirestoreSessionService(
+            client=fake_client, event_layout="paged", session_cache=SessionCache()
+        )
+        writer = FirestoreSessionService(client=fake_client, event_layout="paged")
+        await cached.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(cached, "s1", 0, 3)
+        await append_events(writer, "s1", 3, 2)
+
+        # Act
+        session = await cached.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(5)]
+
+    async def test_delete_session_removes_pages(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """delete_sessionはページドキュメントも削除する"""
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 15)
+
+        await service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        assert await count_documents(fake_client, "event_pages") == 0
+
+    async def test_default_layout_service_deletes_pages(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """従来レイアウトのインスタンスから削除してもページドキュメントを残さない"""
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 15)
+        default_service = FirestoreSessionService(client=fake_client)
+
+        await default_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        assert await count_documents(fake_client, "event_pages") == 0
+
+    async def test_append_respects_page_byte_limit(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """append_eventもページのサイズ上限で次のページに移り、全イベントを復元できる"""
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        with patch("app.services.adk.sessions.event_pages.PAGE_MAX_BYTES", 500):
+            await append_events(service, "s1", 0, 12)
+        session = await FirestoreSessionService(
+            client=fake_client, event_layout="paged", events_per_page=10
+        ).get_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id="s1",
+            config=GetSessionConfig(num_recent_events=8),
+        )
+
+        assert await count_documents(fake_client, "event_pages") == 4
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(4, 12)]
+
+    def test_rejects_snapshots_with_paged_layout(self) -> None:
+        """ページレイアウトとスナップショットの併用はValueError"""
+        with pytest.raises(ValueError):
+            FirestoreSessionService(client=FakeAsyncClient(), event_layout="paged", snapshots=True)
+
+
+class TestMigrateSessionToPages:
+    """従来レイアウトからの移行のテスト"""
+
+    @pytest.fixture
+    async def legacy(self, fake_client: FakeAsyncClient) -> FirestoreSessionService:
+        """従来レイアウトで23イベントを持つセッションを作成"""
+        service = FirestoreSessionService(client=fake_client)
+        await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(service, "s1", 0, 23)
+        return service
+
+    @pytest.mark.usefixtures("legacy")
+    async def test_paged_service_reads_and_appends_legacy_sessions(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """移行前のセッションはページレイアウトのサービスでも従来どおり扱う"""
+        paged = FirestoreSessionService(client=fake_client, event_layout="paged")
+
+        await append_events(paged, "s1", 23, 1)
+        session = await paged.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        assert session is not None
+        assert len(session.events) == 24
+        assert await count_documents(fake_client, "events") == 24
+        assert await count_documents(fake_client, "event_pages") == 0
+
+    async def test_migrated_session_is_identical(
+        self, legacy: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """移行後も同じセッションが復元され、追記は最終ページに続く"""
+        # Arrange
+        before = await legacy.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        paged = FirestoreSessionService(
+            client=fake_client, event_layout="paged", events_per_page=10
+        )
+
+        # Act
+        migrated = await paged.migrate_session_to_pages("s1", delete_source=True)
+        after = await paged.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        assert after is not None
+        await paged.append_event(after, Event(author="agent", timestamp=5000.0))
+
+        # Assert
+        assert migrated == 23
+        assert before is not None
+        assert after.events[:23] == before.events
+        assert await count_documents(fake_client, "events") == 0
+        assert await count_documents(fake_client, "event_pages") == 3
+        last_page = (
+            await fake_client.collection("sessions")
+            .document("s1")
+            .collection("event_pages")
+            .document(page_id(2))
+            .get()
+        )
+        assert len(last_page.get("events")) == 4
+
+    async def test_events_appended_during_migration_are_kept(
+        self, legacy: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """読み取り後に追記されたイベントは前提条件で検出し、読み直して移行する"""
+        # Arrange: 移行のcommit直前に従来レイアウトへ1件追記する
+        paged = FirestoreSessionService(client=fake_client, event_layout="paged")
+        original_batch = fake_client.batch
+        raced = False
+
+        def racing_batch() -> Any:
+            batch = original_batch()
+            commit = batch.commit
+
+            async def commit_after_append(**kwargs: Any) -> Any:
+                nonlocal raced
+                if not raced:
+                    raced = True
+                    await append_events(legacy, "s1", 23, 1)
+                return await commit(**kwargs)
+
+            batch.commit = commit_after_append  # type: ignore[method-assign]
+            return batch
+
+        # Act
+        with patch.object(fake_client, "batch", racing_batch):
+            migrated = await paged.migrate_session_to_pages("s1")
+        session = await paged.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert migrated == 24
+        assert session is not None
+        assert [e.invocation_id for e in session.events] == [f"inv-{i}" for i in range(24)]
+
+    @pytest.mark.usefixtures("legacy")
+    async def test_skips_already_migrated_session(self, fake_client: FakeAsyncClient) -> None:
+        """移行済みのセッションは-1を返して何もしない"""
+        paged = FirestoreSessionService(client=fake_client, event_layout="paged")
+        await paged.migrate_session_to_pages("s1")
+
+        assert await paged.migrate_session_to_pages("s1") == -1
+        assert await paged.migrate_session_to_pages("missing") == -1
+
+
+class TestLayoutResolution:
+    """追記先のレイアウトをセッションドキュメントで確認するテスト"""
+
+    async def test_documents_service_appends_to_pages_of_shared_cached_session(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """共有キャッシュから取得したページレイアウトのセッションにはページで追記する"""
+        # Arrange
+        cache = SessionCache()
+        paged = FirestoreSessionService(
+            client=fake_client, event_layout="paged", session_cache=cache
+        )
+        documents = FirestoreSessionService(client=fake_client, session_cache=cache)
+        await paged.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(paged, "s1", 0, 1)
+
+        # Act
+        await append_events(documents, "s1", 1, 1)
+        reloaded = await FirestoreSessionService(client=fake_client).get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id="s1"
+        )
+
+        # Assert
+        assert reloaded is not None
+        assert [e.invocation_id for e in reloaded.events] == ["inv-0", "inv-1"]
+        assert await count_documents(fake_client, "events") == 0
+
+    @pytest.mark.parametrize("options", [{}, {"optimistic_concurrency": True}])
+    async def test_live_service_appends_to_pages_after_migration(
+        self, fake_client: FakeAsyncClient, options: dict[str, Any]
+    ) -> None:
+        """従来レイアウトを保持したサービスも、移行後の追記はページに書き込む"""
+        # Arrange
+        live = FirestoreSessionService(client=fake_client, session_cache=SessionCache(), **options)
+        await live.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(live, "s1", 0, 2)
+        session = await live.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        assert session is not None
+        paged = FirestoreSessionService(client=fake_client, event_layout="paged")
+        await paged.migrate_session_to_pages("s1", delete_source=True)
+
+        # Act
+        await live.append_event(session, Event(author="agent", invocation_id="inv-2"))
+        reloaded = await paged.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert reloaded is not None
+        assert [e.invocation_id for e in reloaded.events] == ["inv-0", "inv-1", "inv-2"]
+        assert await count_documents(fake_client, "events") == 0
+
+    @pytest.mark.parametrize("options", [{"batch_writes": True}, {"optimistic_concurrency": True}])
+    async def test_legacy_append_racing_migration_is_redirected_to_pages(
+        self, fake_client: FakeAsyncClient, options: dict[str, Any]
+    ) -> None:
+        """レイアウト確認後に移行された追記は前提条件で検出し、ページに追記し直す"""
+        # Arrange: 追記の書き込み直前に移行を反映する
+        live = FirestoreSessionService(client=fake_client, **options)
+        await live.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(live, "s1", 0, 2)
+        session = await live.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        assert session is not None
+        paged = FirestoreSessionService(client=fake_client, event_layout="paged")
+        original_batch = fake_client.batch
+        migrated = False
+
+        def racing_batch() -> Any:
+            batch = original_batch()
+            commit = batch.commit
+
+            async def commit_after_migration(**kwargs: Any) -> Any:
+                nonlocal migrated
+                if not migrated:
+                    migrated = True
+                    await paged.migrate_session_to_pages("s1")
+                return await commit(**kwargs)
+
+            batch.commit = commit_after_migration  # type: ignore[method-assign]
+            return batch
+
+        # Act
+        with patch.object(fake_client, "batch", racing_batch):
+            await live.append_event(session, Event(author="agent", invocation_id="inv-2"))
+        reloaded = await paged.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert reloaded is not None
+        assert [e.invocation_id for e in reloaded.events] == ["inv-0", "inv-1", "inv-2"]
+
+    async def test_queued_legacy_events_are_flushed_into_pages_after_migration(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """遅延キューの従来レイアウトのイベントは、移行後のフラッシュでページに書き込む"""
+        # Arrange
+        live = FirestoreSessionService(client=fake_client, write_behind=WriteBehindQueue())
+        await live.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await append_events(live, "s1", 0, 2)
+        await live.flush_events("s1")
+        await append_events(live, "s1", 2, 2)
+        paged = FirestoreSessionService(client=fake_client, event_layout="paged")
+        await paged.migrate_session_to_pages("s1", delete_source=True)
+
+        # Act
+        flushed = await live.flush_events("s1")
+        reloaded = await paged.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert flushed == 2
+        assert reloaded is not None
+        assert [e.invocation_id for e in reloaded.events] == [f"inv-{i}" for i in range(4)]
+        assert await count_documents(fake_client, "events") == 0
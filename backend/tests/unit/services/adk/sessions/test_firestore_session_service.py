@@ -1,5 +1,6 @@
 """FirestoreSessionServiceのテスト"""
 
+import asyncio
 from collections.abc import AsyncIterator
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -10,10 +11,14 @@ from google.adk.events.event import Event
 from google.adk.events.event_actions import EventActions
 from google.adk.sessions.base_session_service import GetSessionConfig
 from google.adk.sessions.session import Session
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
 
 from app.services.adk.sessions.firestore_session_service import (
     FirestoreSessionService,
 )
+from app.services.adk.sessions.session_cache import SessionCache
+from app.services.adk.sessions.write_behind import WriteBehindQueue
+from app.testing.fake_firestore import FakeAsyncClient
 
 
 async def async_iter(items: list[Any]) -> AsyncIterator[Any]:
@@ -24,12 +29,24 @@ async def async_iter(items: list[Any]) -> AsyncIterator[Any]:
 
 @pytest.fixture
 def mock_firestore_client() -> MagicMock:
-    """モックFirestoreクライアント"""
-    return MagicMock()
+    """モックFirestoreクライアント
+
+    get_allは各ドキュメント参照のget()に委譲する。
+    """
+    client = MagicMock()
+
+    async def get_all(references: list[MagicMock]) -> AsyncIterator[Any]:
+        for ref in references:
+            doc = await ref.get()
+            doc.reference = ref
+            yield doc
+
+    client.get_all.side_effect = get_all
+    return client
 
 
 @pytest.fixture
-def service(mock_firestore_client: MagicMock) -> FirestoreSessionService:
+def mock_service(mock_firestore_client: MagicMock) -> FirestoreSessionService:
     """テスト用FirestoreSessionService"""
     with patch(
         "app.services.adk.sessions.firestore_session_service.firestore.AsyncClient",
@@ -51,14 +68,12 @@ class TestCreateSession:
     """create_sessionメソッドのテスト"""
 
     async def test_creates_new_session(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """新規セッションを作成"""
         # Arrange
-        mock_doc = create_mock_doc(exists=False)
         mock_doc_ref = MagicMock()
-        mock_doc_ref.get = AsyncMock(return_value=mock_doc)
-        mock_doc_ref.set = AsyncMock()
+        mock_doc_ref.create = AsyncMock()
 
         # app_state と user_state 用のモック（存在しない）
         mock_app_state_doc = create_mock_doc(exists=False)
@@ -84,7 +99,7 @@ class TestCreateSession:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        session = await service.create_session(
+        session = await mock_service.create_session(
             app_name="homework_coach",
             user_id="user-123",
             state={"problem": "1+1=?"},
@@ -96,17 +111,16 @@ class TestCreateSession:
         assert session.app_name == "homework_coach"
         assert session.user_id == "user-123"
         assert session.state["problem"] == "1+1=?"
-        mock_doc_ref.set.assert_called_once()
+        mock_doc_ref.create.assert_called_once()
+        mock_doc_ref.get.assert_not_called()
 
     async def test_creates_session_with_generated_id(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """session_id未指定でUUIDを生成"""
         # Arrange
-        mock_doc = create_mock_doc(exists=False)
         mock_doc_ref = MagicMock()
-        mock_doc_ref.get = AsyncMock(return_value=mock_doc)
-        mock_doc_ref.set = AsyncMock()
+        mock_doc_ref.create = AsyncMock()
 
         mock_app_state_doc = create_mock_doc(exists=False)
         mock_app_state_ref = MagicMock()
@@ -131,7 +145,7 @@ class TestCreateSession:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        session = await service.create_session(
+        session = await mock_service.create_session(
             app_name="homework_coach",
             user_id="user-123",
         )
@@ -141,34 +155,30 @@ class TestCreateSession:
         assert len(session.id) == 36  # UUID format
 
     async def test_raises_error_on_duplicate_session_id(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """既存のsession_idで作成するとAlreadyExistsError"""
         # Arrange
-        mock_doc = create_mock_doc(exists=True)
-
         mock_doc_ref = MagicMock()
-        mock_doc_ref.get = AsyncMock(return_value=mock_doc)
+        mock_doc_ref.create = AsyncMock(side_effect=AlreadyExists("exists"))
 
         mock_firestore_client.collection.return_value.document.return_value = mock_doc_ref
 
         # Act & Assert
         with pytest.raises(AlreadyExistsError):
-            await service.create_session(
+            await mock_service.create_session(
                 app_name="homework_coach",
                 user_id="user-123",
                 session_id="existing-session",
             )
 
     async def test_extracts_app_state_on_create(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """app:プレフィックスの状態をapp_stateコレクションに保存"""
         # Arrange
-        mock_doc = create_mock_doc(exists=False)
         mock_doc_ref = MagicMock()
-        mock_doc_ref.get = AsyncMock(return_value=mock_doc)
-        mock_doc_ref.set = AsyncMock()
+        mock_doc_ref.create = AsyncMock()
 
         mock_app_state_ref = MagicMock()
         mock_app_state_ref.set = AsyncMock()
@@ -195,7 +205,7 @@ class TestCreateSession:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        session = await service.create_session(
+        session = await mock_service.create_session(
             app_name="homework_coach",
             user_id="user-123",
             state={"app:version": "1.0", "problem": "1+1=?"},
@@ -208,14 +218,12 @@ class TestCreateSession:
         assert session.state.get("app:version") == "1.0"
 
     async def test_extracts_user_state_on_create(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """user:プレフィックスの状態をuser_stateコレクションに保存"""
         # Arrange
-        mock_doc = create_mock_doc(exists=False)
         mock_doc_ref = MagicMock()
-        mock_doc_ref.get = AsyncMock(return_value=mock_doc)
-        mock_doc_ref.set = AsyncMock()
+        mock_doc_ref.create = AsyncMock()
 
         mock_app_state_doc = create_mock_doc(exists=False)
         mock_app_state_ref = MagicMock()
@@ -242,7 +250,7 @@ class TestCreateSession:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        session = await service.create_session(
+        session = await mock_service.create_session(
             app_name="homework_coach",
             user_id="user-123",
             state={"user:name": "太郎", "problem": "1+1=?"},
@@ -254,11 +262,122 @@ class TestCreateSession:
         assert session.state.get("user:name") == "太郎"
 
 
+class TestGetOrCreateSession:
+    """get_or_create_sessionメソッドのテスト"""
+
+    async def test_creates_without_existence_read(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """新規の場合はセッションドキュメントを読み取らずに条件付き作成する"""
+        # Act
+        before = fake_client.reads
+        session, created = await service.get_or_create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1", state={"a": 1}
+        )
+
+        # Assert: 読み取りはapp/user状態のマージのみ
+        assert created is True
+        assert session.state == {"a": 1}
+        assert fake_client.reads - before == 2
+
+    async def test_existing_session_reads_metadata_only(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """既存の場合はイベントを読み取らずにメタデータのみ返す"""
+        # Arrange
+        existing = await service.create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1", state={"a": 1}
+        )
+        for i in range(5):
+            await service.append_event(existing, Event(author="user", timestamp=float(i)))
+
+        # Act
+        before = fake_client.reads
+        session, created = await service.get_or_create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1", state={"a": 2}
+        )
+
+        # Assert: メタデータ + app/user状態のマージ
+        assert created is False
+        assert session.id == "s1"
+        assert session.state == {"a": 1}
+        assert session.events == []
+        assert fake_client.reads - before == 3
+
+    async def test_existing_session_merges_scope_state(
+        self, service: FirestoreSessionService
+    ) -> None:
+        """既存のセッションにもapp/user状態をマージする（引数のstateは使わない）"""
+        # Arrange
+        await service.create_session(
+            app_name="homework_coach",
+            user_id="user-1",
+            session_id="s1",
+            state={"a": 1, "user:name": "太郎", "app:mode": "kids"},
+        )
+
+        # Act
+        session, created = await service.get_or_create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1", state={"a": 2}
+        )
+
+        # Assert
+        assert created is False
+        assert session.state == {"a": 1, "user:name": "太郎", "app:mode": "kids"}
+
+    async def test_rejects_session_of_other_user(self, service: FirestoreSessionService) -> None:
+        """別のユーザーのセッションIDは返さずにAlreadyExistsErrorにする"""
+        await service.create_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+
+        with pytest.raises(AlreadyExistsError):
+            await service.get_or_create_session(
+                app_name="homework_coach", user_id="user-2", session_id="s1"
+            )
+
+    async def test_recreates_once_when_deleted_after_conflict(
+        self, service: FirestoreSessionService
+    ) -> None:
+        """競合後に削除されていた場合は1回だけ作成し直し、再度の競合は再帰しない"""
+        conflict = AlreadyExists("exists")
+
+        with (
+            patch.object(service, "_create_session", side_effect=conflict) as create,
+            pytest.raises(AlreadyExistsError),
+        ):
+            await service.get_or_create_session(
+                app_name="homework_coach", user_id="user-1", session_id="s1"
+            )
+
+        assert create.call_count == 2
+
+    async def test_create_session_raises_on_conflict_without_read(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """create_sessionも条件付き作成で重複を検出する"""
+        await service.create_session(app_name="homework_coach", user_id="u", session_id="s1")
+
+        before = fake_client.reads
+        with pytest.raises(AlreadyExistsError):
+            await service.create_session(
+                app_name="homework_coach", user_id="u", session_id="s1", state={"user:x": 1}
+            )
+
+        assert fake_client.reads == before
+        user_state = (
+            await fake_client.collection("user_state")
+            .document("homework_coach")
+            .collection("users")
+            .document("u")
+            .get()
+        )
+        assert not user_state.exists
+
+
 class TestGetSession:
     """get_sessionメソッドのテスト"""
 
     async def test_gets_existing_session(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """存在するセッションを取得"""
         # Arrange
@@ -306,7 +425,7 @@ class TestGetSession:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        session = await service.get_session(
+        session = await mock_service.get_session(
             app_name="homework_coach",
             user_id="user-456",
             session_id="session-123",
@@ -318,7 +437,7 @@ class TestGetSession:
         assert session.state["problem"] == "1+1=?"
 
     async def test_returns_none_for_nonexistent_session(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """存在しないセッションにはNoneを返す"""
         # Arrange
@@ -330,7 +449,7 @@ class TestGetSession:
         mock_firestore_client.collection.return_value.document.return_value = mock_doc_ref
 
         # Act
-        session = await service.get_session(
+        session = await mock_service.get_session(
             app_name="homework_coach",
             user_id="user-456",
             session_id="nonexistent",
@@ -340,7 +459,7 @@ class TestGetSession:
         assert session is None
 
     async def test_merges_app_and_user_state(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """app状態とuser状態をセッション状態にマージ"""
         # Arrange
@@ -387,7 +506,7 @@ class TestGetSession:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        session = await service.get_session(
+        session = await mock_service.get_session(
             app_name="homework_coach",
             user_id="user-456",
             session_id="session-123",
@@ -400,7 +519,7 @@ class TestGetSession:
         assert session.state["user:name"] == "太郎"
 
     async def test_applies_num_recent_events_config(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """GetSessionConfig.num_recent_eventsを適用"""
         # Arrange
@@ -462,7 +581,7 @@ class TestGetSession:
 
         # Act
         config = GetSessionConfig(num_recent_events=2)
-        session = await service.get_session(
+        session = await mock_service.get_session(
             app_name="homework_coach",
             user_id="user-456",
             session_id="session-123",
@@ -478,7 +597,7 @@ class TestListSessions:
     """list_sessionsメソッドのテスト"""
 
     async def test_lists_user_sessions(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """ユーザーのセッション一覧を取得"""
         # Arrange
@@ -510,7 +629,7 @@ class TestListSessions:
         mock_query = MagicMock()
         mock_filtered_query = MagicMock()
         mock_filtered_query.stream.return_value = async_iter(mock_session_docs)
-        mock_query.where.return_value.where.return_value = mock_filtered_query
+        mock_query.where.return_value.where.return_value.select.return_value = mock_filtered_query
 
         mock_app_state_doc = create_mock_doc(exists=False)
         mock_app_state_ref = MagicMock()
@@ -538,7 +657,7 @@ class TestListSessions:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        response = await service.list_sessions(
+        response = await mock_service.list_sessions(
             app_name="homework_coach",
             user_id="user-123",
         )
@@ -549,7 +668,7 @@ class TestListSessions:
         assert response.sessions[1].id == "session-2"
 
     async def test_lists_all_sessions_without_user_id(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """user_id未指定で全セッションを取得"""
         # Arrange
@@ -568,7 +687,7 @@ class TestListSessions:
         mock_query = MagicMock()
         mock_filtered_query = MagicMock()
         mock_filtered_query.stream.return_value = async_iter([mock_session_doc])
-        mock_query.where.return_value = mock_filtered_query
+        mock_query.where.return_value.select.return_value = mock_filtered_query
 
         mock_app_state_doc = create_mock_doc(exists=False)
         mock_app_state_ref = MagicMock()
@@ -596,7 +715,7 @@ class TestListSessions:
         mock_firestore_client.collection.side_effect = collection_side_effect
 
         # Act
-        response = await service.list_sessions(
+        response = await mock_service.list_sessions(
             app_name="homework_coach",
         )
 
@@ -604,19 +723,19 @@ class TestListSessions:
         assert len(response.sessions) == 1
 
     async def test_returns_empty_list_when_no_sessions(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """セッションがない場合は空のリスト"""
         # Arrange
         mock_query = MagicMock()
         mock_filtered_query = MagicMock()
         mock_filtered_query.stream.return_value = async_iter([])
-        mock_query.where.return_value.where.return_value = mock_filtered_query
+        mock_query.where.return_value.where.return_value.select.return_value = mock_filtered_query
 
         mock_firestore_client.collection.return_value = mock_query
 
         # Act
-        response = await service.list_sessions(
+        response = await mock_service.list_sessions(
             app_name="homework_coach",
             user_id="user-123",
         )
@@ -629,7 +748,7 @@ class TestDeleteSession:
     """delete_sessionメソッドのテスト"""
 
     async def test_deletes_existing_session(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """存在するセッションを削除"""
         # Arrange
@@ -640,17 +759,20 @@ class TestDeleteSession:
         mock_doc_ref.delete = AsyncMock()
 
         # events サブコレクション（1件）
-        mock_event_doc = MagicMock()
-        mock_event_doc.reference.delete = AsyncMock()
+        mock_event_ref = MagicMock()
 
         mock_events_collection = MagicMock()
-        mock_events_collection.stream.return_value = async_iter([mock_event_doc])
+        mock_events_collection.list_documents.return_value = async_iter([mock_event_ref])
         mock_doc_ref.collection.return_value = mock_events_collection
 
         mock_firestore_client.collection.return_value.document.return_value = mock_doc_ref
 
+        mock_batch = MagicMock()
+        mock_batch.commit = AsyncMock()
+        mock_firestore_client.batch.return_value = mock_batch
+
         # Act
-        await service.delete_session(
+        await mock_service.delete_session(
             app_name="homework_coach",
             user_id="user-456",
             session_id="session-123",
@@ -658,10 +780,11 @@ class TestDeleteSession:
 
         # Assert
         mock_doc_ref.delete.assert_called_once()
-        mock_event_doc.reference.delete.assert_called_once()
+        mock_batch.delete.assert_any_call(mock_event_ref)
+        mock_batch.commit.assert_awaited_once()
 
     async def test_does_not_raise_on_nonexistent_session(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """存在しないセッションの削除はエラーにならない"""
         # Arrange
@@ -673,7 +796,7 @@ class TestDeleteSession:
         mock_firestore_client.collection.return_value.document.return_value = mock_doc_ref
 
         # Act & Assert (should not raise)
-        await service.delete_session(
+        await mock_service.delete_session(
             app_name="homework_coach",
             user_id="user-456",
             session_id="nonexistent",
@@ -684,7 +807,7 @@ class TestAppendEvent:
     """append_eventメソッドのテスト"""
 
     async def test_appends_event_and_persists(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """イベントを追加して永続化"""
         # Arrange
@@ -702,6 +825,7 @@ class TestAppendEvent:
 
         mock_session_ref = MagicMock()
         mock_session_ref.update = AsyncMock()
+        mock_session_ref.get = AsyncMock(return_value=create_mock_doc(exists=True, data={}))
         mock_event_ref = MagicMock()
         mock_event_ref.set = AsyncMock()
         mock_session_ref.collection.return_value.document.return_value = mock_event_ref
@@ -709,7 +833,7 @@ class TestAppendEvent:
         mock_firestore_client.collection.return_value.document.return_value = mock_session_ref
 
         # Act
-        result = await service.append_event(session, event)
+        result = await mock_service.append_event(session, event)
 
         # Assert
         assert result.author == "user"
@@ -717,8 +841,44 @@ class TestAppendEvent:
         mock_event_ref.set.assert_called_once()
         mock_session_ref.update.assert_called_once()
 
+    async def test_writes_only_changed_state_keys(
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
+    ) -> None:
+        """セッション状態は変更されたキーのみをフィールドパスで更新する"""
+        # Arrange
+        session = Session(
+            id="session-123",
+            app_name="homework_coach",
+            user_id="user-456",
+            state={"problem": "1+1=?", "hint_level": 1, "user:name": "太郎"},
+        )
+        event = Event(
+            author="agent",
+            timestamp=1234567890.0,
+            actions=EventActions(state_delta={"hint_level": 2, "a.b": True}),
+        )
+
+        mock_session_ref = MagicMock()
+        mock_session_ref.update = AsyncMock()
+        mock_session_ref.get = AsyncMock(return_value=create_mock_doc(exists=True, data={}))
+        mock_session_ref.collection.return_value.document.return_value.set = AsyncMock()
+        mock_firestore_client.collection.return_value.document.return_value = mock_session_ref
+
+        # Act
+        await mock_service.append_event(session, event)
+
+        # Assert
+        mock_session_ref.update.assert_called_once_with(
+            {
+                "last_update_time": 1234567890.0,
+                "state.hint_level": 2,
+                "state.`a.b`": True,
+            },
+            option=mock_firestore_client.write_option.return_value,
+        )
+
     async def test_does_not_persist_partial_event(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """partial=Trueのイベントは永続化しない"""
         # Arrange
@@ -734,7 +894,7 @@ class TestAppendEvent:
         )
 
         # Act
-        result = await service.append_event(session, event)
+        result = await mock_service.append_event(session, event)
 
         # Assert
         assert result.partial is True
@@ -742,7 +902,7 @@ class TestAppendEvent:
         mock_firestore_client.collection.assert_not_called()
 
     async def test_updates_state_delta(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """state_deltaをセッション状態に適用"""
         # Arrange
@@ -760,6 +920,7 @@ class TestAppendEvent:
 
         mock_session_ref = MagicMock()
         mock_session_ref.update = AsyncMock()
+        mock_session_ref.get = AsyncMock(return_value=create_mock_doc(exists=True, data={}))
         mock_event_ref = MagicMock()
         mock_event_ref.set = AsyncMock()
         mock_session_ref.collection.return_value.document.return_value = mock_event_ref
@@ -767,13 +928,13 @@ class TestAppendEvent:
         mock_firestore_client.collection.return_value.document.return_value = mock_session_ref
 
         # Act
-        await service.append_event(session, event)
+        await mock_service.append_event(session, event)
 
         # Assert
         assert session.state["hint_level"] == 2
 
     async def test_excludes_temp_state_from_persistence(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """temp:プレフィックスの状態は永続化しない"""
         # Arrange
@@ -790,6 +951,7 @@ class TestAppendEvent:
 
         mock_session_ref = MagicMock()
         mock_session_ref.update = AsyncMock()
+        mock_session_ref.get = AsyncMock(return_value=create_mock_doc(exists=True, data={}))
         mock_event_ref = MagicMock()
         mock_event_ref.set = AsyncMock()
         mock_session_ref.collection.return_value.document.return_value = mock_event_ref
@@ -797,7 +959,7 @@ class TestAppendEvent:
         mock_firestore_client.collection.return_value.document.return_value = mock_session_ref
 
         # Act
-        await service.append_event(session, event)
+        await mock_service.append_event(session, event)
 
         # Assert
         # temp:cacheはstate_deltaから除外されている
@@ -806,7 +968,7 @@ class TestAppendEvent:
             assert "temp:cache" not in event_dict["actions"]["state_delta"]
 
     async def test_updates_last_update_time(
-        self, service: FirestoreSessionService, mock_firestore_client: MagicMock
+        self, mock_service: FirestoreSessionService, mock_firestore_client: MagicMock
     ) -> None:
         """last_update_timeを更新"""
         # Arrange
@@ -824,6 +986,7 @@ class TestAppendEvent:
 
         mock_session_ref = MagicMock()
         mock_session_ref.update = AsyncMock()
+        mock_session_ref.get = AsyncMock(return_value=create_mock_doc(exists=True, data={}))
         mock_event_ref = MagicMock()
         mock_event_ref.set = AsyncMock()
         mock_session_ref.collection.return_value.document.return_value = mock_event_ref
@@ -831,9 +994,440 @@ class TestAppendEvent:
         mock_firestore_client.collection.return_value.document.return_value = mock_session_ref
 
         # Act
-        await service.append_event(session, event)
+        await mock_service.append_event(session, event)
 
         # Assert
         assert session.last_update_time == 1234567890.0
         update_call = mock_session_ref.update.call_args[0][0]
         assert update_call["last_update_time"] == 1234567890.0
+
+
+class TestAppendEventBatchWrites:
+    """batch_writesモードのappend_eventテスト"""
+
+    @pytest.fixture
+    def service_options(self) -> dict[str, Any]:
+        """batch_writes有効のFirestoreSessionService"""
+        return {"batch_writes": True}
+
+    async def test_commits_all_writes_in_single_batch(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """イベント・app/user状態・セッション更新を1回のcommitで反映"""
+        # Arrange
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-456", session_id="session-123"
+        )
+        event = Event(
+            author="agent",
+            timestamp=1234567890.0,
+            actions=EventActions(
+                state_delta={"hint_level": 2, "user:points": 10, "app:version": "2"}
+            ),
+        )
+
+        # Act
+        with patch.object(fake_client, "batch", wraps=fake_client.batch) as batch_spy:
+            await service.append_event(session, event)
+
+        # Assert
+        batch_spy.assert_called_once()
+        stored = await service.get_session(
+            app_name="homework_coach", user_id="user-456", session_id="session-123"
+        )
+        assert stored is not None
+        assert len(stored.events) == 1
+        assert stored.state["hint_level"] == 2
+        assert stored.state["user:points"] == 10
+        assert stored.state["app:version"] == "2"
+        assert stored.last_update_time == 1234567890.0
+
+    async def test_sequential_mode_does_not_use_batch(self, fake_client: FakeAsyncClient) -> None:
+        """batch_writes無効時はバッチを使用しない"""
+        # Arrange
+        service = FirestoreSessionService(client=fake_client)
+        session = await service.create_session(app_name="homework_coach", user_id="user-456")
+
+        # Act
+        with patch.object(fake_client, "batch", wraps=fake_client.batch) as batch_spy:
+            await service.append_event(session, Event(author="user"))
+
+        # Assert
+        batch_spy.assert_not_called()
+
+    async def test_failed_commit_writes_nothing(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """セッションドキュメントが存在しない場合、イベントも書き込まれない"""
+        # Arrange
+        session = Session(id="missing", app_name="homework_coach", user_id="user-456")
+
+        # Act
+        with pytest.raises(NotFound):
+            await service.append_event(session, Event(author="user", id="event-1"))
+
+        # Assert
+        event_doc = (
+            await fake_client.collection("sessions")
+            .document("missing")
+            .collection("events")
+            .document("event-1")
+            .get()
+        )
+        assert not event_doc.exists
+
+
+class TestListSessionsWithFakeClient:
+    """インメモリFirestoreを使ったlist_sessions / list_sessions_pageのテスト"""
+
+    async def _create_sessions(self, service: FirestoreSessionService, count: int) -> None:
+        for i in range(count):
+            session = await service.create_session(
+                app_name="homework_coach",
+                user_id=f"user-{i % 2}",
+                session_id=f"session-{i:02d}",
+                state={f"user:name-{i % 2}": f"name-{i % 2}"},
+            )
+            await service.append_event(session, Event(author="user", timestamp=100.0 + i))
+
+    async def test_resolves_each_user_state_once(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """ユーザー状態は重複しないユーザーごとに1回のget_allで取得する"""
+        # Arrange
+        await self._create_sessions(service, 6)
+
+        # Act
+        with patch.object(fake_client, "get_all", wraps=fake_client.get_all) as get_all_spy:
+            response = await service.list_sessions(app_name="homework_coach")
+
+        # Assert
+        assert len(response.sessions) == 6
+        get_all_spy.assert_called_once()
+        assert len(get_all_spy.call_args[0][0]) == 3  # app_state + 2ユーザー
+        for session in response.sessions:
+            suffix = session.user_id[-1]
+            assert session.state[f"user:name-{suffix}"] == f"name-{suffix}"
+            assert session.events == []
+
+    async def test_pages_through_sessions_newest_first(
+        self, service: FirestoreSessionService
+    ) -> None:
+        """ページトークンで新しい順に全件を重複なく取得できる"""
+        # Arrange
+        await self._create_sessions(service, 5)
+
+        # Act
+        first = await service.list_sessions_page(app_name="homework_coach", page_size=2)
+        second = await service.list_sessions_page(
+            app_name="homework_coach", page_size=2, page_token=first.next_page_token
+        )
+        third = await service.list_sessions_page(
+            app_name="homework_coach", page_size=2, page_token=second.next_page_token
+        )
+
+        # Assert
+        ids = [s.id for page in (first, second, third) for s in page.sessions]
+        assert ids == ["session-04", "session-03", "session-02", "session-01", "session-00"]
+        assert third.next_page_token is None
+
+    async def test_page_filters_by_user(self, service: FirestoreSessionService) -> None:
+        """user_id指定時はそのユーザーのセッションのみ返す"""
+        # Arrange
+        await self._create_sessions(service, 5)
+
+        # Act
+        page = await service.list_sessions_page(
+            app_name="homework_coach", user_id="user-1", page_size=10
+        )
+
+        # Assert
+        assert [s.id for s in page.sessions] == ["session-03", "session-01"]
+        assert page.next_page_token is None
+
+    async def test_rejects_invalid_page_token(self, service: FirestoreSessionService) -> None:
+        """不正なページトークンはValueError"""
+        with pytest.raises(ValueError):
+            await service.list_sessions_page(app_name="homework_coach", page_token="!!")
+
+    async def test_rejects_invalid_page_size(self, service: FirestoreSessionService) -> None:
+        """範囲外のpage_sizeはValueError"""
+        with pytest.raises(ValueError):
+            await service.list_sessions_page(app_name="homework_coach", page_size=0)
+
+
+class TestBulkDelete:
+    """WriteBatchによる一括削除のテスト"""
+
+    async def _create_session_with_events(
+        self,
+        fake_client: FakeAsyncClient,
+        service: FirestoreSessionService,
+        user_id: str,
+        session_id: str,
+        num_events: int,
+    ) -> None:
+        await service.create_session(
+            app_name="homework_coach", user_id=user_id, session_id=session_id
+        )
+        events = fake_client.collection("sessions").document(session_id).collection("events")
+        for i in range(num_events):
+            await events.document(f"e{i}").set({"id": f"e{i}", "timestamp": float(i)})
+
+    async def test_delete_session_chunks_events_into_batches(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """大量のイベントは500件単位のWriteBatchで削除する"""
+        # Arrange
+        await self._create_session_with_events(fake_client, service, "user-1", "s1", 1200)
+
+        # Act
+        with patch.object(fake_client, "batch", wraps=fake_client.batch) as batch_spy:
+            await service.delete_session(
+                app_name="homework_coach", user_id="user-1", session_id="s1"
+            )
+
+        # Assert
+        assert batch_spy.call_count == 3
+        events = fake_client.collection("sessions").document("s1").collection("events")
+        assert [ref async for ref in events.list_documents()] == []
+        assert (
+            await service.get_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+            is None
+        )
+
+    async def test_delete_sessions_removes_only_target_user(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """delete_sessionsは指定ユーザーの全セッションとイベントのみ削除する"""
+        # Arrange
+        await self._create_session_with_events(fake_client, service, "user-1", "s1", 3)
+        await self._create_session_with_events(fake_client, service, "user-1", "s2", 2)
+        await self._create_session_with_events(fake_client, service, "user-2", "s3", 1)
+
+        # Act
+        deleted = await service.delete_sessions(app_name="homework_coach", user_id="user-1")
+
+        # Assert
+        assert deleted == 2
+        remaining = await service.list_sessions(app_name="homework_coach")
+        assert [s.id for s in remaining.sessions] == ["s3"]
+        for session_id in ("s1", "s2"):
+            events = fake_client.collection("sessions").document(session_id).collection("events")
+            assert [ref async for ref in events.list_documents()] == []
+
+    async def test_delete_sessions_invalidates_cache(self, fake_client: FakeAsyncClient) -> None:
+        """delete_sessionsで削除したセッションはキャッシュからも消える"""
+        # Arrange
+        cache = SessionCache()
+        service = FirestoreSessionService(client=fake_client, session_cache=cache)
+        await service.create_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+
+        # Act
+        await service.delete_sessions(app_name="homework_coach", user_id="user-1")
+
+        # Assert
+        assert len(cache) == 0
+
+    async def test_delete_sessions_without_sessions_returns_zero(
+        self, service: FirestoreSessionService
+    ) -> None:
+        """対象セッションがない場合は0を返す"""
+        assert await service.delete_sessions(app_name="homework_coach", user_id="nobody") == 0
+
+
+class TestAppendEventStateFieldPaths:
+    """フィールドパスによるセッション状態の差分書き込みのテスト"""
+
+    async def test_concurrent_writers_to_different_keys_do_not_clobber(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """古いセッションを持つ2つのライターが別のキーを書いても両方残る"""
+        # Arrange
+        service = FirestoreSessionService(client=fake_client)
+        await service.create_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1", state={"base": 0}
+        )
+        first = await service.get_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+        second = await service.get_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+        assert first is not None
+        assert second is not None
+
+        # Act
+        await service.append_event(
+            first,
+            Event(
+                author="agent", timestamp=1.0, actions=EventActions(state_delta={"emotion": "joy"})
+            ),
+        )
+        await service.append_event(
+            second,
+            Event(
+                author="agent", timestamp=2.0, actions=EventActions(state_delta={"hint_level": 3})
+            ),
+        )
+
+        # Assert
+        stored = await service.get_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+        assert stored is not None
+        assert stored.state == {"base": 0, "emotion": "joy", "hint_level": 3}
+
+    async def test_keys_with_special_characters(self, fake_client: FakeAsyncClient) -> None:
+        """ドットや日本語を含むキーもそのまま保存される"""
+        # Arrange
+        service = FirestoreSessionService(client=fake_client)
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+
+        # Act
+        await service.append_event(
+            session,
+            Event(
+                author="agent",
+                actions=EventActions(state_delta={"step.1": "done", "ヒント": ["たしざん"]}),
+            ),
+        )
+
+        # Assert
+        doc = await fake_client.collection("sessions").document("s1").get()
+        assert doc.to_dict()["state"] == {"step.1": "done", "ヒント": ["たしざん"]}
+
+    async def test_does_not_copy_app_and_user_state_into_session_document(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """マージ済みのapp/user状態をセッションドキュメントに書き込まない"""
+        # Arrange
+        service = FirestoreSessionService(client=fake_client)
+        session = await service.create_session(
+            app_name="homework_coach",
+            user_id="user-456",
+            session_id="s1",
+            state={"user:name": "太郎"},
+        )
+
+        # Act
+        await service.append_event(
+            session,
+            Event(author="agent", actions=EventActions(state_delta={"hint_level": 1})),
+        )
+
+        # Assert
+        doc = await fake_client.collection("sessions").document("s1").get()
+        assert doc.to_dict()["state"] == {"hint_level": 1}
+
+
+class TestAppendEventOptimisticConcurrency:
+    """append_eventの楽観的並行性制御のテスト"""
+
+    async def _load(self, service: FirestoreSessionService) -> Session:
+        session = await service.get_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+        assert session is not None
+        return session
+
+    async def test_stale_writer_merges_remote_state_and_retries(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """別インスタンスが先に書き込んだ場合、最新の状態に差分を重ねて再試行する"""
+        # Arrange
+        first_service = FirestoreSessionService(client=fake_client, optimistic_concurrency=True)
+        second_service = FirestoreSessionService(client=fake_client, optimistic_concurrency=True)
+        await first_service.create_session(
+            app_name="homework_coach",
+            user_id="user-456",
+            session_id="s1",
+            state={"base": 0, "user:name": "太郎"},
+        )
+        first = await self._load(first_service)
+        second = await self._load(second_service)
+
+        # Act
+        await first_service.append_event(
+            first,
+            Event(author="agent", timestamp=1.0, actions=EventActions(state_delta={"base": 1})),
+        )
+        with patch.object(fake_client, "batch", wraps=fake_client.batch) as batch_spy:
+            await second_service.append_event(
+                second,
+                Event(author="agent", timestamp=2.0, actions=EventActions(state_delta={"hint": 3})),
+            )
+
+        # Assert
+        assert batch_spy.call_count == 2
+        assert second.state == {"base": 1, "hint": 3, "user:name": "太郎"}
+        doc = await fake_client.collection("sessions").document("s1").get()
+        assert doc.to_dict()["state"] == {"base": 1, "hint": 3}
+        assert doc.to_dict()["version"] == 2
+        stored = await self._load(first_service)
+        assert len(stored.events) == 2
+
+    async def test_concurrent_appends_keep_all_events_and_state(self) -> None:
+        """同一セッションへの並行appendでイベントと状態が失われない"""
+        # Arrange
+        fake_client = FakeAsyncClient(latency=0.001)
+        services = [
+            FirestoreSessionService(client=fake_client, optimistic_concurrency=True)
+            for _ in range(3)
+        ]
+        await services[0].create_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+        sessions = [await self._load(service) for service in services]
+
+        # Act
+        await asyncio.gather(
+            *(
+                service.append_event(
+                    session,
+                    Event(
+                        author="agent",
+                        timestamp=float(i + 1),
+                        actions=EventActions(state_delta={f"key{i}": i}),
+                    ),
+                )
+                for i, (service, session) in enumerate(zip(services, sessions, strict=True))
+            )
+        )
+
+        # Assert
+        stored = await self._load(FirestoreSessionService(client=fake_client))
+        assert stored.state == {"key0": 0, "key1": 1, "key2": 2}
+        assert len(stored.events) == 3
+        doc = await fake_client.collection("sessions").document("s1").get()
+        assert doc.to_dict()["version"] == 3
+
+    async def test_raises_when_retries_are_exhausted(self, fake_client: FakeAsyncClient) -> None:
+        """再試行回数を超えて競合した場合はFailedPreconditionを送出し、何も書き込まない"""
+        # Arrange
+        first_service = FirestoreSessionService(client=fake_client, optimistic_concurrency=True)
+        second_service = FirestoreSessionService(
+            client=fake_client, optimistic_concurrency=True, max_append_retries=0
+        )
+        await first_service.create_session(
+            app_name="homework_coach", user_id="user-456", session_id="s1"
+        )
+        first = await self._load(first_service)
+        second = await self._load(second_service)
+        await first_service.append_event(first, Event(author="agent", timestamp=1.0))
+        stale_event = Event(author="agent", timestamp=2.0)
+
+        # Act & Assert
+        with pytest.raises(FailedPrecondition):
+            await second_service.append_event(second, stale_event)
+        stored = await self._load(first_service)
+        assert [event.id for event in stored.events] == [first.events[0].id]
+
+    async def test_write_behind_is_rejected(self, fake_client: FakeAsyncClient) -> None:
+        """write_behindとの併用はValueError"""
+        with pytest.raises(ValueError, match="optimistic_concurrency"):
+            FirestoreSessionService(
+                client=fake_client, optimistic_concurrency=True, write_behind=WriteBehindQueue()
+            )
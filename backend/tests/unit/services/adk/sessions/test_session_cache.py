@@ -0,0 +1,281 @@
+"""SessionCacheのテスト"""
+
+from typing import Any
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.session import Session
+
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.session_cache import SessionCache
+from app.testing.fake_firestore import FakeAsyncClient
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_session(session_id: str, num_events: int = 0) -> Session:
+    """テスト用セッションを作成するヘルパー"""
+    return Session(
+        id=session_id,
+        app_name="homework_coach",
+        user_id="user-1",
+        state={"hint_level": 1},
+        events=[Event(author="user", timestamp=float(i)) for i in range(num_events)],
+        last_update_time=float(num_events),
+    )
+
+
+class TestSessionCache:
+    """SessionCache単体のテスト"""
+
+    def test_get_returns_copy(self) -> None:
+        """取得したセッションを変更してもキャッシュに影響しない"""
+        cache = SessionCache()
+        cache.put(make_session("s1", num_events=1))
+
+        session = cache.get("s1")
+        assert session is not None
+        session.events.append(Event(author="agent"))
+        session.state["hint_level"] = 3
+
+        cached = cache.get("s1")
+        assert cached is not None
+        assert len(cached.events) == 1
+        assert cached.state["hint_level"] == 1
+
+    def test_counts_hits_and_misses(self) -> None:
+        """ヒット・ミスを記録する"""
+        cache = SessionCache()
+        cache.put(make_session("s1"))
+
+        cache.get("s1")
+        cache.get("missing")
+
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_expires_after_ttl(self) -> None:
+        """TTL経過後はミスになる"""
+        clock = FakeClock()
+        cache = SessionCache(ttl_seconds=10.0, clock=clock)
+        cache.put(make_session("s1"))
+
+        clock.now = 10.0
+
+        assert cache.get("s1") is None
+        assert cache.stats.evictions == 1
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used_entry(self) -> None:
+        """エントリ数上限を超えるとLRUで追い出す"""
+        cache = SessionCache(max_entries=2)
+        cache.put(make_session("s1"))
+        cache.put(make_session("s2"))
+        cache.get("s1")
+
+        cache.put(make_session("s3"))
+
+        assert cache.get("s2") is None
+        assert cache.get("s1") is not None
+        assert cache.get("s3") is not None
+
+    def test_evicts_when_event_budget_exceeded(self) -> None:
+        """合計イベント数の上限を超えると追い出す"""
+        cache = SessionCache(max_events=10)
+        cache.put(make_session("s1", num_events=6))
+        cache.put(make_session("s2", num_events=6))
+
+        assert cache.get("s1") is None
+        assert cache.total_events == 6
+
+    def test_invalidate_records_stale(self) -> None:
+        """stale=Trueで無効化すると統計に記録する"""
+        cache = SessionCache()
+        cache.put(make_session("s1"))
+
+        cache.invalidate("s1", stale=True)
+
+        assert cache.get("s1") is None
+        assert cache.stats.stale == 1
+
+
+class TestReadThroughSessionService:
+    """session_cache付きFirestoreSessionServiceのテスト"""
+
+    @pytest.fixture
+    def cache(self) -> SessionCache:
+        """セッションキャッシュ"""
+        return SessionCache()
+
+    @pytest.fixture
+    def service_options(self, cache: SessionCache) -> dict[str, Any]:
+        """キャッシュ付きのFirestoreSessionService"""
+        return {"session_cache": cache}
+
+    async def test_create_and_append_populate_cache(
+        self, service: FirestoreSessionService, cache: SessionCache
+    ) -> None:
+        """create_session/append_eventでキャッシュが更新される"""
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        await service.append_event(session, Event(author="user", timestamp=100.0))
+
+        result = await service.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+
+        assert result is not None
+        assert len(result.events) == 1
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 0
+
+    async def test_warm_get_does_not_reload_events(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """last_update_timeが一致する場合はイベントを読み直さない"""
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        await service.append_event(session, Event(author="user", timestamp=100.0))
+
+        # last_update_timeを変えずにイベントを直接追加（キャッシュが使われれば見えない）
+        events = fake_client.collection("sessions").document("s1").collection("events")
+        await events.document("hidden").set({"id": "hidden", "author": "x", "timestamp": 50.0})
+
+        result = await service.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+
+        assert result is not None
+        assert [e.author for e in result.events] == ["user"]
+
+    async def test_reloads_when_last_update_time_changed(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        cache: SessionCache,
+    ) -> None:
+        """他のライターが更新した場合は再読み込みする"""
+        await service.create_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+
+        # 別プロセスからの追記を模擬
+        other = FirestoreSessionService(client=fake_client)
+        stale_copy = await other.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        assert stale_copy is not None
+        await other.append_event(stale_copy, Event(author="agent", timestamp=200.0))
+
+        result = await service.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+
+        assert result is not None
+        assert [e.author for e in result.events] == ["agent"]
+        assert cache.stats.stale == 1
+        assert cache.stats.delta_syncs == 1
+
+    async def test_delta_sync_fetches_only_new_events(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+    ) -> None:
+        """古いキャッシュは最終イベント以降のイベントと最新の状態のみ取り込む"""
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        await service.append_event(session, Event(author="user", timestamp=100.0))
+
+        # キャッシュ済み区間にイベントを直接追加（差分同期なら読み込まれない）
+        events = fake_client.collection("sessions").document("s1").collection("events")
+        await events.document("old").set({"id": "old", "author": "old", "timestamp": 50.0})
+
+        # 別プロセスから新しいイベントと状態を追記
+        other = FirestoreSessionService(client=fake_client)
+        remote = await other.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        assert remote is not None
+        await other.append_event(
+            remote,
+            Event(
+                author="agent",
+                timestamp=200.0,
+                actions=EventActions(state_delta={"hint_level": 2}),
+            ),
+        )
+
+        result = await service.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+
+        assert result is not None
+        assert [e.author for e in result.events] == ["user", "agent"]
+        assert result.state["hint_level"] == 2
+        assert result.last_update_time == 200.0
+
+    async def test_delta_sync_keeps_events_with_same_timestamp(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+    ) -> None:
+        """最終イベントと同一タイムスタンプの新規イベントも取りこぼさない"""
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        await service.append_event(session, Event(author="user", timestamp=100.0))
+
+        other = FirestoreSessionService(client=fake_client)
+        remote = await other.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        assert remote is not None
+        await other.append_event(remote, Event(author="agent", timestamp=100.0))
+        # 同一タイムスタンプでもlast_update_timeの変化で鮮度切れを検出させる
+        sessions = fake_client.collection("sessions")
+        await sessions.document("s1").update({"last_update_time": 100.5})
+
+        result = await service.get_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+
+        assert result is not None
+        assert sorted(e.author for e in result.events) == ["agent", "user"]
+
+    async def test_append_with_stale_session_invalidates_cache(
+        self, service: FirestoreSessionService, cache: SessionCache
+    ) -> None:
+        """キャッシュと一致しない古いセッションでの追記はキャッシュを無効化する"""
+        session = await service.create_session(
+            app_name="homework_coach", user_id="user-1", session_id="s1"
+        )
+        stale = session.model_copy(deep=True)
+        await service.append_event(session, Event(author="user", timestamp=100.0))
+
+        await service.append_event(stale, Event(author="agent", timestamp=200.0))
+
+        assert len(cache) == 0
+
+    async def test_delete_invalidates_cache(
+        self, service: FirestoreSessionService, cache: SessionCache
+    ) -> None:
+        """delete_sessionでキャッシュから削除される"""
+        await service.create_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+
+        await service.delete_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+
+        assert len(cache) == 0
+        assert (
+            await service.get_session(app_name="homework_coach", user_id="user-1", session_id="s1")
+            is None
+        )
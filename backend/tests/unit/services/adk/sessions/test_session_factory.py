@@ -5,7 +5,10 @@
 
 from unittest.mock import MagicMock, patch
 
-from app.services.adk.sessions.session_factory import create_session_service
+from app.services.adk.sessions.session_factory import (
+    create_firestore_session_service,
+    create_session_service,
+)
 
 # パッチパス
 _FIRESTORE_SESSION_PATCH = "app.services.adk.sessions.session_factory.FirestoreSessionService"
@@ -168,3 +171,191 @@ class TestCreateSessionServiceWithAgentEngine:
             create_session_service()
 
         mock_firestore_cls.assert_not_called()
+
+
+class TestCreateSessionServiceSnapshots:
+    """SESSION_SNAPSHOTS_ENABLED の設定"""
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_snapshots_disabled_by_default(self, mock_firestore_cls: MagicMock) -> None:
+        """デフォルトではスナップショットとコンパクターを使用しない"""
+        with patch.dict("os.environ", {}, clear=True):
+            create_session_service()
+
+        kwargs = mock_firestore_cls.call_args.kwargs
+        assert kwargs["snapshots"] is False
+        assert kwargs["compactor"] is None
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_snapshots_enabled_with_shared_compactor(self, mock_firestore_cls: MagicMock) -> None:
+        """有効化するとプロセス共有のコンパクターを渡す"""
+        with patch.dict("os.environ", {"SESSION_SNAPSHOTS_ENABLED": "true"}, clear=True):
+            create_session_service()
+            create_session_service()
+
+        first, second = (call.kwargs for call in mock_firestore_cls.call_args_list)
+        assert first["snapshots"] is True
+        assert first["compactor"] is not None
+        assert first["compactor"] is second["compactor"]
+
+
+class TestCreateSessionServiceEventLayout:
+    """SESSION_EVENT_LAYOUT の設定"""
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_documents_layout_by_default(self, mock_firestore_cls: MagicMock) -> None:
+        """デフォルトは1イベント1ドキュメントのレイアウト"""
+        with patch.dict("os.environ", {}, clear=True):
+            create_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["event_layout"] == "documents"
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_paged_layout(self, mock_firestore_cls: MagicMock) -> None:
+        """pagedを指定するとページサイズとともに渡す"""
+        env = {"SESSION_EVENT_LAYOUT": "paged", "SESSION_EVENTS_PER_PAGE": "25"}
+        with patch.dict("os.environ", env, clear=True):
+            create_session_service()
+
+        kwargs = mock_firestore_cls.call_args.kwargs
+        assert kwargs["event_layout"] == "paged"
+        assert kwargs["events_per_page"] == 25
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_paged_layout_disables_snapshots(self, mock_firestore_cls: MagicMock) -> None:
+        """ページレイアウトではスナップショットを無効にする"""
+        env = {"SESSION_EVENT_LAYOUT": "paged", "SESSION_SNAPSHOTS_ENABLED": "true"}
+        with patch.dict("os.environ", env, clear=True):
+            create_session_service()
+
+        kwargs = mock_firestore_cls.call_args.kwargs
+        assert kwargs["snapshots"] is False
+        assert kwargs["compactor"] is None
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_invalid_layout_falls_back_to_documents(self, mock_firestore_cls: MagicMock) -> None:
+        """不正な値はデフォルトのレイアウトにフォールバックする"""
+        with patch.dict("os.environ", {"SESSION_EVENT_LAYOUT": "bogus"}, clear=True):
+            create_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["event_layout"] == "documents"
+
+
+class TestCreateSessionServiceAppStateShards:
+    """APP_STATE_SHARDS / APP_STATE_COALESCE の設定"""
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_single_document_by_default(self, mock_firestore_cls: MagicMock) -> None:
+        """デフォルトはシャーディングも書き込み集約もしない"""
+        with patch.dict("os.environ", {}, clear=True):
+            create_session_service()
+
+        kwargs = mock_firestore_cls.call_args.kwargs
+        assert kwargs["app_state_shards"] == 0
+        assert kwargs["app_state_coalescer"] is None
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_coalesce_requires_shards(self, mock_firestore_cls: MagicMock) -> None:
+        """シャード数0では書き込み集約を有効にしない"""
+        with patch.dict("os.environ", {"APP_STATE_COALESCE": "true"}, clear=True):
+            create_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["app_state_coalescer"] is None
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_shards_with_shared_coalescer(self, mock_firestore_cls: MagicMock) -> None:
+        """有効化するとシャード数とプロセス共有の集約を渡す"""
+        env = {"APP_STATE_SHARDS": "4", "APP_STATE_COALESCE": "true"}
+        with patch.dict("os.environ", env, clear=True):
+            create_session_service()
+            create_session_service()
+
+        first, second = (call.kwargs for call in mock_firestore_cls.call_args_list)
+        assert first["app_state_shards"] == 4
+        assert first["app_state_coalescer"] is not None
+        assert first["app_state_coalescer"] is second["app_state_coalescer"]
+
+
+class TestCreateSessionServiceWriteBehind:
+    """SESSION_WRITE_BEHIND の設定"""
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_disabled_by_default(self, mock_firestore_cls: MagicMock) -> None:
+        """デフォルトでは書き込み遅延を使用しない"""
+        with patch.dict("os.environ", {"SESSION_WRITE_BEHIND": "true"}, clear=True):
+            create_firestore_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["write_behind"] is None
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_live_path_uses_shared_queue(self, mock_firestore_cls: MagicMock) -> None:
+        """write_behind=True かつ有効化されている場合は共有キューを渡す"""
+        with patch.dict("os.environ", {"SESSION_WRITE_BEHIND": "true"}, clear=True):
+            create_firestore_session_service(write_behind=True)
+            create_firestore_session_service(write_behind=True)
+
+        first, second = (call.kwargs for call in mock_firestore_cls.call_args_list)
+        assert first["write_behind"] is not None
+        assert first["write_behind"] is second["write_behind"]
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_live_path_without_env(self, mock_firestore_cls: MagicMock) -> None:
+        """環境変数で有効化されていない場合は同期書き込み"""
+        with patch.dict("os.environ", {}, clear=True):
+            create_firestore_session_service(write_behind=True)
+
+        assert mock_firestore_cls.call_args.kwargs["write_behind"] is None
+
+
+class TestCreateSessionServiceBatchWrites:
+    """SESSION_BATCH_WRITES の設定"""
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_disabled_by_default(self, mock_firestore_cls: MagicMock) -> None:
+        """デフォルトでは1件ずつ書き込む"""
+        with patch.dict("os.environ", {}, clear=True):
+            create_firestore_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["batch_writes"] is False
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_enabled_by_env(self, mock_firestore_cls: MagicMock) -> None:
+        """環境変数で有効化する"""
+        with patch.dict("os.environ", {"SESSION_BATCH_WRITES": "true"}, clear=True):
+            create_firestore_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["batch_writes"] is True
+
+
+class TestCreateSessionServiceOptimisticConcurrency:
+    """SESSION_OPTIMISTIC_CONCURRENCY の設定"""
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_disabled_by_default(self, mock_firestore_cls: MagicMock) -> None:
+        """デフォルトでは無効"""
+        with patch.dict("os.environ", {}, clear=True):
+            create_firestore_session_service()
+
+        assert mock_firestore_cls.call_args.kwargs["optimistic_concurrency"] is False
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_enabled_by_env(self, mock_firestore_cls: MagicMock) -> None:
+        """環境変数で有効化し、再試行回数を設定できる"""
+        env = {"SESSION_OPTIMISTIC_CONCURRENCY": "true", "SESSION_APPEND_MAX_RETRIES": "5"}
+        with patch.dict("os.environ", env, clear=True):
+            create_firestore_session_service()
+
+        kwargs = mock_firestore_cls.call_args.kwargs
+        assert kwargs["optimistic_concurrency"] is True
+        assert kwargs["max_append_retries"] == 5
+
+    @patch(_FIRESTORE_SESSION_PATCH)
+    def test_not_combined_with_write_behind(self, mock_firestore_cls: MagicMock) -> None:
+        """書き込み遅延キューを使う場合は適用しない"""
+        env = {"SESSION_OPTIMISTIC_CONCURRENCY": "true", "SESSION_WRITE_BEHIND": "true"}
+        with patch.dict("os.environ", env, clear=True):
+            create_firestore_session_service(write_behind=True)
+
+        kwargs = mock_firestore_cls.call_args.kwargs
+        assert kwargs["write_behind"] is not None
+        assert kwargs["optimistic_concurrency"] is False
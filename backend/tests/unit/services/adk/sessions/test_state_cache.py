@@ -0,0 +1,145 @@
+"""StateCacheのテスト"""
+
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.state_cache import StateCache, app_state_key, user_state_key
+from app.testing.fake_firestore import FakeAsyncClient
+
+
+class FakeClock:
+    """テスト用の手動時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStateCache:
+    """StateCache単体のテスト"""
+
+    def test_returns_copy_of_cached_state(self) -> None:
+        """取得した状態を変更してもキャッシュに影響しない"""
+        cache = StateCache()
+        cache.put(app_state_key("app"), {"version": "1"})
+
+        state = cache.get(app_state_key("app"))
+        assert state == {"version": "1"}
+        state["version"] = "2"
+
+        assert cache.get(app_state_key("app")) == {"version": "1"}
+
+    def test_caches_missing_document_as_empty(self) -> None:
+        """存在しないドキュメントは空dictとしてヒットする"""
+        cache = StateCache()
+        cache.put(user_state_key("app", "u1"), {})
+
+        assert cache.get(user_state_key("app", "u1")) == {}
+        assert cache.stats.hits == 1
+
+    def test_expires_after_ttl(self) -> None:
+        """TTL経過後はミスになる"""
+        clock = FakeClock()
+        cache = StateCache(ttl_seconds=5.0, clock=clock)
+        cache.put(app_state_key("app"), {"version": "1"})
+
+        clock.now = 5.0
+
+        assert cache.get(app_state_key("app")) is None
+        assert cache.stats.misses == 1
+
+    def test_evicts_least_recently_used(self) -> None:
+        """最大エントリ数を超えるとLRUで追い出す"""
+        cache = StateCache(max_entries=1)
+        cache.put(user_state_key("app", "u1"), {})
+        cache.put(user_state_key("app", "u2"), {})
+
+        assert cache.get(user_state_key("app", "u1")) is None
+        assert cache.stats.evictions == 1
+
+
+class TestMergeStateWithCache:
+    """state_cache付きFirestoreSessionServiceのテスト"""
+
+    @pytest.fixture
+    def cache(self) -> StateCache:
+        """状態キャッシュ"""
+        return StateCache()
+
+    @pytest.fixture
+    def service_options(self, cache: StateCache) -> dict[str, Any]:
+        """状態キャッシュ付きのFirestoreSessionService"""
+        return {"state_cache": cache}
+
+    async def test_fetches_both_scopes_in_single_get_all(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """キャッシュなしでもapp/user状態を1回のget_allで取得する"""
+        service = FirestoreSessionService(client=fake_client)
+        await service.create_session(
+            app_name="app",
+            user_id="u1",
+            session_id="s1",
+            state={"app:version": "1", "user:name": "太郎"},
+        )
+
+        with patch.object(fake_client, "get_all", wraps=fake_client.get_all) as get_all_spy:
+            session = await service.get_session(app_name="app", user_id="u1", session_id="s1")
+
+        assert session is not None
+        assert session.state["app:version"] == "1"
+        assert session.state["user:name"] == "太郎"
+        get_all_spy.assert_called_once()
+        assert len(get_all_spy.call_args[0][0]) == 2
+
+    async def test_skips_read_when_both_scopes_cached(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """両スコープがキャッシュ済みならget_allを呼ばない"""
+        await service.create_session(app_name="app", user_id="u1", session_id="s1")
+        await service.get_session(app_name="app", user_id="u1", session_id="s1")
+
+        with patch.object(fake_client, "get_all", wraps=fake_client.get_all) as get_all_spy:
+            await service.get_session(app_name="app", user_id="u1", session_id="s1")
+
+        get_all_spy.assert_not_called()
+
+    async def test_app_state_shared_across_users(
+        self, service: FirestoreSessionService, fake_client: FakeAsyncClient
+    ) -> None:
+        """app状態のキャッシュは全ユーザーで共有され、user状態のみ読み取る"""
+        await service.create_session(app_name="app", user_id="u1", session_id="s1")
+        await service.create_session(app_name="app", user_id="u2", session_id="s2")
+
+        with patch.object(fake_client, "get_all", wraps=fake_client.get_all) as get_all_spy:
+            await service.create_session(app_name="app", user_id="u3", session_id="s3")
+
+        refs = get_all_spy.call_args[0][0]
+        assert [ref.id for ref in refs] == ["u3"]
+
+    async def test_own_writes_invalidate_cache(
+        self, service: FirestoreSessionService, cache: StateCache
+    ) -> None:
+        """append_eventでのapp/user状態の書き込みはキャッシュを無効化する"""
+        session = await service.create_session(app_name="app", user_id="u1", session_id="s1")
+        assert cache.get(app_state_key("app")) == {}
+
+        await service.append_event(
+            session,
+            Event(
+                author="agent",
+                actions=EventActions(state_delta={"app:version": "2", "user:points": 5}),
+            ),
+        )
+
+        result = await service.get_session(app_name="app", user_id="u1", session_id="s1")
+        assert result is not None
+        assert result.state["app:version"] == "2"
+        assert result.state["user:points"] == 5
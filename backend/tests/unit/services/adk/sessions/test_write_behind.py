@@ -0,0 +1,330 @@
+"""イベントの書き込み遅延（write-behind）キューのテスト"""
+
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.api_core import exceptions as gexc
+
+from app.services.adk.sessions.firestore_session_service import FirestoreSessionService
+from app.services.adk.sessions.session_cache import SessionCache
+from app.services.adk.sessions.write_behind import WriteBehindQueue
+from app.testing.fake_firestore import FakeAsyncClient, FakeCollectionReference
+
+APP_NAME = "homework_coach"
+USER_ID = "user-1"
+
+
+def events_collection(client: FakeAsyncClient, session_id: str = "s1") -> FakeCollectionReference:
+    """イベントサブコレクション参照"""
+    return client.collection("sessions").document(session_id).collection("events")
+
+
+async def stored_event_count(client: FakeAsyncClient, session_id: str = "s1") -> int:
+    """Firestoreに保存済みのイベント数"""
+    return len([ref async for ref in events_collection(client, session_id).list_documents()])
+
+
+def make_event(index: int, *, turn_complete: bool = False) -> Event:
+    """session/user状態差分付きのイベント"""
+    return Event(
+        author="agent",
+        invocation_id=f"inv-{index}",
+        timestamp=1000.0 + index,
+        turn_complete=turn_complete,
+        actions=EventActions(state_delta={"hint_level": index, "user:points": index}),
+    )
+
+
+class TestWriteBehindAppend:
+    """write_behind指定時のappend_eventのテスト"""
+
+    @pytest.fixture
+    def queue(self) -> WriteBehindQueue:
+        """自動フラッシュしない書き込み遅延キュー"""
+        return WriteBehindQueue(flush_interval_seconds=3600)
+
+    @pytest.fixture
+    def service_options(self, queue: WriteBehindQueue) -> dict[str, Any]:
+        """書き込み遅延付きのFirestoreSessionService"""
+        return {"write_behind": queue}
+
+    async def test_defers_writes_and_flushes_in_one_batch(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        queue: WriteBehindQueue,
+    ) -> None:
+        """append_eventは書き込まずにキューに積み、フラッシュ時に1回のcommitで書き込む"""
+        # Arrange
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        writes_before = fake_client.writes
+
+        # Act
+        for i in range(10):
+            await service.append_event(session, make_event(i))
+        deferred_writes = fake_client.writes - writes_before
+        with patch.object(fake_client, "batch", wraps=fake_client.batch) as batch_spy:
+            flushed = await service.flush_events("s1")
+        await queue.stop()
+
+        # Assert
+        assert deferred_writes == 0
+        assert flushed == 10
+        assert batch_spy.call_count == 1
+        assert await stored_event_count(fake_client) == 10
+        assert queue.stats.flushes == 1
+        assert queue.stats.queue_depth == 0
+        assert queue.stats.max_queue_depth == 10
+
+    async def test_turn_complete_flushes_immediately(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        queue: WriteBehindQueue,
+    ) -> None:
+        """turn_completeのイベントで未書き込みのイベントをすべて書き込む"""
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        await service.append_event(session, make_event(0))
+        await service.append_event(session, make_event(1))
+        pending_before = queue.pending("s1")
+        await service.append_event(session, make_event(2, turn_complete=True))
+        await queue.stop()
+
+        assert pending_before == 2
+        assert queue.pending("s1") == 0
+        assert await stored_event_count(fake_client) == 3
+
+    async def test_get_session_reads_own_pending_writes(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        queue: WriteBehindQueue,
+    ) -> None:
+        """get_sessionは未書き込みのイベントを書き込んでから読み取る"""
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        for i in range(3):
+            await service.append_event(session, make_event(i))
+
+        loaded = await FirestoreSessionService(client=fake_client, write_behind=queue).get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id="s1"
+        )
+        await queue.stop()
+
+        assert loaded is not None
+        assert [e.invocation_id for e in loaded.events] == ["inv-0", "inv-1", "inv-2"]
+        assert loaded.state["hint_level"] == 2
+        assert loaded.state["user:points"] == 2
+
+    async def test_backpressure_flushes_when_queue_is_full(
+        self, fake_client: FakeAsyncClient
+    ) -> None:
+        """未書き込みイベント数が上限に達するとフラッシュを待ってから積む"""
+        # Arrange
+        queue = WriteBehindQueue(max_pending_events=3, flush_interval_seconds=3600)
+        service = FirestoreSessionService(client=fake_client, write_behind=queue)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Act
+        for i in range(4):
+            await service.append_event(session, make_event(i))
+
+        # Assert
+        assert queue.stats.backpressure_waits == 1
+        assert await stored_event_count(fake_client) == 3
+        assert queue.pending("s1") == 1
+        await queue.stop()
+
+    async def test_failed_flush_keeps_order_and_retries(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        queue: WriteBehindQueue,
+    ) -> None:
+        """commitに失敗した書き込みはキューに残り、次回順序どおりに書き込む"""
+        # Arrange
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+        await service.append_event(session, make_event(1))
+
+        # Act
+        with (
+            patch.object(service, "_commit_batch", side_effect=RuntimeError("boom")),
+            pytest.raises(RuntimeError),
+        ):
+            await service.flush_events("s1")
+        await service.append_event(session, make_event(2))
+        await queue.stop()
+
+        # Assert
+        assert queue.stats.failures == 1
+        assert queue.stats.flushed == 3
+        loaded = await FirestoreSessionService(client=fake_client).get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id="s1"
+        )
+        assert loaded is not None
+        assert [e.invocation_id for e in loaded.events] == ["inv-0", "inv-1", "inv-2"]
+        assert loaded.state["hint_level"] == 2
+
+    async def test_drops_writes_for_deleted_session(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        queue: WriteBehindQueue,
+    ) -> None:
+        """他のインスタンスが削除したセッションの書き込みは破棄し、後続の処理を止めない"""
+        # Arrange
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+        await service.append_event(session, make_event(1))
+        await fake_client.collection("sessions").document("s1").delete()
+
+        # Act
+        loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(2, turn_complete=True))
+        await queue.stop()
+
+        # Assert
+        assert loaded is None
+        assert queue.stats.dropped == 3
+        assert queue.stats.queue_depth == 0
+        assert queue.stats.in_flight == 0
+        assert queue.pending("s1") == 0
+
+    async def test_gives_up_after_max_retries(self, fake_client: FakeAsyncClient) -> None:
+        """一時的なエラーはバックオフして再試行し、上限を超えたら破棄する"""
+        # Arrange
+        queue = WriteBehindQueue(flush_interval_seconds=3600, max_retries=2)
+        service = FirestoreSessionService(client=fake_client, write_behind=queue)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+        error = gexc.ServiceUnavailable("down")  # type: ignore[no-untyped-call]
+
+        # Act
+        with patch.object(service, "_commit_batch", side_effect=error):
+            for _ in range(2):
+                with pytest.raises(gexc.ServiceUnavailable):
+                    await service.flush_events("s1")
+            skipped = await queue.flush_all()
+            await service.flush_events("s1")
+        await queue.stop()
+
+        # Assert
+        assert skipped == 0
+        assert queue.stats.failures == 3
+        assert queue.stats.dropped == 1
+        assert queue.stats.queue_depth == 0
+        assert queue.pending("s1") == 0
+
+    async def test_dropped_batch_invalidates_cached_session(
+        self, fake_client: FakeAsyncClient, queue: WriteBehindQueue
+    ) -> None:
+        """破棄したバッチのイベントはキャッシュからも消え、次のget_sessionはFirestoreを読む"""
+        # Arrange
+        cache = SessionCache()
+        service = FirestoreSessionService(
+            client=fake_client, session_cache=cache, write_behind=queue
+        )
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+        await service.append_event(session, make_event(1))
+        assert cache.peek_last_update_time("s1") is not None
+        error = gexc.InvalidArgument("too large")  # type: ignore[no-untyped-call]
+
+        # Act
+        with patch.object(service, "_commit_batch", side_effect=error):
+            await service.flush_events("s1")
+        invalidated = cache.peek_last_update_time("s1") is None
+        loaded = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        # Assert
+        assert queue.stats.dropped == 2
+        assert invalidated
+        assert loaded is not None
+        assert loaded.events == []
+        assert "hint_level" not in loaded.state
+
+    async def test_discard_during_flush_keeps_counts(
+        self, service: FirestoreSessionService, queue: WriteBehindQueue
+    ) -> None:
+        """commit中に破棄されたセッションの書き込みはキューに戻さず、件数を二重に減らさない"""
+        # Arrange
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def failing_commit(_writes: list[object]) -> list[object]:
+            started.set()
+            await release.wait()
+            raise gexc.ServiceUnavailable("down")  # type: ignore[no-untyped-call]
+
+        # Act
+        with patch.object(service, "_commit_batch", side_effect=failing_commit):
+            flush = asyncio.create_task(service.flush_events("s1"))
+            await started.wait()
+            await service.append_event(session, make_event(1))
+            await service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+            release.set()
+            flushed = await flush
+        await queue.stop()
+
+        # Assert
+        assert flushed == 0
+        assert queue.stats.queue_depth == 0
+        assert queue.stats.in_flight == 0
+        assert queue.stats.dropped == 0
+        assert queue.pending("s1") == 0
+
+    async def test_records_flush_latency(self) -> None:
+        """バッチcommitの所要時間を記録する"""
+        client = FakeAsyncClient()
+        queue = WriteBehindQueue(flush_interval_seconds=3600)
+        service = FirestoreSessionService(client=client, write_behind=queue)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+
+        client.latency = 0.01
+        await service.flush_events("s1")
+
+        assert queue.stats.last_flush_seconds >= 0.01
+        assert queue.stats.mean_flush_seconds == queue.stats.last_flush_seconds
+
+    async def test_flushes_in_background(self, fake_client: FakeAsyncClient) -> None:
+        """バックグラウンドタスクが定期的に書き込む"""
+        queue = WriteBehindQueue(flush_interval_seconds=0.01)
+        service = FirestoreSessionService(client=fake_client, write_behind=queue)
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+
+        await service.append_event(session, make_event(0))
+        for _ in range(100):
+            if queue.stats.flushed:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        assert await stored_event_count(fake_client) == 1
+
+    async def test_delete_session_discards_pending_writes(
+        self,
+        service: FirestoreSessionService,
+        fake_client: FakeAsyncClient,
+        queue: WriteBehindQueue,
+    ) -> None:
+        """削除したセッションの未書き込みイベントは破棄する"""
+        session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await service.append_event(session, make_event(0))
+
+        await service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id="s1")
+        await queue.stop()
+
+        assert queue.stats.queue_depth == 0
+        assert await stored_event_count(fake_client) == 0
+
+    async def test_flush_events_without_write_behind(self, fake_client: FakeAsyncClient) -> None:
+        """write_behindが無効の場合は何もしない"""
+        assert await FirestoreSessionService(client=fake_client).flush_events("s1") == 0
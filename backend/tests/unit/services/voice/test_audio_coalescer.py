@@ -0,0 +1,109 @@
+"""audio_coalescer のテスト"""
+
+import asyncio
+
+import pytest
+
+from app.services.voice.audio_coalescer import AudioCoalescer
+
+
+class FakeClock:
+    """手動で進める時計"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _coalescer(
+    frames: list[bytes], clock: FakeClock, frame_ms: int = 20, max_delay_ms: int = 50
+) -> AudioCoalescer:
+    return AudioCoalescer(frames.append, frame_ms=frame_ms, max_delay_ms=max_delay_ms, clock=clock)
+
+
+class TestAudioCoalescer:
+    """AudioCoalescer のテスト"""
+
+    def test_rejects_out_of_range_frame(self) -> None:
+        """フレーム長は20〜100ミリ秒"""
+        with pytest.raises(ValueError):
+            AudioCoalescer(lambda _: None, frame_ms=10)
+        with pytest.raises(ValueError):
+            AudioCoalescer(lambda _: None, frame_ms=120)
+
+    def test_aggregates_small_chunks_into_fixed_frames(self) -> None:
+        """小さなチャンクを固定長（20ms = 640バイト）のフレームにまとめる"""
+        frames: list[bytes] = []
+        coalescer = _coalescer(frames, FakeClock())
+
+        for i in range(10):
+            coalescer.push(bytes([i]) * 160)
+
+        assert [len(frame) for frame in frames] == [640, 640]
+        assert frames[0] == b"".join(bytes([i]) * 160 for i in range(4))
+        assert coalescer.buffered_bytes == 320
+
+    def test_large_chunk_is_split_into_frames(self) -> None:
+        """フレーム数個分のチャンクは順に分割して送る"""
+        frames: list[bytes] = []
+        coalescer = _coalescer(frames, FakeClock())
+
+        coalescer.push(b"\x01" * 1500)
+
+        assert [len(frame) for frame in frames] == [640, 640]
+        assert coalescer.buffered_bytes == 220
+
+    def test_flushes_partial_frame_after_max_delay(self) -> None:
+        """最も古いバイトから max_delay_ms 経過したらフレーム長未満でも送る"""
+        clock = FakeClock()
+        frames: list[bytes] = []
+        coalescer = _coalescer(frames, clock)
+
+        coalescer.push(b"\x01" * 100)
+        clock.now = 0.03
+        coalescer.push(b"\x02" * 101)
+        assert coalescer.flush_expired() is False
+
+        clock.now = 0.05
+        assert coalescer.flush_expired() is True
+        # サンプル境界（2バイト）に揃え、端数の1バイトは残す
+        assert [len(frame) for frame in frames] == [200]
+        assert coalescer.buffered_bytes == 1
+        assert coalescer.stats.deadline_flushes == 1
+        assert coalescer.flush_expired() is False
+
+    def test_stats_track_frame_size_and_latency(self) -> None:
+        """フレームサイズと最も古いバイトからの遅延を記録する"""
+        clock = FakeClock()
+        frames: list[bytes] = []
+        coalescer = _coalescer(frames, clock)
+
+        coalescer.push(b"\x00" * 320)
+        clock.now = 0.01
+        coalescer.push(b"\x00" * 320)
+        clock.now = 0.02
+        coalescer.push(b"\x00" * 100)
+        coalescer.close()
+
+        stats = coalescer.stats
+        assert stats.chunks_in == 3
+        assert stats.frames_out == 2
+        assert stats.bytes_in == stats.bytes_out == 740
+        assert stats.mean_frame_bytes == 370
+        assert stats.max_latency == pytest.approx(0.01)
+        assert stats.mean_latency_ms == pytest.approx(5.0)
+
+    async def test_timer_flushes_when_input_stalls(self) -> None:
+        """イベントループ上では入力が途切れても max_delay_ms 後に送る"""
+        frames: list[bytes] = []
+        coalescer = AudioCoalescer(frames.append, frame_ms=100, max_delay_ms=20)
+
+        coalescer.push(b"\x00" * 64)
+        assert frames == []
+        await asyncio.sleep(0.05)
+
+        assert frames == [b"\x00" * 64]
+        assert coalescer.stats.deadline_flushes == 1
+        coalescer.close()
@@ -0,0 +1,60 @@
+"""audio_frames のテスト"""
+
+import pytest
+
+from app.services.voice.audio_frames import (
+    AUDIO_FRAME_HEADER,
+    AUDIO_FRAME_VERSION,
+    AUDIO_KIND_PCM16,
+    DEFAULT_OUTPUT_SAMPLE_RATE,
+    AudioChunk,
+    AudioFrameEncoder,
+    decode_audio_frame,
+    pcm_sample_rate,
+)
+
+
+class TestPcmSampleRate:
+    """pcm_sample_rate のテスト"""
+
+    def test_reads_rate_parameter(self) -> None:
+        """rate パラメータからサンプリングレートを取得する"""
+        assert pcm_sample_rate("audio/pcm;rate=16000") == 16000
+        assert pcm_sample_rate("audio/PCM; rate=24000") == 24000
+
+    def test_defaults_without_rate(self) -> None:
+        """rate がない場合はLive APIの出力レート"""
+        assert pcm_sample_rate("audio/pcm") == DEFAULT_OUTPUT_SAMPLE_RATE
+        assert pcm_sample_rate(None) == DEFAULT_OUTPUT_SAMPLE_RATE
+
+    def test_rejects_non_pcm_and_invalid_rate(self) -> None:
+        """PCM以外や不正なレートはNone"""
+        assert pcm_sample_rate("audio/mp3") is None
+        assert pcm_sample_rate("audio/pcm;rate=abc") is None
+        assert pcm_sample_rate("audio/pcm;rate=96000") is None
+
+
+class TestAudioFrameEncoder:
+    """AudioFrameEncoder / decode_audio_frame のテスト"""
+
+    def test_round_trip_with_sequence(self) -> None:
+        """ヘッダーに連番とレートを付け、ペイロードはそのまま送る"""
+        encoder = AudioFrameEncoder()
+
+        first = encoder.encode(AudioChunk(b"\x01\x02", 24000))
+        second = encoder.encode(AudioChunk(b"\x03\x04\x05\x06", 16000))
+
+        assert len(first) == AUDIO_FRAME_HEADER.size + 2
+        header, payload = decode_audio_frame(second)
+        assert header.version == AUDIO_FRAME_VERSION
+        assert header.kind == AUDIO_KIND_PCM16
+        assert header.sample_rate == 16000
+        assert header.seq == 1
+        assert payload == b"\x03\x04\x05\x06"
+
+    def test_decode_rejects_short_or_unknown_frames(self) -> None:
+        """短すぎるフレームや未知のバージョンはエラー"""
+        with pytest.raises(ValueError):
+            decode_audio_frame(b"\x01\x01")
+        with pytest.raises(ValueError):
+            decode_audio_frame(AUDIO_FRAME_HEADER.pack(99, AUDIO_KIND_PCM16, 24000, 0))
@@ -0,0 +1,136 @@
+"""audio_ingest のテスト"""
+
+import numpy as np
+import pytest
+
+from app.services.voice.audio_ingest import (
+    AudioIngest,
+    AudioInputFormat,
+    design_polyphase_filter,
+)
+
+OUTPUT_RATE = 16000
+
+
+def _sine(freq: float, rate: int, seconds: float = 0.5, amplitude: float = 0.5) -> np.ndarray:
+    return amplitude * np.sin(2 * np.pi * freq * np.arange(int(rate * seconds)) / rate)
+
+
+def _encode(signal: np.ndarray, input_format: AudioInputFormat) -> bytes:
+    if input_format.channels == 2:
+        signal = np.repeat(signal, 2)
+    if input_format.encoding == "f32le":
+        return signal.astype("<f4").tobytes()
+    return np.round(signal * 32767).astype("<i2").tobytes()
+
+
+def _convert_in_chunks(ingest: AudioIngest, data: bytes, chunk: int) -> np.ndarray:
+    out = b"".join(ingest.convert(data[i : i + chunk]) for i in range(0, len(data), chunk))
+    return np.frombuffer(out, dtype="<i2") / 32767
+
+
+def _snr_db(actual: np.ndarray, expected: np.ndarray) -> float:
+    error = actual - expected
+    return float(10 * np.log10(np.mean(expected**2) / np.mean(error**2)))
+
+
+class TestAudioInputFormat:
+    """AudioInputFormat のテスト"""
+
+    def test_rejects_unsupported_formats(self) -> None:
+        """サポートしていないエンコーディング・レート・チャンネル数はエラー"""
+        with pytest.raises(ValueError):
+            AudioInputFormat(encoding="mulaw", sample_rate=48000)  # type: ignore[arg-type]
+        with pytest.raises(ValueError):
+            AudioInputFormat(sample_rate=8000)
+        with pytest.raises(ValueError):
+            AudioInputFormat(channels=6)
+
+    def test_native_format_is_passed_through(self) -> None:
+        """16kHz Int16 モノラルは変換しない"""
+        ingest = AudioIngest(AudioInputFormat())
+
+        assert AudioInputFormat().is_native is True
+        assert ingest.convert(b"\x01\x02\x03") == b"\x01\x02\x03"
+
+
+class TestDesignPolyphaseFilter:
+    """design_polyphase_filter のテスト"""
+
+    def test_rows_have_unity_dc_gain(self) -> None:
+        """各位相の係数の和は1"""
+        half, table = design_polyphase_filter(160, 441)
+
+        assert table.shape == (160, 2 * half)
+        np.testing.assert_allclose(table.sum(axis=1), 1.0, atol=1e-5)
+
+
+class TestAudioIngest:
+    """AudioIngest のテスト"""
+
+    @pytest.mark.parametrize(
+        "input_format",
+        [
+            AudioInputFormat("f32le", 48000, 1),
+            AudioInputFormat("f32le", 44100, 2),
+            AudioInputFormat("s16le", 48000, 2),
+            AudioInputFormat("s16le", 44100, 1),
+            AudioInputFormat("f32le", 16000, 1),
+        ],
+    )
+    def test_resamples_tone_to_16khz(self, input_format: AudioInputFormat) -> None:
+        """1kHzの正弦波を 16kHz の同じ正弦波に変換する"""
+        rate = input_format.sample_rate
+        data = _encode(_sine(1000, rate), input_format)
+        # 20ms 相当のチャンクに、サンプル境界をまたぐよう1バイト足して分割する
+        chunk = rate // 50 * input_format.frame_size + 1
+
+        output = _convert_in_chunks(AudioIngest(input_format), data, chunk)
+
+        assert abs(len(output) - OUTPUT_RATE // 2) <= 16
+        expected = _sine(1000, OUTPUT_RATE)[: len(output)]
+        assert _snr_db(output[32:], expected[32:]) > 60
+
+    def test_attenuates_frequencies_above_output_nyquist(self) -> None:
+        """8kHzを超える成分は折り返さずに除去する"""
+        input_format = AudioInputFormat("f32le", 48000, 1)
+
+        output = _convert_in_chunks(
+            AudioIngest(input_format), _encode(_sine(11000, 48000), input_format), 3840
+        )
+
+        assert np.sqrt(np.mean(output[32:] ** 2)) < 1e-3
+
+    def test_downmixes_stereo(self) -> None:
+        """ステレオは左右の平均にする"""
+        input_format = AudioInputFormat("f32le", 48000, 2)
+        left = _sine(500, 48000)
+        stereo = np.column_stack([left, np.zeros_like(left)]).astype("<f4").tobytes()
+
+        output = _convert_in_chunks(AudioIngest(input_format), stereo, 7680)
+
+        expected = _sine(500, OUTPUT_RATE, amplitude=0.25)[: len(output)]
+        assert _snr_db(output[32:], expected[32:]) > 60
+
+    def test_chunking_does_not_change_output(self) -> None:
+        """チャンクの分け方によらず同じ出力になる"""
+        input_format = AudioInputFormat("s16le", 44100, 2)
+        data = _encode(_sine(700, 44100), input_format)
+
+        whole = _convert_in_chunks(AudioIngest(input_format), data, len(data))
+        chunked = _convert_in_chunks(AudioIngest(input_format), data, 997)
+
+        np.testing.assert_array_equal(whole, chunked)
+
+    def test_reuses_buffers_across_frames(self) -> None:
+        """通常のフレーム長ではバッファを再確保しない"""
+        input_format = AudioInputFormat("f32le", 48000, 1)
+        ingest = AudioIngest(input_format)
+        data = _encode(_sine(440, 48000), input_format)
+        buffers = {id(ingest._buffer), id(ingest._spare)}
+        rows = ingest._rows
+
+        _convert_in_chunks(ingest, data, 48000 // 50 * 4)
+
+        assert {id(ingest._buffer), id(ingest._spare)} == buffers
+        assert ingest._rows is rows
@@ -9,11 +9,14 @@ import pytest
 from app.schemas.voice_stream import (
     ADKEventMessage,
 )
+from app.services.voice.audio_frames import AudioChunk
+from app.services.voice.audio_ingest import AudioInputFormat
 from app.services.voice.streaming_service import (
     DEFAULT_APP_NAME,
     LIVE_MODEL,
     VoiceStreamingService,
 )
+from app.services.voice.vad import VoiceActivityDetector
 
 
 def create_mock_event(
@@ -146,6 +149,90 @@ class TestSendAudio:
         assert blob.mime_type == "audio/pcm"
         assert blob.data == audio_data
 
+    @patch("app.services.voice.streaming_service.LiveRequestQueue")
+    @patch("app.services.voice.streaming_service.Runner")
+    @patch("app.services.voice.streaming_service.create_router_agent")
+    def test_coalesces_small_chunks(
+        self,
+        _mock_create_agent: MagicMock,
+        _mock_runner_cls: MagicMock,
+        mock_queue_cls: MagicMock,
+    ) -> None:
+        """audio_frame_ms を指定すると固定長フレームにまとめ、close時に残りを送る"""
+        mock_queue = MagicMock()
+        mock_queue_cls.return_value = mock_queue
+
+        service = VoiceStreamingService(
+            session_service=MagicMock(),
+            memory_service=MagicMock(),
+            audio_frame_ms=20,
+        )
+
+        for _ in range(5):
+            service.send_audio(b"\x00" * 160)
+        assert mock_queue.send_realtime.call_count == 1
+        assert len(mock_queue.send_realtime.call_args[0][0].data) == 640
+
+        service.close()
+        assert mock_queue.send_realtime.call_count == 2
+        assert len(mock_queue.send_realtime.call_args[0][0].data) == 160
+        assert service.audio_coalescer is not None
+        assert service.audio_coalescer.stats.frames_out == 2
+
+    @patch("app.services.voice.streaming_service.LiveRequestQueue")
+    @patch("app.services.voice.streaming_service.Runner")
+    @patch("app.services.voice.streaming_service.create_router_agent")
+    def test_vad_drops_silent_frames(
+        self,
+        _mock_create_agent: MagicMock,
+        _mock_runner_cls: MagicMock,
+        mock_queue_cls: MagicMock,
+    ) -> None:
+        """vad を指定すると無音のフレームは送信しない"""
+        mock_queue = MagicMock()
+        mock_queue_cls.return_value = mock_queue
+
+        service = VoiceStreamingService(
+            session_service=MagicMock(),
+            memory_service=MagicMock(),
+            vad=VoiceActivityDetector(pre_roll_ms=0, hangover_ms=0),
+        )
+
+        service.send_audio(bytes(640))
+        mock_queue.send_realtime.assert_not_called()
+
+        loud = b"\x00\x40\x00\xc0" * 160
+        service.send_audio(loud)
+        mock_queue.send_realtime.assert_called_once()
+        assert mock_queue.send_realtime.call_args[0][0].data == loud
+
+    @patch("app.services.voice.streaming_service.LiveRequestQueue")
+    @patch("app.services.voice.streaming_service.Runner")
+    @patch("app.services.voice.streaming_service.create_router_agent")
+    def test_converts_input_format_to_16khz_int16(
+        self,
+        _mock_create_agent: MagicMock,
+        _mock_runner_cls: MagicMock,
+        mock_queue_cls: MagicMock,
+    ) -> None:
+        """input_format を指定すると 16kHz Int16 モノラルに変換してから送信する"""
+        mock_queue = MagicMock()
+        mock_queue_cls.return_value = mock_queue
+
+        service = VoiceStreamingService(
+            session_service=MagicMock(),
+            memory_service=MagicMock(),
+            input_format=AudioInputFormat("f32le", 48000, 2),
+        )
+
+        # 48kHz ステレオ Float32 の 100ms（4800サンプル × 2ch × 4バイト）
+        service.send_audio(bytes(4800 * 2 * 4))
+
+        blob = mock_queue.send_realtime.call_args[0][0]
+        assert blob.mime_type == "audio/pcm"
+        # フィルタの遅延分を除いた約1600サンプル（16-bit）
+        assert 1580 * 2 <= len(blob.data) <= 1600 * 2
+
 
 class TestSendText:
     """send_textメソッドのテスト"""
@@ -439,6 +526,50 @@ class TestReceiveEvents:
         assert len(events) == 1
         assert events[0].turnComplete is True
 
+    @pytest.mark.asyncio
+    @patch("app.services.voice.streaming_service.Runner")
+    @patch("app.services.voice.streaming_service.create_router_agent")
+    async def test_yields_audio_chunks_in_binary_mode(
+        self,
+        _mock_create_agent: MagicMock,
+        _mock_runner_cls: MagicMock,
+    ) -> None:
+        """binary_audio の場合、PCM音声はbase64にせずAudioChunkとしてyieldする"""
+        service = VoiceStreamingService(
+            session_service=MagicMock(),
+            memory_service=MagicMock(),
+            binary_audio=True,
+        )
+
+        content = create_mock_content_with_audio(b"\x00\x01\x02\x03")
+        content.parts[0].inline_data.mime_type = "audio/pcm;rate=24000"
+        audio_event = create_mock_event(author="agent", content=content)
+        audio_with_turn_complete = create_mock_event(
+            author="agent",
+            content=create_mock_content_with_audio(b"\x04\x05"),
+            turn_complete=True,
+        )
+
+        async def mock_run_live(**_kwargs: Any) -> Any:
+            yield audio_event
+            yield audio_with_turn_complete
+
+        service._runner.run_live = mock_run_live  # type: ignore[method-assign]
+
+        events = [
+            event
+            async for event in service.receive_events(user_id="user-1", session_id="session-1")
+        ]
+
+        assert events[:2] == [
+            AudioChunk(b"\x00\x01\x02\x03", 24000),
+            AudioChunk(b"\x04\x05", 24000),
+        ]
+        assert isinstance(events[2], ADKEventMessage)
+        assert events[2].turnComplete is True
+        assert events[2].content is None
+        assert len(events) == 3
+
 
 class TestConstants:
     """定数のテスト"""
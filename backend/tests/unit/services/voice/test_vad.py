@@ -0,0 +1,108 @@
+"""vad のテスト（合成波形）"""
+
+import numpy as np
+
+from app.services.voice.vad import VoiceActivityDetector, frame_features
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 320  # 20ms
+
+
+def _to_pcm(signal: np.ndarray) -> bytes:
+    return np.clip(signal * 32767, -32768, 32767).astype("<i2").tobytes()
+
+
+def _tone(db: float, freq: float = 200.0, samples: int = CHUNK_SAMPLES) -> bytes:
+    """指定したdBFS（RMS）の正弦波"""
+    t = np.arange(samples) / SAMPLE_RATE
+    amplitude = 10 ** (db / 20) * np.sqrt(2)
+    return _to_pcm(amplitude * np.sin(2 * np.pi * freq * t))
+
+
+def _noise(db: float, samples: int = CHUNK_SAMPLES, seed: int = 0) -> bytes:
+    """指定したdBFS（RMS）のホワイトノイズ"""
+    rng = np.random.default_rng(seed)
+    return _to_pcm(rng.standard_normal(samples) * 10 ** (db / 20))
+
+
+SILENCE = bytes(CHUNK_SAMPLES * 2)
+
+
+class TestFrameFeatures:
+    """frame_features のテスト"""
+
+    def test_energy_and_zero_crossing_rate(self) -> None:
+        """正弦波のエネルギーとゼロ交差率を窓ごとに計算する"""
+        samples = np.frombuffer(_tone(-20.0, freq=400.0, samples=480), dtype="<i2")
+
+        energy_db, zcr = frame_features(samples, window=160)
+
+        assert energy_db.shape == (3,)
+        np.testing.assert_allclose(energy_db, -20.0, atol=0.2)
+        # 400Hz は 1秒あたり800回交差する
+        np.testing.assert_allclose(zcr, 800 / SAMPLE_RATE, atol=0.01)
+
+    def test_silence_and_partial_window(self) -> None:
+        """無音は下限のエネルギー、末尾の端数は短い窓になる"""
+        energy_db, zcr = frame_features(np.zeros(250, dtype=np.int16), window=160)
+
+        assert energy_db.shape == (2,)
+        assert (energy_db <= -90).all()
+        assert (zcr == 0).all()
+
+
+class TestVoiceActivityDetector:
+    """VoiceActivityDetector のテスト"""
+
+    def test_classifies_synthetic_waveforms(self) -> None:
+        """声（正弦波）・無声摩擦音（高いゼロ交差率）は発話、無音・小さな雑音は無音"""
+        vad = VoiceActivityDetector()
+
+        assert vad.is_speech(_tone(-25.0)) is True
+        assert vad.is_speech(_noise(-50.0)) is True
+        assert vad.is_speech(SILENCE) is False
+        assert vad.is_speech(_noise(-65.0)) is False
+        # 閾値付近でもゼロ交差率が低い（低い周波数のハム音）ものは発話としない
+        assert vad.is_speech(_tone(-50.0, freq=50.0)) is False
+
+    def test_suppresses_silence_between_utterances(self) -> None:
+        """ハングオーバー後の無音は送らない"""
+        vad = VoiceActivityDetector(pre_roll_ms=0, hangover_ms=100)
+
+        sent = [vad.process(SILENCE) for _ in range(10)]
+
+        assert sent == [[]] * 10
+        assert vad.stats.chunks_suppressed == 10
+        assert vad.stats.bytes_out == 0
+
+    def test_pre_roll_keeps_speech_onset(self) -> None:
+        """発話開始時に直前の無音（プレロール）も送り、語頭を欠落させない"""
+        vad = VoiceActivityDetector(pre_roll_ms=40, hangover_ms=100)
+        quiet = [_noise(-70.0, seed=i) for i in range(5)]
+        for chunk in quiet:
+            assert vad.process(chunk) == []
+
+        speech = _tone(-20.0)
+        sent = vad.process(speech)
+
+        assert sent == [quiet[3], quiet[4], speech]
+        assert vad.stats.speech_onsets == 1
+        assert vad.stats.chunks_suppressed == 3
+
+    def test_hangover_keeps_trailing_silence(self) -> None:
+        """発話終了後 hangover_ms の間は無音も送る"""
+        vad = VoiceActivityDetector(pre_roll_ms=0, hangover_ms=60)
+        vad.process(_tone(-20.0))
+
+        sent = [len(vad.process(SILENCE)) for _ in range(5)]
+
+        assert sent == [1, 1, 1, 0, 0]
+        assert vad.in_speech is False
+
+    def test_keepalive_throttles_silence(self) -> None:
+        """keepalive_ms を指定すると無音中もその間隔で1チャンク送る"""
+        vad = VoiceActivityDetector(pre_roll_ms=0, hangover_ms=0, keepalive_ms=100)
+
+        sent = [len(vad.process(SILENCE)) for _ in range(10)]
+
+        assert sent == [0, 0, 0, 0, 1, 0, 0, 0, 0, 1]
@@ -0,0 +1,157 @@
+"""FakeAsyncClient のテスト"""
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.sessions.session import Session
+from google.api_core.exceptions import ServiceUnavailable
+from google.genai import types
+
+from app.services.adk.memory.firestore_memory_service import FirestoreMemoryService
+from app.testing.fake_firestore import FakeAsyncClient
+
+
+class TestOpStats:
+    """操作ごとの統計のテスト"""
+
+    async def test_counts_reads_and_writes_per_operation(self) -> None:
+        """呼び出し数・読み取り数・書き込み数を操作ごとに記録する"""
+        # Arrange
+        client = FakeAsyncClient()
+        users = client.collection("users")
+
+        # Act
+        await users.document("a").set({"n": 1})
+        batch = client.batch()
+        batch.set(users.document("b"), {"n": 2})
+        batch.update(users.document("a"), {"n": 3})
+        await batch.commit()
+        await users.document("a").get()
+        await users.where("n", ">", 0).get()
+
+        # Assert
+        assert (client.op_stats["set"].calls, client.op_stats["set"].writes) == (1, 1)
+        assert (client.op_stats["commit"].calls, client.op_stats["commit"].writes) == (1, 2)
+        assert client.op_stats["get"].reads == 1
+        assert client.op_stats["query"].reads == 2
+        assert (client.reads, client.writes) == (3, 3)
+
+    async def test_reset_stats_keeps_data(self) -> None:
+        """統計をリセットしてもデータは残る"""
+        # Arrange
+        client = FakeAsyncClient()
+        await client.collection("users").document("a").set({"n": 1})
+
+        # Act
+        client.reset_stats()
+
+        # Assert
+        assert (client.reads, client.writes, dict(client.op_stats)) == (0, 0, {})
+        doc = await client.collection("users").document("a").get()
+        assert doc.to_dict() == {"n": 1}
+
+
+class TestLatencyInjection:
+    """レイテンシ注入のテスト"""
+
+    async def test_op_latency_overrides_default(self) -> None:
+        """操作ごとのレイテンシが未指定の操作はデフォルトを使う"""
+        # Arrange
+        client = FakeAsyncClient(latency=0.001, op_latency={"get": 0.002})
+        ref = client.collection("users").document("a")
+
+        # Act
+        await ref.set({"n": 1})
+        await ref.get()
+
+        # Assert
+        assert client.op_stats["set"].latency_seconds == pytest.approx(0.001)
+        assert client.op_stats["get"].latency_seconds == pytest.approx(0.002)
+
+    async def test_jitter_is_reproducible_with_seed(self) -> None:
+        """同じシードなら同じジッターが注入される"""
+        # Arrange
+        clients = [FakeAsyncClient(jitter=0.001, seed=42) for _ in range(2)]
+
+        # Act
+        for client in clients:
+            for i in range(5):
+                await client.collection("users").document(str(i)).set({"n": i})
+
+        # Assert
+        first, second = (client.op_stats["set"].latency_seconds for client in clients)
+        assert first == second
+        assert 0 < first <= 0.005
+
+    def test_unknown_operation_is_rejected(self) -> None:
+        """未知の操作名はValueError"""
+        with pytest.raises(ValueError, match="Unknown operations"):
+            FakeAsyncClient(op_latency={"upsert": 0.1})
+
+
+class TestErrorInjection:
+    """エラー注入のテスト"""
+
+    async def test_failed_commit_does_not_apply_writes(self) -> None:
+        """エラーを注入したcommitは書き込みを反映しない"""
+        # Arrange
+        client = FakeAsyncClient(op_error_rates={"commit": 1.0})
+        ref = client.collection("users").document("a")
+        batch = client.batch()
+        batch.set(ref, {"n": 1})
+
+        # Act & Assert
+        with pytest.raises(ServiceUnavailable):
+            await batch.commit()
+        assert client.op_stats["commit"].errors == 1
+        assert client.writes == 0
+        assert not (await ref.get()).exists
+
+    async def test_error_rate_is_reproducible_with_seed(self) -> None:
+        """同じシードなら同じRPCが失敗する"""
+
+        async def failures(seed: int) -> list[int]:
+            client = FakeAsyncClient(error_rate=0.5, seed=seed)
+            failed = []
+            for i in range(20):
+                try:
+                    await client.collection("users").document(str(i)).get()
+                except ServiceUnavailable:
+                    failed.append(i)
+            return failed
+
+        first = await failures(7)
+        assert first == await failures(7)
+        assert 0 < len(first) < 20
+
+
+class TestMemoryServiceSurface:
+    """FirestoreMemoryService が使用するAPIのテスト"""
+
+    async def test_add_and_search_memory(self) -> None:
+        """記憶の追加と検索がインメモリで動作する"""
+        # Arrange
+        client = FakeAsyncClient()
+        service = FirestoreMemoryService(client=client)
+        session = Session(
+            id="s1",
+            app_name="homework_coach",
+            user_id="user-1",
+            events=[
+                Event(
+                    author="user",
+                    content=types.Content(role="user", parts=[types.Part(text="apple pie")]),
+                )
+            ],
+        )
+
+        # Act
+        await service.add_session_to_memory(session)
+        response = await service.search_memory(
+            app_name="homework_coach", user_id="user-1", query="apple"
+        )
+
+        # Assert
+        assert len(response.memories) == 1
+        # 記憶エントリ + memory_version + 書き込み済み位置
+        assert client.op_stats["commit"].writes == 3
+        assert client.op_stats["query"].reads == 1
@@ -44,6 +44,49 @@ resource "google_firestore_index" "sessions_active_by_user" {
   depends_on = [google_firestore_database.main]
 }
 
+# ADK sessions by app/user, newest first (list_sessions_page)
+resource "google_firestore_index" "adk_sessions_by_user_updated" {
+  project    = var.project_id
+  database   = google_firestore_database.main.name
+  collection = "sessions"
+
+  fields {
+    field_path = "app_name"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "user_id"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "last_update_time"
+    order      = "DESCENDING"
+  }
+
+  depends_on = [google_firestore_database.main]
+}
+
+# ADK sessions by app, newest first (list_sessions_page without user_id)
+resource "google_firestore_index" "adk_sessions_by_app_updated" {
+  project    = var.project_id
+  database   = google_firestore_database.main.name
+  collection = "sessions"
+
+  fields {
+    field_path = "app_name"
+    order      = "ASCENDING"
+  }
+
+  fields {
+    field_path = "last_update_time"
+    order      = "DESCENDING"
+  }
+
+  depends_on = [google_firestore_database.main]
+}
+
 # Problems by subject and grade
 resource "google_firestore_index" "problems_by_subject_grade" {
   project    = var.project_id
@@ -130,6 +173,36 @@ resource "google_firestore_index" "users_by_parent" {
   depends_on = [google_firestore_database.main]
 }
 
+# =============================================================================
+# Single-field index exemptions
+# =============================================================================
+
+# Memory inverted index: posting lists (terms/{term}/shards/{n}) are read by
+# document ID only. Exempt the entry-ID-keyed map from single-field indexing so
+# each posting does not consume index entries (40,000 per document limit).
+resource "google_firestore_field" "memory_term_shard_postings" {
+  project    = var.project_id
+  database   = google_firestore_database.main.name
+  collection = "shards"
+  field      = "postings"
+
+  index_config {}
+
+  depends_on = [google_firestore_database.main]
+}
+
+# Memory inverted index: per-entry token counts (entry_lengths/{n})
+resource "google_firestore_field" "memory_entry_lengths" {
+  project    = var.project_id
+  database   = google_firestore_database.main.name
+  collection = "entry_lengths"
+  field      = "lengths"
+
+  index_config {}
+
+  depends_on = [google_firestore_database.main]
+}
+
 # =============================================================================
 # Phase 2 Indexes (conditional)
 # =============================================================================